@@ -0,0 +1,8 @@
+# benchmarks/__init__.py
+"""
+Bộ công cụ đo hiệu năng SRTTranslator hoàn toàn offline.
+
+- mock_llm_server: server giả lập Gemini generateContent và OpenAI chat-completions
+- synthetic_srt: sinh file SRT tổng hợp từ 100 đến 50k phụ đề
+- bench_translator: chạy ma trận số luồng x kích thước lô và báo cáo kết quả
+"""
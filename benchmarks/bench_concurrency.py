@@ -0,0 +1,95 @@
+# benchmarks/bench_concurrency.py
+"""
+So sánh số luồng cố định với bộ điều chỉnh AIMD (concurrency.py).
+
+Server LLM giả lập chỉ nhận tối đa --provider-limit yêu cầu đồng thời và trả
+429 cho phần vượt quá, như một nhà cung cấp thật. Mỗi cấu hình dịch cùng một
+file; kết quả gồm thời gian, số phản hồi 429 và số yêu cầu đồng thời đỉnh.
+Cấu hình "aimd" chạy hai lần: lần hai bắt đầu từ giới hạn đã nhớ của lần một.
+
+Ví dụ:
+    python -m benchmarks.bench_concurrency --cues 600 --provider-limit 6 --fixed 2,16
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Dict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.mock_llm_server import MockLLMConfig, MockLLMServer
+from benchmarks.synthetic_srt import write_synthetic_srt
+
+
+def run_once(label: str, args, work_dir: str, threads: int, adaptive: bool) -> Dict:
+    from srt_translator import SRTTranslator
+
+    config = MockLLMConfig(
+        latency=args.latency, seed=1, max_concurrent=args.provider_limit
+    )
+    input_file = write_synthetic_srt(
+        os.path.join(work_dir, "input.srt"), args.cues, seed=1
+    )
+    with MockLLMServer(config) as server:
+        api_config = {
+            "type": "gemini",
+            "key": "bench",
+            "base_url": server.gemini_base_url,
+            "concurrency_memory": os.path.join(work_dir, "concurrency.json"),
+        }
+        if adaptive:
+            api_config["adaptive_concurrency"] = True
+            api_config["max_concurrency"] = args.max_concurrency
+        translator = SRTTranslator(
+            update_status_callback=lambda msg: None,
+            state_dir=os.path.join(work_dir, f"state_{label}"),
+        )
+        start = time.perf_counter()
+        translator.translate_file(
+            input_file,
+            os.path.join(work_dir, f"{label}.srt"),
+            api_config,
+            threads,
+            args.batch_size,
+        )
+        elapsed = time.perf_counter() - start
+        controller = translator.get_api(api_config).concurrency
+        return {
+            "label": label,
+            "seconds": elapsed,
+            "requests": server.stats["requests"],
+            "rate_limited": server.stats["rate_limited"],
+            "peak": server.peak_concurrent,
+            "final": controller.limit if controller is not None else threads,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark điều chỉnh số yêu cầu đồng thời")
+    parser.add_argument("--cues", type=int, default=600)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--latency", default="fixed:0.2")
+    parser.add_argument("--provider-limit", type=int, default=6)
+    parser.add_argument("--fixed", default="2,16", help="Các số luồng cố định cần so sánh")
+    parser.add_argument("--start", type=int, default=2, help="Số luồng ban đầu của AIMD")
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"{'cấu hình':<10} {'thời gian (s)':>14} {'yêu cầu':>8} {'429':>6} {'đỉnh':>6} {'cuối':>6}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        runs = [(f"fixed-{n}", int(n), False) for n in args.fixed.split(",")]
+        runs += [("aimd-1", args.start, True), ("aimd-2", args.start, True)]
+        for label, threads, adaptive in runs:
+            result = run_once(label, args, work_dir, threads, adaptive)
+            print(
+                f"{result['label']:<10} {result['seconds']:>14.2f} {result['requests']:>8} "
+                f"{result['rate_limited']:>6} {result['peak']:>6} {result['final']:>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
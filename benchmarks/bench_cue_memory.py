@@ -0,0 +1,107 @@
+# benchmarks/bench_cue_memory.py
+"""
+So sánh bộ nhớ và kích thước pickle giữa dạng dict cũ và Cue (__slots__).
+
+Ví dụ:
+    python -m benchmarks.bench_cue_memory --cues 100000
+"""
+import argparse
+import gc
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.synthetic_srt import generate_srt
+from subtitle_cue import Cue
+
+
+def _as_dicts(cues: List[Cue]) -> List[Dict]:
+    """Tái tạo bố cục cũ: dict với thời gian dạng chuỗi, sau khi dịch có original_text."""
+    result = []
+    for cue in cues:
+        item = {
+            "index": cue.index,
+            "start_time": cue.start_time,
+            "end_time": cue.end_time,
+            "text": "Bản dịch: " + cue.text,
+        }
+        item["original_text"] = cue.text
+        result.append(item)
+    return result
+
+
+def _as_cues(cues: List[Cue]) -> List[Cue]:
+    result = []
+    for cue in cues:
+        translated = cue.copy()
+        translated.original_text = cue.text
+        translated["text"] = "Bản dịch: " + cue.text
+        result.append(translated)
+    return result
+
+
+def measure(name: str, build: Callable[[], List]) -> Dict:
+    """Đo bộ nhớ tăng thêm (tracemalloc), kích thước và thời gian pickle."""
+    gc.collect()
+    tracemalloc.start()
+    data = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+    dump_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pickle.loads(blob)
+    load_s = time.perf_counter() - start
+
+    return {
+        "layout": name,
+        "memory_mb": current / 1024 / 1024,
+        "pickle_mb": len(blob) / 1024 / 1024,
+        "dump_s": dump_s,
+        "load_s": load_s,
+    }
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark bộ nhớ dict và Cue")
+    parser.add_argument("--cues", type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    from srt_translator import SRTTranslator
+
+    import tempfile
+
+    with tempfile.NamedTemporaryFile("w", suffix=".srt", delete=False, encoding="utf-8") as f:
+        f.write(generate_srt(args.cues))
+        path = f.name
+    try:
+        parsed = SRTTranslator(lambda msg: None).parse_srt(path)
+    finally:
+        os.remove(path)
+
+    rows = [
+        measure("dict", lambda: _as_dicts(parsed)),
+        measure("Cue", lambda: _as_cues(parsed)),
+    ]
+
+    print(f"{args.cues} phụ đề đã dịch (có original_text)")
+    print(f"{'Bố cục':<8} {'RAM MB':>9} {'Pickle MB':>10} {'dump s':>8} {'load s':>8}")
+    for row in rows:
+        print(
+            f"{row['layout']:<8} {row['memory_mb']:>9.1f} {row['pickle_mb']:>10.1f} "
+            f"{row['dump_s']:>8.3f} {row['load_s']:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/bench_scan.py
+"""
+Đo thời gian tìm file phụ đề trên cây thư mục lớn (file_scanner.py).
+
+Tạo một cây gồm --dirs thư mục, mỗi thư mục --files file phụ đề rỗng (một
+nửa là file đầu ra "_vi"), rồi so sánh os.walk tuần tự (cách cũ) với
+SubtitleScanner song song khi chưa có chỉ mục và khi chỉ mục đã "ấm".
+--latency-ms giả lập độ trễ mỗi lần liệt kê thư mục của ổ mạng; trên ổ cục
+bộ việc liệt kê gần như miễn phí nên os.walk tuần tự vẫn nhanh nhất.
+
+Ví dụ:
+    python -m benchmarks.bench_scan --dirs 2000 --files 50 --workers 16 --latency-ms 5
+"""
+import argparse
+import os
+import stat
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import file_scanner
+from file_scanner import ScanIndex, SubtitleScanner
+from subtitle_formats import is_subtitle_file
+
+
+def _walk(root: str):
+    found = []
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if is_subtitle_file(name) and not os.path.splitext(name)[0].endswith("_vi"):
+                found.append(os.path.join(directory, name))
+    return found
+
+
+def _timed(label: str, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<28} {time.perf_counter() - start:>8.3f} s  ({len(result)} file)")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark quét thư mục")
+    parser.add_argument("--dirs", type=int, default=1000)
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=0.0,
+        help="Độ trễ giả lập cho mỗi lần liệt kê/stat thư mục (như ổ mạng)",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        for d in range(args.dirs):
+            directory = os.path.join(root, f"show{d // 50:03d}", f"season{d % 50:02d}")
+            os.makedirs(directory, exist_ok=True)
+            for f in range(args.files):
+                suffix = "_vi" if f % 2 else ""
+                open(os.path.join(directory, f"ep{f // 2:03d}{suffix}.srt"), "w").close()
+
+        if args.latency_ms:
+            # os.walk cũng gọi os.scandir nên cả hai cách đều chịu cùng độ trễ
+            real_scandir, real_stat = os.scandir, os.stat
+
+            def slow_scandir(path="."):
+                time.sleep(args.latency_ms / 1000)
+                return real_scandir(path)
+
+            def slow_stat(path, *a, **kw):
+                result = real_stat(path, *a, **kw)
+                if stat.S_ISDIR(result.st_mode):
+                    time.sleep(args.latency_ms / 1000)
+                return result
+
+            os.scandir = slow_scandir
+            file_scanner.os.stat = slow_stat
+
+        index_path = os.path.join(root, "scan_index.json")
+        expected = sorted(_timed("os.walk", lambda: _walk(root)))
+        scanned = _timed(
+            "scandir song song", lambda: SubtitleScanner(workers=args.workers).scan(root)
+        )
+        assert scanned == expected
+        _timed(
+            "scandir + tạo chỉ mục",
+            lambda: SubtitleScanner(workers=args.workers, index=ScanIndex(index_path)).scan(root),
+        )
+        _timed(
+            "scandir + chỉ mục ấm",
+            lambda: SubtitleScanner(workers=args.workers, index=ScanIndex(index_path)).scan(root),
+        )
+
+
+if __name__ == "__main__":
+    main()
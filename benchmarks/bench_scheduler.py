@@ -0,0 +1,103 @@
+# benchmarks/bench_scheduler.py
+"""
+So sánh độ trễ của các công việc nhỏ khi chạy chung với một công việc lớn.
+
+Kịch bản: một phim dài (lớp "bulk") được gửi trước, ngay sau đó là nhiều
+đoạn ngắn (lớp "urgent"). Chạy hai chế độ trên JobService với server LLM giả
+lập:
+    fifo  - mỗi lần một công việc, theo thứ tự gửi (như translate_directory)
+    fair  - nhiều công việc đồng thời, chia chỗ gọi API bằng FairScheduler
+
+Ví dụ:
+    python -m benchmarks.bench_scheduler --film-cues 2000 --promos 10 --latency fixed:0.2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Dict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.bench_translator import percentile
+from benchmarks.mock_llm_server import MockLLMConfig, MockLLMServer
+from benchmarks.synthetic_srt import write_synthetic_srt
+
+
+def run_mode(mode: str, args, base_url: str, work_dir: str) -> Dict:
+    from job_server import JOB_DONE, JOB_FAILED, JobService
+
+    film = os.path.join(work_dir, "film.srt")
+    write_synthetic_srt(film, args.film_cues, seed=1)
+    promos = []
+    for i in range(args.promos):
+        path = os.path.join(work_dir, f"promo_{i}.srt")
+        write_synthetic_srt(path, args.promo_cues, seed=100 + i)
+        promos.append(path)
+
+    service = JobService(
+        os.path.join(work_dir, f"state_{mode}"),
+        {"type": "gemini", "key": "bench", "base_url": base_url},
+        num_threads=args.threads,
+        max_concurrent_jobs=1 if mode == "fifo" else args.promos + 1,
+        allowed_root=work_dir,
+        update_status=lambda msg: None,
+    ).start()
+
+    # FIFO: mọi công việc cùng lớp, công việc gửi trước chạy trước
+    film_priority = "normal" if mode == "fifo" else "bulk"
+    promo_priority = "normal" if mode == "fifo" else "urgent"
+
+    start = time.perf_counter()
+    film_job = service.submit(
+        {"path": film, "output": f"{film[:-4]}_{mode}.srt", "priority": film_priority}
+    )
+    promo_jobs = [
+        service.submit(
+            {"path": path, "output": f"{path[:-4]}_{mode}.srt", "priority": promo_priority}
+        )
+        for path in promos
+    ]
+
+    jobs = [film_job] + promo_jobs
+    while any(job.status not in (JOB_DONE, JOB_FAILED) for job in jobs):
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    service.stop()
+
+    promo_latency = [job.finished - job.created for job in promo_jobs]
+    return {
+        "mode": mode,
+        "promo_p50": percentile(promo_latency, 50),
+        "promo_max": max(promo_latency) if promo_latency else 0.0,
+        "film": film_job.finished - film_job.created,
+        "total": elapsed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark lập lịch công bằng")
+    parser.add_argument("--film-cues", type=int, default=1000)
+    parser.add_argument("--promos", type=int, default=10)
+    parser.add_argument("--promo-cues", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=5)
+    parser.add_argument("--latency", default="fixed:0.2")
+    parser.add_argument("--modes", default="fifo,fair")
+    args = parser.parse_args()
+
+    config = MockLLMConfig(latency=args.latency, seed=1)
+    print(f"{'chế độ':<6} {'promo p50 (s)':>14} {'promo max (s)':>14} {'phim (s)':>10} {'tổng (s)':>10}")
+    with MockLLMServer(config) as server, tempfile.TemporaryDirectory() as work_dir:
+        for mode in args.modes.split(","):
+            result = run_mode(mode, args, server.gemini_base_url, work_dir)
+            print(
+                f"{result['mode']:<6} {result['promo_p50']:>14.2f} {result['promo_max']:>14.2f} "
+                f"{result['film']:>10.2f} {result['total']:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/bench_timestamps.py
+"""
+Đo tốc độ xử lý thời gian hàng loạt (timestamps.py) trên file lớn.
+
+Đo từng bước với N phụ đề: chuyển chuỗi -> ms, đổi fps + dời + kéo dài theo
+tốc độ đọc + sửa chồng lấn, rồi ms -> chuỗi; so với cách làm từng phụ đề một
+(subtitle_cue.parse_timestamp/format_timestamp). Dùng --python để ép dùng
+bản Python thuần khi có NumPy.
+
+Ví dụ:
+    python -m benchmarks.bench_timestamps --cues 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import timestamps
+from subtitle_cue import format_timestamp, parse_timestamp
+
+
+def _timed(label: str, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<36} {1000 * (time.perf_counter() - start):>9.1f} ms")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark xử lý thời gian hàng loạt")
+    parser.add_argument("--cues", type=int, default=100000)
+    parser.add_argument("--python", action="store_true", help="Ép dùng Python thuần")
+    args = parser.parse_args()
+    if args.python:
+        timestamps.np = None
+
+    rng = random.Random(1)
+    starts, ends, texts = [], [], []
+    t = 0
+    for _ in range(args.cues):
+        t += rng.randint(500, 4000)
+        starts.append(t)
+        ends.append(t + rng.randint(400, 5000))
+        texts.append("x" * rng.randint(5, 80))
+    start_strings = [format_timestamp(v) for v in starts]
+    end_strings = [format_timestamp(v) for v in ends]
+
+    print(f"{args.cues} phụ đề, phần xử lý: {timestamps.backend()}")
+    _timed("parse từng mục", lambda: [parse_timestamp(s) for s in start_strings + end_strings])
+    parsed = _timed(
+        "parse hàng loạt",
+        lambda: (
+            timestamps.parse_timestamps(start_strings),
+            timestamps.parse_timestamps(end_strings),
+        ),
+    )
+    assert timestamps.to_list(parsed[0]) == starts
+
+    timeline = timestamps.Timeline(*parsed)
+    _timed(
+        "fps + dời + cps + chồng lấn",
+        lambda: timeline.scale_fps(25, 23.976)
+        .shift(-250)
+        .extend_for_cps(texts, 17, 1000, 80)
+        .fix_overlaps(80),
+    )
+
+    _timed("format từng mục", lambda: [format_timestamp(v) for v in starts + ends])
+    formatted = _timed("format hàng loạt", timeline.format)
+    final_starts = timestamps.to_list(timeline.starts)
+    assert formatted[0] == [format_timestamp(v) for v in final_starts]
+
+
+if __name__ == "__main__":
+    main()
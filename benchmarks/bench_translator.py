@@ -0,0 +1,248 @@
+# benchmarks/bench_translator.py
+"""
+Đo thông lượng SRTTranslator với server LLM giả lập.
+
+Mỗi cấu hình (kích thước file x số luồng x kích thước lô) chạy trong một
+tiến trình con riêng để đo RSS đỉnh chính xác. Kết quả gồm: cues/giây,
+độ trễ lô p50/p99 (đo phía client, đã gồm thử lại), RSS đỉnh, và token đầu
+vào/đã cache trung bình mỗi yêu cầu cùng TTFT trung bình.
+
+Khoảng nghỉ sau mỗi lô (srt_translator.BATCH_PAUSE_SECONDS, 1 giây khi dịch
+thật) được đặt bằng --batch-pause trong tiến trình con, mặc định 0 để kết
+quả phản ánh tốc độ xử lý thay vì thời gian ngủ; giá trị đã dùng được in
+cùng kết quả.
+
+Ví dụ:
+    python -m benchmarks.bench_translator --sizes 100,1000 --threads 1,4,8 \\
+        --batch-sizes 10,25 --latency lognormal:-1.5,0.5 --rate-limit-rate 0.02
+
+So sánh mẫu prompt (v1: hướng dẫn trong tin nhắn người dùng, v2: system
+instruction):
+    python -m benchmarks.bench_translator --prompt-versions v1,v2
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.mock_llm_server import MockLLMConfig, MockLLMServer
+from benchmarks.synthetic_srt import write_synthetic_srt
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Phân vị theo phương pháp nearest-rank."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def peak_rss_mb() -> float:
+    """RSS đỉnh của tiến trình hiện tại (MB). Linux trả về KB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_single(spec: Dict) -> Dict:
+    """Chạy một cấu hình benchmark trong tiến trình hiện tại."""
+    import srt_translator
+    from srt_translator import SRTTranslator
+    from translation_apis import TranslationAPI
+
+    srt_translator.BATCH_PAUSE_SECONDS = spec.get("batch_pause", 0.0)
+
+    latencies: List[float] = []
+    original_create = TranslationAPI.create_api
+
+    def timed_create(api_type, api_config):
+        api = original_create(api_type, api_config)
+        inner = api.translate_batch
+
+        def timed_translate_batch(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return inner(*args, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+        api.translate_batch = timed_translate_batch
+        return api
+
+    TranslationAPI.create_api = staticmethod(timed_create)
+
+    messages = []
+    translator = SRTTranslator(update_status_callback=messages.append)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_file = write_synthetic_srt(
+            os.path.join(work_dir, "input.srt"), spec["cues"], seed=spec["seed"]
+        )
+        output_file = os.path.join(work_dir, "output.srt")
+
+        start = time.perf_counter()
+        success = translator.translate_file(
+            input_file,
+            output_file,
+            spec["api_config"],
+            spec["threads"],
+            spec["batch_size"],
+            spec["max_retries"],
+        )
+        elapsed = time.perf_counter() - start
+
+    usage = translator.usage.snapshot()
+    requests = usage["requests"] or 1
+    return {
+        "prompt": spec["api_config"].get("prompt_version", "-"),
+        "cues": spec["cues"],
+        "threads": spec["threads"],
+        "batch_size": spec["batch_size"],
+        "batch_pause": srt_translator.BATCH_PAUSE_SECONDS,
+        "success": success,
+        "seconds": elapsed,
+        "cues_per_sec": spec["cues"] / elapsed if elapsed > 0 else 0.0,
+        "batches": len(latencies),
+        "p50_batch_s": percentile(latencies, 50),
+        "p99_batch_s": percentile(latencies, 99),
+        "peak_rss_mb": peak_rss_mb(),
+        "prompt_tokens_per_req": usage["prompt_tokens"] / requests,
+        "cached_tokens_per_req": usage["cached_tokens"] / requests,
+        "ttft_ms": 1000 * usage["ttft_total"] / requests,
+    }
+
+
+def run_in_subprocess(spec: Dict) -> Dict:
+    """Chạy một cấu hình trong tiến trình con và đọc kết quả JSON."""
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_translator", "--single", json.dumps(spec)],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def format_table(results: List[Dict]) -> str:
+    header = (
+        f"{'prompt':>6} {'cues':>7} {'threads':>7} {'batch':>5} {'ok':>3} {'seconds':>9} "
+        f"{'cues/s':>9} {'p50 (s)':>8} {'p99 (s)':>8} {'RSS MB':>8} "
+        f"{'in/req':>7} {'cache/req':>9} {'TTFT ms':>8}"
+    )
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['prompt']:>6} {r['cues']:>7} {r['threads']:>7} {r['batch_size']:>5} "
+            f"{'y' if r['success'] else 'n':>3} {r['seconds']:>9.2f} "
+            f"{r['cues_per_sec']:>9.1f} {r['p50_batch_s']:>8.3f} "
+            f"{r['p99_batch_s']:>8.3f} {r['peak_rss_mb']:>8.1f} "
+            f"{r['prompt_tokens_per_req']:>7.1f} {r['cached_tokens_per_req']:>9.1f} "
+            f"{r['ttft_ms']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark SRTTranslator offline")
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    parser.add_argument("--provider", choices=["gemini", "openai"], default="gemini")
+    parser.add_argument("--sizes", type=_int_list, default=[100, 1000])
+    parser.add_argument("--threads", type=_int_list, default=[1, 4, 8])
+    parser.add_argument("--batch-sizes", type=_int_list, default=[10, 25])
+    parser.add_argument("--latency", default="fixed:0.05")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--truncate-rate", type=float, default=0.0)
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument(
+        "--batch-pause",
+        type=float,
+        default=0.0,
+        help="Giây nghỉ sau mỗi lô (BATCH_PAUSE_SECONDS, khi dịch thật là 1)",
+    )
+    parser.add_argument("--prompt-versions", default="v2", help="Danh sách phiên bản prompt, ví dụ v1,v2")
+    parser.add_argument("--cached-content", action="store_true", help="Dùng cachedContent của Gemini")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_output", help="Ghi kết quả ra file JSON")
+    args = parser.parse_args(argv)
+
+    if args.single:
+        print(json.dumps(run_single(json.loads(args.single))))
+        return
+
+    config = MockLLMConfig(
+        args.latency,
+        args.error_rate,
+        args.rate_limit_rate,
+        args.truncate_rate,
+        args.seed,
+    )
+    results = []
+    print(f"Nghỉ sau mỗi lô (BATCH_PAUSE_SECONDS): {args.batch_pause:g} giây", flush=True)
+    with MockLLMServer(config) as server:
+        if args.provider == "gemini":
+            api_config = {
+                "type": "gemini",
+                "key": "mock",
+                "model": "mock-model",
+                "base_url": server.gemini_base_url,
+            }
+        else:
+            api_config = {
+                "type": "novita",
+                "key": "mock",
+                "model": "mock-model",
+                "base_url": server.openai_base_url,
+            }
+
+        if args.cached_content:
+            api_config["cached_content"] = True
+
+        for prompt_version in args.prompt_versions.split(","):
+            for cues in args.sizes:
+                for threads in args.threads:
+                    for batch_size in args.batch_sizes:
+                        spec = {
+                            "cues": cues,
+                            "threads": threads,
+                            "batch_size": batch_size,
+                            "max_retries": args.max_retries,
+                            "batch_pause": args.batch_pause,
+                            "seed": args.seed,
+                            "api_config": dict(api_config, prompt_version=prompt_version),
+                        }
+                        result = run_in_subprocess(spec)
+                        results.append(result)
+                        print(format_table([result]).splitlines()[-1], flush=True)
+
+        stats = dict(server.stats)
+
+    print()
+    print(format_table(results))
+    print(f"\nNghỉ sau mỗi lô (BATCH_PAUSE_SECONDS): {args.batch_pause:g} giây")
+    print(f"Thống kê server giả lập: {stats}")
+
+    if args.json_output:
+        with open(args.json_output, "w", encoding="utf-8") as f:
+            json.dump(
+                {"batch_pause": args.batch_pause, "results": results, "server_stats": stats},
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
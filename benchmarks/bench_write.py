@@ -0,0 +1,156 @@
+# benchmarks/bench_write.py
+"""
+Đo thông lượng ghi file phụ đề lớn ra ổ cục bộ.
+
+So sánh cách ghi cũ (ghi thẳng vào file đích, mỗi phụ đề vài lần write()
+nhỏ qua bộ đệm 8 KiB mặc định) với write_cues (gom khối, ghi file tạm rồi
+đổi tên) theo từng chính sách fsync, cùng thời gian chỉ định dạng (không
+ghi ra đĩa). Cột "syscall" đếm số lần ghi thực sự xuống hệ điều hành;
+--write-latency-ms thêm độ trễ cho mỗi lần đó để giả lập ổ mạng. Mỗi cấu
+hình chạy --repeat lần, lấy lần nhanh nhất.
+
+--variants so sánh ghi ba file đầu ra (SRT chỉ bản dịch, SRT song ngữ, ASS
+phụ đề gốc chữ nhỏ) bằng ba lần write_cues tuần tự với write_variants (một
+lượt, mỗi file một luồng ghi).
+
+Ví dụ:
+    python -m benchmarks.bench_write --cues 200000 --formats srt,ass --dir /tmp
+    python -m benchmarks.bench_write --cues 50000 --write-latency-ms 2
+    python -m benchmarks.bench_write --cues 100000 --formats srt --variants
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import subtitle_formats
+from benchmarks.synthetic_srt import generate_srt
+from subtitle_formats import (
+    DURABILITY_MODES,
+    SrtCodec,
+    codec_for_path,
+    write_cues,
+    write_variants,
+)
+
+
+class _CountingRaw(io.FileIO):
+    """File cấp hệ điều hành đếm (và làm chậm, nếu cần) từng lần ghi."""
+
+    writes = 0
+    latency = 0.0
+
+    def write(self, data):
+        _CountingRaw.writes += 1
+        if _CountingRaw.latency:
+            time.sleep(_CountingRaw.latency)
+        return super().write(data)
+
+
+def _counting_open(path, mode="r", encoding=None, **kwargs):
+    """Thay open() khi ghi: cùng lớp đệm như open() nhưng ghi qua _CountingRaw."""
+    if "w" not in mode:
+        return open(path, mode, encoding=encoding, **kwargs)
+    return io.TextIOWrapper(io.BufferedWriter(_CountingRaw(path, "w")), encoding=encoding)
+
+
+class _NullFile:
+    def write(self, text):
+        return len(text)
+
+
+def _direct_write(path, cues, bilingual):
+    """Cách ghi cũ: mở thẳng file đích, codec gọi write() cho từng mảnh nhỏ."""
+    with _counting_open(path, "w", encoding="utf-8") as f:
+        codec_for_path(path).write(f, cues, None, bilingual)
+
+
+def _best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ghi file phụ đề")
+    parser.add_argument("--cues", type=int, default=200000)
+    parser.add_argument("--formats", default="srt,ass")
+    parser.add_argument("--dir", default=None, help="Thư mục ghi thử (mặc định: thư mục tạm)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--bilingual", action="store_true")
+    parser.add_argument(
+        "--write-latency-ms", type=float, default=0.0, help="Độ trễ mỗi lần ghi xuống hệ điều hành"
+    )
+    parser.add_argument(
+        "--variants", action="store_true", help="So sánh ghi ba file đầu ra tuần tự và trong một lượt"
+    )
+    args = parser.parse_args()
+    _CountingRaw.latency = args.write_latency_ms / 1000
+    subtitle_formats.open = _counting_open
+
+    header = {}
+    cues = list(SrtCodec().read(generate_srt(args.cues).splitlines(), header))
+    for cue in cues:
+        cue.original_text = cue.text
+        cue.text = cue.text.upper()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        print(f"{args.cues} phụ đề, thư mục: {directory}")
+        print(f"{'cấu hình':<28} {'MB':>6} {'thời gian':>10} {'MB/s':>8} {'syscall':>8}")
+
+        def run(label, size_mb, func):
+            _CountingRaw.writes = 0
+            seconds = _best_of(args.repeat, func)
+            writes = _CountingRaw.writes // args.repeat
+            print(
+                f"{label:<28} {size_mb:>6.1f} "
+                f"{1000 * seconds:>8.0f}ms {size_mb / seconds:>8.1f} {writes:>8}"
+            )
+
+        for fmt in args.formats.split(","):
+            path = os.path.join(directory, f"out.{fmt}")
+            _direct_write(path, cues, args.bilingual)
+            size_mb = os.path.getsize(path) / 1e6
+
+            codec = codec_for_path(path)
+            run(
+                f"{fmt} chỉ định dạng",
+                size_mb,
+                lambda: codec.write(_NullFile(), cues, None, args.bilingual),
+            )
+            run(f"{fmt} ghi thẳng (cũ)", size_mb, lambda: _direct_write(path, cues, args.bilingual))
+            for durability in DURABILITY_MODES:
+                run(
+                    f"{fmt} nguyên tử, fsync={durability}",
+                    size_mb,
+                    lambda: write_cues(path, cues, None, args.bilingual, durability),
+                )
+
+        if args.variants:
+            outputs = [
+                {"path": os.path.join(directory, "vi.srt"), "layout": "translated"},
+                {"path": os.path.join(directory, "en_vi.srt"), "layout": "stacked"},
+                {"path": os.path.join(directory, "vi_small_en.ass"), "layout": "small_original"},
+            ]
+
+            def sequential():
+                for output in outputs:
+                    write_cues(output["path"], cues, None, output["layout"])
+
+            sequential()
+            size_mb = sum(os.path.getsize(output["path"]) for output in outputs) / 1e6
+            run("3 file, tuần tự", size_mb, sequential)
+            run("3 file, một lượt", size_mb, lambda: write_variants(outputs, cues))
+
+
+if __name__ == "__main__":
+    main()
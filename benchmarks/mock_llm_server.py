@@ -0,0 +1,525 @@
+# benchmarks/mock_llm_server.py
+"""
+Server LLM giả lập chạy cục bộ, nói cả giao thức Gemini (generateContent)
+và OpenAI (chat/completions), dùng để đo hiệu năng mà không tốn quota API.
+
+Hỗ trợ cả phản hồi streaming (SSE của streamGenerateContent và stream=True
+của OpenAI): phần đầu của độ trễ là thời gian tới token đầu tiên, phần còn
+lại rải đều giữa các phụ đề.
+
+Server giả lập cache tiền tố: system instruction (hoặc cachedContent) đã gặp
+trước đó được báo là token đã cache trong usage, giống cách nhà cung cấp thật
+tính phí tiền tố prompt lặp lại.
+
+Chạy độc lập:
+    python -m benchmarks.mock_llm_server --port 8765 --latency lognormal:-1.5,0.5
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+_CUE_PATTERN = re.compile(r"\[(\d+)\]\s*(.*?)(?=\n\s*\[\d+\]|\Z)", re.DOTALL)
+_GEMINI_PATH = re.compile(r"^/(?:v1beta|v1)/models/([^/:]+):(generateContent|streamGenerateContent)")
+_GEMINI_CACHE_PATH = re.compile(r"^/(?:v1beta|v1)/cachedContents$")
+_OPENAI_PATH = re.compile(r"^(?:/v1)?/chat/completions$")
+
+
+class LatencyDistribution:
+    """
+    Phân phối độ trễ (giây) cho mỗi yêu cầu.
+
+    Cú pháp mô tả:
+        fixed:0.2               luôn 0.2 giây
+        uniform:0.1,0.5         đều trong [0.1, 0.5]
+        lognormal:-1.5,0.5      lognormal(mu, sigma)
+        exp:0.3                 mũ với trung bình 0.3
+    """
+
+    def __init__(self, spec: str = "fixed:0"):
+        self.spec = spec
+        kind, _, params = spec.partition(":")
+        self.kind = kind.strip().lower()
+        self.params = [float(p) for p in params.split(",") if p.strip()]
+        if self.kind not in ("fixed", "uniform", "lognormal", "exp"):
+            raise ValueError(f"Phân phối độ trễ không được hỗ trợ: {spec}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.params[0] if self.params else 0.0
+        if self.kind == "uniform":
+            return rng.uniform(self.params[0], self.params[1])
+        if self.kind == "lognormal":
+            return rng.lognormvariate(self.params[0], self.params[1])
+        return rng.expovariate(1.0 / self.params[0])
+
+
+class MockLLMConfig:
+    """Cấu hình hành vi của server giả lập."""
+
+    def __init__(
+        self,
+        latency: str = "fixed:0",
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        truncate_rate: float = 0.0,
+        seed: Optional[int] = None,
+        derail_rate: float = 0.0,
+        ttft_fraction: float = 0.3,
+        max_concurrent: int = 0,
+    ):
+        """
+        Tham số:
+            latency: Mô tả phân phối độ trễ (xem LatencyDistribution)
+            error_rate: Tỉ lệ phản hồi lỗi 500
+            rate_limit_rate: Tỉ lệ phản hồi 429
+            truncate_rate: Tỉ lệ phản hồi bị cắt cụt (thiếu phụ đề ở cuối)
+            seed: Hạt giống ngẫu nhiên để tái lập kết quả
+            derail_rate: Tỉ lệ phản hồi lệch hướng (trả lại nguyên văn tiếng Anh)
+            ttft_fraction: Khi streaming, phần độ trễ trước token đầu tiên
+            max_concurrent: Số yêu cầu xử lý đồng thời tối đa; vượt quá thì
+                trả 429 ngay (như nhà cung cấp thật); 0 = không giới hạn
+        """
+        self.latency = LatencyDistribution(latency)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.truncate_rate = truncate_rate
+        self.seed = seed
+        self.derail_rate = derail_rate
+        self.ttft_fraction = ttft_fraction
+        self.max_concurrent = max_concurrent
+
+
+# Tiền tố bản dịch giả theo ngôn ngữ đích ghi trong prompt ("... to Thai.")
+FAKE_PREFIXES = {
+    "Thai": "คำแปล: ",
+    "Indonesian": "Terjemahan: ",
+}
+
+
+def fake_translate(text: str, instructions: str = "") -> str:
+    """
+    Bản dịch giả: giữ nguyên độ dài tương đối và có chữ của ngôn ngữ đích
+    (mặc định dấu tiếng Việt).
+    """
+    for language, prefix in FAKE_PREFIXES.items():
+        if f"to {language}" in instructions:
+            return f"{prefix}{text}"
+    return f"Bản dịch: {text}"
+
+
+def build_cues(
+    prompt: str,
+    truncate: bool,
+    rng: random.Random,
+    derail: bool = False,
+    instructions: str = "",
+) -> List[str]:
+    """
+    Các khối "[n] bản dịch" của câu trả lời, theo định dạng client mong đợi.
+    instructions: system instruction (nếu có), dùng để nhận ngôn ngữ đích.
+    """
+    cues = _CUE_PATTERN.findall(prompt)
+    if truncate and cues:
+        cues = cues[: rng.randint(0, max(len(cues) - 1, 0))]
+    if derail:
+        return [f"[{n}] {text.strip()}" for n, text in cues]
+    instructions += prompt
+    return [f"[{n}] {fake_translate(text.strip(), instructions)}" for n, text in cues]
+
+
+def build_translation(prompt: str, truncate: bool, rng: random.Random) -> str:
+    """Tạo phần văn bản trả lời theo đúng định dạng [n] mà client mong đợi."""
+    return "\n\n".join(build_cues(prompt, truncate, rng))
+
+
+class MockLLMServer:
+    """
+    Server HTTP đa luồng giả lập API LLM.
+
+    Dùng như context manager:
+        with MockLLMServer(MockLLMConfig(latency="fixed:0.1")) as server:
+            api_config = {"type": "gemini", "key": "x", "base_url": server.gemini_base_url}
+    """
+
+    def __init__(
+        self, config: MockLLMConfig = None, host: str = "127.0.0.1", port: int = 0
+    ):
+        self.config = config or MockLLMConfig()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "ok": 0,
+            "errors": 0,
+            "rate_limited": 0,
+            "truncated": 0,
+            "derailed": 0,
+            "aborted": 0,
+        }
+        self._stats_lock = threading.Lock()
+        self._active = 0
+        self.peak_concurrent = 0
+        # Tiền tố prompt đã gặp (cache ngầm) và cachedContent đã tạo
+        self._prefix_cache = set()
+        self._cached_contents: Dict[str, str] = {}
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def gemini_base_url(self) -> str:
+        return f"{self.base_url}/v1beta"
+
+    @property
+    def openai_base_url(self) -> str:
+        return f"{self.base_url}/v1"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="mock-llm", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _cached_tokens(self, system: str, cache_name: Optional[str]) -> Tuple[str, int]:
+        """Trả về (system instruction thực tế, số token được tính là đã cache)."""
+        with self._stats_lock:
+            if cache_name is not None:
+                system = self._cached_contents.get(cache_name)
+                if system is None:
+                    return "", -1
+                return system, _approx_tokens(system)
+            if not system:
+                return system, 0
+            if system in self._prefix_cache:
+                return system, _approx_tokens(system)
+            self._prefix_cache.add(system)
+            return system, 0
+
+    def _enter(self) -> bool:
+        """Nhận một yêu cầu nếu chưa vượt max_concurrent."""
+        with self._stats_lock:
+            limit = self.config.max_concurrent
+            if limit and self._active >= limit:
+                return False
+            self._active += 1
+            self.peak_concurrent = max(self.peak_concurrent, self._active)
+            return True
+
+    def _leave(self) -> None:
+        with self._stats_lock:
+            self._active -= 1
+
+    def _decide(self) -> Tuple[float, str]:
+        """Chọn độ trễ và kết cục (ok/error/rate_limited/truncated) cho một yêu cầu."""
+        with self._rng_lock:
+            delay = self.config.latency.sample(self._rng)
+            roll = self._rng.random()
+        cfg = self.config
+        if roll < cfg.rate_limit_rate:
+            return delay, "rate_limited"
+        roll -= cfg.rate_limit_rate
+        if roll < cfg.error_rate:
+            return delay, "errors"
+        roll -= cfg.error_rate
+        if roll < cfg.truncate_rate:
+            return delay, "truncated"
+        roll -= cfg.truncate_rate
+        if roll < cfg.derail_rate:
+            return delay, "derailed"
+        return delay, "ok"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: Dict) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_stream(self, events: List[Dict], delay: float, openai: bool) -> None:
+                """Gửi các sự kiện SSE (chunked), rải độ trễ như một model thật."""
+                ttft = delay * server.config.ttft_fraction
+                gap = (delay - ttft) / max(len(events) - 1, 1)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    time.sleep(ttft)
+                    for i, event in enumerate(events):
+                        if i:
+                            time.sleep(gap)
+                        data = f"data: {json.dumps(event)}\n\n".encode("utf-8")
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                        self.wfile.flush()
+                    if openai:
+                        data = b"data: [DONE]\n\n"
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client huỷ yêu cầu giữa chừng (ví dụ phản hồi lệch hướng)
+                    server._count("aborted")
+                    self.close_connection = True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    self._send_json(400, {"error": {"message": "invalid json"}})
+                    return
+
+                path = self.path.split("?", 1)[0]
+                if _GEMINI_CACHE_PATH.match(path):
+                    system = _gemini_system(request)
+                    with server._stats_lock:
+                        name = f"cachedContents/mock-{len(server._cached_contents) + 1}"
+                        server._cached_contents[name] = system
+                    self._send_json(200, {"name": name, "model": request.get("model")})
+                    return
+
+                gemini_match = _GEMINI_PATH.match(path)
+                if not gemini_match and not _OPENAI_PATH.match(path):
+                    self._send_json(404, {"error": {"message": f"unknown path {path}"}})
+                    return
+
+                streaming = bool(
+                    (gemini_match and gemini_match.group(2) == "streamGenerateContent")
+                    or request.get("stream")
+                )
+                server._count("requests")
+                if not server._enter():
+                    server._count("rate_limited")
+                    self._send_json(
+                        429,
+                        {"error": {"code": 429, "message": "Too many concurrent requests"}},
+                    )
+                    return
+                try:
+                    self._respond(request, gemini_match, streaming)
+                finally:
+                    server._leave()
+
+            def _respond(self, request: Dict, gemini_match, streaming: bool) -> None:
+                delay, outcome = server._decide()
+                if delay > 0 and not streaming:
+                    time.sleep(delay)
+                server._count(outcome)
+
+                if outcome == "rate_limited":
+                    self._send_json(
+                        429,
+                        {"error": {"code": 429, "message": "Resource exhausted"}},
+                    )
+                    return
+                if outcome == "errors":
+                    self._send_json(
+                        500, {"error": {"code": 500, "message": "Internal error"}}
+                    )
+                    return
+
+                truncate = outcome == "truncated"
+                derail = outcome == "derailed"
+                if gemini_match:
+                    prompt = _gemini_prompt(request)
+                    system, cached = server._cached_tokens(
+                        _gemini_system(request), request.get("cachedContent")
+                    )
+                    if cached < 0:
+                        self._send_json(
+                            404, {"error": {"code": 404, "message": "cachedContent not found"}}
+                        )
+                        return
+                else:
+                    prompt = _openai_prompt(request)
+                    system, cached = server._cached_tokens(_openai_system(request), None)
+                with server._rng_lock:
+                    cues = build_cues(prompt, truncate, server._rng, derail, system)
+                text = "\n\n".join(cues)
+
+                if streaming:
+                    # Mỗi phụ đề một sự kiện; sự kiện cuối kèm usage
+                    pieces = [cue + "\n\n" for cue in cues] or [""]
+                    if gemini_match:
+                        events = [_gemini_response(piece, "", 0) for piece in pieces]
+                        events[-1] = _gemini_response(pieces[-1], system + prompt, cached, text)
+                    else:
+                        model = request.get("model", "")
+                        events = [_openai_chunk(piece, model) for piece in pieces]
+                        events.append(_openai_usage_chunk(text, system + prompt, model, cached))
+                    self._send_stream(events, delay, openai=not gemini_match)
+                elif gemini_match:
+                    self._send_json(200, _gemini_response(text, system + prompt, cached))
+                else:
+                    self._send_json(
+                        200,
+                        _openai_response(
+                            text, system + prompt, request.get("model", ""), cached
+                        ),
+                    )
+
+        return Handler
+
+
+def _gemini_prompt(request: Dict) -> str:
+    parts: List[str] = []
+    for content in request.get("contents", []):
+        for part in content.get("parts", []):
+            parts.append(part.get("text", ""))
+    return "\n".join(parts)
+
+
+def _gemini_system(request: Dict) -> str:
+    instruction = request.get("systemInstruction") or {}
+    return "\n".join(part.get("text", "") for part in instruction.get("parts", []))
+
+
+def _openai_system(request: Dict) -> str:
+    return "\n".join(
+        m.get("content", "") for m in request.get("messages", []) if m.get("role") == "system"
+    )
+
+
+def _openai_prompt(request: Dict) -> str:
+    messages = [m for m in request.get("messages", []) if m.get("role") == "user"]
+    return messages[-1].get("content", "") if messages else ""
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _gemini_response(
+    text: str, prompt: str, cached_tokens: int = 0, full_text: Optional[str] = None
+) -> Dict:
+    return {
+        "candidates": [
+            {
+                "content": {"role": "model", "parts": [{"text": text}]},
+                "finishReason": "STOP",
+            }
+        ],
+        "usageMetadata": {
+            "promptTokenCount": _approx_tokens(prompt),
+            "cachedContentTokenCount": cached_tokens,
+            "candidatesTokenCount": _approx_tokens(full_text or text),
+            "totalTokenCount": _approx_tokens(prompt) + _approx_tokens(full_text or text),
+        },
+    }
+
+
+def _openai_response(text: str, prompt: str, model: str, cached_tokens: int = 0) -> Dict:
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": _approx_tokens(prompt),
+            "completion_tokens": _approx_tokens(text),
+            "total_tokens": _approx_tokens(prompt) + _approx_tokens(text),
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        },
+    }
+
+
+def _openai_chunk(text: str, model: str) -> Dict:
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {"index": 0, "delta": {"role": "assistant", "content": text}, "finish_reason": None}
+        ],
+    }
+
+
+def _openai_usage_chunk(text: str, prompt: str, model: str, cached_tokens: int) -> Dict:
+    chunk = _openai_response(text, prompt, model, cached_tokens)
+    chunk["object"] = "chat.completion.chunk"
+    chunk["choices"] = []
+    return chunk
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Server LLM giả lập cục bộ")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="fixed:0")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--truncate-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--derail-rate", type=float, default=0.0)
+    parser.add_argument("--ttft-fraction", type=float, default=0.3)
+    parser.add_argument("--max-concurrent", type=int, default=0)
+    args = parser.parse_args()
+
+    mock = MockLLMServer(
+        MockLLMConfig(
+            args.latency,
+            args.error_rate,
+            args.rate_limit_rate,
+            args.truncate_rate,
+            args.seed,
+            args.derail_rate,
+            args.ttft_fraction,
+            args.max_concurrent,
+        ),
+        args.host,
+        args.port,
+    )
+    print(f"Gemini base_url: {mock.gemini_base_url}")
+    print(f"OpenAI base_url: {mock.openai_base_url}")
+    try:
+        mock._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock._httpd.server_close()
@@ -0,0 +1,67 @@
+# benchmarks/synthetic_srt.py
+"""Sinh file SRT tổng hợp có kích thước tuỳ ý để đo hiệu năng."""
+import random
+from typing import List, Optional
+
+# Các kích thước chuẩn dùng trong benchmark
+STANDARD_SIZES = [100, 1000, 10000, 50000]
+
+_WORDS = (
+    "the a you I we they it is was are be have do go know see come "
+    "think look want give use find tell ask work seem feel try leave "
+    "call good new first last long great little own other old right "
+    "big high different small large next early young important few "
+    "public bad same able time person year way day thing man world "
+    "life hand part child eye woman place week case point company"
+).split()
+
+
+def _format_timestamp(ms: int) -> str:
+    hours, ms = divmod(ms, 3_600_000)
+    minutes, ms = divmod(ms, 60_000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{ms:03d}"
+
+
+def generate_cues(num_cues: int, seed: Optional[int] = 0) -> List[str]:
+    """Sinh danh sách khối phụ đề SRT (dạng văn bản) với thời gian tăng dần."""
+    rng = random.Random(seed)
+    blocks = []
+    current_ms = 1000
+    for index in range(1, num_cues + 1):
+        duration = rng.randint(800, 5000)
+        lines = []
+        for _ in range(rng.choice((1, 1, 2))):
+            words = rng.choices(_WORDS, k=rng.randint(3, 9))
+            lines.append(" ".join(words).capitalize() + rng.choice(".?!,"))
+        blocks.append(
+            f"{index}\n"
+            f"{_format_timestamp(current_ms)} --> {_format_timestamp(current_ms + duration)}\n"
+            + "\n".join(lines)
+        )
+        current_ms += duration + rng.randint(50, 1500)
+    return blocks
+
+
+def generate_srt(num_cues: int, seed: Optional[int] = 0) -> str:
+    """Sinh nội dung một file SRT hoàn chỉnh."""
+    return "\n\n".join(generate_cues(num_cues, seed)) + "\n\n"
+
+
+def write_synthetic_srt(path: str, num_cues: int, seed: Optional[int] = 0) -> str:
+    """Ghi file SRT tổng hợp ra đĩa và trả về đường dẫn."""
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(generate_srt(num_cues, seed))
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sinh file SRT tổng hợp")
+    parser.add_argument("output")
+    parser.add_argument("--cues", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_synthetic_srt(args.output, args.cues, args.seed)
+    print(f"Đã ghi {args.cues} phụ đề vào {args.output}")
@@ -0,0 +1,100 @@
+# cancellation.py
+"""
+Huỷ công việc dịch theo kiểu hợp tác.
+
+CancelToken gắn vào SRTTranslator (translator.cancel_token) và được truyền
+xuống bộ lập lịch, cổng AIMD, bộ giới hạn tốc độ, vòng lặp thử lại của API
+và các lần nghỉ giữa các lô. Mọi chỗ chờ đều chờ trên token nên cancel()
+đánh thức chúng ngay thay vì đợi hết lần nghỉ (tới 60 giây); yêu cầu
+streaming đang chạy bị đóng kết nối. Nơi phát hiện việc huỷ ném
+TranslationCancelled; nhật ký công việc (JobState, ghi sau mỗi lô) được
+đóng bình thường nên lần chạy sau tiếp tục từ chỗ đã dừng.
+"""
+import contextlib
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+class TranslationCancelled(Exception):
+    """Công việc bị huỷ qua CancelToken."""
+
+
+class CancelToken:
+    """Cờ huỷ dùng chung giữa các luồng của một công việc."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.reason = ""
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "") -> None:
+        """Huỷ công việc: đánh thức mọi chỗ đang chờ và gọi các callback đã đăng ký."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise TranslationCancelled(self.reason or "Công việc đã bị huỷ")
+
+    def sleep(self, seconds: float) -> None:
+        """Ngủ tối đa seconds giây; ném TranslationCancelled ngay khi bị huỷ."""
+        if seconds > 0:
+            self._event.wait(seconds)
+        self.raise_if_cancelled()
+
+    @contextlib.contextmanager
+    def on_cancel(self, callback: Callable[[], None]):
+        """
+        Gọi callback nếu công việc bị huỷ trong lúc khối with đang chạy (gọi
+        ngay nếu đã bị huỷ từ trước), ví dụ để đóng kết nối HTTP hoặc đánh
+        thức một Condition.
+        """
+        with self._lock:
+            registered = not self._event.is_set()
+            if registered:
+                self._callbacks.append(callback)
+        if not registered:
+            callback()
+        try:
+            yield
+        finally:
+            if registered:
+                with self._lock:
+                    self._callbacks.remove(callback)
+
+
+def sleep(seconds: float, token: Optional[CancelToken] = None) -> None:
+    """time.sleep có thể bị ngắt bởi token (nếu có)."""
+    if token is None:
+        if seconds > 0:
+            time.sleep(seconds)
+    else:
+        token.sleep(seconds)
+
+
+def on_cancel(token: Optional[CancelToken], callback: Callable[[], None]):
+    """CancelToken.on_cancel, hoặc không làm gì khi không có token."""
+    if token is None:
+        return contextlib.nullcontext()
+    return token.on_cancel(callback)
+
+
+def check(token: Optional[CancelToken]) -> None:
+    """Ném TranslationCancelled nếu token (nếu có) đã bị huỷ."""
+    if token is not None:
+        token.raise_if_cancelled()
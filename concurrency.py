@@ -0,0 +1,218 @@
+# concurrency.py
+"""
+Tự động điều chỉnh số yêu cầu API đồng thời theo kiểu AIMD (như điều khiển
+tắc nghẽn của TCP).
+
+Mỗi yêu cầu xin một chỗ từ AIMDController trước khi gửi:
+- Thành công với độ trễ và tỉ lệ lỗi bình thường: giới hạn tăng cộng dồn
+  (thêm khoảng 1 sau mỗi "cửa sổ" gồm limit yêu cầu thành công).
+- Gặp 429 hoặc hết thời gian chờ: giới hạn giảm theo cấp số nhân (mặc định
+  còn một nửa). Các yêu cầu đã gửi trước lần giảm không làm giảm thêm, để
+  một đợt 429 chỉ bị tính một lần.
+- Độ trễ tăng vọt hoặc lỗi khác nhiều: giữ nguyên giới hạn.
+
+Giới hạn tốt gần nhất được lưu theo nhà cung cấp (loại API + model + URL)
+vào một file JSON, để lần chạy sau bắt đầu ngay ở mức phù hợp thay vì mò lại
+từ số luồng nhập trong GUI.
+
+Bật qua api_config:
+    {"adaptive_concurrency": True, "max_concurrency": 16}
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import cancellation
+
+CONCURRENCY_MEMORY_PATH = os.path.join(
+    os.path.expanduser("~"), ".srt_translator", "concurrency.json"
+)
+DEFAULT_MAX_CONCURRENCY = 16
+
+# Kết cục của một yêu cầu khi trả chỗ
+OUTCOME_OK = "ok"
+OUTCOME_CONGESTED = "congested"  # 429 hoặc hết thời gian chờ
+OUTCOME_ERROR = "error"  # lỗi khác (500, phản hồi sai định dạng...)
+
+# Mức nền độ trễ trôi dần về độ trễ quan sát được với hệ số này (EWMA),
+# nhưng không vượt quá BASELINE_MAX_GROWTH lần độ trễ nhỏ nhất từng thấy
+BASELINE_DECAY = 0.05
+BASELINE_MAX_GROWTH = 4.0
+
+_memory_lock = threading.Lock()
+
+
+def provider_key(api_config: Dict) -> str:
+    """Khoá nhớ giới hạn: loại API, model và base_url (nếu có)."""
+    return "|".join(
+        str(api_config.get(name) or "") for name in ("type", "model", "base_url")
+    )
+
+
+def load_memory(path: str = CONCURRENCY_MEMORY_PATH) -> Dict[str, Dict]:
+    """Đọc giới hạn đã lưu của mọi nhà cung cấp ({} nếu chưa có hoặc hỏng)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            memory = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return memory if isinstance(memory, dict) else {}
+
+
+def save_limit(key: str, limit: int, path: str = CONCURRENCY_MEMORY_PATH) -> None:
+    """Ghi giới hạn tốt gần nhất của một nhà cung cấp (ghi nguyên tử)."""
+    with _memory_lock:
+        memory = load_memory(path)
+        memory[key] = {"limit": limit, "updated": time.time()}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(memory, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+
+class AIMDController:
+    """Cổng giới hạn số yêu cầu đồng thời, tự điều chỉnh (an toàn đa luồng)."""
+
+    def __init__(
+        self,
+        key: str,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: int = DEFAULT_MAX_CONCURRENCY,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+        max_error_rate: float = 0.2,
+        memory_path: Optional[str] = CONCURRENCY_MEMORY_PATH,
+    ):
+        """
+        Tham số:
+            key: Khoá nhà cung cấp (xem provider_key)
+            initial: Giới hạn ban đầu khi chưa có giá trị đã lưu
+            min_limit, max_limit: Khoảng giới hạn cho phép
+            decrease_factor: Hệ số nhân khi gặp 429/hết thời gian chờ
+            latency_tolerance: Độ trễ vượt quá chừng này lần mức nền thì
+                không tăng giới hạn
+            max_error_rate: Tỉ lệ lỗi khác (trung bình trượt) tối đa để
+                còn tăng giới hạn
+            memory_path: File JSON nhớ giới hạn theo nhà cung cấp; None = không nhớ
+        """
+        self.key = key
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+        self.memory_path = memory_path
+
+        remembered = None
+        if memory_path:
+            remembered = load_memory(memory_path).get(key, {}).get("limit")
+        self.remembered = isinstance(remembered, int)
+        start = remembered if self.remembered else initial
+        self._limit = float(min(self.max_limit, max(self.min_limit, start)))
+
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        # Số thứ tự của yêu cầu; yêu cầu có số < _cut_seq đã gửi trước lần giảm cuối
+        self._seq = 0
+        self._cut_seq = 0
+        self._baseline: Optional[float] = None
+        self._min_latency: Optional[float] = None
+        self._error_rate = 0.0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def baseline(self) -> Optional[float]:
+        """Mức nền độ trễ (giây) dùng để phát hiện độ trễ tăng vọt."""
+        return self._baseline
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self, cancel: Optional[cancellation.CancelToken] = None) -> int:
+        """
+        Chờ tới khi còn chỗ, trả về số thứ tự của yêu cầu (đưa lại cho
+        release). Ném TranslationCancelled nếu cancel bị huỷ trong lúc chờ.
+        """
+        with cancellation.on_cancel(cancel, self._wake), self._cond:
+            while self._in_flight >= int(self._limit):
+                cancellation.check(cancel)
+                self._cond.wait()
+            self._in_flight += 1
+            self._seq += 1
+            return self._seq
+
+    def _wake(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+
+    def set_limit(self, limit: int) -> int:
+        """Đặt giới hạn hiện tại (trong khoảng cho phép), trả về giá trị được dùng."""
+        with self._cond:
+            self._limit = float(min(self.max_limit, max(self.min_limit, limit)))
+            self._cond.notify_all()
+        return int(self._limit)
+
+    def release(
+        self, ticket: int, outcome: str, latency: Optional[float] = None
+    ) -> Optional[int]:
+        """
+        Trả chỗ và điều chỉnh giới hạn theo kết cục của yêu cầu.
+        Trả về giới hạn mới nếu vừa bị giảm, ngược lại None.
+        """
+        with self._cond:
+            saturated = self._in_flight >= int(self._limit)
+            self._in_flight -= 1
+            reduced = None
+
+            if outcome == OUTCOME_CONGESTED:
+                if ticket > self._cut_seq:
+                    self._limit = max(
+                        float(self.min_limit), self._limit * self.decrease_factor
+                    )
+                    self._cut_seq = self._seq
+                    reduced = int(self._limit)
+            elif outcome == OUTCOME_ERROR:
+                self._error_rate = self._error_rate * 0.9 + 0.1
+            else:
+                self._error_rate *= 0.9
+                healthy = self._error_rate <= self.max_error_rate
+                if latency is not None:
+                    if self._min_latency is None or latency < self._min_latency:
+                        self._min_latency = latency
+                    if self._baseline is None or latency < self._baseline:
+                        self._baseline = latency
+                    else:
+                        # Mức nền bám theo độ trễ thấp, trôi chậm về độ trễ
+                        # hiện tại (nhà cung cấp chậm đi hẳn) nhưng có trần
+                        target = min(latency, self._min_latency * BASELINE_MAX_GROWTH)
+                        self._baseline += BASELINE_DECAY * (target - self._baseline)
+                    healthy = healthy and latency <= self._baseline * self.latency_tolerance
+                # Chỉ tăng khi giới hạn hiện tại thực sự được dùng hết
+                if healthy and saturated and self._limit < self.max_limit:
+                    self._limit = min(
+                        float(self.max_limit), self._limit + 1.0 / self._limit
+                    )
+            self._cond.notify_all()
+
+        if reduced is not None:
+            self.save()
+        return reduced
+
+    def save(self) -> None:
+        """Lưu giới hạn hiện tại làm giá trị tốt gần nhất của nhà cung cấp."""
+        if not self.memory_path:
+            return
+        try:
+            save_limit(self.key, self.limit, self.memory_path)
+        except OSError:
+            pass
@@ -0,0 +1,243 @@
+# file_scanner.py
+"""
+Quét nhanh cây thư mục lớn (ổ mạng, hàng trăm nghìn file) để tìm file phụ đề.
+
+- Duyệt song song: mỗi thư mục được liệt kê bằng os.scandir trong một pool
+  luồng, nên độ trễ của ổ mạng được chồng lên nhau thay vì cộng dồn.
+- Lọc theo glob include/exclude trên đường dẫn tương đối (exclude khớp thư
+  mục thì bỏ cả thư mục), và bỏ file đầu ra (tên kết thúc bằng hậu tố như
+  "_vi").
+- Không stat từng file khi liệt kê (loại file lấy từ kết quả os.scandir).
+- Chỉ mục lưu trên đĩa (tuỳ chọn): lần quét sau chỉ stat mỗi thư mục một lần,
+  thư mục có mtime không đổi dùng lại danh sách đã lưu thay vì liệt kê lại.
+  File bị sửa tại chỗ không làm đổi mtime thư mục, nên khi cần phát hiện cả
+  trường hợp này thì không dùng chỉ mục.
+- Bỏ qua file đã có bản dịch mới (is_up_to_date): theo mtime của file đầu ra,
+  hoặc theo hash nội dung file nguồn đã ghi lại khi dịch xong.
+"""
+import concurrent.futures
+import fnmatch
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from subtitle_formats import is_subtitle_file
+
+# Số luồng liệt kê thư mục đồng thời
+DEFAULT_SCAN_WORKERS = 8
+
+# Cách xác định file đã có bản dịch mới
+UP_TO_DATE_MODES = ("mtime", "hash")
+
+_INDEX_VERSION = 1
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 nội dung file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ScanIndex:
+    """
+    Chỉ mục quét lưu dạng JSON: danh sách file phụ đề và thư mục con của mỗi
+    thư mục (kèm mtime thư mục), và hash file nguồn đã dịch xong.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.dirs: Dict[str, Dict] = {}
+        self.translated: Dict[str, str] = {}
+        self._seen: Dict[str, Dict] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == _INDEX_VERSION:
+                self.dirs = data.get("dirs", {})
+                self.translated = data.get("translated", {})
+        except (OSError, ValueError):
+            pass
+
+    def lookup(self, directory: str, mtime_ns: int) -> Optional[Dict]:
+        """Danh sách đã lưu của thư mục nếu mtime không đổi, ngược lại None."""
+        entry = self.dirs.get(directory)
+        if entry is not None and entry["mtime_ns"] == mtime_ns:
+            with self._lock:
+                self._seen[directory] = entry
+            return entry
+        return None
+
+    def store(self, directory: str, entry: Dict) -> None:
+        with self._lock:
+            self._seen[directory] = entry
+
+    def mark_translated(self, path: str, digest: Optional[str] = None) -> None:
+        """Ghi lại hash file nguồn sau khi dịch xong (cho chế độ "hash")."""
+        with self._lock:
+            self.translated[os.path.abspath(path)] = digest or file_digest(path)
+
+    def save(self) -> None:
+        """Ghi chỉ mục (chỉ giữ các thư mục của lần quét gần nhất)."""
+        with self._lock:
+            if self._seen:
+                self.dirs = self._seen
+                self._seen = {}
+            data = {
+                "version": _INDEX_VERSION,
+                "dirs": self.dirs,
+                "translated": self.translated,
+            }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class SubtitleScanner:
+    """Bộ quét file phụ đề song song với bộ lọc glob và chỉ mục tuỳ chọn."""
+
+    def __init__(
+        self,
+        include: Optional[Sequence[str]] = None,
+        exclude: Optional[Sequence[str]] = None,
+        output_suffixes: Iterable[str] = ("_vi",),
+        workers: int = DEFAULT_SCAN_WORKERS,
+        index: Optional[ScanIndex] = None,
+    ):
+        """
+        Tham số:
+            include: Glob đường dẫn tương đối cần lấy (None = mọi file phụ đề)
+            exclude: Glob đường dẫn tương đối (file hoặc thư mục) cần bỏ
+            output_suffixes: Hậu tố tên file đầu ra (không được coi là đầu vào)
+            workers: Số luồng liệt kê thư mục
+            index: Chỉ mục quét dùng lại giữa các lần quét
+        """
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.output_suffixes = tuple(s for s in output_suffixes if s)
+        self.workers = max(1, workers)
+        self.index = index
+
+    def is_output(self, name: str) -> bool:
+        if not self.output_suffixes:
+            return False
+        return os.path.splitext(name)[0].endswith(self.output_suffixes)
+
+    def _excluded(self, relative: str) -> bool:
+        return any(fnmatch.fnmatch(relative, pattern) for pattern in self.exclude)
+
+    def _included(self, relative: str) -> bool:
+        if not self.include:
+            return True
+        name = os.path.basename(relative)
+        return any(
+            fnmatch.fnmatch(relative, pattern) or fnmatch.fnmatch(name, pattern)
+            for pattern in self.include
+        )
+
+    def _list_directory(self, directory: str) -> Tuple[str, Dict]:
+        """Liệt kê một thư mục: {"mtime_ns", "subdirs", "files": [tên file phụ đề]}."""
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return directory, {"mtime_ns": 0, "subdirs": [], "files": []}
+        if self.index is not None:
+            cached = self.index.lookup(directory, mtime_ns)
+            if cached is not None:
+                return directory, cached
+
+        subdirs = []
+        files = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        # is_dir() dùng loại file từ chính kết quả liệt kê,
+                        # không cần stat từng file
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        elif is_subtitle_file(entry.name):
+                            files.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        listing = {"mtime_ns": mtime_ns, "subdirs": subdirs, "files": files}
+        if self.index is not None:
+            self.index.store(directory, listing)
+        return directory, listing
+
+    def scan(self, root: str) -> List[str]:
+        """Trả về đường dẫn các file phụ đề đầu vào, sắp xếp theo đường dẫn."""
+        root = os.path.abspath(root)
+        filtered = bool(self.include or self.exclude)
+        found = []
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="scan"
+        ) as pool:
+            pending = {pool.submit(self._list_directory, root)}
+            while pending:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    directory, listing = future.result()
+                    # Đường dẫn tương đối dạng "a/b/" để so với glob
+                    prefix = directory[len(root) + 1 :].replace(os.sep, "/")
+                    if prefix:
+                        prefix += "/"
+                    for name in listing["subdirs"]:
+                        if not (self.exclude and self._excluded(prefix + name)):
+                            pending.add(
+                                pool.submit(
+                                    self._list_directory, os.path.join(directory, name)
+                                )
+                            )
+                    for name in listing["files"]:
+                        if self.is_output(name):
+                            continue
+                        if filtered and (
+                            self._excluded(prefix + name)
+                            or not self._included(prefix + name)
+                        ):
+                            continue
+                        found.append(os.path.join(directory, name))
+        if self.index is not None:
+            self.index.save()
+        found.sort()
+        return found
+
+
+def is_up_to_date(
+    input_file: str,
+    output_files: Sequence[str],
+    mode: str = "mtime",
+    index: Optional[ScanIndex] = None,
+) -> bool:
+    """
+    True nếu mọi file đầu ra đã tồn tại và còn mới so với file nguồn.
+
+    Tham số:
+        mode: "mtime" (file đầu ra không cũ hơn file nguồn) hoặc "hash" (nội
+            dung file nguồn trùng hash đã ghi bởi ScanIndex.mark_translated)
+    """
+    if mode not in UP_TO_DATE_MODES:
+        raise ValueError(f"Chế độ kiểm tra không hợp lệ: {mode}")
+    try:
+        output_mtimes = [os.stat(path).st_mtime for path in output_files]
+    except OSError:
+        return False
+    if mode == "hash":
+        if index is None:
+            raise ValueError('Chế độ "hash" cần chỉ mục quét (ScanIndex)')
+        recorded = index.translated.get(os.path.abspath(input_file))
+        return recorded is not None and recorded == file_digest(input_file)
+    return min(output_mtimes) >= os.stat(input_file).st_mtime
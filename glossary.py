@@ -0,0 +1,183 @@
+# glossary.py
+"""
+Bảng thuật ngữ (tên nhân vật, địa danh, thuật ngữ của series) cho từng lô.
+
+Thay vì dán cả bảng thuật ngữ (có thể hàng nghìn mục) vào mọi prompt, bảng
+được biên dịch một lần thành máy Aho–Corasick; với mỗi lô, chỉ các thuật ngữ
+thực sự xuất hiện trong phụ đề của lô mới được chèn vào prompt. Sau khi
+dịch, bản dịch được kiểm tra xem có dùng đúng thuật ngữ không.
+
+Định dạng file:
+- .json: {"thuật ngữ gốc": "bản dịch", ...}
+- .csv: mỗi dòng "thuật ngữ gốc,bản dịch"
+- còn lại: mỗi dòng "thuật ngữ gốc<TAB>bản dịch" hoặc "thuật ngữ gốc = bản dịch";
+  dòng bắt đầu bằng # bị bỏ qua
+
+Thuật ngữ không có bản dịch được giữ nguyên (ví dụ tên riêng).
+"""
+import csv
+import json
+import os
+import threading
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+class AhoCorasick:
+    """Máy Aho–Corasick tìm mọi mẫu trong một lần duyệt văn bản."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = list(patterns)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[state][ch] = next_state
+                state = next_state
+            self._out[state].append(pattern_id)
+
+        # Liên kết thất bại theo chiều rộng; đầu ra của trạng thái gộp cả đầu
+        # ra của trạng thái thất bại
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._out[next_state] += self._out[self._fail[next_state]]
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Trả về lần lượt (vị trí bắt đầu, mã mẫu) của mọi lần xuất hiện."""
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pattern_id in out[state]:
+                yield i + 1 - len(patterns[pattern_id]), pattern_id
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class Glossary:
+    """Bảng thuật ngữ đã biên dịch (không phân biệt hoa thường, khớp nguyên từ)."""
+
+    def __init__(self, entries: Dict[str, str]):
+        """
+        Tham số:
+            entries: {thuật ngữ gốc: bản dịch}; bản dịch rỗng = giữ nguyên
+        """
+        self.entries: List[Tuple[str, str]] = []
+        seen = set()
+        for source, target in entries.items():
+            key = _normalize(source)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            self.entries.append((source.strip(), target.strip() or source.strip()))
+        self._matcher = AhoCorasick(_normalize(source) for source, _ in self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def find(self, text: str) -> List[int]:
+        """
+        Mã các thuật ngữ có trong văn bản, theo thứ tự xuất hiện. Khi các lần
+        khớp chồng nhau, giữ thuật ngữ dài nhất ("Ned Stark" thay vì "Stark").
+        """
+        text = _normalize(text)
+        matches = []
+        for start, term_id in self._matcher.finditer(text):
+            end = start + len(self._matcher.patterns[term_id])
+            # Chỉ khớp nguyên từ
+            if start > 0 and text[start - 1].isalnum():
+                continue
+            if end < len(text) and text[end].isalnum():
+                continue
+            matches.append((start, -end, term_id))
+        matches.sort()
+
+        found = []
+        covered = 0
+        for start, neg_end, term_id in matches:
+            if start < covered:
+                continue
+            covered = -neg_end
+            if term_id not in found:
+                found.append(term_id)
+        return found
+
+    def terms_for(self, texts: Iterable[str]) -> List[Tuple[str, str]]:
+        """Các mục (gốc, bản dịch) xuất hiện trong các văn bản, không trùng lặp."""
+        found: List[int] = []
+        for text in texts:
+            for term_id in self.find(text):
+                if term_id not in found:
+                    found.append(term_id)
+        return [self.entries[term_id] for term_id in found]
+
+    def violations(self, source: str, translation: str) -> List[Tuple[str, str]]:
+        """Các thuật ngữ có trong câu gốc mà bản dịch không dùng đúng bản dịch quy định."""
+        translation = _normalize(translation)
+        return [
+            self.entries[term_id]
+            for term_id in self.find(source)
+            if _normalize(self.entries[term_id][1]) not in translation
+        ]
+
+
+def read_glossary_file(path: str) -> Dict[str, str]:
+    """Đọc file thuật ngữ thành {thuật ngữ gốc: bản dịch}."""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if ext == ".json":
+            data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError(f"File thuật ngữ JSON phải là một object: {path}")
+            return {str(k): str(v or "") for k, v in data.items()}
+        entries: Dict[str, str] = {}
+        if ext == ".csv":
+            for row in csv.reader(f):
+                if row and row[0].strip() and not row[0].startswith("#"):
+                    entries[row[0]] = row[1] if len(row) > 1 else ""
+            return entries
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            separator = "\t" if "\t" in line else "="
+            source, _, target = line.partition(separator)
+            entries[source] = target
+        return entries
+
+
+# Bảng đã biên dịch theo (đường dẫn, thời điểm sửa), dùng chung giữa các API
+_compiled: Dict[Tuple[str, float], Glossary] = {}
+_compiled_lock = threading.Lock()
+
+
+def load_glossary(path: str) -> Glossary:
+    """Đọc và biên dịch file thuật ngữ (chỉ một lần cho mỗi phiên bản file)."""
+    path = os.path.abspath(path)
+    key = (path, os.path.getmtime(path))
+    with _compiled_lock:
+        glossary = _compiled.get(key)
+        if glossary is None:
+            glossary = Glossary(read_glossary_file(path))
+            _compiled[key] = glossary
+        return glossary
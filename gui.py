@@ -1,4 +1,5 @@
 # gui.py
+import os
 import tkinter as tk
 from tkinter import filedialog, ttk
 from typing import Dict, List, Callable
@@ -10,6 +11,13 @@ from translation_apis import (
     NOVITA_MODELS,
     OPENROUTER_MODELS,
 )
+from subtitle_formats import subtitle_extensions
+
+# Bộ lọc file phụ đề cho hộp thoại chọn file
+SUBTITLE_FILETYPES = (
+    "Subtitle files",
+    " ".join(f"*{extension}" for extension in subtitle_extensions()),
+)
 
 
 class SRTTranslatorGUI:
@@ -30,6 +38,14 @@ class SRTTranslatorGUI:
         self.api_var.set(api_config["type"])  # Giá trị mặc định
         self.bilingual_var = tk.BooleanVar()
         self.bilingual_var.set(False)  # Mặc định: tắt
+        self.incremental_var = tk.BooleanVar()
+        self.incremental_var.set(False)  # Mặc định: tắt
+        self.adaptive_var = tk.BooleanVar()
+        self.adaptive_var.set(False)  # Mặc định: tắt
+        self.languages_var = tk.StringVar()
+        self.languages_var.set("vi")  # Mặc định: chỉ tiếng Việt
+        self.dry_run_var = tk.BooleanVar()
+        self.dry_run_var.set(False)  # Mặc định: dịch thật
 
         # Thêm biến để lưu chế độ dịch (file đơn lẻ hoặc thư mục)
         self.mode_var = tk.StringVar()
@@ -42,6 +58,12 @@ class SRTTranslatorGUI:
 
         # Lưu trữ đối tượng progress_bars
         self.progress_bars = {}
+        # Luồng dịch đang chạy và các hàm dừng, tạm dừng/tiếp tục và áp dụng
+        # thiết lập mới cho nó (gán bởi start_translation)
+        self.worker_thread = None
+        self.on_stop = None
+        self.on_pause = None
+        self.on_apply = None
 
         # Frame cho các điều khiển chính
         main_frame = tk.Frame(self.root, padx=10, pady=10)
@@ -253,6 +275,75 @@ class SRTTranslatorGUI:
         )
         bilingual_check.pack(side=tk.LEFT, padx=5)
 
+        # Tuỳ chọn dịch tăng dần (dùng lại bản dịch từ manifest)
+        incremental_frame = tk.Frame(advanced_frame)
+        incremental_frame.pack(fill=tk.X, pady=5)
+
+        incremental_check = tk.Checkbutton(
+            incremental_frame,
+            text="Dịch tăng dần (chỉ dịch phụ đề mới hoặc đã thay đổi)",
+            variable=self.incremental_var,
+        )
+        incremental_check.pack(side=tk.LEFT, padx=5)
+
+        # Tuỳ chọn tự động điều chỉnh số yêu cầu đồng thời (AIMD)
+        adaptive_frame = tk.Frame(advanced_frame)
+        adaptive_frame.pack(fill=tk.X, pady=5)
+
+        adaptive_check = tk.Checkbutton(
+            adaptive_frame,
+            text="Tự động điều chỉnh số luồng (bắt đầu từ số luồng dưới đây)",
+            variable=self.adaptive_var,
+        )
+        adaptive_check.pack(side=tk.LEFT, padx=5)
+
+        # Chỉ lập kế hoạch, ước tính chi phí (không gọi API)
+        dry_run_frame = tk.Frame(advanced_frame)
+        dry_run_frame.pack(fill=tk.X, pady=5)
+
+        dry_run_check = tk.Checkbutton(
+            dry_run_frame,
+            text="Chỉ ước tính số yêu cầu, token, thời gian và chi phí (không gọi API)",
+            variable=self.dry_run_var,
+        )
+        dry_run_check.pack(side=tk.LEFT, padx=5)
+
+        # Bảng thuật ngữ (chỉ các thuật ngữ có trong lô được đưa vào prompt)
+        glossary_frame = tk.Frame(advanced_frame)
+        glossary_frame.pack(fill=tk.X, pady=5)
+
+        glossary_label = tk.Label(
+            glossary_frame, text="File thuật ngữ (tuỳ chọn):", width=25, anchor="w"
+        )
+        glossary_label.pack(side=tk.LEFT)
+
+        self.glossary_entry = tk.Entry(glossary_frame, width=40)
+        self.glossary_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+
+        glossary_button = tk.Button(
+            glossary_frame, text="Duyệt...", command=self.browse_glossary_file
+        )
+        glossary_button.pack(side=tk.LEFT, padx=5)
+
+        # Ngôn ngữ đích (nhiều ngôn ngữ được dịch trong một lượt)
+        languages_frame = tk.Frame(advanced_frame)
+        languages_frame.pack(fill=tk.X, pady=5)
+
+        languages_label = tk.Label(
+            languages_frame, text="Ngôn ngữ đích:", width=25, anchor="w"
+        )
+        languages_label.pack(side=tk.LEFT)
+
+        languages_entry = tk.Entry(
+            languages_frame, width=15, textvariable=self.languages_var
+        )
+        languages_entry.pack(side=tk.LEFT, padx=5)
+
+        languages_help = tk.Label(
+            languages_frame, text="(Ví dụ: vi,th,id → video_vi.srt, video_th.srt, video_id.srt)"
+        )
+        languages_help.pack(side=tk.LEFT, padx=5)
+
         # Số luồng
         threads_frame = tk.Frame(advanced_frame)
         threads_frame.pack(fill=tk.X, pady=5)
@@ -295,6 +386,29 @@ class SRTTranslatorGUI:
         self.retries_entry.insert(0, "0")  # Giá trị mặc định
         self.retries_entry.pack(side=tk.LEFT, padx=5)
 
+        # Giới hạn tốc độ
+        rpm_frame = tk.Frame(advanced_frame)
+        rpm_frame.pack(fill=tk.X, pady=5)
+
+        rpm_label = tk.Label(
+            rpm_frame,
+            text="Số yêu cầu tối đa mỗi phút (0 = không giới hạn):",
+            width=25,
+            anchor="w",
+        )
+        rpm_label.pack(side=tk.LEFT)
+
+        self.rpm_entry = tk.Entry(rpm_frame, width=10)
+        self.rpm_entry.insert(0, "0")  # Giá trị mặc định
+        self.rpm_entry.pack(side=tk.LEFT, padx=5)
+
+        live_help = tk.Label(
+            advanced_frame,
+            text="Số luồng, kích thước lô, model và giới hạn tốc độ có thể đổi khi đang dịch (nút \"Áp dụng thiết lập\")",
+            anchor="w",
+        )
+        live_help.pack(fill=tk.X, padx=5)
+
         # ========== PROGRESS TAB ==========
         # Khu vực hiển thị tiến trình
         progress_frame = tk.Frame(progress_tab, padx=10, pady=10)
@@ -331,16 +445,11 @@ class SRTTranslatorGUI:
 
         # Tạo hàm wrapper để truyền các tham số vào start_translation
         def on_start_click():
-            # Xác định model được sử dụng
-            if self.custom_model_var.get():
-                model = self.custom_model_entry.get().strip()
-            else:
-                model = self.model_var.get()
             start_translation(
                 self.api_var,
                 self.api_key_entry,
                 self.base_url_entry,
-                model,
+                self.selected_model(),
                 self.input_file_entry,
                 self.output_file_entry,
                 self.threads_entry,
@@ -350,6 +459,12 @@ class SRTTranslatorGUI:
                 self.mode_var,  # Thêm chế độ dịch
                 self.directory_entry,  # Thêm entry chứa đường dẫn thư mục
                 self.file_suffix_var,  # Thêm hậu tố file
+                self.incremental_var,  # Dịch tăng dần
+                self.adaptive_var,  # Tự động điều chỉnh số luồng
+                self.languages_var,  # Ngôn ngữ đích
+                self.glossary_entry,  # File thuật ngữ
+                self.dry_run_var,  # Chỉ ước tính
+                self.rpm_entry,  # Giới hạn tốc độ
             )
 
         self.start_button = tk.Button(
@@ -361,6 +476,40 @@ class SRTTranslatorGUI:
         )
         self.start_button.pack()
 
+        self.stop_button = tk.Button(
+            button_frame,
+            text="Dừng dịch",
+            command=self.request_stop,
+            width=20,
+            state=tk.DISABLED,
+        )
+        self.stop_button.pack(pady=5)
+
+        # Tạm dừng/tiếp tục và áp dụng thiết lập mới khi đang dịch
+        live_buttons = tk.Frame(button_frame)
+        live_buttons.pack()
+
+        self.pause_button = tk.Button(
+            live_buttons,
+            text="Tạm dừng",
+            command=self.request_pause,
+            width=20,
+            state=tk.DISABLED,
+        )
+        self.pause_button.pack(side=tk.LEFT, padx=5)
+
+        self.apply_button = tk.Button(
+            live_buttons,
+            text="Áp dụng thiết lập",
+            command=self.request_apply,
+            width=20,
+            state=tk.DISABLED,
+        )
+        self.apply_button.pack(side=tk.LEFT, padx=5)
+
+        # Đóng cửa sổ khi đang dịch: dừng công việc rồi mới thoát
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # Thiết lập sự kiện khi thay đổi API
         self.api_var.trace_add("write", self.on_api_change)
         # Gọi on_api_change để thiết lập ban đầu
@@ -403,15 +552,16 @@ class SRTTranslatorGUI:
         """Mở hộp thoại chọn file đầu vào"""
         filename = filedialog.askopenfilename(
             initialdir=".",
-            title="Chọn file SRT",
-            filetypes=(("SRT files", "*.srt"), ("All files", "*.*")),
+            title="Chọn file phụ đề",
+            filetypes=(SUBTITLE_FILETYPES, ("All files", "*.*")),
         )
         if filename:
             self.input_file_entry.delete(0, tk.END)
             self.input_file_entry.insert(0, filename)
 
             # Tự động đề xuất tên file đầu ra
-            suggested_output = filename.replace(".srt", "_vi.srt")
+            name, extension = os.path.splitext(filename)
+            suggested_output = f"{name}_vi{extension}"
             self.output_file_entry.delete(0, tk.END)
             self.output_file_entry.insert(0, suggested_output)
 
@@ -419,14 +569,28 @@ class SRTTranslatorGUI:
         """Mở hộp thoại chọn file đầu ra"""
         filename = filedialog.asksaveasfilename(
             initialdir=".",
-            title="Lưu file SRT",
-            filetypes=(("SRT files", "*.srt"), ("All files", "*.*")),
+            title="Lưu file phụ đề",
+            filetypes=(SUBTITLE_FILETYPES, ("All files", "*.*")),
             defaultextension=".srt",
         )
         if filename:
             self.output_file_entry.delete(0, tk.END)
             self.output_file_entry.insert(0, filename)
 
+    def browse_glossary_file(self):
+        """Mở hộp thoại chọn file thuật ngữ"""
+        filename = filedialog.askopenfilename(
+            initialdir=".",
+            title="Chọn file thuật ngữ",
+            filetypes=(
+                ("Glossary files", "*.txt *.tsv *.csv *.json"),
+                ("All files", "*.*"),
+            ),
+        )
+        if filename:
+            self.glossary_entry.delete(0, tk.END)
+            self.glossary_entry.insert(0, filename)
+
     def on_api_change(self, *args):
         """Xử lý khi thay đổi loại API"""
         api_type = self.api_var.get()
@@ -483,6 +647,35 @@ class SRTTranslatorGUI:
             self.custom_model_frame.pack_forget()
             self.model_listbox.config(state=tk.NORMAL)
 
+    def selected_model(self) -> str:
+        """Model đang được chọn (trong danh sách hoặc model tùy chỉnh)."""
+        if self.custom_model_var.get():
+            return self.custom_model_entry.get().strip()
+        return self.model_var.get()
+
+    def request_pause(self):
+        """Tạm dừng hoặc tiếp tục công việc đang chạy."""
+        if self.on_pause is not None:
+            self.on_pause()
+
+    def request_apply(self):
+        """Áp dụng số luồng, kích thước lô, model và giới hạn tốc độ đang nhập cho công việc đang chạy."""
+        if self.on_apply is not None:
+            self.on_apply()
+
+    def request_stop(self):
+        """Yêu cầu dừng công việc đang chạy (tiến trình đã dịch được giữ lại)."""
+        if self.on_stop is not None:
+            self.on_stop()
+
+    def on_close(self):
+        """Dừng công việc đang chạy (nếu có) và chờ luồng dịch kết thúc trước khi đóng."""
+        if self.worker_thread is not None and self.worker_thread.is_alive():
+            self.request_stop()
+            self.root.after(100, self.on_close)
+            return
+        self.root.destroy()
+
     def run(self):
         """Khởi chạy vòng lặp chính của GUI"""
         self.root.mainloop()
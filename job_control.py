@@ -0,0 +1,115 @@
+# job_control.py
+"""
+Tạm dừng/tiếp tục và đổi thiết lập của công việc đang chạy.
+
+JobControl gắn vào SRTTranslator (translator.control). Các luồng dịch chỉ xem
+nó ở ranh giới giữa các lô:
+- Khi tạm dừng, luồng chờ trước lô tiếp theo; lô đang gửi vẫn chạy tới khi
+  xong và được ghi vào nhật ký JobState như bình thường.
+- Khi số luồng, kích thước lô hoặc model thay đổi, mỗi luồng dừng sau lô hiện
+  tại và translate_with_state chia lại phần chưa dịch theo thiết lập mới.
+  Nhật ký khoá theo chỉ số phụ đề nên việc chia lại không làm mất phần đã dịch.
+Giới hạn tốc độ không thuộc về một công việc (bộ giới hạn dùng chung), xem
+SRTTranslator.set_rate_limit.
+"""
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import cancellation
+
+# Các thiết lập đổi được khi công việc đang chạy
+LIVE_SETTINGS = ("num_threads", "batch_size", "model")
+
+
+def _validate(name: str, value: Any) -> Any:
+    if name not in LIVE_SETTINGS:
+        raise ValueError(f"Không đổi được thiết lập khi đang chạy: {name}")
+    if name == "model":
+        value = str(value or "").strip()
+        if not value:
+            raise ValueError("model không được để trống")
+        return value
+    try:
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{name} phải là số nguyên") from None
+    if value < 1:
+        raise ValueError(f"{name} phải lớn hơn 0")
+    return value
+
+
+class JobControl:
+    """Trạng thái tạm dừng và thiết lập ghi đè của một công việc (an toàn đa luồng)."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._paused = False
+        self._settings: Dict[str, Any] = {}
+        # Tăng mỗi khi thiết lập đổi; luồng dịch so với giá trị lúc chia phần
+        self._generation = 0
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def pause(self) -> bool:
+        """Tạm dừng trước lô tiếp theo. Trả về False nếu đã tạm dừng từ trước."""
+        with self._cond:
+            if self._paused:
+                return False
+            self._paused = True
+            return True
+
+    def resume(self) -> bool:
+        """Tiếp tục dịch. Trả về False nếu không tạm dừng."""
+        with self._cond:
+            if not self._paused:
+                return False
+            self._paused = False
+            self._cond.notify_all()
+            return True
+
+    def wait_if_paused(self, cancel: Optional[cancellation.CancelToken] = None) -> None:
+        """Chờ tới khi được tiếp tục; ném TranslationCancelled nếu cancel bị huỷ."""
+        if not self._paused:
+            return
+        with cancellation.on_cancel(cancel, self._wake), self._cond:
+            while self._paused:
+                cancellation.check(cancel)
+                self._cond.wait()
+
+    def _wake(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+
+    def update(self, **settings) -> Dict[str, Any]:
+        """
+        Ghi đè thiết lập (num_threads, batch_size, model), có hiệu lực từ lô
+        tiếp theo. Trả về các giá trị thực sự thay đổi; ném ValueError nếu
+        thiết lập không hợp lệ (khi đó không giá trị nào được áp dụng).
+        """
+        values = {name: _validate(name, value) for name, value in settings.items()}
+        with self._cond:
+            changed = {
+                name: value
+                for name, value in values.items()
+                if self._settings.get(name) != value
+            }
+            if changed:
+                self._settings.update(changed)
+                self._generation += 1
+        return changed
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        with self._cond:
+            return dict(self._settings)
+
+    def snapshot(self) -> Tuple[int, Dict[str, Any]]:
+        """(generation, thiết lập ghi đè) đọc cùng lúc."""
+        with self._cond:
+            return self._generation, dict(self._settings)
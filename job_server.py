@@ -0,0 +1,837 @@
+# job_server.py
+"""
+Dịch vụ HTTP cục bộ nhận công việc dịch SRT từ các dịch vụ khác.
+
+Mọi công việc dùng chung một SRTTranslator (pool luồng, bộ giới hạn tốc độ và
+pool kết nối API), được xếp hàng theo lớp ưu tiên và chạy bởi một số luồng
+công việc cố định. Các lô của những công việc đang chạy chia nhau số yêu cầu
+API đồng thời qua FairScheduler (xem scheduler.py).
+Thông tin công việc được lưu trong thư mục trạng thái, nên khi khởi động lại
+các công việc chưa xong được xếp hàng lại và tiếp tục từ nhật ký JobState.
+
+API (JSON):
+    POST /jobs              {"path": "...", "output": "..."} hoặc
+                            {"content": "<nội dung phụ đề>", "name": "a.ass"}
+                            (SRT, VTT, ASS/SSA, SBV theo phần mở rộng của name)
+                            tuỳ chọn: "priority" (urgent/normal/bulk),
+                            "weight", "deadline_seconds"
+                            -> 202 {"id": ..., "status": "queued", ...}
+    GET  /jobs              danh sách công việc
+    GET  /jobs/{id}         trạng thái và tiến trình của một công việc
+    GET  /jobs/{id}/output  nội dung phụ đề đã dịch (khi status = "done")
+    POST /jobs/{id}/cancel  huỷ công việc (đang chờ hoặc đang chạy); phần đã
+                            dịch vẫn nằm trong nhật ký
+    POST /jobs/{id}/pause   tạm dừng trước lô tiếp theo (lô đang gửi vẫn xong)
+    POST /jobs/{id}/resume  tiếp tục công việc đã tạm dừng
+    POST /jobs/{id}/config  {"threads": 8, "batch_size": 20, "model": "..."}
+                            đổi thiết lập khi đang chạy, áp dụng từ lô tiếp theo
+    GET  /config            giới hạn dùng chung của dịch vụ
+    POST /config            {"requests_per_minute": 60, "inflight": 8}
+                            đổi giới hạn tốc độ (0 = bỏ) và số lô đồng thời
+
+Chạy từ dòng lệnh:
+    python job_server.py --port 8080 --api gemini --key ...
+"""
+import collections
+import concurrent.futures
+import json
+import math
+import os
+import queue
+import threading
+import time
+import urllib.parse
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+from cancellation import CancelToken
+from concurrency import DEFAULT_MAX_CONCURRENCY
+from job_control import JobControl
+from rate_limiter import RateLimiter
+from scheduler import PRIORITY_CLASSES, FairScheduler
+from srt_translator import SRTTranslator, estimate_tokens
+from subtitle_formats import is_subtitle_file
+from token_usage import UsageStats
+
+# Trạng thái của một công việc
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+# Các khoá api_config mà client được phép ghi đè. Loại API không nằm trong số
+# này vì API key của server chỉ dùng được với nhà cung cấp của nó
+JOB_API_OVERRIDES = ("model", "target_language")
+
+# Khoá của POST /jobs/{id}/config -> thiết lập của JobControl
+JOB_LIVE_SETTINGS = {"threads": "num_threads", "batch_size": "batch_size", "model": "model"}
+
+# Content-Type khi trả file đã dịch, theo phần mở rộng
+OUTPUT_CONTENT_TYPES = {
+    ".srt": "application/x-subrip",
+    ".vtt": "text/vtt",
+    ".ass": "text/x-ssa",
+    ".ssa": "text/x-ssa",
+}
+
+
+# Các trường chuỗi của yêu cầu tạo công việc
+_STRING_FIELDS = ("content", "name", "path", "output", "suffix", "priority") + JOB_API_OVERRIDES
+
+
+def _number(request: Dict, key: str, default: float) -> float:
+    """
+    Giá trị số hữu hạn request[key] (default nếu không có). Ném ValueError nếu
+    không phải số, hoặc là NaN/Infinity.
+    """
+    value = request.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{key} phải là số")
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"{key} phải là số hữu hạn")
+    return value
+
+
+class TranslationJob:
+    """Một công việc dịch và tiến trình tổng hợp của nó."""
+
+    # Các trường được lưu xuống đĩa
+    _PERSISTED = (
+        "id",
+        "input_file",
+        "output_file",
+        "api_overrides",
+        "options",
+        "priority",
+        "weight",
+        "deadline",
+        "status",
+        "created",
+        "started",
+        "finished",
+        "error",
+    )
+
+    def __init__(
+        self,
+        job_id: str,
+        input_file: str,
+        output_file: str,
+        api_overrides: Optional[Dict] = None,
+        options: Optional[Dict] = None,
+        priority: str = "normal",
+        weight: float = 1.0,
+        deadline: Optional[float] = None,
+    ):
+        self.id = job_id
+        self.input_file = input_file
+        self.output_file = output_file
+        self.api_overrides = api_overrides or {}
+        self.options = options or {}
+        self.priority = priority
+        self.weight = weight
+        self.deadline = deadline
+        self.status = JOB_QUEUED
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.error: Optional[str] = None
+        # Tiến trình theo luồng: {thread_id: (lô hiện tại, tổng số lô)}
+        self.thread_progress: Dict[int, tuple] = {}
+        self.log = collections.deque(maxlen=20)
+        # Token và độ trễ của các yêu cầu API thuộc công việc này
+        self.usage = UsageStats()
+        # Chỉ số các phụ đề đã nhận bản dịch (báo sớm khi streaming)
+        self.received_cues = set()
+        # Token huỷ, trạng thái tạm dừng và thiết lập đổi khi đang chạy
+        # (không lưu xuống đĩa)
+        self.cancel_token = CancelToken()
+        self.control = JobControl()
+        self._lock = threading.Lock()
+
+    def record_status(self, message: str) -> None:
+        with self._lock:
+            self.log.append(message)
+
+    def record_progress(self, thread_id: int, current: int, total: int) -> None:
+        with self._lock:
+            self.thread_progress[thread_id] = (current, total)
+
+    def record_cue(self, cue) -> None:
+        with self._lock:
+            self.received_cues.add(cue.index)
+
+    def percent(self) -> float:
+        """Phần trăm số lô đã xong, tổng hợp từ tiến trình của mọi luồng."""
+        if self.status == JOB_DONE:
+            return 100.0
+        with self._lock:
+            progress = list(self.thread_progress.values())
+        total = sum(t for _, t in progress)
+        if not total:
+            return 0.0
+        # Lô "hiện tại" của mỗi luồng vẫn đang được dịch
+        return 100.0 * sum(c - 1 for c, _ in progress) / total
+
+    def queue_key(self):
+        """Thứ tự nhận vào chạy: lớp ưu tiên, hạn chót, thời điểm gửi."""
+        deadline = self.deadline if self.deadline is not None else float("inf")
+        return (PRIORITY_CLASSES.index(self.priority), deadline, self.created, self.id)
+
+    def to_dict(self, include_log: bool = False) -> Dict:
+        data = {name: getattr(self, name) for name in self._PERSISTED}
+        data["progress"] = round(self.percent(), 1)
+        data["paused"] = self.control.paused
+        data["live_settings"] = self.control.settings
+        data["usage"] = self.usage.snapshot()
+        with self._lock:
+            data["cues_received"] = len(self.received_cues)
+        if include_log:
+            with self._lock:
+                data["log"] = list(self.log)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TranslationJob":
+        job = cls(
+            data["id"],
+            data["input_file"],
+            data["output_file"],
+            data.get("api_overrides"),
+            data.get("options"),
+            data.get("priority", "normal"),
+            data.get("weight", 1.0),
+            data.get("deadline"),
+        )
+        for name in ("status", "created", "started", "finished", "error"):
+            if name in data:
+                setattr(job, name, data[name])
+        return job
+
+
+class JobService:
+    """
+    Hàng đợi công việc dịch dùng chung cho mọi client.
+
+    Tham số:
+        state_dir: Thư mục lưu thông tin công việc, file tải lên, kết quả và
+            nhật ký tiếp tục dịch
+        api_config: Cấu hình API mặc định (gồm API key)
+        num_threads: Số luồng dịch tối đa cho mỗi công việc (số "threads" của
+            client bị giới hạn ở mức này)
+        max_concurrent_jobs: Số công việc chạy đồng thời
+        max_inflight_batches: Số lô gọi API đồng thời cho mọi công việc
+            (mặc định = num_threads), chia theo FairScheduler
+        requests_per_minute: Giới hạn tốc độ chung cho mọi công việc
+        allowed_root: Chỉ nhận đường dẫn (đầu vào và đầu ra) nằm trong thư mục
+            này; mặc định là thư mục làm việc hiện tại
+    """
+
+    def __init__(
+        self,
+        state_dir: str,
+        api_config: Dict,
+        num_threads: int = 5,
+        max_concurrent_jobs: int = 4,
+        max_inflight_batches: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        allowed_root: Optional[str] = None,
+        update_status: Callable[[str], None] = None,
+    ):
+        self.state_dir = os.path.abspath(state_dir)
+        self.api_config = api_config
+        self.num_threads = num_threads
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.allowed_root = os.path.realpath(allowed_root or os.getcwd())
+        self.update_status = update_status or (lambda msg: print(msg))
+
+        self.jobs_dir = os.path.join(self.state_dir, "jobs")
+        self.uploads_dir = os.path.join(self.state_dir, "uploads")
+        self.outputs_dir = os.path.join(self.state_dir, "outputs")
+        for directory in (self.jobs_dir, self.uploads_dir, self.outputs_dir):
+            os.makedirs(directory, exist_ok=True)
+
+        # Pool luồng, bộ giới hạn tốc độ và cache API dùng chung. Pool đủ chỗ
+        # cho mọi phần của mọi công việc đang chạy, nên không phần nào phải
+        # xếp hàng trong pool: thứ tự gọi API chỉ do FairScheduler quyết định
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._chunk_workers() * max_concurrent_jobs,
+            thread_name_prefix="chunk",
+        )
+        self.rate_limiter = (
+            RateLimiter(requests_per_minute) if requests_per_minute else None
+        )
+        self.scheduler = FairScheduler(max_inflight_batches or num_threads)
+        self.translator = SRTTranslator(
+            self.update_status,
+            rate_limiter=self.rate_limiter,
+            state_dir=os.path.join(self.state_dir, "journal"),
+            executor=self.executor,
+            scheduler=self.scheduler,
+        )
+
+        self._jobs: Dict[str, TranslationJob] = {}
+        self._jobs_lock = threading.Lock()
+        # Hàng đợi nhận vào chạy, sắp theo TranslationJob.queue_key()
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._workers: List[threading.Thread] = []
+        self._stopping = False
+
+    def _chunk_workers(self) -> int:
+        """Số phần tối đa của một công việc chạy cùng lúc (xem translate_with_state)."""
+        if self.api_config.get("adaptive_concurrency"):
+            # Khi tự điều chỉnh, mỗi công việc chia thành max_concurrency phần
+            return max(
+                1, int(self.api_config.get("max_concurrency", DEFAULT_MAX_CONCURRENCY))
+            )
+        return self.num_threads
+
+    def _allowed_path(self, path: str) -> str:
+        """
+        Đường dẫn thật của path (tương đối thì tính từ allowed_root). Ném
+        ValueError nếu nó nằm ngoài allowed_root (kể cả qua ".." hoặc symlink).
+        """
+        resolved = os.path.realpath(os.path.join(self.allowed_root, path))
+        if os.path.commonpath([self.allowed_root, resolved]) != self.allowed_root:
+            raise ValueError(f"Đường dẫn nằm ngoài thư mục cho phép: {path}")
+        return resolved
+
+    def _clamp_threads(self, value) -> int:
+        """Số luồng của một công việc, giới hạn trong [1, num_threads]."""
+        try:
+            threads = int(value)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError("threads phải là số nguyên") from None
+        if threads < 1:
+            raise ValueError("threads phải lớn hơn 0")
+        return min(threads, self.num_threads)
+
+    def start(self) -> "JobService":
+        """Nạp lại công việc đã lưu và khởi động các luồng công việc."""
+        requeued = 0
+        for name in sorted(os.listdir(self.jobs_dir)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.jobs_dir, name), "r", encoding="utf-8") as f:
+                    job = TranslationJob.from_dict(json.load(f))
+            except (OSError, ValueError, KeyError):
+                continue
+            self._jobs[job.id] = job
+            if job.status in (JOB_QUEUED, JOB_RUNNING):
+                # Công việc dở dang sẽ tiếp tục từ nhật ký JobState
+                job.status = JOB_QUEUED
+                self._queue.put(job.queue_key())
+                requeued += 1
+        if requeued:
+            self.update_status(f"Xếp hàng lại {requeued} công việc chưa hoàn thành")
+
+        for i in range(self.max_concurrent_jobs):
+            worker = threading.Thread(
+                target=self._work_loop, name=f"job-worker-{i + 1}"
+            )
+            worker.start()
+            self._workers.append(worker)
+        return self
+
+    def stop(self) -> None:
+        """
+        Dừng các luồng công việc. Công việc đang chạy được huỷ (phần đã dịch
+        nằm trong nhật ký) và cùng các công việc còn trong hàng đợi được giữ
+        lại cho lần khởi động sau.
+        """
+        self._stopping = True
+        for job in self.list_jobs():
+            if job.status == JOB_RUNNING:
+                job.cancel_token.cancel("Dịch vụ đang dừng")
+        for _ in self._workers:
+            # Khoá nhỏ hơn mọi công việc nên được lấy ra trước
+            self._queue.put((-1,))
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        self.executor.shutdown(wait=True)
+
+    def submit(self, request: Dict) -> TranslationJob:
+        """
+        Tạo công việc từ yêu cầu của client. Ném ValueError nếu yêu cầu không
+        hợp lệ.
+        """
+        if not isinstance(request, dict):
+            raise ValueError("Cần một đối tượng JSON")
+        for key in _STRING_FIELDS:
+            if request.get(key) is not None and not isinstance(request[key], str):
+                raise ValueError(f"{key} phải là chuỗi")
+
+        # Kiểm tra mọi tuỳ chọn trước khi ghi file tải lên
+        options = {
+            "num_threads": self._clamp_threads(request.get("threads", self.num_threads)),
+            "batch_size": int(_number(request, "batch_size", 10)),
+            "max_retries": int(_number(request, "max_retries", 0)),
+            "bilingual": bool(request.get("bilingual", False)),
+            "incremental": bool(request.get("incremental", False)),
+        }
+        api_overrides = {
+            k: request[k] for k in JOB_API_OVERRIDES if request.get(k)
+        }
+
+        priority = request.get("priority", "normal")
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Lớp ưu tiên không hợp lệ: {priority}")
+        weight = _number(request, "weight", 1.0)
+        if weight <= 0:
+            raise ValueError("weight phải lớn hơn 0")
+        deadline = None
+        if request.get("deadline_seconds") is not None:
+            deadline = time.time() + _number(request, "deadline_seconds", 0.0)
+
+        job_id = uuid.uuid4().hex
+        if request.get("content"):
+            name = os.path.basename(request.get("name") or "upload.srt")
+            stem, extension = os.path.splitext(name)
+            stem = stem or "upload"
+            extension = extension.lower() or ".srt"
+            if not is_subtitle_file(name):
+                raise ValueError(f"Định dạng phụ đề không được hỗ trợ: {name}")
+            input_file = os.path.join(self.uploads_dir, f"{job_id}{extension}")
+            with open(input_file, "w", encoding="utf-8") as f:
+                f.write(request["content"])
+            output_file = os.path.join(
+                self.outputs_dir, f"{job_id}_{stem}_vi{extension}"
+            )
+        elif request.get("path"):
+            input_file = self._allowed_path(request["path"])
+            if not os.path.isfile(input_file):
+                raise ValueError(f"File đầu vào không tồn tại: {request['path']}")
+            output_file = self._allowed_path(
+                request.get("output")
+                or self.translator._output_path(input_file, request.get("suffix", "_vi"))
+            )
+        else:
+            raise ValueError("Cần 'path' hoặc 'content'")
+
+        job = TranslationJob(
+            job_id,
+            input_file,
+            output_file,
+            api_overrides,
+            options,
+            priority,
+            weight,
+            deadline,
+        )
+        with self._jobs_lock:
+            self._jobs[job_id] = job
+        self._save(job)
+        self._queue.put(job.queue_key())
+        self.update_status(f"Nhận công việc {job_id}: {os.path.basename(input_file)}")
+        return job
+
+    def cancel(self, job_id: str) -> Optional[TranslationJob]:
+        """
+        Huỷ công việc: công việc đang chờ không được chạy nữa, công việc đang
+        chạy dừng ở lần chờ tiếp theo (yêu cầu streaming bị đóng ngay).
+        Trả về None nếu không có công việc.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_token.cancel("Client huỷ công việc")
+        if job.status == JOB_QUEUED:
+            job.status = JOB_CANCELLED
+            job.finished = time.time()
+            self._save(job)
+        return job
+
+    def pause(self, job_id: str) -> Optional[TranslationJob]:
+        """
+        Tạm dừng công việc trước lô tiếp theo; các lô đang gửi vẫn chạy tới khi
+        xong và được ghi vào nhật ký. Trả về None nếu không có công việc.
+        """
+        job = self.get(job_id)
+        if job is not None and job.control.pause():
+            self.update_status(f"[{job.id[:8]}] Tạm dừng")
+        return job
+
+    def resume(self, job_id: str) -> Optional[TranslationJob]:
+        """Tiếp tục công việc đã tạm dừng. Trả về None nếu không có công việc."""
+        job = self.get(job_id)
+        if job is not None and job.control.resume():
+            self.update_status(f"[{job.id[:8]}] Tiếp tục")
+        return job
+
+    def reconfigure(self, job_id: str, request: Dict) -> Optional[TranslationJob]:
+        """
+        Đổi số luồng (tối đa num_threads), kích thước lô hoặc model của công
+        việc, áp dụng từ lô tiếp theo (phần chưa dịch được chia lại). Số luồng
+        và kích thước lô được lưu cùng công việc cho lần chạy tiếp theo; model
+        mới chỉ dùng cho lần chạy hiện tại vì nhật ký tiếp tục dịch khoá theo
+        model ban đầu.
+        Ném ValueError nếu yêu cầu không hợp lệ; trả về None nếu không có
+        công việc.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        unknown = [key for key in request if key not in JOB_LIVE_SETTINGS]
+        if unknown:
+            raise ValueError(f"Không đổi được thiết lập: {', '.join(unknown)}")
+        if "threads" in request:
+            request = dict(request, threads=self._clamp_threads(request["threads"]))
+        changed = job.control.update(
+            **{JOB_LIVE_SETTINGS[key]: value for key, value in request.items()}
+        )
+        for name in ("num_threads", "batch_size"):
+            if name in changed:
+                job.options[name] = changed[name]
+        if changed:
+            self._save(job)
+            settings = ", ".join(f"{name}={value}" for name, value in changed.items())
+            self.update_status(f"[{job.id[:8]}] Đổi thiết lập: {settings}")
+        return job
+
+    def config(self) -> Dict:
+        """Giới hạn dùng chung hiện tại của dịch vụ."""
+        rate_limiter = self.translator.rate_limiter
+        return {
+            "requests_per_minute": rate_limiter.requests_per_minute if rate_limiter else None,
+            "inflight": self.scheduler.capacity,
+        }
+
+    def configure(self, request: Dict) -> Dict:
+        """
+        Đổi giới hạn tốc độ ("requests_per_minute", 0 hoặc null = bỏ giới
+        hạn) và số lô gọi API đồng thời ("inflight") cho mọi công việc, có
+        hiệu lực ngay. Ném ValueError nếu yêu cầu không hợp lệ.
+        """
+        unknown = [key for key in request if key not in ("requests_per_minute", "inflight")]
+        if unknown:
+            raise ValueError(f"Không đổi được thiết lập: {', '.join(unknown)}")
+        try:
+            rate = request.get("requests_per_minute")
+            rate = float(rate) if rate else None
+            inflight = int(request["inflight"]) if "inflight" in request else None
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError("requests_per_minute và inflight phải là số") from None
+        if rate is not None and not (0 <= rate < math.inf):
+            raise ValueError("requests_per_minute phải là số hữu hạn, không âm")
+        if inflight is not None:
+            self.scheduler.set_capacity(inflight)
+        if "requests_per_minute" in request:
+            self.translator.set_rate_limit(rate)
+            self.rate_limiter = self.translator.rate_limiter
+        config = self.config()
+        self.update_status(
+            f"Giới hạn dịch vụ: {config['requests_per_minute'] or 'không giới hạn'} yêu cầu/phút, "
+            f"{config['inflight']} lô đồng thời"
+        )
+        return config
+
+    def get(self, job_id: str) -> Optional[TranslationJob]:
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[TranslationJob]:
+        with self._jobs_lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created)
+
+    def _save(self, job: TranslationJob) -> None:
+        path = os.path.join(self.jobs_dir, f"{job.id}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _work_loop(self) -> None:
+        while True:
+            key = self._queue.get()
+            if key[0] < 0:
+                return
+            job = self.get(key[-1])
+            if job is None or job.status != JOB_QUEUED:
+                continue
+            self._run(job)
+
+    def _run(self, job: TranslationJob) -> None:
+        tag = f"[{job.id[:8]}]"
+
+        def update_status(msg: str) -> None:
+            job.record_status(msg)
+            self.update_status(f"{tag} {msg}")
+
+        translator = self.translator.with_callbacks(update_status, job.record_progress)
+        translator.job_key = job.id
+        translator.usage = job.usage
+        translator.on_cue = job.record_cue
+        translator.cancel_token = job.cancel_token
+        translator.control = job.control
+        # Công việc lưu từ phiên bản cũ có thể ghi đè cả khoá không còn được phép
+        api_config = dict(
+            self.api_config,
+            **{k: v for k, v in job.api_overrides.items() if k in JOB_API_OVERRIDES},
+        )
+        options = job.options
+        max_retries = options.get("max_retries", 0)
+
+        job.status = JOB_RUNNING
+        job.started = time.time()
+        self._save(job)
+        try:
+            # Tổng chi phí ước tính giúp bộ lập lịch xét hạn chót
+            total_cost = sum(
+                estimate_tokens(sub.text) for sub in translator.parse_subtitles(job.input_file)
+            )
+            self.scheduler.register(
+                job.id, job.priority, job.weight, job.deadline, total_cost
+            )
+            success = translator.translate_file(
+                job.input_file,
+                job.output_file,
+                api_config,
+                min(options.get("num_threads", self.num_threads), self.num_threads),
+                options.get("batch_size", 10),
+                float("inf") if max_retries == 0 else max_retries,
+                options.get("bilingual", False),
+                incremental=options.get("incremental", False),
+            )
+            if not success:
+                job.error = job.log[-1] if job.log else "Dịch thất bại"
+        except Exception as e:
+            success = False
+            job.error = str(e)
+        finally:
+            self.scheduler.unregister(job.id)
+
+        if success:
+            job.status = JOB_DONE
+        elif job.cancel_token.cancelled:
+            # Dịch vụ dừng: tiếp tục ở lần khởi động sau; client huỷ: kết thúc
+            job.status = JOB_QUEUED if self._stopping else JOB_CANCELLED
+            job.error = None if self._stopping else job.cancel_token.reason
+        else:
+            job.status = JOB_FAILED
+        job.finished = time.time() if job.status != JOB_QUEUED else None
+        self._save(job)
+        self.update_status(f"{tag} Công việc kết thúc: {job.status}")
+
+
+def _make_handler(service: JobService):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, status: int, payload) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self._send(status, body, "application/json; charset=utf-8")
+
+        def _path_parts(self) -> List[str]:
+            return [p for p in self.path.split("?", 1)[0].split("/") if p]
+
+        def _read_body(self) -> bytes:
+            """Thân yêu cầu; ném ValueError nếu Content-Length không hợp lệ."""
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+            except ValueError:
+                raise ValueError("Content-Length không hợp lệ") from None
+            if length < 0:
+                raise ValueError("Content-Length không hợp lệ")
+            return self.rfile.read(length)
+
+        def _read_json(self, body: Optional[bytes] = None) -> Dict:
+            """Đối tượng JSON trong thân yêu cầu (ValueError nếu không phải đối tượng)."""
+            if body is None:
+                body = self._read_body()
+            request = json.loads(body or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("Cần một đối tượng JSON")
+            return request
+
+        def do_POST(self):
+            parts = self._path_parts()
+            if parts == ["config"]:
+                try:
+                    self._send_json(200, service.configure(self._read_json()))
+                except (TypeError, ValueError) as e:
+                    self._send_json(400, {"error": str(e)})
+                return
+            if len(parts) == 3 and parts[0] == "jobs" and parts[2] in (
+                "cancel", "pause", "resume", "config"
+            ):
+                job = service.get(parts[1])
+                if job is None:
+                    self._send_json(404, {"error": "Không tìm thấy công việc"})
+                elif job.status not in (JOB_QUEUED, JOB_RUNNING):
+                    self._send_json(409, {"error": f"Công việc đang ở trạng thái {job.status}"})
+                elif parts[2] == "config":
+                    try:
+                        job = service.reconfigure(job.id, self._read_json())
+                    except (TypeError, ValueError) as e:
+                        self._send_json(400, {"error": str(e)})
+                        return
+                    self._send_json(200, job.to_dict())
+                else:
+                    action = getattr(service, parts[2])
+                    self._send_json(200, action(job.id).to_dict())
+                return
+            if parts != ["jobs"]:
+                self._send_json(404, {"error": "Không tìm thấy"})
+                return
+            content_type = self.headers.get("Content-Type", "")
+            try:
+                body = self._read_body()
+                if content_type.startswith("application/json"):
+                    request = self._read_json(body)
+                else:
+                    # Tải lên nội dung phụ đề trực tiếp (?name=phim.ass để chọn định dạng)
+                    query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+                    request = {
+                        "content": body.decode("utf-8-sig"),
+                        "name": query.get("name", ["upload.srt"])[0],
+                    }
+                job = service.submit(request)
+            except (TypeError, ValueError) as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            self._send_json(202, job.to_dict())
+
+        def do_GET(self):
+            parts = self._path_parts()
+            if parts == ["config"]:
+                self._send_json(200, service.config())
+                return
+            if parts == ["jobs"]:
+                self._send_json(200, [job.to_dict() for job in service.list_jobs()])
+                return
+            if len(parts) in (2, 3) and parts[0] == "jobs":
+                job = service.get(parts[1])
+                if job is None:
+                    self._send_json(404, {"error": "Không tìm thấy công việc"})
+                    return
+                if len(parts) == 2:
+                    self._send_json(200, job.to_dict(include_log=True))
+                    return
+                if parts[2] == "output":
+                    if job.status != JOB_DONE:
+                        self._send_json(409, {"error": f"Công việc đang ở trạng thái {job.status}"})
+                        return
+                    extension = os.path.splitext(job.output_file)[1].lower()
+                    content_type = OUTPUT_CONTENT_TYPES.get(extension, "text/plain")
+                    with open(job.output_file, "rb") as f:
+                        self._send(200, f.read(), f"{content_type}; charset=utf-8")
+                    return
+            self._send_json(404, {"error": "Không tìm thấy"})
+
+    return Handler
+
+
+class JobServer:
+    """Server HTTP đa luồng bao quanh JobService."""
+
+    def __init__(self, service: JobService, host: str = "127.0.0.1", port: int = 8080):
+        self.service = service
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(service))
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "JobServer":
+        self.service.start()
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="job-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+        self.service.stop()
+
+    def __enter__(self) -> "JobServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main(argv: List[str] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Dịch vụ HTTP dịch phụ đề SRT")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--state-dir", default=".srt_server")
+    parser.add_argument("--api", default="gemini", choices=["gemini", "novita", "openrouter"])
+    parser.add_argument("--key", default=os.environ.get("SRT_TRANSLATOR_API_KEY", ""))
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--base-url", default=None)
+    parser.add_argument("--threads", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=4, help="Số công việc chạy đồng thời")
+    parser.add_argument("--inflight", type=int, default=None, help="Số lô gọi API đồng thời (mặc định = --threads)")
+    parser.add_argument("--rpm", type=float, default=None, help="Giới hạn số yêu cầu API mỗi phút")
+    parser.add_argument(
+        "--root",
+        default=None,
+        help="Chỉ nhận đường dẫn trong thư mục này (mặc định: thư mục hiện tại)",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Tự động điều chỉnh số yêu cầu API đồng thời (AIMD), bắt đầu từ --threads",
+    )
+    parser.add_argument("--glossary", default=None, help="File thuật ngữ dùng cho mọi công việc")
+    args = parser.parse_args(argv)
+
+    api_config = {"type": args.api, "key": args.key}
+    if args.model:
+        api_config["model"] = args.model
+    if args.base_url:
+        api_config["base_url"] = args.base_url
+    if args.glossary:
+        api_config["glossary"] = args.glossary
+    inflight = args.inflight
+    if args.adaptive:
+        api_config["adaptive_concurrency"] = True
+        # Scheduler không được chặn trước giới hạn tối đa của AIMD
+        inflight = inflight or DEFAULT_MAX_CONCURRENCY
+
+    service = JobService(
+        args.state_dir,
+        api_config,
+        args.threads,
+        args.jobs,
+        inflight,
+        args.rpm,
+        args.root,
+    )
+    server = JobServer(service, args.host, args.port).start()
+    print(f"Đang phục vụ tại {server.url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
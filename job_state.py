@@ -0,0 +1,135 @@
+# job_state.py
+"""
+Trạng thái công việc dịch, khoá theo hash nội dung đầu vào + cấu hình dịch.
+
+Mỗi công việc có một file nhật ký (journal) chỉ ghi nối thêm: mỗi bản ghi là
+một lô phụ đề đã dịch (pickle). Vì vậy việc tiếp tục dịch hoạt động ở mức
+từng phụ đề, không phụ thuộc số luồng, tên file đầu ra hay máy đang chạy
+(chỉ cần dùng chung thư mục trạng thái).
+"""
+import glob
+import hashlib
+import json
+import os
+import pickle
+import threading
+from typing import Dict, Iterable, List
+
+import profiling
+from subtitle_cue import Cue
+
+# Tên thư mục trạng thái mặc định, đặt cạnh file đầu vào
+DEFAULT_STATE_DIRNAME = ".srt_jobs"
+
+
+def job_settings(api_config: Dict) -> Dict:
+    """Các thiết lập ảnh hưởng tới nội dung bản dịch (không gồm key, URL...)."""
+    settings = {
+        "type": api_config.get("type"),
+        "model": api_config.get("model"),
+    }
+    # Chỉ thêm khi khác tiếng Việt để giữ nguyên mã công việc của các lần chạy cũ
+    target_language = api_config.get("target_language")
+    if target_language and target_language != "vi":
+        settings["target_language"] = target_language
+    return settings
+
+
+def compute_job_id(contents: Iterable[bytes], settings: Dict) -> str:
+    """Hash SHA-256 của nội dung đầu vào và thiết lập dịch."""
+    digest = hashlib.sha256()
+    for content in contents:
+        digest.update(hashlib.sha256(content).digest())
+    digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+class JobState:
+    """Nhật ký các phụ đề đã dịch của một công việc (an toàn đa luồng)."""
+
+    def __init__(self, state_dir: str, job_id: str):
+        self.state_dir = state_dir
+        self.job_id = job_id
+        self.path = os.path.join(state_dir, f"{job_id}.journal")
+        self._lock = threading.Lock()
+        self._file = None
+        # Độ dài phần đầu nhật ký gồm các bản ghi đọc được (xem load)
+        self._valid_size = None
+
+    def load(self) -> Dict[int, Cue]:
+        """
+        Đọc nhật ký, trả về {chỉ số: phụ đề đã dịch}.
+        Bản ghi cuối bị cắt cụt (do dừng đột ngột) được bỏ qua; phần hỏng
+        này bị cắt khỏi file ở lần append() đầu tiên để các bản ghi mới
+        không nằm sau chỗ không đọc được.
+        """
+        completed: Dict[int, Cue] = {}
+        self._valid_size = 0
+        if not os.path.exists(self.path):
+            return completed
+        with profiling.stage("progress_load"), open(self.path, "rb") as f:
+            while True:
+                try:
+                    records = pickle.load(f)
+                    cues = [Cue.coerce(cue) for cue in records]
+                except EOFError:
+                    break
+                except (pickle.UnpicklingError, ValueError, AttributeError, TypeError):
+                    break
+                for cue in cues:
+                    completed[cue.index] = cue
+                self._valid_size = f.tell()
+        return completed
+
+    def append(self, cues: List[Cue]) -> None:
+        """Ghi nối một lô phụ đề đã dịch vào nhật ký."""
+        if not cues:
+            return
+        with profiling.stage("progress_save"), self._lock:
+            if self._file is None:
+                os.makedirs(self.state_dir, exist_ok=True)
+                if self._valid_size is None:
+                    self.load()
+                self._file = open(self.path, "ab")
+                if self._file.tell() > self._valid_size:
+                    # Bỏ phần đuôi hỏng trước khi ghi tiếp
+                    self._file.truncate(self._valid_size)
+            pickle.dump(list(cues), self._file, protocol=pickle.HIGHEST_PROTOCOL)
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def discard(self) -> None:
+        """Xoá nhật ký khi công việc hoàn thành."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        try:
+            # Xoá thư mục trạng thái nếu không còn công việc nào
+            os.rmdir(self.state_dir)
+        except OSError:
+            pass
+
+    def import_legacy_progress(self, progress_file: str) -> int:
+        """
+        Chuyển các file tiến trình kiểu cũ ("{output}.progress" và
+        ".chunkN") vào nhật ký rồi xoá chúng. Trả về số phụ đề đã chuyển.
+        """
+        imported = 0
+        for path in [progress_file] + sorted(glob.glob(f"{glob.escape(progress_file)}.chunk*")):
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, "rb") as f:
+                    cues = [Cue.coerce(sub) for sub in pickle.load(f)]
+            except Exception:
+                continue
+            translated = [cue for cue in cues if "original_text" in cue]
+            self.append(translated)
+            imported += len(translated)
+            os.remove(path)
+        return imported
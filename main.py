@@ -5,13 +5,17 @@ import tkinter as tk
 from tkinter import ttk
 
 # Import lớp SRTTranslator
-from srt_translator import SRTTranslator
+from cancellation import CancelToken
+from job_control import JobControl
+from srt_translator import SRTTranslator, language_suffix
 from translation_apis import (
     TranslationAPI,
     GEMINI_MODELS,
     NOVITA_MODELS,
     OPENROUTER_MODELS,
 )
+from concurrency import DEFAULT_MAX_CONCURRENCY
+from prompt_templates import TARGET_LANGUAGES
 from gui import SRTTranslatorGUI
 
 # Biến toàn cục để lưu trữ giao diện
@@ -52,6 +56,28 @@ def update_progress_bar(thread_id, current, total):
         gui.root.update()
 
 
+def create_progress_bars(count: int):
+    """Tạo lại các thanh tiến trình, mỗi luồng dịch một thanh."""
+    for widget in gui.progress_bars_frame.winfo_children():
+        widget.destroy()
+
+    gui.progress_bars.clear()
+
+    for i in range(1, count + 1):
+        thread_frame = tk.Frame(gui.progress_bars_frame)
+        thread_frame.pack(fill=tk.X, pady=2)
+
+        label = tk.Label(
+            thread_frame, text=f"Thread {i}: 0/0 (0%)", width=20, anchor="w"
+        )
+        label.pack(side=tk.LEFT, padx=5)
+
+        progress_bar = ttk.Progressbar(thread_frame, length=400, mode="determinate")
+        progress_bar.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+
+        gui.progress_bars[i] = {"bar": progress_bar, "label": label}
+
+
 def start_translation(
     api_var,
     api_key_entry,
@@ -66,6 +92,12 @@ def start_translation(
     mode_var=None,
     directory_entry=None,
     file_suffix_var=None,
+    incremental_var=None,
+    adaptive_var=None,
+    languages_var=None,
+    glossary_entry=None,
+    dry_run_var=None,
+    rpm_entry=None,
 ):
     global gui
 
@@ -73,12 +105,23 @@ def start_translation(
     mode = mode_var.get() if mode_var else "file"
 
     bilingual = bilingual_var.get()
+    incremental = incremental_var.get() if incremental_var else False
+    adaptive = adaptive_var.get() if adaptive_var else False
+    dry_run = dry_run_var.get() if dry_run_var else False
+    languages = [
+        code.strip()
+        for code in (languages_var.get() if languages_var else "vi").split(",")
+        if code.strip()
+    ] or ["vi"]
     # Lấy cấu hình từ giao diện
     api_type = api_var.get()
     api_key = api_key_entry.get().strip()
 
     # Tạo cấu hình API
     api_config = {"type": api_type, "key": api_key, "model": model}
+    if adaptive:
+        # Số luồng nhập vào chỉ là điểm bắt đầu, xem concurrency.py
+        api_config["adaptive_concurrency"] = True
 
     # Cấu hình thêm cho Novita API
     if api_type == "novita":
@@ -94,12 +137,33 @@ def start_translation(
         batch_size = int(batch_size_entry.get().strip())
         max_retries_str = retries_entry.get().strip()
         max_retries = float("inf") if max_retries_str == "0" else int(max_retries_str)
+        requests_per_minute = float(rpm_entry.get().strip() or 0) if rpm_entry else 0
+        if requests_per_minute < 0:
+            raise ValueError(requests_per_minute)
     except ValueError:
         update_status(
-            "Lỗi: Vui lòng nhập số hợp lệ cho số luồng, kích thước lô và số lần thử lại"
+            "Lỗi: Vui lòng nhập số hợp lệ cho số luồng, kích thước lô, số lần thử lại "
+            "và số yêu cầu mỗi phút"
         )
         return
 
+    unknown = [code for code in languages if code not in TARGET_LANGUAGES]
+    if unknown:
+        update_status(
+            f"Lỗi: Ngôn ngữ đích không được hỗ trợ: {', '.join(unknown)} "
+            f"(hỗ trợ: {', '.join(TARGET_LANGUAGES)})"
+        )
+        return
+    if len(languages) == 1:
+        api_config["target_language"] = languages[0]
+
+    glossary_file = glossary_entry.get().strip() if glossary_entry else ""
+    if glossary_file:
+        if not os.path.exists(glossary_file):
+            update_status(f"Lỗi: File thuật ngữ '{glossary_file}' không tồn tại")
+            return
+        api_config["glossary"] = glossary_file
+
     # Kiểm tra đầu vào hợp lệ
     if not api_key:
         update_status("Lỗi: Vui lòng nhập API key")
@@ -139,26 +203,9 @@ def start_translation(
     # Vô hiệu hóa nút bắt đầu trong quá trình dịch
     gui.start_button.config(state=tk.DISABLED)
 
-    # Xóa các thanh tiến trình cũ nếu có
-    for widget in gui.progress_bars_frame.winfo_children():
-        widget.destroy()
-
-    gui.progress_bars.clear()
-
-    # Tạo thanh tiến trình mới
-    for i in range(1, num_threads + 1):
-        thread_frame = tk.Frame(gui.progress_bars_frame)
-        thread_frame.pack(fill=tk.X, pady=2)
-
-        label = tk.Label(
-            thread_frame, text=f"Thread {i}: 0/0 (0%)", width=20, anchor="w"
-        )
-        label.pack(side=tk.LEFT, padx=5)
-
-        progress_bar = ttk.Progressbar(thread_frame, length=400, mode="determinate")
-        progress_bar.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
-
-        gui.progress_bars[i] = {"bar": progress_bar, "label": label}
+    # Tạo thanh tiến trình mới (khi tự động điều chỉnh, số phần = số luồng tối đa)
+    num_bars = max(num_threads, DEFAULT_MAX_CONCURRENCY) if adaptive else num_threads
+    create_progress_bars(num_bars)
 
     # Chuyển sang tab tiến trình
     gui.tabs.select(1)
@@ -166,10 +213,126 @@ def start_translation(
     # Khởi tạo SRTTranslator với các hàm callback
     translator = SRTTranslator(update_status, update_progress_bar)
 
+    # Nút "Dừng dịch" (và đóng cửa sổ) huỷ công việc qua token này
+    cancel_token = CancelToken()
+    translator.cancel_token = cancel_token
+
+    def stop_translation():
+        if cancel_token.cancelled:
+            return
+        gui.stop_button.config(state=tk.DISABLED)
+        update_status("Đang dừng dịch...")
+        cancel_token.cancel("Người dùng dừng dịch")
+
+    gui.on_stop = stop_translation
+    gui.stop_button.config(state=tk.NORMAL)
+
+    # Tạm dừng và đổi thiết lập khi đang dịch (xem job_control.py). Thiết lập
+    # ban đầu được ghi sẵn để "Áp dụng" chỉ chia lại phần còn lại khi có thay đổi
+    control = JobControl()
+    control.update(num_threads=num_threads, batch_size=batch_size)
+    if model:
+        control.update(model=model)
+    translator.control = control
+    if requests_per_minute:
+        translator.set_rate_limit(requests_per_minute)
+
+    def pause_translation():
+        if control.pause():
+            gui.pause_button.config(text="Tiếp tục")
+            update_status("Tạm dừng: các lô đang gửi sẽ hoàn thành, sau đó dừng chờ...")
+        elif control.resume():
+            gui.pause_button.config(text="Tạm dừng")
+            update_status("Tiếp tục dịch")
+
+    def apply_settings():
+        try:
+            new_threads = int(gui.threads_entry.get().strip())
+            new_batch_size = int(gui.batch_size_entry.get().strip())
+            new_rate = float(gui.rpm_entry.get().strip() or 0)
+            if new_rate < 0:
+                raise ValueError(new_rate)
+        except ValueError:
+            update_status(
+                "Lỗi: Vui lòng nhập số hợp lệ cho số luồng, kích thước lô và số yêu cầu mỗi phút"
+            )
+            return
+        try:
+            changed = control.update(
+                num_threads=new_threads,
+                batch_size=new_batch_size,
+                model=gui.selected_model(),
+            )
+        except ValueError as e:
+            update_status(f"Lỗi: {e}")
+            return
+
+        rate_limiter = translator.rate_limiter
+        if new_rate != (rate_limiter.requests_per_minute if rate_limiter else 0):
+            translator.set_rate_limit(new_rate)
+            changed["requests_per_minute"] = new_rate or "không giới hạn"
+        if not changed:
+            update_status("Thiết lập không thay đổi")
+            return
+        if "num_threads" in changed and not adaptive:
+            create_progress_bars(new_threads)
+        if "requests_per_minute" in changed:
+            update_status(
+                f"Giới hạn tốc độ mới có hiệu lực ngay (kể cả yêu cầu đang chờ): "
+                f"{changed.pop('requests_per_minute')} yêu cầu/phút"
+            )
+        if changed:
+            settings = ", ".join(f"{name}={value}" for name, value in changed.items())
+            update_status(f"Áp dụng thiết lập mới từ lô tiếp theo: {settings}")
+
+    gui.on_pause = pause_translation
+    gui.on_apply = apply_settings
+    gui.pause_button.config(state=tk.NORMAL, text="Tạm dừng")
+    gui.apply_button.config(state=tk.NORMAL)
+
     # Khởi chạy dịch trong một luồng riêng biệt để không chặn GUI
     def translation_thread():
         try:
-            if mode == "file":
+            if mode == "file" and dry_run:
+                # Chỉ lập kế hoạch cho file, không gọi API
+                from planner import plan_translation
+
+                plan = plan_translation(
+                    translator,
+                    [(input_file, output_file)],
+                    api_config,
+                    num_threads,
+                    batch_size,
+                    target_languages=languages,
+                )
+                for line in plan.summary_lines():
+                    update_status(line)
+            elif mode == "file" and len(languages) > 1:
+                # Một file, nhiều ngôn ngữ: đầu ra đặt cạnh file đầu ra đã chọn
+                output_dir = os.path.dirname(output_file)
+                outputs = {
+                    language: os.path.join(
+                        output_dir,
+                        os.path.basename(
+                            translator._output_path(input_file, language_suffix(language))
+                        ),
+                    )
+                    for language in languages
+                }
+                results = translator.translate_file_multi(
+                    input_file,
+                    outputs,
+                    api_config,
+                    num_threads,
+                    batch_size,
+                    max_retries,
+                    bilingual,
+                )
+                if not all(results.values()):
+                    update_status(
+                        "Dịch thất bại. Vui lòng kiểm tra thông báo lỗi ở trên."
+                    )
+            elif mode == "file":
                 # Dịch file đơn lẻ
                 success = translator.translate_file(
                     input_file,
@@ -179,6 +342,7 @@ def start_translation(
                     batch_size,
                     max_retries,
                     bilingual,
+                    incremental=incremental,
                 )
 
                 if not success:
@@ -198,6 +362,9 @@ def start_translation(
                     max_retries,
                     bilingual,
                     file_suffix,
+                    incremental=incremental,
+                    target_languages=languages if len(languages) > 1 else None,
+                    dry_run=dry_run,
                 )
 
                 # Hiển thị tổng kết chi tiết
@@ -207,12 +374,19 @@ def start_translation(
                     update_status(f"{os.path.basename(file_path)}: {status}")
 
         finally:
-            # Kích hoạt lại nút bắt đầu sau khi hoàn thành hoặc gặp lỗi
-            gui.root.after(0, lambda: gui.start_button.config(state=tk.NORMAL))
-
-    # Bắt đầu luồng dịch
-    thread = threading.Thread(target=translation_thread)
-    thread.daemon = True  # Cho phép chương trình thoát nếu luồng này vẫn chạy
+            # Kích hoạt lại nút bắt đầu sau khi hoàn thành, gặp lỗi hoặc bị dừng
+            def reset_buttons():
+                gui.start_button.config(state=tk.NORMAL)
+                gui.stop_button.config(state=tk.DISABLED)
+                gui.pause_button.config(state=tk.DISABLED, text="Tạm dừng")
+                gui.apply_button.config(state=tk.DISABLED)
+
+            gui.root.after(0, reset_buttons)
+
+    # Bắt đầu luồng dịch. Không phải luồng daemon: khi đóng cửa sổ, công việc
+    # được huỷ và nhật ký được đóng trước khi chương trình thoát (gui.on_close)
+    thread = threading.Thread(target=translation_thread, name="translation")
+    gui.worker_thread = thread
     thread.start()
 
 
@@ -0,0 +1,341 @@
+# planner.py
+"""
+Lập kế hoạch dịch (dry-run): ước tính số yêu cầu, token, thời gian và chi phí
+mà không gọi API.
+
+Các file được phân tích và chia lô đúng như khi dịch thật (trạng thái công
+việc, manifest khi dịch tăng dần, đóng gói file ngắn, nhiều ngôn ngữ đích,
+chia phần theo số luồng rồi make_batches), prompt được dựng bằng cùng mẫu
+prompt và bảng thuật ngữ. Token được ước tính bằng estimate_tokens nên chỉ
+là số gần đúng; yêu cầu thử lại và dịch lại của kiểm tra chất lượng không
+được tính.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from concurrency import (
+    CONCURRENCY_MEMORY_PATH,
+    DEFAULT_MAX_CONCURRENCY,
+    load_memory,
+    provider_key,
+)
+from prompt_templates import DEFAULT_TARGET_LANGUAGE, get_template
+from srt_translator import (
+    BATCH_PAUSE_SECONDS,
+    PACKED_MAX_BATCH_CUES,
+    estimate_tokens,
+    make_batches,
+)
+from translation_manifest import TranslationManifest
+
+# Độ trễ mặc định của một yêu cầu khi ước tính thời gian (giây)
+DEFAULT_REQUEST_SECONDS = 5.0
+
+# Số token đầu ra so với token của câu gốc, theo ngôn ngữ đích (chữ có dấu và
+# chữ Thái bị tách thành nhiều token hơn tiếng Anh)
+OUTPUT_TOKEN_RATIO = {"vi": 1.5, "th": 2.0, "id": 1.2}
+
+# Giá tham khảo (USD cho 1 triệu token đầu vào, đầu ra); ghi đè bằng
+# api_config["price_input"] / api_config["price_output"]
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gemini-1.0-pro": (0.50, 1.50),
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-exp": (0.0, 0.0),
+    "openai/gpt-4o": (2.50, 10.00),
+    "openai/gpt-4-turbo": (10.00, 30.00),
+    "openai/gpt-3.5-turbo": (0.50, 1.50),
+    "anthropic/claude-3-opus": (15.00, 75.00),
+    "anthropic/claude-3-sonnet": (3.00, 15.00),
+    "anthropic/claude-3-haiku": (0.25, 1.25),
+    "meta-llama/llama-3.1-8b-instruct": (0.05, 0.05),
+    "meta-llama/llama-3.1-70b-instruct": (0.34, 0.39),
+}
+
+
+def model_price(api_config: Dict) -> Optional[Tuple[float, float]]:
+    """Giá (đầu vào, đầu ra) USD / 1 triệu token của model, None nếu không rõ."""
+    if "price_input" in api_config or "price_output" in api_config:
+        return (
+            float(api_config.get("price_input", 0.0)),
+            float(api_config.get("price_output", 0.0)),
+        )
+    from translation_apis import TranslationAPI
+
+    model = api_config.get("model")
+    if model in MODEL_PRICES:
+        return MODEL_PRICES[model]
+    for model_id, _, is_free in TranslationAPI.get_models_for_api(api_config["type"]):
+        if model_id == model and is_free:
+            return (0.0, 0.0)
+    return None
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:d}:{minutes:02d}:{seconds:02d}"
+
+
+class TranslationPlan:
+    """Kết quả cộng dồn của kế hoạch dịch."""
+
+    def __init__(
+        self,
+        api_config: Dict,
+        workers: int,
+        num_processes: int = 1,
+        requests_per_minute: Optional[float] = None,
+        request_seconds: float = DEFAULT_REQUEST_SECONDS,
+        concurrency: Optional[int] = None,
+    ):
+        """
+        Tham số:
+            workers: Số phần mỗi luồng phụ đề được chia thành
+            concurrency: Số yêu cầu được gửi cùng lúc (giới hạn AIMD khi tự
+                động điều chỉnh); None = bằng workers
+        """
+        self.api_config = api_config
+        self.workers = workers
+        self.concurrency = min(workers, concurrency or workers)
+        self.num_processes = max(1, num_processes)
+        self.requests_per_minute = requests_per_minute
+        self.request_seconds = request_seconds
+        self.files = 0
+        self.packed_files = 0
+        self.cues = 0
+        self.journal_cues = 0
+        self.manifest_cues = 0
+        self.pending_cues = 0
+        self.duplicate_cues = 0
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.system_tokens = 0
+        self.output_tokens = 0
+        # Tổng thời gian nếu các luồng (file, gói, ngôn ngữ) chạy lần lượt
+        self.sequential_seconds = 0.0
+        self._texts = set()
+        self._glossaries = {}
+
+    def add_stream(
+        self,
+        subtitles: List,
+        completed: Dict,
+        split,
+        batch_size: int,
+        max_batch_tokens: Optional[int] = None,
+        target_language: Optional[str] = None,
+    ) -> None:
+        """
+        Thêm một luồng phụ đề được dịch bằng một lần translate_with_state
+        (một file, một gói file ngắn, hoặc một ngôn ngữ của file).
+
+        Tham số:
+            completed: Phụ đề đã có trong nhật ký công việc (theo chỉ số)
+            split: Hàm chia phần như SRTTranslator.split_subtitles
+        """
+        config = self.api_config
+        template = get_template(config.get("prompt_version"), target_language)
+        glossary = self._glossary()
+        remaining = [sub for sub in subtitles if sub["index"] not in completed]
+        self.journal_cues += len(subtitles) - len(remaining)
+        self.pending_cues += len(remaining)
+        for sub in remaining:
+            key = (target_language, sub["text"])
+            if key in self._texts:
+                self.duplicate_cues += 1
+            else:
+                self._texts.add(key)
+        if not remaining:
+            return
+
+        ratio = OUTPUT_TOKEN_RATIO.get(target_language or DEFAULT_TARGET_LANGUAGE, 1.5)
+        system_tokens = estimate_tokens(template.system_instruction or "")
+        longest_chunk = 0
+        stream_requests = 0
+        for chunk in split(remaining, self.workers):
+            batches = make_batches(chunk, batch_size, max_batch_tokens)
+            longest_chunk = max(longest_chunk, len(batches))
+            for batch in batches:
+                terms = None
+                if glossary is not None:
+                    terms = glossary.terms_for(sub["text"] for sub in batch)
+                self.requests += 1
+                stream_requests += 1
+                self.system_tokens += system_tokens
+                self.prompt_tokens += system_tokens + estimate_tokens(
+                    template.render(batch, terms)
+                )
+                self.output_tokens += int(
+                    sum(estimate_tokens(sub["text"]) for sub in batch) * ratio
+                )
+        # Mỗi phần gửi các lô của nó lần lượt, nghỉ BATCH_PAUSE_SECONDS sau mỗi
+        # lô; khi ít chỗ gửi hơn số phần, các yêu cầu phải chờ tới lượt
+        self.sequential_seconds += max(
+            longest_chunk * (self.request_seconds + BATCH_PAUSE_SECONDS),
+            stream_requests * self.request_seconds / self.concurrency,
+        )
+
+    def _glossary(self):
+        path = self.api_config.get("glossary")
+        if not path:
+            return None
+        if path not in self._glossaries:
+            from glossary import load_glossary
+
+            self._glossaries[path] = load_glossary(path)
+        return self._glossaries[path]
+
+    @property
+    def seconds(self) -> float:
+        """Thời gian ước tính, không ít hơn mức giới hạn tốc độ cho phép."""
+        seconds = self.sequential_seconds / self.num_processes
+        if self.requests_per_minute:
+            seconds = max(seconds, self.requests * 60.0 / self.requests_per_minute)
+        return seconds
+
+    @property
+    def cost(self) -> Optional[float]:
+        price = model_price(self.api_config)
+        if price is None:
+            return None
+        return (self.prompt_tokens * price[0] + self.output_tokens * price[1]) / 1e6
+
+    def summary_lines(self) -> List[str]:
+        """Các dòng tóm tắt kế hoạch để in ra trạng thái."""
+        config = self.api_config
+        lines = [
+            "\n===== KẾ HOẠCH DỊCH (dry-run, không gọi API) =====",
+            f"API: {config.get('type')}, model: {config.get('model') or 'mặc định'}",
+            f"File: {self.files} (đóng gói {self.packed_files} file ngắn), phụ đề: {self.cues}",
+            f"Đã có trong trạng thái công việc: {self.journal_cues}, "
+            f"dùng lại từ manifest: {self.manifest_cues}, cần dịch: {self.pending_cues} "
+            f"({self.duplicate_cues} mục trùng văn bản với mục khác)",
+            f"Số yêu cầu API: {self.requests}",
+            f"Token đầu vào: ~{self.prompt_tokens} (system instruction: ~{self.system_tokens}, "
+            f"nhà cung cấp có thể cache), token đầu ra: ~{self.output_tokens}",
+        ]
+        threads = f"{self.workers} luồng"
+        if self.concurrency != self.workers:
+            threads += f" ({self.concurrency} yêu cầu đồng thời)"
+        limits = f"{threads} x {self.num_processes} tiến trình, ~{self.request_seconds:g} giây/yêu cầu"
+        if self.requests_per_minute:
+            limits += f", giới hạn {self.requests_per_minute:g} yêu cầu/phút"
+        lines.append(f"Thời gian ước tính: {_format_duration(self.seconds)} ({limits})")
+        cost = self.cost
+        if cost is None:
+            lines.append(
+                "Chi phí ước tính: không rõ giá model "
+                '(đặt api_config["price_input"] và ["price_output"], USD/1 triệu token)'
+            )
+        else:
+            lines.append(f"Chi phí ước tính: ${cost:.2f}" if cost >= 1 else f"Chi phí ước tính: ${cost:.4f}")
+        lines.append("Chưa tính các yêu cầu thử lại và dịch lại khi kiểm tra chất lượng")
+        return lines
+
+
+def plan_translation(
+    translator,
+    files: List[Tuple[str, str]],
+    api_config: Dict,
+    num_threads: int,
+    batch_size: int = 10,
+    pack_small_files: bool = False,
+    pack_max_cues: int = 40,
+    pack_token_budget: int = 2000,
+    num_processes: int = 1,
+    requests_per_minute: Optional[float] = None,
+    incremental: bool = False,
+    target_languages: Optional[List[str]] = None,
+    request_seconds: float = DEFAULT_REQUEST_SECONDS,
+) -> TranslationPlan:
+    """
+    Lập kế hoạch cho danh sách (file đầu vào, file đầu ra) theo đúng cách
+    SRTTranslator.translate_directory sẽ dịch, không gọi API.
+
+    Tham số:
+        translator: SRTTranslator (để phân tích file, đọc trạng thái công việc)
+        request_seconds: Độ trễ giả định của một yêu cầu
+    """
+    if target_languages and len(target_languages) == 1:
+        api_config = dict(api_config, target_language=target_languages[0])
+    multi = bool(target_languages) and len(target_languages) > 1
+
+    # Khi tự động điều chỉnh, phụ đề được chia theo số luồng tối đa như
+    # translate_with_state; giới hạn đã nhớ của nhà cung cấp (hoặc num_threads)
+    # chỉ quyết định số yêu cầu gửi cùng lúc
+    workers = num_threads
+    concurrency = None
+    if api_config.get("adaptive_concurrency"):
+        workers = max(1, api_config.get("max_concurrency", DEFAULT_MAX_CONCURRENCY))
+        memory = load_memory(api_config.get("concurrency_memory") or CONCURRENCY_MEMORY_PATH)
+        entry = memory.get(provider_key(api_config))
+        remembered = entry.get("limit") if isinstance(entry, dict) else None
+        concurrency = remembered if isinstance(remembered, int) else num_threads
+        concurrency = min(workers, max(1, concurrency))
+    if requests_per_minute is None:
+        requests_per_minute = getattr(translator.rate_limiter, "requests_per_minute", None)
+
+    plan = TranslationPlan(
+        api_config,
+        workers,
+        1 if multi else num_processes,
+        requests_per_minute,
+        request_seconds,
+        concurrency,
+    )
+    parsed = [
+        (input_file, output_file, translator.parse_subtitles(input_file))
+        for input_file, output_file in files
+    ]
+    plan.files = len(parsed)
+    plan.cues = sum(len(subtitles) for _, _, subtitles in parsed)
+    split = translator.split_subtitles
+
+    if multi:
+        for input_file, _, subtitles in parsed:
+            completed = translator.open_job_state(
+                [input_file], dict(api_config, target_language=",".join(target_languages))
+            ).load()
+            for k, language in enumerate(target_languages):
+                stream = []
+                for position, subtitle in enumerate(subtitles):
+                    cue = subtitle.copy()
+                    cue["index"] = k * len(subtitles) + position + 1
+                    stream.append(cue)
+                plan.add_stream(stream, completed, split, batch_size, None, language)
+        plan.cues *= len(target_languages)
+        return plan
+
+    target_language = api_config.get("target_language")
+    if pack_small_files:
+        small = [f for f in parsed if len(f[2]) <= pack_max_cues]
+        if len(small) > 1:
+            packed = []
+            for input_file, _, subtitles in small:
+                for subtitle in subtitles:
+                    cue = subtitle.copy()
+                    cue["index"] = len(packed) + 1
+                    packed.append(cue)
+            completed = translator.open_job_state([f[0] for f in small], api_config).load()
+            plan.add_stream(
+                packed,
+                completed,
+                split,
+                PACKED_MAX_BATCH_CUES,
+                pack_token_budget,
+                target_language,
+            )
+            plan.packed_files = len(small)
+            packed_inputs = {f[0] for f in small}
+            parsed = [f for f in parsed if f[0] not in packed_inputs]
+
+    for input_file, output_file, subtitles in parsed:
+        if incremental:
+            manifest = TranslationManifest.load(TranslationManifest.path_for(output_file))
+            pending = [sub for sub in subtitles if manifest.lookup(sub["text"]) is None]
+            plan.manifest_cues += len(subtitles) - len(pending)
+            subtitles = pending
+        completed = translator.open_job_state([input_file], api_config).load()
+        plan.add_stream(subtitles, completed, split, batch_size, None, target_language)
+    return plan
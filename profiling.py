@@ -0,0 +1,261 @@
+# profiling.py
+"""
+Đo thời gian theo từng giai đoạn của một lần dịch (tuỳ chọn, mặc định tắt).
+
+Các module khác đánh dấu giai đoạn bằng:
+    with profiling.stage("network"):
+        ...
+Khi không có JobProfiler nào đang hoạt động, stage() không làm gì cả.
+"""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional, Tuple
+
+# Các chế độ hỗ trợ
+PROFILE_MODES = ("stages", "cprofile", "sample")
+
+# Profiler đang hoạt động (chỉ một lần dịch được profile tại một thời điểm)
+_active: Optional["JobProfiler"] = None
+
+
+def stage(name: str):
+    """Context manager ghi thời gian cho giai đoạn `name` nếu đang profile."""
+    profiler = _active
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name)
+
+
+def thread_scope():
+    """Đánh dấu phạm vi của một luồng làm việc (cần cho chế độ cprofile)."""
+    profiler = _active
+    if profiler is None:
+        return nullcontext()
+    return profiler.thread_scope()
+
+
+class _StageStats:
+    __slots__ = ("calls", "wall", "cpu")
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+
+
+class JobProfiler:
+    """
+    Ghi thời gian thực (wall) và thời gian CPU theo giai đoạn và theo luồng.
+
+    Thời gian được tính "tự thân": khi giai đoạn lồng nhau, thời gian của
+    giai đoạn con không bị cộng vào giai đoạn cha.
+
+    Chế độ:
+        stages   chỉ đo theo giai đoạn
+        cprofile thêm cProfile cho từng luồng, ghi file .pstats
+        sample   thêm bộ lấy mẫu ngăn xếp, ghi file .folded (flamegraph)
+    """
+
+    def __init__(self, mode: str = "stages", sample_interval: float = 0.005):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Chế độ profile không được hỗ trợ: {mode}")
+        self.mode = mode
+        self.sample_interval = sample_interval
+        self._stats: Dict[Tuple[str, str], _StageStats] = defaultdict(_StageStats)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles: List[cProfile.Profile] = []
+        self._samples: Dict[str, int] = defaultdict(int)
+        self._sampler: Optional[threading.Thread] = None
+        self._stop_sampling = threading.Event()
+        self._wall_start = 0.0
+        self.wall_total = 0.0
+
+    # ---- Vòng đời ----
+
+    def start(self) -> "JobProfiler":
+        global _active
+        if _active is not None:
+            raise RuntimeError("Đã có một phiên profile khác đang chạy")
+        _active = self
+        self._wall_start = time.perf_counter()
+        if self.mode == "sample":
+            self._stop_sampling.clear()
+            self._sampler = threading.Thread(
+                target=self._sample_loop, name="profiler-sampler", daemon=True
+            )
+            self._sampler.start()
+        if self.mode == "cprofile":
+            self._enter_cprofile()
+        return self
+
+    def stop(self) -> None:
+        global _active
+        if self.mode == "cprofile":
+            self._exit_cprofile()
+        if self._sampler is not None:
+            self._stop_sampling.set()
+            self._sampler.join()
+            self._sampler = None
+        self.wall_total = time.perf_counter() - self._wall_start
+        if _active is self:
+            _active = None
+
+    def __enter__(self) -> "JobProfiler":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ---- Đo giai đoạn ----
+
+    @contextmanager
+    def stage(self, name: str):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        # Mỗi phần tử: [tên, wall bắt đầu, cpu bắt đầu, wall con, cpu con]
+        frame = [name, time.perf_counter(), time.thread_time(), 0.0, 0.0]
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.pop()
+            wall = time.perf_counter() - frame[1]
+            cpu = time.thread_time() - frame[2]
+            if stack:
+                stack[-1][3] += wall
+                stack[-1][4] += cpu
+            thread_name = threading.current_thread().name
+            with self._lock:
+                stats = self._stats[(name, thread_name)]
+                stats.calls += 1
+                stats.wall += wall - frame[3]
+                stats.cpu += cpu - frame[4]
+
+    @contextmanager
+    def thread_scope(self):
+        if self.mode != "cprofile":
+            yield
+            return
+        self._enter_cprofile()
+        try:
+            yield
+        finally:
+            self._exit_cprofile()
+
+    def _enter_cprofile(self) -> None:
+        profile = cProfile.Profile()
+        self._local.profile = profile
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+
+    def _exit_cprofile(self) -> None:
+        profile = getattr(self._local, "profile", None)
+        if profile is not None:
+            profile.disable()
+            self._local.profile = None
+
+    def _sample_loop(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop_sampling.wait(self.sample_interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{os.path.basename(code.co_filename)}:{code.co_name}"
+                    )
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                key = ";".join(reversed(stack))
+                self._samples[key] += 1
+
+    # ---- Báo cáo ----
+
+    def stage_totals(self) -> Dict[str, _StageStats]:
+        """Tổng hợp theo giai đoạn trên mọi luồng."""
+        totals: Dict[str, _StageStats] = defaultdict(_StageStats)
+        with self._lock:
+            for (name, _), stats in self._stats.items():
+                total = totals[name]
+                total.calls += stats.calls
+                total.wall += stats.wall
+                total.cpu += stats.cpu
+        return dict(totals)
+
+    def summary_table(self) -> str:
+        """Bảng tóm tắt theo giai đoạn, sau đó theo giai đoạn x luồng."""
+        header = f"{'Giai đoạn':<16} {'Luồng':<24} {'Lần':>7} {'Wall (s)':>10} {'CPU (s)':>10}"
+        lines = [header, "-" * len(header)]
+        totals = sorted(self.stage_totals().items(), key=lambda kv: -kv[1].wall)
+        for name, stats in totals:
+            lines.append(
+                f"{name:<16} {'(tất cả)':<24} {stats.calls:>7} {stats.wall:>10.3f} {stats.cpu:>10.3f}"
+            )
+        lines.append("-" * len(header))
+        with self._lock:
+            per_thread = sorted(self._stats.items(), key=lambda kv: (kv[0][0], kv[0][1]))
+            for (name, thread_name), stats in per_thread:
+                lines.append(
+                    f"{name:<16} {thread_name[:24]:<24} {stats.calls:>7} {stats.wall:>10.3f} {stats.cpu:>10.3f}"
+                )
+        lines.append(f"Tổng thời gian thực: {self.wall_total:.3f} giây")
+        return "\n".join(lines)
+
+    def dump(self, prefix: str) -> List[str]:
+        """
+        Ghi kết quả ra đĩa, trả về danh sách file đã ghi:
+            {prefix}.txt            bảng tóm tắt
+            {prefix}.stages.folded  giai đoạn theo luồng (micro giây, định dạng folded)
+            {prefix}.folded         ngăn xếp lấy mẫu (chế độ sample)
+            {prefix}.pstats         thống kê cProfile gộp (chế độ cprofile)
+        """
+        written = []
+
+        summary_file = f"{prefix}.txt"
+        with open(summary_file, "w", encoding="utf-8") as f:
+            f.write(self.summary_table() + "\n")
+        written.append(summary_file)
+
+        stages_file = f"{prefix}.stages.folded"
+        with open(stages_file, "w", encoding="utf-8") as f:
+            with self._lock:
+                for (name, thread_name), stats in sorted(self._stats.items()):
+                    f.write(f"{thread_name};{name} {int(stats.wall * 1_000_000)}\n")
+        written.append(stages_file)
+
+        if self.mode == "sample":
+            folded_file = f"{prefix}.folded"
+            with open(folded_file, "w", encoding="utf-8") as f:
+                for key, count in sorted(self._samples.items()):
+                    f.write(f"{key} {count}\n")
+            written.append(folded_file)
+
+        if self.mode == "cprofile" and self._profiles:
+            pstats_file = f"{prefix}.pstats"
+            stats = None
+            for profile in self._profiles:
+                try:
+                    if stats is None:
+                        stats = pstats.Stats(profile)
+                    else:
+                        stats.add(profile)
+                except TypeError:
+                    # Profile rỗng (luồng không chạy gì) không tạo được Stats
+                    continue
+            if stats is not None:
+                stats.dump_stats(pstats_file)
+                written.append(pstats_file)
+
+        return written
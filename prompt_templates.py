@@ -0,0 +1,135 @@
+# prompt_templates.py
+"""
+Mẫu prompt có đánh phiên bản.
+
+Phần hướng dẫn tĩnh nằm trong system instruction và không đổi giữa các lô
+(giống hệt từng byte), nên nhà cung cấp có thể cache tiền tố prompt; tin nhắn
+người dùng chỉ còn các phụ đề đánh số [n]. Khi sửa nội dung hướng dẫn, hãy
+thêm phiên bản mới thay vì sửa phiên bản cũ, để kết quả giữa các lần chạy có
+thể so sánh được.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# Ngôn ngữ đích hỗ trợ: mã (dùng trong hậu tố file, ví dụ "_th") -> tên trong prompt
+TARGET_LANGUAGES: Dict[str, str] = {
+    "vi": "Vietnamese",
+    "th": "Thai",
+    "id": "Indonesian",
+}
+DEFAULT_TARGET_LANGUAGE = "vi"
+
+
+# Mở đầu phần thuật ngữ trong tin nhắn người dùng (xem glossary.py)
+GLOSSARY_HEADER = "Glossary (always use these translations for the following terms):\n"
+
+
+class PromptTemplate:
+    """Một phiên bản prompt: system instruction + phần đầu tin nhắn người dùng."""
+
+    def __init__(self, version: str, system_instruction: Optional[str], header: str = ""):
+        """
+        Tham số:
+            version: Tên phiên bản (ví dụ "v2")
+            system_instruction: Hướng dẫn tĩnh gửi riêng; None = không dùng
+                system instruction (mọi thứ nằm trong tin nhắn người dùng)
+            header: Văn bản đặt trước các phụ đề trong tin nhắn người dùng
+        """
+        self.version = version
+        self.system_instruction = system_instruction
+        self.header = header
+
+    @property
+    def multilingual(self) -> bool:
+        """True nếu mẫu có chỗ điền ngôn ngữ đích ({language})."""
+        return "{language}" in (self.system_instruction or "") + self.header
+
+    def for_language(self, target_language: str) -> "PromptTemplate":
+        """Bản của mẫu cho một ngôn ngữ đích (mẫu cố định tiếng Việt trả về chính nó)."""
+        if not self.multilingual:
+            return self
+        language = TARGET_LANGUAGES[target_language]
+        system_instruction = self.system_instruction
+        if system_instruction is not None:
+            system_instruction = system_instruction.replace("{language}", language)
+        return PromptTemplate(
+            self.version, system_instruction, self.header.replace("{language}", language)
+        )
+
+    def render(
+        self,
+        subtitles_batch: List[Dict],
+        glossary_terms: Optional[Sequence[Tuple[str, str]]] = None,
+    ) -> str:
+        """
+        Tạo tin nhắn người dùng đánh số [n] cho một lô phụ đề. glossary_terms
+        (các mục thuật ngữ có trong lô) được chèn trước các phụ đề.
+        """
+        subtitles_text = "".join(
+            f"[{i+1}] {subtitle['text']}\n\n"
+            for i, subtitle in enumerate(subtitles_batch)
+        )
+        glossary_text = ""
+        if glossary_terms:
+            glossary_text = GLOSSARY_HEADER + "".join(
+                f"- {source} => {target}\n" for source, target in glossary_terms
+            ) + "\n"
+        return f"{self.header}{glossary_text}{subtitles_text}"
+
+
+PROMPT_TEMPLATES: Dict[str, PromptTemplate] = {
+    # Prompt ban đầu: hướng dẫn lặp lại trong tin nhắn người dùng của mỗi lô
+    "v1": PromptTemplate(
+        "v1",
+        None,
+        "Translate the following English subtitles to Vietnamese. Maintain the numbering format exactly as provided.\n"
+        "Each subtitle is marked with [number] followed by text. Translate ONLY the text, keeping the [number] format.\n"
+        "Return ONLY the translated subtitles with their numbers, no additional text or explanations.\n\n",
+    ),
+    # Hướng dẫn chuyển vào system instruction, tin nhắn người dùng chỉ có phụ đề
+    "v2": PromptTemplate(
+        "v2",
+        "You are a professional subtitle translator. Translate English subtitles to Vietnamese.\n"
+        "Each subtitle is marked with [number] followed by text. Translate ONLY the text, keeping the [number] format exactly as provided.\n"
+        "Return ONLY the translated subtitles with their numbers, no additional text or explanations.",
+    ),
+    # Như v2 nhưng ngôn ngữ đích được điền theo api_config["target_language"]
+    "v3": PromptTemplate(
+        "v3",
+        "You are a professional subtitle translator. Translate English subtitles to {language}.\n"
+        "Each subtitle is marked with [number] followed by text. Translate ONLY the text, keeping the [number] format exactly as provided.\n"
+        "Return ONLY the translated subtitles with their numbers, no additional text or explanations.",
+    ),
+}
+
+DEFAULT_PROMPT_VERSION = "v2"
+# Mẫu mặc định khi ngôn ngữ đích không phải tiếng Việt
+MULTILINGUAL_PROMPT_VERSION = "v3"
+
+
+def get_template(
+    version: Optional[str] = None, target_language: Optional[str] = None
+) -> PromptTemplate:
+    """
+    Trả về mẫu prompt theo phiên bản và ngôn ngữ đích (mặc định tiếng Việt).
+    Không chỉ định phiên bản: DEFAULT_PROMPT_VERSION cho tiếng Việt,
+    MULTILINGUAL_PROMPT_VERSION cho ngôn ngữ khác.
+    """
+    target_language = target_language or DEFAULT_TARGET_LANGUAGE
+    if target_language not in TARGET_LANGUAGES:
+        raise ValueError(f"Ngôn ngữ đích không được hỗ trợ: {target_language}")
+    if not version:
+        version = (
+            DEFAULT_PROMPT_VERSION
+            if target_language == DEFAULT_TARGET_LANGUAGE
+            else MULTILINGUAL_PROMPT_VERSION
+        )
+    try:
+        template = PROMPT_TEMPLATES[version]
+    except KeyError:
+        raise ValueError(f"Phiên bản prompt không tồn tại: {version}")
+    if not template.multilingual and target_language != DEFAULT_TARGET_LANGUAGE:
+        raise ValueError(
+            f"Mẫu prompt {version} chỉ dịch sang tiếng Việt, hãy dùng {MULTILINGUAL_PROMPT_VERSION}"
+        )
+    return template.for_language(target_language)
@@ -0,0 +1,150 @@
+# qa.py
+"""
+Kiểm tra chất lượng bản dịch theo luật (không gọi API).
+
+Chạy sau khi dịch xong các phần: mỗi phụ đề được kiểm tra bằng vài luật rẻ
+và chỉ những phụ đề lỗi được dịch lại theo lô nhỏ (xem
+SRTTranslator.quality_pass), thay vì chạy lại cả file.
+
+Các lỗi:
+- missing: lô dịch thất bại, phụ đề vẫn là bản gốc
+- empty: bản dịch rỗng trong khi câu gốc có chữ
+- untranslated: bản dịch giống câu gốc hoặc không có chữ của ngôn ngữ đích
+- marker: dấu [n] lọt vào bản dịch (thường do mô hình gộp hai phụ đề)
+- length_ratio: độ dài bản dịch quá chênh lệch so với câu gốc
+- line_length: dòng dài hơn giới hạn (chỉ khi câu gốc nằm trong giới hạn)
+- cps: tốc độ đọc (ký tự/giây) vượt giới hạn (chỉ khi câu gốc không vượt)
+"""
+import re
+from typing import Dict, List, Optional
+
+from stream_parser import looks_untranslated
+
+# Mô tả lỗi trong thông báo trạng thái
+QA_ISSUE_LABELS = {
+    "missing": "chưa dịch",
+    "empty": "bản dịch rỗng",
+    "untranslated": "sai ngôn ngữ",
+    "marker": "lọt dấu [n]",
+    "length_ratio": "độ dài bất thường",
+    "line_length": "dòng quá dài",
+    "cps": "đọc quá nhanh",
+}
+
+# Tuỳ chọn mặc định của api_config["qa"] (giới hạn 0 = tắt luật đó)
+QA_DEFAULTS = {
+    "rounds": 2,
+    "batch_size": 5,
+    "min_length_ratio": 0.25,
+    "max_length_ratio": 4.0,
+    "max_line_length": 0,
+    "max_cps": 0,
+}
+
+# Câu gốc ngắn hơn chừng này ký tự không bị xét tỉ lệ độ dài
+MIN_CHARS_FOR_LENGTH_RATIO = 20
+
+_MARKER = re.compile(r"\[\d+\]")
+
+
+def qa_options(option) -> Optional[Dict]:
+    """
+    Chuẩn hoá api_config["qa"]: None/True = mặc định, False = tắt,
+    dict = ghi đè một phần QA_DEFAULTS.
+    """
+    if option is False:
+        return None
+    options = dict(QA_DEFAULTS)
+    if isinstance(option, dict):
+        unknown = set(option) - set(QA_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Tuỳ chọn QA không hợp lệ: {', '.join(sorted(unknown))}")
+        options.update(option)
+    return options
+
+
+def _cps(text: str, duration_ms: int) -> float:
+    chars = sum(1 for c in text if not c.isspace())
+    return chars * 1000.0 / max(duration_ms, 1)
+
+
+class QAChecker:
+    """Bộ kiểm tra theo luật cho các phụ đề đã dịch."""
+
+    def __init__(
+        self,
+        target_language: str = "vi",
+        min_length_ratio: float = QA_DEFAULTS["min_length_ratio"],
+        max_length_ratio: float = QA_DEFAULTS["max_length_ratio"],
+        max_line_length: int = QA_DEFAULTS["max_line_length"],
+        max_cps: float = QA_DEFAULTS["max_cps"],
+    ):
+        self.target_language = target_language
+        self.min_length_ratio = min_length_ratio
+        self.max_length_ratio = max_length_ratio
+        self.max_line_length = max_line_length
+        self.max_cps = max_cps
+
+    @classmethod
+    def from_options(cls, options: Dict, target_language: str = "vi") -> "QAChecker":
+        return cls(
+            target_language,
+            options["min_length_ratio"],
+            options["max_length_ratio"],
+            options["max_line_length"],
+            options["max_cps"],
+        )
+
+    def check(self, cue) -> List[str]:
+        """Danh sách mã lỗi của một phụ đề (rỗng nếu đạt)."""
+        if "original_text" not in cue:
+            return ["missing"] if cue["text"].strip() else []
+        source = cue["original_text"]
+        text = cue["text"]
+        if not text.strip():
+            return ["empty"] if any(c.isalpha() for c in source) else []
+
+        issues = []
+        if looks_untranslated(text, source, self.target_language):
+            issues.append("untranslated")
+        if _MARKER.search(text) and not _MARKER.search(source):
+            issues.append("marker")
+
+        source_length = len(source.strip())
+        if source_length >= MIN_CHARS_FOR_LENGTH_RATIO:
+            ratio = len(text.strip()) / source_length
+            if ratio < self.min_length_ratio or ratio > self.max_length_ratio:
+                issues.append("length_ratio")
+
+        if self.max_line_length:
+            limit = self.max_line_length
+            if max(map(len, text.split("\n"))) > limit and max(
+                map(len, source.split("\n"))
+            ) <= limit:
+                issues.append("line_length")
+
+        if self.max_cps:
+            duration = cue["end_ms"] - cue["start_ms"]
+            if _cps(text, duration) > self.max_cps >= _cps(source, duration):
+                issues.append("cps")
+        return issues
+
+    def find_issues(self, cues) -> Dict[int, List[str]]:
+        """{chỉ số phụ đề: mã lỗi} cho các phụ đề không đạt."""
+        issues = {}
+        for cue in cues:
+            cue_issues = self.check(cue)
+            if cue_issues:
+                issues[cue["index"]] = cue_issues
+        return issues
+
+
+def summarize_issues(issues: Dict[int, List[str]]) -> str:
+    """Tóm tắt số phụ đề theo từng loại lỗi, ví dụ "3 sai ngôn ngữ, 1 lọt dấu [n]"."""
+    counts: Dict[str, int] = {}
+    for cue_issues in issues.values():
+        for issue in cue_issues:
+            counts[issue] = counts.get(issue, 0) + 1
+    return ", ".join(
+        f"{count} {QA_ISSUE_LABELS.get(issue, issue)}" for issue, count in counts.items()
+    )
@@ -0,0 +1,87 @@
+# rate_limiter.py
+"""
+Bộ giới hạn tốc độ gọi API theo thuật toán token bucket.
+Dùng chung giữa các luồng (và qua proxy giữa các tiến trình, xem sharding.py).
+"""
+import threading
+import time
+from typing import Optional
+
+import cancellation
+
+
+class RateLimiter:
+    """
+    Giới hạn số yêu cầu mỗi phút.
+
+    reserve() giữ chỗ cho một yêu cầu và trả về số giây cần chờ trước khi gửi,
+    nên có thể gọi từ xa mà không chặn tiến trình quản lý (thời gian chờ đã
+    tính không đổi theo set_rate). acquire() chờ ngay trên bộ giới hạn và xét
+    lại sau mỗi lần set_rate, nên yêu cầu đang chờ cũng theo tốc độ mới.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: Optional[int] = None):
+        """
+        Tham số:
+            requests_per_minute: Số yêu cầu tối đa mỗi phút
+            burst: Số yêu cầu được phép gửi dồn ngay lập tức (mặc định 1)
+        """
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._closed = False
+        self.set_rate(requests_per_minute, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+
+    def set_rate(self, requests_per_minute: float, burst: Optional[int] = None) -> None:
+        """
+        Thay đổi tốc độ, có hiệu lực ngay với các yêu cầu đang chờ trong
+        acquire() (không áp dụng cho thời gian chờ reserve() đã trả về).
+        """
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute phải lớn hơn 0")
+        with self._cond:
+            if hasattr(self, "_interval"):
+                # Tính số token tích luỹ tới giờ theo tốc độ cũ
+                self._refill()
+            self.requests_per_minute = requests_per_minute
+            self.burst = max(1, burst if burst is not None else getattr(self, "burst", 1))
+            self._interval = 60.0 / requests_per_minute
+            self._cond.notify_all()
+
+    def _refill(self) -> None:
+        """Cộng token tích luỹ từ lần trước (gọi khi đang giữ khoá)."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) / self._interval)
+        self._last = now
+
+    def reserve(self) -> float:
+        """Giữ chỗ cho một yêu cầu, trả về số giây phải chờ."""
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens * self._interval
+
+    def acquire(self, cancel: Optional[cancellation.CancelToken] = None) -> None:
+        """Chờ tới khi được phép gửi yêu cầu tiếp theo (ngắt được bởi cancel)."""
+        with cancellation.on_cancel(cancel, self._wake), self._cond:
+            while not self._closed:
+                cancellation.check(cancel)
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                # Thức dậy khi đủ token, hoặc sớm hơn khi set_rate/huỷ
+                self._cond.wait((1 - self._tokens) * self._interval)
+
+    def close(self) -> None:
+        """Bỏ giới hạn: mọi yêu cầu đang chờ trong acquire() được gửi ngay."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _wake(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
@@ -0,0 +1,304 @@
+# replay.py
+"""
+Ghi và phát lại lưu lượng tới nhà cung cấp API (cassette).
+
+Chế độ "record" bọc một TranslationAPI thật: mỗi yêu cầu (prompt + system
+instruction) được ghi cùng phản hồi, lỗi, token, độ trễ và thời điểm của
+từng đoạn streaming vào một file JSON Lines nén gzip (mỗi bản ghi là một
+member gzip hoàn chỉnh, nên file vẫn đọc được khi tiến trình bị dừng đột
+ngột giữa chừng và lần ghi sau nối thêm vào). Chế độ "replay" trả lại
+đúng các phản hồi đó (kể cả lỗi 429/500) với độ trễ gốc hoặc đã nhân hệ số,
+không cần mạng. Kết hợp với trạng thái công việc, có thể chạy lại lưu lượng
+của một công việc thật trên máy cá nhân để thử thay đổi về lập lịch và số
+luồng.
+
+Bật qua api_config:
+    {"cassette": "job.cassette.gz", "cassette_mode": "record"}
+    {"cassette": "job.cassette.gz", "cassette_mode": "replay",
+     "cassette_latency_scale": 0.5}
+
+Xem tóm tắt một cassette:
+    python replay.py job.cassette.gz
+"""
+import collections
+import gzip
+import hashlib
+import json
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, List
+
+import cancellation
+from translation_apis import (
+    TranslationAPI,
+    TranslationAPIError,
+    _call_usage,
+    current_cancel_token,
+)
+
+CASSETTE_MODES = ("record", "replay")
+CASSETTE_VERSION = 1
+
+# Đầu của một member gzip (magic + phương thức deflate)
+_GZIP_MAGIC = b"\x1f\x8b\x08"
+
+
+def request_key(api: TranslationAPI, prompt: str) -> str:
+    """Khoá của một yêu cầu: lớp API, model, system instruction và prompt."""
+    payload = json.dumps(
+        [
+            type(api).__name__,
+            getattr(api, "model", None),
+            api.prompt_template.system_instruction,
+            prompt,
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+
+def _gzip_members(data: bytes) -> Iterator[bytes]:
+    """
+    Giải nén lần lượt các member gzip. Member hỏng hoặc bị cắt cụt (dừng đột
+    ngột khi đang ghi) trả ra phần đã giải nén được, rồi đọc tiếp từ member
+    kế tiếp tìm được.
+    """
+    position = 0
+    while position < len(data):
+        decompressor = zlib.decompressobj(wbits=31)
+        parts = []
+        offset = end = position
+        # Giải nén từng đoạn tới đầu member kế tiếp (có thể là đầu giả nằm
+        # trong dữ liệu nén), để lỗi ở đoạn sau không làm mất đoạn trước
+        while offset < len(data) and not decompressor.eof:
+            end = data.find(_GZIP_MAGIC, offset + 1)
+            if end < 0:
+                end = len(data)
+            try:
+                parts.append(decompressor.decompress(data[offset:end]))
+            except zlib.error:
+                break
+            offset = end
+        yield b"".join(parts)
+        if decompressor.eof:
+            position = end - len(decompressor.unused_data)
+        elif offset > position:
+            # Member dở dang: member sau bắt đầu ở đoạn gây lỗi
+            position = offset
+        else:
+            position = data.find(_GZIP_MAGIC, position + 1)
+            if position < 0:
+                return
+
+
+def load_cassette(path: str) -> List[Dict]:
+    """Đọc mọi bản ghi của cassette (bỏ qua phần bị cắt cụt hoặc hỏng)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    entries = []
+    for member in _gzip_members(data):
+        for line in member.decode("utf-8", errors="replace").splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Dòng cuối của member bị cắt cụt
+                continue
+            if isinstance(entry, dict):
+                entries.append(entry)
+    return [e for e in entries if e.get("v") == CASSETTE_VERSION]
+
+
+class CassetteAPI(TranslationAPI):
+    """TranslationAPI bọc một API khác để ghi hoặc phát lại lưu lượng."""
+
+    def __init__(
+        self,
+        inner: TranslationAPI,
+        path: str,
+        mode: str = "replay",
+        latency_scale: float = 1.0,
+    ):
+        """
+        Tham số:
+            inner: API thật (chỉ được gọi ở chế độ record)
+            path: File cassette (.gz)
+            mode: "record" (ghi nối thêm) hoặc "replay"
+            latency_scale: Hệ số nhân độ trễ khi phát lại (0 = không chờ)
+        """
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Chế độ cassette không hợp lệ: {mode}")
+        self.inner = inner
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.display_name = inner.display_name
+        self.prompt_template = inner.prompt_template
+        self.target_language = inner.target_language
+        self.glossary = inner.glossary
+        self.stream = inner.stream
+        self.model = getattr(inner, "model", None)
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._file = None
+        # Bản ghi theo khoá, phát lại theo đúng thứ tự đã ghi
+        self._entries: Dict[str, collections.deque] = collections.defaultdict(
+            collections.deque
+        )
+        if mode == "replay":
+            for entry in load_cassette(path):
+                self._entries[entry["key"]].append(entry)
+
+    def supports_streaming(self) -> bool:
+        if self.mode == "replay":
+            return True
+        return self.inner.supports_streaming()
+
+    # ----- Ghi -----
+
+    def _write(self, entry: Dict) -> None:
+        entry["v"] = CASSETTE_VERSION
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        # Mỗi bản ghi là một member gzip đầy đủ (có phần kết), nên dừng đột
+        # ngột chỉ có thể làm hỏng bản ghi đang ghi dở
+        member = gzip.compress((line + "\n").encode("utf-8"))
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "ab")
+            self._file.write(member)
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _record(self, key: str, start: float, **fields) -> None:
+        entry = {
+            "key": key,
+            "t": round(start - self._started, 4),
+            "latency": round(time.monotonic() - start, 4),
+            "usage": getattr(_call_usage, "value", None),
+        }
+        entry.update(fields)
+        self._write(entry)
+
+    # ----- Phát lại -----
+
+    def _next_entry(self, prompt: str) -> Dict:
+        key = request_key(self, prompt)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise TranslationAPIError("Yêu cầu không có trong cassette", 404)
+            # Bản ghi cuối được giữ lại cho các lần gọi tiếp theo
+            return entries.popleft() if len(entries) > 1 else entries[0]
+
+    def _wait(self, seconds: float) -> None:
+        # Ngắt được khi công việc bị huỷ (xem cancellation.py)
+        if seconds > 0 and self.latency_scale > 0:
+            cancellation.sleep(seconds * self.latency_scale, current_cancel_token())
+
+    def _replay_result(self, entry: Dict) -> None:
+        """Báo token đã ghi và ném lại lỗi đã ghi (nếu có)."""
+        usage = entry.get("usage")
+        if usage:
+            usage = dict(usage)
+            if usage.get("ttft") is not None:
+                usage["ttft"] *= self.latency_scale
+            self._report_usage(**usage)
+        if entry.get("error") is not None:
+            raise TranslationAPIError(entry["error"], entry.get("status"))
+
+    def _complete(self, prompt: str) -> str:
+        if self.mode == "record":
+            key = request_key(self, prompt)
+            start = time.monotonic()
+            _call_usage.value = None
+            try:
+                text = self.inner._complete(prompt)
+            except Exception as e:
+                self._record(key, start, error=str(e), status=getattr(e, "status_code", None))
+                raise
+            self._record(key, start, text=text)
+            return text
+
+        entry = self._next_entry(prompt)
+        self._wait(entry["latency"])
+        self._replay_result(entry)
+        if "chunks" in entry:
+            return "".join(text for _, text in entry["chunks"])
+        return entry.get("text", "")
+
+    def _stream(self, prompt: str) -> Iterator[str]:
+        if self.mode == "record":
+            yield from self._record_stream(prompt)
+            return
+
+        entry = self._next_entry(prompt)
+        chunks = entry.get("chunks")
+        if chunks is None:
+            # Bản ghi không streaming: trả cả văn bản như một đoạn
+            chunks = [[entry["latency"], entry.get("text", "")]] if entry.get("error") is None else []
+        elapsed = 0.0
+        for offset, text in chunks:
+            self._wait(offset - elapsed)
+            elapsed = offset
+            yield text
+        self._wait(entry["latency"] - elapsed)
+        self._replay_result(entry)
+
+    def _record_stream(self, prompt: str) -> Iterator[str]:
+        key = request_key(self, prompt)
+        start = time.monotonic()
+        chunks = []
+        error = None
+        _call_usage.value = None
+        inner = self.inner._stream(prompt)
+        try:
+            for text in inner:
+                chunks.append([round(time.monotonic() - start, 4), text])
+                yield text
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            inner.close()
+            # Ghi cả khi bên gọi dừng đọc giữa chừng (phản hồi lệch hướng)
+            self._record(
+                key,
+                start,
+                chunks=chunks,
+                error=str(error) if error is not None else None,
+                status=getattr(error, "status_code", None),
+            )
+
+
+def summarize(path: str) -> str:
+    """Tóm tắt cassette: số yêu cầu, lỗi, độ trễ, token."""
+    entries = load_cassette(path)
+    if not entries:
+        return f"{path}: không có bản ghi"
+    latencies = sorted(e["latency"] for e in entries)
+    errors = collections.Counter(e.get("status") for e in entries if e.get("error"))
+    prompt_tokens = sum((e.get("usage") or {}).get("prompt_tokens", 0) for e in entries)
+    output_tokens = sum((e.get("usage") or {}).get("output_tokens", 0) for e in entries)
+    duration = max(e["t"] + e["latency"] for e in entries)
+    return "\n".join(
+        [
+            f"{path}: {len(entries)} yêu cầu trong {duration:.1f}s "
+            f"({len(set(e['key'] for e in entries))} prompt khác nhau)",
+            f"Độ trễ p50 {latencies[len(latencies) // 2]:.3f}s, "
+            f"p99 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]:.3f}s",
+            f"Lỗi: {dict(errors) if errors else 0}",
+            f"Token: đầu vào {prompt_tokens}, đầu ra {output_tokens}",
+        ]
+    )
+
+
+if __name__ == "__main__":
+    import sys
+
+    for cassette_path in sys.argv[1:]:
+        print(summarize(cassette_path))
@@ -0,0 +1,258 @@
+# scheduler.py
+"""
+Bộ lập lịch công bằng cho nhiều công việc dịch chạy đồng thời.
+
+Mỗi lô phụ đề phải xin một "chỗ" trước khi gọi API; số chỗ (capacity) là số
+yêu cầu được phép bay cùng lúc tới nhà cung cấp. Khi có chỗ trống, lô được
+chọn theo:
+
+1. Hạn chót: công việc có deadline và không kịp xong nếu chỉ nhận phần chia
+   công bằng được phục vụ trước (hạn sớm nhất trước), nhưng chỉ vượt các lô
+   cùng lớp ưu tiên hoặc lớp thấp hơn. Hạn đã qua thì không còn được ưu tiên,
+   nên một việc bulk trễ hạn không chặn được việc urgent.
+2. Weighted fair queueing: mỗi công việc có trọng số = trọng số lớp ưu tiên
+   x trọng số riêng; lô có thẻ kết thúc ảo (virtual finish tag) nhỏ nhất
+   được phục vụ. Chi phí của lô là số token ước tính.
+
+Nhờ vậy một phim 5.000 phụ đề không chặn mười đoạn quảng cáo 50 phụ đề xếp
+sau nó, còn khi chỉ có việc lớn thì nó dùng hết mọi chỗ (không lãng phí quota).
+"""
+import collections
+import contextlib
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional
+
+import cancellation
+import profiling
+
+# Các lớp ưu tiên và trọng số tương ứng
+PRIORITY_CLASSES = ("urgent", "normal", "bulk")
+CLASS_WEIGHTS = {"urgent": 16.0, "normal": 4.0, "bulk": 1.0}
+
+# Cửa sổ (giây) để ước lượng tốc độ phục vụ khi xét hạn chót
+RATE_WINDOW = 60.0
+
+
+class _JobEntry:
+    __slots__ = ("key", "priority", "weight", "deadline", "total_cost", "served", "finish_tag")
+
+    def __init__(self, key, priority, weight, deadline, total_cost):
+        self.key = key
+        self.priority = priority
+        self.weight = weight
+        self.deadline = deadline
+        self.total_cost = total_cost
+        self.served = 0.0
+        self.finish_tag = 0.0
+
+
+class _Request:
+    __slots__ = ("job", "cost", "start_tag", "finish_tag", "seq", "granted")
+
+    def __init__(self, job, cost, start_tag, finish_tag, seq):
+        self.job = job
+        self.cost = cost
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.seq = seq
+        self.granted = False
+
+
+class FairScheduler:
+    """Cấp chỗ gọi API cho các lô theo ưu tiên, hạn chót và WFQ (an toàn đa luồng)."""
+
+    def __init__(self, capacity: int):
+        """
+        Tham số:
+            capacity: Số lô được gọi API đồng thời (cho mọi công việc)
+        """
+        if capacity < 1:
+            raise ValueError("capacity phải lớn hơn 0")
+        self.capacity = capacity
+        self._cond = threading.Condition()
+        self._jobs: Dict[str, _JobEntry] = {}
+        self._waiting: List[_Request] = []
+        self._in_flight = 0
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        # (thời điểm, chi phí) của các lô đã xong, để ước lượng tốc độ
+        self._completions = collections.deque()
+
+    def register(
+        self,
+        job_key: str,
+        priority: str = "normal",
+        weight: float = 1.0,
+        deadline: Optional[float] = None,
+        total_cost: float = 0.0,
+    ) -> None:
+        """
+        Đăng ký (hoặc cập nhật) một công việc.
+
+        Tham số:
+            priority: Một trong PRIORITY_CLASSES
+            weight: Trọng số riêng trong lớp ưu tiên
+            deadline: Hạn chót mong muốn (time.time()), None = không có
+            total_cost: Tổng chi phí ước tính (token), dùng để xét hạn chót
+        """
+        if priority not in CLASS_WEIGHTS:
+            raise ValueError(f"Lớp ưu tiên không hợp lệ: {priority}")
+        if weight <= 0:
+            raise ValueError("weight phải lớn hơn 0")
+        with self._cond:
+            job = self._jobs.get(job_key)
+            if job is None:
+                job = self._jobs[job_key] = _JobEntry(
+                    job_key, priority, weight, deadline, total_cost
+                )
+            else:
+                job.priority = priority
+                job.weight = weight
+                job.deadline = deadline
+                job.total_cost = total_cost
+
+    def unregister(self, job_key: str) -> None:
+        with self._cond:
+            self._jobs.pop(job_key, None)
+
+    def set_capacity(self, capacity: int) -> None:
+        """Đổi số chỗ (có hiệu lực ngay, kể cả khi đang chạy)."""
+        if capacity < 1:
+            raise ValueError("capacity phải lớn hơn 0")
+        with self._cond:
+            self.capacity = capacity
+            self._dispatch()
+
+    @contextlib.contextmanager
+    def slot(
+        self,
+        job_key: str,
+        cost: float = 1.0,
+        cancel: Optional[cancellation.CancelToken] = None,
+    ):
+        """Giữ một chỗ gọi API cho một lô của job_key trong suốt khối with."""
+        with profiling.stage("schedule_wait"):
+            self.acquire(job_key, cost, cancel)
+        try:
+            yield
+        finally:
+            self.release(job_key, cost)
+
+    def acquire(
+        self,
+        job_key: str,
+        cost: float = 1.0,
+        cancel: Optional[cancellation.CancelToken] = None,
+    ) -> None:
+        """
+        Chờ tới lượt của lô (chi phí cost) thuộc công việc job_key. Nếu cancel
+        bị huỷ trong lúc chờ, lô rời hàng đợi và TranslationCancelled được ném.
+        """
+        cost = max(float(cost), 1.0)
+        with cancellation.on_cancel(cancel, self._wake), self._cond:
+            job = self._jobs.get(job_key)
+            if job is None:
+                job = self._jobs[job_key] = _JobEntry(job_key, "normal", 1.0, None, 0.0)
+            weight = CLASS_WEIGHTS[job.priority] * job.weight
+            start_tag = max(self._virtual_time, job.finish_tag)
+            job.finish_tag = start_tag + cost / weight
+            request = _Request(job, cost, start_tag, job.finish_tag, next(self._seq))
+            self._waiting.append(request)
+            self._dispatch()
+            while not request.granted:
+                if cancel is not None and cancel.cancelled:
+                    self._waiting.remove(request)
+                    cancel.raise_if_cancelled()
+                self._cond.wait()
+
+    def _wake(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+
+    def release(self, job_key: str, cost: float = 1.0) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            job = self._jobs.get(job_key)
+            if job is not None:
+                job.served += max(float(cost), 1.0)
+            now = time.monotonic()
+            self._completions.append((now, max(float(cost), 1.0)))
+            while self._completions and now - self._completions[0][0] > RATE_WINDOW:
+                self._completions.popleft()
+            self._dispatch()
+
+    def _service_rate(self) -> Optional[float]:
+        """Tốc độ phục vụ gần đây (chi phí/giây) của cả bộ lập lịch."""
+        if len(self._completions) < 2:
+            return None
+        span = self._completions[-1][0] - self._completions[0][0]
+        if span <= 0:
+            return None
+        return sum(cost for _, cost in self._completions) / span
+
+    def _at_risk(self, job: _JobEntry, rate: Optional[float], total_weight: float) -> bool:
+        """True nếu công việc sẽ trễ hạn khi chỉ nhận phần chia công bằng."""
+        if job.deadline is None:
+            return False
+        time_left = job.deadline - time.time()
+        if time_left <= 0:
+            # Đã trễ hạn: ưu tiên thêm cũng không cứu được, trở về WFQ
+            return False
+        if not rate or not job.total_cost:
+            return False
+        share = CLASS_WEIGHTS[job.priority] * job.weight / total_weight
+        remaining = max(job.total_cost - job.served, 0.0)
+        return remaining / (rate * share) > time_left
+
+    def _dispatch(self) -> None:
+        """Cấp chỗ trống cho các lô đang chờ (gọi khi đang giữ khoá)."""
+        granted = False
+        while self._waiting and self._in_flight < self.capacity:
+            waiting_jobs = {id(r.job): r.job for r in self._waiting}.values()
+            total_weight = sum(CLASS_WEIGHTS[j.priority] * j.weight for j in waiting_jobs)
+            rate = self._service_rate()
+            at_risk = {
+                id(j) for j in waiting_jobs if self._at_risk(j, rate, total_weight)
+            }
+
+            best = min(self._waiting, key=lambda r: (r.finish_tag, r.seq))
+            if at_risk:
+                # Chỉ vượt lô mà WFQ chọn nếu cùng lớp hoặc lớp của lô đó thấp hơn
+                rank = PRIORITY_CLASSES.index(best.job.priority)
+                candidates = [
+                    r
+                    for r in self._waiting
+                    if id(r.job) in at_risk and PRIORITY_CLASSES.index(r.job.priority) <= rank
+                ]
+                if candidates:
+                    best = min(
+                        candidates, key=lambda r: (r.job.deadline, r.finish_tag, r.seq)
+                    )
+
+            self._waiting.remove(best)
+            best.granted = True
+            self._in_flight += 1
+            self._virtual_time = max(self._virtual_time, best.start_tag)
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict:
+        """Thông tin hiện tại của bộ lập lịch (để hiển thị/giám sát)."""
+        with self._cond:
+            return {
+                "capacity": self.capacity,
+                "in_flight": self._in_flight,
+                "waiting": len(self._waiting),
+                "jobs": {
+                    key: {
+                        "priority": job.priority,
+                        "weight": job.weight,
+                        "served": job.served,
+                        "total_cost": job.total_cost,
+                    }
+                    for key, job in self._jobs.items()
+                },
+            }
@@ -0,0 +1,327 @@
+# sharding.py
+"""
+Chế độ đa tiến trình cho các đợt dịch lớn (hàng chục nghìn file SRT).
+
+Danh sách file được chia cho nhiều tiến trình làm việc. Mỗi tiến trình chạy
+SRTTranslator riêng (với số luồng riêng), còn việc nhận file và giới hạn tốc
+độ toàn cục đi qua một ShardCoordinator duy nhất chạy trong tiến trình
+quản lý (multiprocessing.managers).
+
+- Mỗi file chỉ được một tiến trình nhận tại một thời điểm.
+- Khi một tiến trình chết, các file nó đang giữ được trả lại hàng đợi và
+  một tiến trình thay thế được khởi động (tiếp tục từ file tiến trình).
+- Khi translator.cancel_token bị huỷ, coordinator ngừng giao file và báo huỷ
+  cho các tiến trình (file đang dịch dừng như khi huỷ trong một tiến trình,
+  nhật ký được giữ lại); tiến trình không dừng kịp bị kết thúc cưỡng bức.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from multiprocessing.managers import BaseManager
+from typing import Dict, List, Optional, Tuple
+
+import cancellation
+from cancellation import CancelToken
+from rate_limiter import RateLimiter
+
+# Chu kỳ (giây) tiến trình làm việc hỏi coordinator xem công việc đã bị huỷ chưa
+CANCEL_POLL_SECONDS = 0.5
+# Thời gian (giây) chờ các tiến trình tự dừng sau khi huỷ trước khi kết thúc chúng
+CANCEL_GRACE_SECONDS = 10.0
+
+
+class ShardCoordinator:
+    """Bảng nhận file và bộ giới hạn tốc độ dùng chung giữa các tiến trình."""
+
+    def __init__(
+        self, files: List[Tuple[str, str]], requests_per_minute: Optional[float] = None
+    ):
+        """
+        Tham số:
+            files: Danh sách (file đầu vào, file đầu ra)
+            requests_per_minute: Giới hạn tốc độ toàn cục, None = không giới hạn
+        """
+        self._lock = threading.Lock()
+        self._pending = deque(files)
+        self._claimed: Dict[str, Tuple[int, Tuple[str, str]]] = {}
+        self._results: Dict[str, bool] = {}
+        self._limiter = RateLimiter(requests_per_minute) if requests_per_minute else None
+        self._cancel_reason: Optional[str] = None
+
+    def claim(self, worker_id: int) -> Optional[Tuple[str, str]]:
+        """Nhận file tiếp theo cho tiến trình worker_id, None nếu đã hết hoặc đã huỷ."""
+        with self._lock:
+            if not self._pending or self._cancel_reason is not None:
+                return None
+            item = self._pending.popleft()
+            self._claimed[item[0]] = (worker_id, item)
+            return item
+
+    def complete(self, worker_id: int, input_file: str, success: bool) -> None:
+        with self._lock:
+            owner = self._claimed.get(input_file)
+            if owner and owner[0] == worker_id:
+                del self._claimed[input_file]
+                self._results[input_file] = success
+
+    def release_worker(self, worker_id: int) -> List[str]:
+        """Trả các file đang giữ bởi tiến trình đã chết về đầu hàng đợi."""
+        with self._lock:
+            released = [
+                item for owner, item in self._claimed.values() if owner == worker_id
+            ]
+            for item in released:
+                del self._claimed[item[0]]
+                self._pending.appendleft(item)
+            return [item[0] for item in released]
+
+    def cancel(self, reason: str = "") -> None:
+        """Ngừng giao file; các tiến trình thấy lệnh huỷ qua cancel_reason()."""
+        with self._lock:
+            if self._cancel_reason is None:
+                self._cancel_reason = reason or "Công việc đã bị huỷ"
+
+    def cancel_reason(self) -> Optional[str]:
+        """Lý do huỷ, None nếu chưa bị huỷ."""
+        return self._cancel_reason
+
+    def reserve(self) -> float:
+        """Giữ chỗ cho một yêu cầu API, trả về số giây phải chờ."""
+        return self._limiter.reserve() if self._limiter else 0.0
+
+    def remaining(self) -> int:
+        with self._lock:
+            return len(self._pending) + len(self._claimed)
+
+    def results(self) -> Dict[str, bool]:
+        with self._lock:
+            return dict(self._results)
+
+
+class RemoteRateLimiter:
+    """Bộ giới hạn tốc độ phía tiến trình làm việc, hỏi ShardCoordinator."""
+
+    def __init__(self, coordinator):
+        self._coordinator = coordinator
+        self._lock = threading.Lock()
+
+    def acquire(self, cancel=None) -> None:
+        # Proxy của manager không an toàn khi dùng đồng thời từ nhiều luồng
+        with self._lock:
+            wait = self._coordinator.reserve()
+        cancellation.sleep(wait, cancel)
+
+
+def _watch_cancel(manager, token: CancelToken) -> None:
+    """Chuyển lệnh huỷ của coordinator thành token.cancel() trong tiến trình làm việc."""
+    try:
+        # Proxy riêng cho luồng này (proxy không dùng chung được giữa các luồng)
+        coordinator = manager.coordinator()
+        while not token.cancelled:
+            reason = coordinator.cancel_reason()
+            if reason is not None:
+                token.cancel(reason)
+                return
+            time.sleep(CANCEL_POLL_SECONDS)
+    except (EOFError, OSError):
+        # Tiến trình quản lý đã dừng
+        return
+
+
+# Đối tượng coordinator sống trong tiến trình quản lý
+_coordinator: Optional[ShardCoordinator] = None
+
+
+def _init_coordinator(files, requests_per_minute) -> None:
+    global _coordinator
+    _coordinator = ShardCoordinator(files, requests_per_minute)
+
+
+def _get_coordinator() -> ShardCoordinator:
+    return _coordinator
+
+
+class _CoordinatorManager(BaseManager):
+    pass
+
+
+_CoordinatorManager.register("coordinator", callable=_get_coordinator)
+
+
+def _worker_main(
+    worker_id: int,
+    address,
+    authkey: bytes,
+    messages,
+    settings: Dict,
+) -> None:
+    """Vòng lặp của một tiến trình làm việc: nhận file, dịch, báo kết quả."""
+    from srt_translator import SRTTranslator
+
+    manager = _CoordinatorManager(address=address, authkey=authkey)
+    manager.connect()
+    coordinator = manager.coordinator()
+
+    def update_status(msg: str) -> None:
+        messages.put(f"[P{worker_id}] {msg}")
+
+    translator = SRTTranslator(update_status, rate_limiter=RemoteRateLimiter(coordinator))
+    translator.cancel_token = CancelToken()
+    threading.Thread(
+        target=_watch_cancel,
+        args=(manager, translator.cancel_token),
+        name="shard-cancel-watch",
+        daemon=True,
+    ).start()
+
+    while not translator.cancelled:
+        item = coordinator.claim(worker_id)
+        if item is None:
+            break
+        input_file, output_file = item
+        update_status(f"Đang dịch: {os.path.basename(input_file)}")
+        success = translator.translate_file(
+            input_file,
+            output_file,
+            settings["api_config"],
+            settings["num_threads"],
+            settings["batch_size"],
+            settings["max_retries"],
+            settings["bilingual"],
+            incremental=settings["incremental"],
+        )
+        if translator.cancelled:
+            # File dở dang không có kết quả (tiếp tục từ nhật ký lần sau)
+            break
+        coordinator.complete(worker_id, input_file, success)
+
+
+def translate_sharded(
+    translator,
+    files: List[Tuple[str, str]],
+    api_config: Dict,
+    num_processes: int,
+    num_threads: int,
+    batch_size: int = 10,
+    max_retries: int = float("inf"),
+    bilingual: bool = False,
+    requests_per_minute: Optional[float] = None,
+    max_restarts: int = 3,
+    incremental: bool = False,
+) -> Dict[str, bool]:
+    """
+    Dịch danh sách file bằng nhiều tiến trình.
+
+    Tham số:
+        translator: SRTTranslator của tiến trình chính (dùng để báo trạng thái)
+        files: Danh sách (file đầu vào, file đầu ra)
+        num_processes: Số tiến trình làm việc
+        num_threads: Số luồng dịch trong mỗi tiến trình
+        requests_per_minute: Giới hạn tốc độ toàn cục cho mọi tiến trình
+        max_restarts: Số lần tối đa khởi động lại tiến trình bị chết
+
+    Khi translator.cancel_token bị huỷ, các tiến trình được báo dừng (file chưa
+    xong có kết quả False) và hàm trả về sau khi chúng kết thúc.
+
+    Trả về:
+        {file đầu vào: True/False}
+    """
+    cancel_token = translator.cancel_token
+    # "spawn" để không fork một tiến trình đang có nhiều luồng (GUI, executor)
+    ctx = multiprocessing.get_context("spawn")
+    authkey = os.urandom(16)
+    manager = _CoordinatorManager(
+        address=("127.0.0.1", 0), authkey=authkey, ctx=ctx
+    )
+    manager.start(_init_coordinator, (files, requests_per_minute))
+    coordinator = manager.coordinator()
+
+    messages = ctx.Queue()
+    settings = {
+        "api_config": api_config,
+        "num_threads": num_threads,
+        "batch_size": batch_size,
+        "max_retries": max_retries,
+        "bilingual": bilingual,
+        "incremental": incremental,
+    }
+
+    def spawn(worker_id: int):
+        process = ctx.Process(
+            target=_worker_main,
+            args=(worker_id, manager.address, authkey, messages, settings),
+            name=f"srt-shard-{worker_id}",
+        )
+        process.start()
+        return process
+
+    def drain_messages() -> None:
+        while True:
+            try:
+                translator.update_status(messages.get_nowait())
+            except queue.Empty:
+                return
+
+    translator.update_status(
+        f"Chia {len(files)} file cho {num_processes} tiến trình ({num_threads} luồng mỗi tiến trình)"
+    )
+
+    workers = {}
+    try:
+        workers = {i: spawn(i) for i in range(1, min(num_processes, len(files)) + 1)}
+        next_id = len(workers) + 1
+        restarts = 0
+        # Hạn chót để các tiến trình tự dừng sau khi huỷ (None = chưa huỷ)
+        cancel_deadline = None
+
+        while workers:
+            drain_messages()
+            if cancel_deadline is None and cancel_token is not None and cancel_token.cancelled:
+                coordinator.cancel(cancel_token.reason)
+                cancel_deadline = time.monotonic() + CANCEL_GRACE_SECONDS
+            elif cancel_deadline is not None and time.monotonic() > cancel_deadline:
+                for worker_id, process in workers.items():
+                    translator.update_status(
+                        f"Kết thúc tiến trình P{worker_id} chưa dừng sau khi huỷ"
+                    )
+                    process.terminate()
+                cancel_deadline = float("inf")
+            for worker_id, process in list(workers.items()):
+                process.join(timeout=0.2)
+                if process.is_alive():
+                    continue
+                del workers[worker_id]
+                released = coordinator.release_worker(worker_id)
+                if cancel_deadline is not None:
+                    continue
+                if process.exitcode != 0 or released:
+                    translator.update_status(
+                        f"Tiến trình P{worker_id} dừng bất thường (mã {process.exitcode}), trả lại {len(released)} file"
+                    )
+                    if restarts < max_restarts and coordinator.remaining() > 0:
+                        restarts += 1
+                        workers[next_id] = spawn(next_id)
+                        next_id += 1
+
+            # Còn file nhưng không còn tiến trình nào (đã hết lượt khởi động lại)
+            if not workers and cancel_deadline is None and coordinator.remaining() > 0:
+                translator.update_status(
+                    "Không còn tiến trình làm việc, một số file chưa được dịch"
+                )
+
+        drain_messages()
+        results = coordinator.results()
+        if cancel_deadline is not None:
+            translator.report_cancelled()
+    finally:
+        # Lỗi bất ngờ trong tiến trình chính: không để lại tiến trình mồ côi
+        for process in workers.values():
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        manager.shutdown()
+
+    return {input_file: results.get(input_file, False) for input_file, _ in files}
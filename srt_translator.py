@@ -1,12 +1,90 @@
 # srt_translator.py
 import os
-import re
 import time
-import pickle
 import concurrent.futures
-from typing import List, Dict, Optional, Callable, Any
+import contextlib
+import copy
+import functools
+from typing import List, Dict, Optional, Callable, Any, Tuple
 import threading
 
+import cancellation
+import profiling
+from cancellation import CancelToken, TranslationCancelled
+from job_control import JobControl
+from concurrency import (
+    CONCURRENCY_MEMORY_PATH,
+    DEFAULT_MAX_CONCURRENCY,
+    AIMDController,
+    provider_key,
+)
+from subtitle_cue import Cue
+from file_scanner import ScanIndex, SubtitleScanner, is_up_to_date
+from subtitle_formats import (
+    output_spec,
+    read_cues,
+    read_header,
+    write_cues,
+    write_variants,
+)
+from timestamps import retime_cues
+from token_usage import UsageStats
+from translation_manifest import TranslationManifest
+from qa import QAChecker, qa_options, summarize_issues
+from rate_limiter import RateLimiter
+from job_state import (
+    DEFAULT_STATE_DIRNAME,
+    JobState,
+    compute_job_id,
+    job_settings,
+)
+
+
+def language_suffix(target_language: str, suffixes: Optional[Dict[str, str]] = None) -> str:
+    """Hậu tố file đầu ra của một ngôn ngữ đích (mặc định "_vi", "_th", "_id"...)."""
+    if suffixes and target_language in suffixes:
+        return suffixes[target_language]
+    return f"_{target_language}"
+
+
+# Thời gian nghỉ sau mỗi lô của một luồng (giây), để tránh giới hạn tốc độ
+BATCH_PAUSE_SECONDS = 1
+
+# Số phụ đề tối đa trong một lô khi đóng gói nhiều file ngắn
+# (kích thước lô thực tế do ngân sách token quyết định)
+PACKED_MAX_BATCH_CUES = 100
+
+
+def estimate_tokens(text: str) -> int:
+    """Ước lượng số token của một đoạn văn bản (~4 ký tự/token, cộng phần đánh số [n])."""
+    return len(text) // 4 + 4
+
+
+def make_batches(
+    subtitles: List[Dict], batch_size: int, max_batch_tokens: Optional[int] = None
+) -> List[List[Dict]]:
+    """
+    Chia phụ đề thành các lô tối đa batch_size mục.
+    Nếu có max_batch_tokens, lô cũng được cắt khi vượt ngân sách token ước tính.
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    for subtitle in subtitles:
+        tokens = estimate_tokens(subtitle["text"])
+        if current and (
+            len(current) >= batch_size
+            or (max_batch_tokens and current_tokens + tokens > max_batch_tokens)
+        ):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(subtitle)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
 
 class SRTTranslator:
     """
@@ -18,6 +96,10 @@ class SRTTranslator:
         self,
         update_status_callback: Callable[[str], None] = None,
         update_progress_callback: Callable[[int, int, int], None] = None,
+        rate_limiter: Any = None,
+        state_dir: Optional[str] = None,
+        executor: Optional[concurrent.futures.Executor] = None,
+        scheduler: Any = None,
     ):
         """
         Khởi tạo SRTTranslator.
@@ -25,51 +107,112 @@ class SRTTranslator:
         Tham số:
             update_status_callback: Hàm để gọi khi cập nhật trạng thái
             update_progress_callback: Hàm để gọi khi cập nhật tiến trình
+            rate_limiter: Bộ giới hạn tốc độ dùng chung cho mọi yêu cầu API
+                (đối tượng có phương thức acquire(), ví dụ RateLimiter)
+            state_dir: Thư mục lưu trạng thái công việc (mặc định: thư mục
+                ".srt_jobs" cạnh file đầu vào)
+            executor: Pool luồng dùng chung giữa các lần dịch (để giữ pool
+                "ấm" khi chạy lâu dài); None = tạo pool riêng cho mỗi file
+            scheduler: Bộ lập lịch dùng chung giữa các công việc (ví dụ
+                scheduler.FairScheduler); mỗi lô xin chỗ trước khi gọi API
         """
         self.update_status = update_status_callback or (lambda msg: print(msg))
         self.update_progress = update_progress_callback or (
             lambda thread_id, current, total: None
         )
-
-    def parse_srt(self, file_path: str) -> List[Dict]:
+        # Bộ giới hạn tốc độ nằm trong dict dùng chung với các bản sao của
+        # with_callbacks, để set_rate_limit trên một bản áp dụng cho tất cả
+        self._shared = {"rate_limiter": rate_limiter}
+        self.state_dir = state_dir
+        self.executor = executor
+        self.scheduler = scheduler
+        # Khoá công việc khi xin chỗ từ scheduler (đặt riêng cho mỗi công việc)
+        self.job_key = None
+        # Token huỷ của công việc (đặt riêng cho mỗi công việc, xem
+        # cancellation.py); None = không huỷ được
+        self.cancel_token: Optional[CancelToken] = None
+        # Tạm dừng/đổi thiết lập khi đang chạy (đặt riêng cho mỗi công việc,
+        # xem job_control.py); None = không điều khiển được
+        self.control: Optional[JobControl] = None
+        # Thống kê token/độ trễ của mọi yêu cầu API gửi qua translator này
+        self.usage = UsageStats()
+        # Hàm nhận từng phụ đề đã dịch ngay khi về tới (khi API streaming),
+        # trước khi cả lô hoàn tất; có thể được gọi lại cho cùng phụ đề khi
+        # lô được thử lại. None = không dùng
+        self.on_cue: Optional[Callable[[Cue], None]] = None
+        # Đối tượng API (và pool kết nối của chúng) được dùng lại giữa các lần dịch
+        self._api_cache: Dict[Tuple, Any] = {}
+        self._api_cache_lock = threading.Lock()
+
+    @property
+    def rate_limiter(self) -> Any:
+        return self._shared["rate_limiter"]
+
+    @rate_limiter.setter
+    def rate_limiter(self, rate_limiter: Any) -> None:
+        self._shared["rate_limiter"] = rate_limiter
+
+    def with_callbacks(
+        self,
+        update_status_callback: Callable[[str], None] = None,
+        update_progress_callback: Callable[[int, int, int], None] = None,
+    ) -> "SRTTranslator":
         """
-        Phân tích file SRT thành danh sách các mục phụ đề.
+        Tạo bản sao dùng chung pool luồng, bộ giới hạn tốc độ và cache API
+        nhưng có callback trạng thái/tiến trình riêng (mỗi công việc một bản).
         """
-        with open(file_path, "r", encoding="utf-8") as file:
-            content = file.read()
-
-        subtitle_pattern = r"(\d+)\s+(\d{2}:\d{2}:\d{2},\d{3}) --> (\d{2}:\d{2}:\d{2},\d{3})\s+([\s\S]*?)(?=\n\s*\n|\Z)"
-        matches = re.findall(subtitle_pattern, content, re.MULTILINE)
-
-        subtitles = []
-        for match in matches:
-            index, start_time, end_time, text = match
-            subtitles.append(
-                {
-                    "index": int(index),
-                    "start_time": start_time,
-                    "end_time": end_time,
-                    "text": text.strip(),
-                }
-            )
+        clone = copy.copy(self)
+        if update_status_callback is not None:
+            clone.update_status = update_status_callback
+        if update_progress_callback is not None:
+            clone.update_progress = update_progress_callback
+        return clone
+
+    def parse_subtitles(self, file_path: str) -> List[Cue]:
+        """
+        Phân tích file phụ đề (SRT, VTT, ASS/SSA, SBV - theo phần mở rộng)
+        thành danh sách các mục phụ đề (Cue). Xem subtitle_formats.py.
+        """
+        with profiling.stage("parse"):
+            return list(read_cues(file_path))
 
-        return subtitles
+    def write_subtitles(
+        self,
+        subtitles: List[Cue],
+        output_file: str,
+        bilingual: bool = False,
+        source_file: Optional[str] = None,
+        durability: Optional[str] = None,
+    ) -> None:
+        """
+        Ghi phụ đề (Cue hoặc dict dạng cũ) theo định dạng của output_file.
+        Phần đầu file (style ASS, header WebVTT...) lấy từ source_file nếu có.
+        File được ghi nguyên tử qua file tạm; durability là chính sách fsync
+        (api_config["durability"]: "none", "file" hoặc "full").
+        """
+        with profiling.stage("write"):
+            header = read_header(source_file) if source_file else None
+            write_cues(output_file, subtitles, header, bilingual, durability)
 
-    def write_srt(
-        self, subtitles: List[Dict], output_file: str, bilingual: bool = False
+    def write_outputs(
+        self,
+        subtitles: List[Cue],
+        outputs: List[Dict],
+        source_file: Optional[str] = None,
+        durability: Optional[str] = None,
     ) -> None:
-        """Ghi phụ đề vào file SRT."""
-        with open(output_file, "w", encoding="utf-8") as file:
-            for subtitle in subtitles:
-                file.write(f"{subtitle['index']}\n")
-                file.write(f"{subtitle['start_time']} --> {subtitle['end_time']}\n")
+        """
+        Ghi nhiều file đầu ra từ cùng danh sách phụ đề trong một lượt, mỗi mục
+        {"path": ..., "layout": ...} (xem subtitle_formats.OUTPUT_LAYOUTS và
+        write_variants).
+        """
+        with profiling.stage("write"):
+            header = read_header(source_file) if source_file else None
+            write_variants(outputs, subtitles, header, durability)
 
-                if bilingual and "original_text" in subtitle:
-                    # Ghi cả phụ đề gốc và phụ đề đã dịch
-                    file.write(f"{subtitle['original_text']}\n{subtitle['text']}\n\n")
-                else:
-                    # Chỉ ghi phụ đề đã dịch
-                    file.write(f"{subtitle['text']}\n\n")
+    # Tên cũ, giữ cho các nơi gọi sẵn có
+    parse_srt = parse_subtitles
+    write_srt = write_subtitles
 
     def split_subtitles(
         self, subtitles: List[Dict], num_chunks: int
@@ -89,180 +232,228 @@ class SRTTranslator:
 
     def translate_subtitle_chunk(
         self,
-        chunk: List[Dict],
+        chunk: List[Cue],
         api_config: Dict,
         thread_id: int,
-        progress_file: str,
+        job_state: Optional[JobState],
         max_retries: int = float("inf"),
         batch_size: int = 10,
-    ) -> List[Dict]:
-        """Dịch một phần phụ đề, xử lý thành các lô nhỏ hơn."""
-        from translation_apis import TranslationAPI
-
-        total_batches = (len(chunk) + batch_size - 1) // batch_size
-        translated_chunk = []
-
-        # Kiểm tra tiến trình đã lưu
-        chunk_progress = []
-        chunk_progress_file = f"{progress_file}.chunk{thread_id}"
-        if os.path.exists(chunk_progress_file):
-            try:
-                with open(chunk_progress_file, "rb") as f:
-                    chunk_progress = pickle.load(f)
-                    self.update_status(
-                        f"Thread {thread_id}: Đã tải {len(chunk_progress)} phụ đề đã dịch từ tiến trình đã lưu"
-                    )
-            except Exception as e:
-                self.update_status(
-                    f"Thread {thread_id}: Lỗi khi tải file tiến trình: {str(e)}"
-                )
-
-        # Tìm vị trí để tiếp tục
-        completed_indices = {sub["index"] for sub in chunk_progress}
-        remaining_chunk = [
-            sub for sub in chunk if sub["index"] not in completed_indices
-        ]
-
-        if not remaining_chunk:
-            self.update_status(
-                f"Thread {thread_id}: Tất cả phụ đề trong phần này đã được dịch"
+        max_batch_tokens: Optional[int] = None,
+        generation: Optional[int] = None,
+    ) -> List[Cue]:
+        """
+        Dịch một phần phụ đề, xử lý thành các lô nhỏ hơn. Nếu thiết lập của
+        self.control đổi khác generation (lúc chia phần), dừng sau lô hiện tại
+        và chỉ trả về các phụ đề đã xử lý.
+        """
+        with profiling.thread_scope():
+            return self._translate_subtitle_chunk(
+                chunk,
+                api_config,
+                thread_id,
+                job_state,
+                max_retries,
+                batch_size,
+                max_batch_tokens,
+                generation,
             )
-            return chunk_progress
 
-        # Thêm phụ đề đã dịch vào kết quả
-        translated_chunk = chunk_progress.copy()
+    def _translate_subtitle_chunk(
+        self,
+        chunk: List[Cue],
+        api_config: Dict,
+        thread_id: int,
+        job_state: Optional[JobState],
+        max_retries: int,
+        batch_size: int,
+        max_batch_tokens: Optional[int],
+        generation: Optional[int] = None,
+    ) -> List[Cue]:
+        translated_chunk = []
 
         self.update_status(
-            f"Thread {thread_id}: Phụ đề còn lại cần dịch: {len(remaining_chunk)}/{len(chunk)}"
+            f"Thread {thread_id}: Phụ đề cần dịch: {len(chunk)}"
         )
 
-        # Tạo đối tượng API từ cấu hình
-        translation_api = TranslationAPI.create_api(api_config["type"], api_config)
+        # Lấy đối tượng API (dùng chung giữa các luồng)
+        translation_api = self.get_api(api_config)
 
-        for batch_idx in range(0, len(remaining_chunk), batch_size):
-            # Lấy một lô phụ đề
-            batch = remaining_chunk[batch_idx : batch_idx + batch_size]
-            current_batch = batch_idx // batch_size + 1
-            remaining_batches = (len(remaining_chunk) + batch_size - 1) // batch_size
+        batches = make_batches(chunk, batch_size, max_batch_tokens)
+        remaining_batches = len(batches)
+        for current_batch, batch in enumerate(batches, 1):
+            cancellation.check(self.cancel_token)
+            if self.control is not None:
+                self.control.wait_if_paused(self.cancel_token)
+                if generation is not None and self.control.generation != generation:
+                    # Thiết lập đã đổi: phần chưa dịch được chia lại
+                    # (xem translate_with_state)
+                    break
 
             self.update_status(
                 f"Thread {thread_id}: Đang dịch lô {current_batch}/{remaining_batches} ({len(batch)} phụ đề)"
             )
             self.update_progress(thread_id, current_batch, remaining_batches)
 
-            # Sử dụng API để dịch lô
+            # Sử dụng API để dịch lô (mỗi yêu cầu chờ tới lượt nếu có bộ lập lịch)
             translated_batch = translation_api.translate_batch(
-                batch, thread_id, self.update_status, max_retries
+                batch,
+                thread_id,
+                self.update_status,
+                max_retries,
+                self.usage,
+                self._cue_emitter(batch),
+                self.cancel_token,
+                self._batch_slot(batch),
             )
             translated_chunk.extend(translated_batch)
 
-            # Lưu tiến trình sau mỗi lô
-            try:
-                with open(chunk_progress_file, "wb") as f:
-                    pickle.dump(translated_chunk, f)
-                self.update_status(
-                    f"Thread {thread_id}: Đã lưu tiến trình ({len(translated_chunk)}/{len(chunk)} phụ đề)"
-                )
-            except Exception as e:
-                self.update_status(
-                    f"Thread {thread_id}: Lỗi khi lưu tiến trình: {str(e)}"
+            # Ghi nhật ký sau mỗi lô (chỉ những phụ đề đã thực sự được dịch,
+            # phụ đề lỗi sẽ được thử lại ở lần chạy sau); job_state None khi
+            # người gọi tự quyết định ghi gì (xem quality_pass)
+            if job_state is not None:
+                self._journal(
+                    job_state,
+                    [sub for sub in translated_batch if "original_text" in sub],
+                    thread_id,
                 )
 
             # Nghỉ một chút để tránh giới hạn tốc độ
-            time.sleep(1)
-
-        # Dọn dẹp file tiến trình khi phần này hoàn thành
-        if os.path.exists(chunk_progress_file):
-            try:
-                os.remove(chunk_progress_file)
-                self.update_status(
-                    f"Thread {thread_id}: Đã xóa file tiến trình (phần đã hoàn thành)"
-                )
-            except Exception as e:
-                self.update_status(
-                    f"Thread {thread_id}: Lỗi khi xóa file tiến trình: {str(e)}"
-                )
+            with profiling.stage("sleep"):
+                cancellation.sleep(BATCH_PAUSE_SECONDS, self.cancel_token)
 
         return translated_chunk
 
-    def save_global_progress(
-        self, all_translated: List[Dict], progress_file: str
+    def _journal(
+        self, job_state: JobState, cues: List[Cue], thread_id: Optional[int] = None
     ) -> None:
-        """Lưu tiến trình dịch toàn cục hiện tại."""
+        """Ghi các phụ đề đã dịch vào nhật ký; lỗi ghi chỉ được báo, không dừng việc dịch."""
         try:
-            with open(progress_file, "wb") as f:
-                pickle.dump(all_translated, f)
-            self.update_status(
-                f"Đã lưu tiến trình toàn cục ({len(all_translated)} phụ đề)"
-            )
+            job_state.append(cues)
         except Exception as e:
-            self.update_status(f"Lỗi khi lưu tiến trình toàn cục: {str(e)}")
+            prefix = f"Thread {thread_id}: " if thread_id is not None else ""
+            self.update_status(f"{prefix}Lỗi khi lưu tiến trình: {str(e)}")
 
-    def load_global_progress(self, progress_file: str) -> List[Dict]:
-        """Tải tiến trình dịch toàn cục."""
-        if os.path.exists(progress_file):
-            try:
-                with open(progress_file, "rb") as f:
-                    progress = pickle.load(f)
+    def _cue_emitter(self, batch: List[Cue]) -> Optional[Callable[[int, str], None]]:
+        """Chuyển (vị trí trong lô, bản dịch) từ API thành Cue cho self.on_cue."""
+        if self.on_cue is None:
+            return None
+
+        def emit(position: int, text: str) -> None:
+            if 0 <= position < len(batch):
+                cue = batch[position].copy()
+                cue["original_text"] = batch[position]["text"]
+                cue["text"] = text
+                self.on_cue(cue)
+
+        return emit
+
+    def _batch_slot(self, batch: List[Cue]):
+        """
+        Hàm xin chỗ gọi API cho một lô từ scheduler (chi phí = số token ước
+        tính), gọi lại cho mỗi lần gửi; None nếu không có scheduler.
+        """
+        if self.scheduler is None:
+            return None
+        cost = sum(estimate_tokens(sub["text"]) for sub in batch)
+        return functools.partial(
+            self.scheduler.slot, self.job_key, cost, self.cancel_token
+        )
+
+    def get_api(self, api_config: Dict):
+        """
+        Trả về đối tượng API cho cấu hình, tạo mới nếu chưa có. Đối tượng được
+        dùng chung giữa các luồng và các file để giữ kết nối HTTP.
+        """
+        from translation_apis import TranslationAPI
+
+        key = tuple(
+            sorted(
+                (k, v)
+                for k, v in api_config.items()
+                if isinstance(v, (str, int, float, bool, type(None)))
+            )
+        )
+        with self._api_cache_lock:
+            translation_api = self._api_cache.get(key)
+            if translation_api is None:
+                translation_api = TranslationAPI.create_api(
+                    api_config["type"], api_config
+                )
+                translation_api.rate_limiter = self.rate_limiter
+                self._api_cache[key] = translation_api
+        return translation_api
+
+    def concurrency_controller(self, api_config: Dict, num_threads: int):
+        """
+        Bộ điều chỉnh số yêu cầu đồng thời (AIMD) gắn với API của cấu hình,
+        hoặc None nếu không bật api_config["adaptive_concurrency"]. num_threads
+        là giới hạn ban đầu khi chưa nhớ giới hạn nào của nhà cung cấp.
+        """
+        if not api_config.get("adaptive_concurrency"):
+            return None
+        translation_api = self.get_api(api_config)
+        with self._api_cache_lock:
+            if translation_api.concurrency is None:
+                translation_api.concurrency = AIMDController(
+                    provider_key(api_config),
+                    num_threads,
+                    max_limit=api_config.get("max_concurrency", DEFAULT_MAX_CONCURRENCY),
+                    memory_path=api_config.get(
+                        "concurrency_memory", CONCURRENCY_MEMORY_PATH
+                    ),
+                )
+                controller = translation_api.concurrency
+                source = "đã lưu" if controller.remembered else "ban đầu"
                 self.update_status(
-                    f"Đã tải tiến trình toàn cục ({len(progress)} phụ đề)"
+                    f"Tự động điều chỉnh số yêu cầu đồng thời: {controller.limit} ({source}), "
+                    f"tối đa {controller.max_limit}"
                 )
-                return progress
-            except Exception as e:
-                self.update_status(f"Lỗi khi tải file tiến trình toàn cục: {str(e)}")
-        return []
+        return translation_api.concurrency
 
     def process_chunk_batch(
         self,
         api_config: Dict,
-        chunks: List[List[Dict]],
+        chunks: List[List[Cue]],
         max_workers: int,
-        progress_file: str,
+        job_state: Optional[JobState],
         batch_size: int = 10,
         max_retries: int = float("inf"),
-    ) -> List[Dict]:
-        """Xử lý nhiều phần đồng thời sử dụng ThreadPoolExecutor."""
-        all_translated = self.load_global_progress(progress_file)
-
-        # Nếu có tiến trình hoàn chỉnh, chỉ cần trả về nó
-        if all_translated:
-            total_subtitles = sum(len(chunk) for chunk in chunks)
-            if len(all_translated) >= total_subtitles:
-                self.update_status("Tất cả phụ đề đã được dịch")
-                return all_translated
-
-        # Theo dõi phần nào đã hoàn thành
-        completed_indices = {sub["index"] for sub in all_translated}
-        completed_chunks = []
-        remaining_chunks = []
-
-        for i, chunk in enumerate(chunks):
-            # Kiểm tra xem tất cả phụ đề trong phần này đã được dịch chưa
-            if all(sub["index"] in completed_indices for sub in chunk):
-                completed_chunks.append(i)
-            else:
-                remaining_chunks.append((i, chunk))
-
-        self.update_status(f"Phần đã hoàn thành: {len(completed_chunks)}/{len(chunks)}")
-        self.update_status(f"Phần còn lại: {len(remaining_chunks)}/{len(chunks)}")
+        max_batch_tokens: Optional[int] = None,
+        generation: Optional[int] = None,
+    ) -> List[Cue]:
+        """
+        Xử lý nhiều phần đồng thời sử dụng ThreadPoolExecutor.
+        Trả về các phụ đề của những phần này (đã dịch, hoặc bản gốc nếu lỗi),
+        sắp xếp theo chỉ số. Khi công việc bị huỷ, các phần chưa bắt đầu bị
+        bỏ khỏi hàng đợi, chờ các phần đang chạy dừng rồi ném
+        TranslationCancelled. Khi thiết lập đổi khác generation, các phần dừng
+        sau lô hiện tại và kết quả chỉ gồm các phụ đề đã xử lý.
+        """
+        all_translated = []
 
-        if not remaining_chunks:
-            return all_translated
+        if self.executor is not None:
+            executor_context = contextlib.nullcontext(self.executor)
+        else:
+            executor_context = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="chunk"
+            )
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with executor_context as executor:
             # Tạo danh sách để giữ kết quả tương lai
             future_to_chunk_idx = {}
 
-            # Gửi công việc dịch cho các phần còn lại
-            for i, chunk in remaining_chunks:
+            # Gửi công việc dịch cho các phần
+            for i, chunk in enumerate(chunks):
                 future = executor.submit(
                     self.translate_subtitle_chunk,
                     chunk,
                     api_config,
                     i + 1,  # Thread ID (bắt đầu từ 1)
-                    progress_file,
+                    job_state,
                     max_retries,
                     batch_size,
+                    max_batch_tokens,
+                    generation,
                 )
                 future_to_chunk_idx[future] = i
 
@@ -271,44 +462,249 @@ class SRTTranslator:
             total_futures = len(future_to_chunk_idx)
 
             # Xử lý kết quả khi hoàn thành
+            cancelled = None
             for future in concurrent.futures.as_completed(future_to_chunk_idx):
                 chunk_idx = future_to_chunk_idx[future]
                 completed_futures += 1
 
                 try:
-                    result = future.result()
+                    all_translated.extend(future.result())
                     self.update_status(
                         f"Phần {chunk_idx + 1} đã hoàn thành ({completed_futures}/{total_futures})"
                     )
 
-                    # Cập nhật all_translated với kết quả mới
-                    for sub in result:
-                        # Xóa bất kỳ phụ đề hiện có nào có cùng chỉ số
-                        all_translated = [
-                            s for s in all_translated if s["index"] != sub["index"]
-                        ]
-                        # Thêm phụ đề mới
-                        all_translated.append(sub)
-
-                    # Lưu tiến trình toàn cục sau khi mỗi phần hoàn thành
-                    self.save_global_progress(all_translated, progress_file)
+                except (TranslationCancelled, concurrent.futures.CancelledError) as e:
+                    if cancelled is None:
+                        cancelled = e
+                        # Bỏ các phần chưa bắt đầu (pool có thể dùng chung)
+                        for pending in future_to_chunk_idx:
+                            pending.cancel()
 
                 except Exception as e:
                     self.update_status(f"Phần {chunk_idx + 1} gặp ngoại lệ: {e}")
                     self.update_status(f"Chi tiết lỗi: {str(e)}")
                     # Trong trường hợp ngoại lệ không xử lý, vẫn thêm phụ đề gốc
-                    if chunk_idx < len(chunks):
-                        for sub in chunks[chunk_idx]:
-                            if not any(
-                                s["index"] == sub["index"] for s in all_translated
-                            ):
-                                all_translated.append(sub)
+                    all_translated.extend(chunks[chunk_idx])
+
+        if cancelled is not None:
+            cancellation.check(self.cancel_token)
+            raise TranslationCancelled(str(cancelled))
 
         # Sắp xếp theo chỉ số để đảm bảo thứ tự chính xác
         all_translated.sort(key=lambda x: x["index"])
-        self.save_global_progress(all_translated, progress_file)
         return all_translated
 
+    def open_job_state(self, input_files: List[str], api_config: Dict) -> JobState:
+        """
+        Mở trạng thái công việc cho (các) file đầu vào, khoá theo hash nội dung
+        và thiết lập dịch.
+        """
+        contents = []
+        for input_file in input_files:
+            with open(input_file, "rb") as f:
+                contents.append(f.read())
+        job_id = compute_job_id(contents, job_settings(api_config))
+        state_dir = self.state_dir or os.path.join(
+            os.path.dirname(os.path.abspath(input_files[0])), DEFAULT_STATE_DIRNAME
+        )
+        return JobState(state_dir, job_id)
+
+    def translate_with_state(
+        self,
+        subtitles: List[Cue],
+        api_config: Dict,
+        num_threads: int,
+        job_state: JobState,
+        batch_size: int = 10,
+        max_retries: int = float("inf"),
+        max_batch_tokens: Optional[int] = None,
+    ) -> List[Cue]:
+        """
+        Dịch danh sách phụ đề, bỏ qua những mục đã có trong nhật ký công việc.
+        Phần còn lại được chia đều cho num_threads luồng, bất kể lần chạy trước
+        dùng bao nhiêu luồng. Khi bật adaptive_concurrency, phần còn lại được
+        chia cho số luồng tối đa và bộ điều chỉnh AIMD quyết định bao nhiêu
+        luồng được gọi API cùng lúc. Nếu số luồng, kích thước lô hoặc model bị
+        đổi qua self.control trong lúc dịch, các luồng dừng sau lô hiện tại và
+        phần chưa dịch được chia lại theo thiết lập mới. Cuối cùng, các phụ đề
+        không qua kiểm tra chất lượng được dịch lại (xem quality_pass).
+        """
+        completed = job_state.load()
+        remaining = [sub for sub in subtitles if sub["index"] not in completed]
+        translated = [completed[sub["index"]] for sub in subtitles if sub["index"] in completed]
+        if translated:
+            self.update_status(
+                f"Đã tải {len(translated)} phụ đề đã dịch từ trạng thái công việc"
+            )
+
+        if remaining:
+            self.update_status(
+                f"Phụ đề còn lại cần dịch: {len(remaining)}/{len(subtitles)}"
+            )
+        else:
+            self.update_status("Tất cả phụ đề đã được dịch")
+
+        controllers = []
+        planned_threads = num_threads
+        try:
+            pending = remaining
+            while True:
+                # Thiết lập hiện hành (có thể đã bị đổi qua self.control)
+                generation, live_config, live_threads, live_batch_size = self.live_settings(
+                    api_config, num_threads, batch_size
+                )
+                controller = self.concurrency_controller(live_config, live_threads)
+                if controller is not None:
+                    if controller not in controllers:
+                        controllers.append(controller)
+                    elif live_threads != planned_threads:
+                        controller.set_limit(live_threads)
+                planned_threads = live_threads
+                workers = controller.max_limit if controller is not None else live_threads
+                if not pending:
+                    break
+
+                # Chia thành các phần
+                with profiling.stage("split"):
+                    chunks = self.split_subtitles(pending, workers)
+                self.update_status(f"Đã chia thành {len(chunks)} phần")
+
+                if pending is remaining:
+                    self.update_status("\nBắt đầu dịch...")
+                done = self.process_chunk_batch(
+                    live_config,
+                    chunks,
+                    workers,
+                    job_state,
+                    live_batch_size,
+                    max_retries,
+                    max_batch_tokens,
+                    generation,
+                )
+                translated.extend(done)
+                finished = {sub["index"] for sub in done}
+                pending = [sub for sub in pending if sub["index"] not in finished]
+                if pending:
+                    self.update_status(
+                        f"\nÁp dụng thiết lập mới, chia lại {len(pending)} phụ đề còn lại"
+                    )
+            translated = self.quality_pass(
+                subtitles, translated, live_config, workers, job_state, max_retries
+            )
+        finally:
+            job_state.close()
+            for controller in controllers:
+                # Nhớ giới hạn cuối cùng cho lần chạy sau với cùng nhà cung cấp
+                controller.save()
+            if controllers:
+                self.update_status(
+                    f"Số yêu cầu đồng thời khi kết thúc: {controllers[-1].limit}"
+                )
+
+        translated.sort(key=lambda x: x["index"])
+        return translated
+
+    def live_settings(
+        self, api_config: Dict, num_threads: int, batch_size: int
+    ) -> Tuple[Optional[int], Dict, int, int]:
+        """
+        (generation, api_config, num_threads, batch_size) hiện hành: giá trị
+        của lần gọi, ghi đè bởi self.control nếu có (generation = None khi
+        không có control).
+        """
+        if self.control is None:
+            return None, api_config, num_threads, batch_size
+        generation, settings = self.control.snapshot()
+        if "model" in settings:
+            api_config = dict(api_config, model=settings["model"])
+        return (
+            generation,
+            api_config,
+            settings.get("num_threads", num_threads),
+            settings.get("batch_size", batch_size),
+        )
+
+    def set_rate_limit(self, requests_per_minute: Optional[float]) -> None:
+        """
+        Đổi giới hạn số yêu cầu mỗi phút, có hiệu lực ngay với mọi API đã tạo
+        (kể cả yêu cầu đang chờ lượt). None hoặc 0 = bỏ giới hạn.
+        """
+        with self._api_cache_lock:
+            if not requests_per_minute:
+                if isinstance(self.rate_limiter, RateLimiter):
+                    self.rate_limiter.close()
+                self.rate_limiter = None
+            elif isinstance(self.rate_limiter, RateLimiter):
+                self.rate_limiter.set_rate(requests_per_minute)
+            else:
+                self.rate_limiter = RateLimiter(requests_per_minute)
+            for translation_api in self._api_cache.values():
+                translation_api.rate_limiter = self.rate_limiter
+
+    def quality_pass(
+        self,
+        subtitles: List[Cue],
+        translated: List[Cue],
+        api_config: Dict,
+        workers: int,
+        job_state: JobState,
+        max_retries: int = float("inf"),
+    ) -> List[Cue]:
+        """
+        Kiểm tra bản dịch theo luật (qa.py) và chỉ dịch lại các phụ đề lỗi,
+        theo lô nhỏ, tối đa api_config["qa"]["rounds"] vòng. Bản dịch lại chỉ
+        được dùng khi có ít lỗi hơn; phụ đề vẫn lỗi được đánh dấu
+        cue["qa_issues"]. Tắt bằng api_config["qa"] = False.
+        """
+        options = qa_options(api_config.get("qa"))
+        if options is None or not translated:
+            return translated
+        checker = QAChecker.from_options(
+            options, api_config.get("target_language") or "vi"
+        )
+        with profiling.stage("qa"):
+            issues = checker.find_issues(translated)
+        sources = {sub["index"]: sub for sub in subtitles}
+        by_index = {sub["index"]: sub for sub in translated}
+
+        for round_number in range(1, options["rounds"] + 1):
+            retry = [sources[index] for index in issues if index in sources]
+            if not retry:
+                break
+            self.update_status(
+                f"\nKiểm tra chất lượng: {len(retry)} phụ đề lỗi ({summarize_issues(issues)}), "
+                f"dịch lại theo lô {options['batch_size']} (vòng {round_number}/{options['rounds']})"
+            )
+            with profiling.stage("split"):
+                chunks = self.split_subtitles(
+                    retry, max(1, min(workers, len(retry) // options["batch_size"]))
+                )
+            # Bản dịch lại không ghi nhật ký ngay: chỉ những bản được giữ mới
+            # thay bản dịch cũ khi tiếp tục công việc
+            kept = []
+            for cue in self.process_chunk_batch(
+                api_config, chunks, workers, None, options["batch_size"], max_retries
+            ):
+                cue_issues = checker.check(cue)
+                if len(cue_issues) < len(issues[cue["index"]]):
+                    by_index[cue["index"]] = cue
+                    kept.append(cue)
+                    if cue_issues:
+                        issues[cue["index"]] = cue_issues
+                    else:
+                        del issues[cue["index"]]
+            self._journal(job_state, [cue for cue in kept if "original_text" in cue])
+
+        for index, cue_issues in issues.items():
+            by_index[index]["qa_issues"] = cue_issues
+        if issues:
+            self.update_status(
+                f"Cảnh báo: {len(issues)} phụ đề vẫn chưa đạt kiểm tra chất lượng ({summarize_issues(issues)})"
+            )
+        elif options["rounds"]:
+            self.update_status("Kiểm tra chất lượng: tất cả phụ đề đều đạt")
+        return sorted(by_index.values(), key=lambda x: x["index"])
+
     def create_backup(self, input_file: str) -> str:
         """Tạo bản sao lưu của file đầu vào nếu chưa tồn tại."""
         backup_file = input_file + ".backup"
@@ -319,23 +715,37 @@ class SRTTranslator:
             self.update_status(f"Đã tạo bản sao lưu tại: {backup_file}")
         return backup_file
 
-    def find_srt_files(self, directory: str) -> List[str]:
+    def find_subtitle_files(
+        self,
+        directory: str,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        output_suffixes: Tuple[str, ...] = (),
+        index: Optional[ScanIndex] = None,
+    ) -> List[str]:
         """
-        Tìm tất cả các file SRT trong một thư mục.
+        Tìm tất cả các file phụ đề đọc được (xem subtitle_formats) trong một
+        thư mục, quét song song bằng os.scandir (xem file_scanner.py).
 
         Args:
             directory: Đường dẫn thư mục cần quét
+            include, exclude: Glob đường dẫn tương đối cần lấy / bỏ qua
+            output_suffixes: Hậu tố của file đầu ra, không coi là file nguồn
+            index: Chỉ mục quét để lần sau chỉ liệt kê thư mục đã thay đổi
 
         Returns:
-            Danh sách đường dẫn đầy đủ đến các file SRT
+            Danh sách đường dẫn đầy đủ đến các file phụ đề
         """
-        srt_files = []
-        for root, _, files in os.walk(directory):
-            for file in files:
-                if file.lower().endswith(".srt"):
-                    srt_files.append(os.path.join(root, file))
+        scanner = SubtitleScanner(include, exclude, output_suffixes, index=index)
+        return scanner.scan(directory)
 
-        return srt_files
+    def find_srt_files(self, directory: str) -> List[str]:
+        """Tìm các file .srt trong một thư mục."""
+        return [
+            path
+            for path in self.find_subtitle_files(directory)
+            if path.lower().endswith(".srt")
+        ]
 
     def translate_directory(
         self,
@@ -346,27 +756,194 @@ class SRTTranslator:
         max_retries: int = float("inf"),
         bilingual: bool = False,
         file_suffix: str = "_vi",
+        pack_small_files: bool = False,
+        pack_max_cues: int = 40,
+        pack_token_budget: int = 2000,
+        num_processes: int = 1,
+        requests_per_minute: Optional[float] = None,
+        incremental: bool = False,
+        target_languages: Optional[List[str]] = None,
+        language_suffixes: Optional[Dict[str, str]] = None,
+        dry_run: bool = False,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        skip_up_to_date: Optional[str] = None,
+        scan_index: Optional[str] = None,
     ) -> Dict[str, bool]:
         """
         Dịch tất cả các file SRT trong một thư mục.
+
+        Tham số:
+            pack_small_files: Gộp các file ngắn (<= pack_max_cues phụ đề) vào
+                chung các yêu cầu API thay vì dịch từng file một
+            pack_max_cues: Ngưỡng số phụ đề để coi một file là ngắn
+            pack_token_budget: Ngân sách token đầu vào ước tính cho mỗi yêu cầu
+                khi đóng gói
+            num_processes: Số tiến trình làm việc; > 1 để chia file cho nhiều
+                tiến trình (xem sharding.py)
+            requests_per_minute: Giới hạn tốc độ toàn cục khi chạy đa tiến trình
+            incremental: Dùng lại bản dịch từ manifest (xem translate_file)
+            target_languages: Dịch mỗi file sang nhiều ngôn ngữ trong một lượt
+                (xem translate_file_multi); file_suffix, đóng gói và đa tiến
+                trình khi đó không được dùng
+            language_suffixes: Hậu tố file đầu ra theo ngôn ngữ
+                (mặc định "_<mã ngôn ngữ>")
+            dry_run: Chỉ in kế hoạch (số yêu cầu, token, thời gian, chi phí
+                ước tính, xem planner.py) mà không gọi API; trả về {}
+            include, exclude: Glob đường dẫn tương đối (so với directory) của
+                file cần dịch / file hoặc thư mục cần bỏ qua
+            skip_up_to_date: Bỏ qua file đã có bản dịch mới: "mtime" (file
+                đầu ra không cũ hơn file nguồn) hoặc "hash" (nội dung file
+                nguồn không đổi từ lần dịch trước, cần scan_index); None = dịch hết
+            scan_index: File chỉ mục quét (JSON); lần quét sau chỉ liệt kê lại
+                các thư mục đã thay đổi
+
+        File đầu ra (tên mang hậu tố file_suffix hoặc hậu tố ngôn ngữ) không
+        bao giờ được coi là file nguồn.
         """
-        srt_files = self.find_srt_files(directory)
+        if target_languages and len(target_languages) == 1:
+            api_config = dict(api_config, target_language=target_languages[0])
+            file_suffix = language_suffix(target_languages[0], language_suffixes)
+        multi = bool(target_languages) and len(target_languages) > 1
+        if multi:
+            suffixes = {
+                language: language_suffix(language, language_suffixes)
+                for language in target_languages
+            }
+        else:
+            suffixes = {None: file_suffix}
+
+        index = ScanIndex(scan_index) if scan_index else None
+        with profiling.stage("scan"):
+            srt_files = self.find_subtitle_files(
+                directory, include, exclude, tuple(suffixes.values()), index
+            )
+
+        if skip_up_to_date and srt_files:
+            fresh = [
+                f
+                for f in srt_files
+                if is_up_to_date(
+                    f,
+                    [self._output_path(f, suffix) for suffix in suffixes.values()],
+                    skip_up_to_date,
+                    index,
+                )
+            ]
+            if fresh:
+                self.update_status(f"Bỏ qua {len(fresh)} file đã có bản dịch mới")
+                fresh = set(fresh)
+                srt_files = [f for f in srt_files if f not in fresh]
 
         if not srt_files:
             self.update_status(
-                f"Không tìm thấy file SRT nào trong thư mục: {directory}"
+                f"Không tìm thấy file phụ đề nào cần dịch trong thư mục: {directory}"
             )
             return {}
 
         self.update_status(
-            f"Tìm thấy {len(srt_files)} file SRT trong thư mục: {directory}"
+            f"Tìm thấy {len(srt_files)} file phụ đề trong thư mục: {directory}"
         )
 
         results = {}
+
+        if dry_run:
+            from planner import plan_translation
+
+            plan = plan_translation(
+                self,
+                [(f, self._output_path(f, file_suffix)) for f in srt_files],
+                api_config,
+                num_threads,
+                batch_size,
+                pack_small_files,
+                pack_max_cues,
+                pack_token_budget,
+                num_processes,
+                requests_per_minute,
+                incremental,
+                target_languages,
+            )
+            for line in plan.summary_lines():
+                self.update_status(line)
+            return results
+
+        if multi:
+            for i, input_file in enumerate(srt_files):
+                if self.cancelled:
+                    break
+                self.update_status(
+                    f"\n[{i+1}/{len(srt_files)}] Đang dịch: {os.path.basename(input_file)}"
+                )
+                outputs = {
+                    language: self._output_path(
+                        input_file, language_suffix(language, language_suffixes)
+                    )
+                    for language in target_languages
+                }
+                results[input_file] = all(
+                    self.translate_file_multi(
+                        input_file,
+                        outputs,
+                        api_config,
+                        num_threads,
+                        batch_size,
+                        max_retries,
+                        bilingual,
+                    ).values()
+                )
+            srt_files = []
+
+        if pack_small_files and not self.cancelled:
+            small_files = []
+            for input_file in srt_files:
+                subtitles = self.parse_subtitles(input_file)
+                if len(subtitles) <= pack_max_cues:
+                    small_files.append(
+                        (
+                            input_file,
+                            self._output_path(input_file, file_suffix),
+                            subtitles,
+                        )
+                    )
+
+            if len(small_files) > 1:
+                results.update(
+                    self.translate_packed_files(
+                        small_files,
+                        api_config,
+                        num_threads,
+                        max_retries,
+                        bilingual,
+                        pack_token_budget,
+                    )
+                )
+                srt_files = [f for f in srt_files if f not in results]
+
+        if num_processes > 1 and len(srt_files) > 1 and not self.cancelled:
+            from sharding import translate_sharded
+
+            results.update(
+                translate_sharded(
+                    self,
+                    [(f, self._output_path(f, file_suffix)) for f in srt_files],
+                    api_config,
+                    num_processes,
+                    num_threads,
+                    batch_size,
+                    max_retries,
+                    bilingual,
+                    requests_per_minute,
+                    incremental=incremental,
+                )
+            )
+            srt_files = []
+
         for i, input_file in enumerate(srt_files):
+            if self.cancelled:
+                break
             # Tạo tên file đầu ra
-            file_name, file_ext = os.path.splitext(input_file)
-            output_file = f"{file_name}{file_suffix}{file_ext}"
+            output_file = self._output_path(input_file, file_suffix)
 
             self.update_status(
                 f"\n[{i+1}/{len(srt_files)}] Đang dịch: {os.path.basename(input_file)}"
@@ -383,6 +960,7 @@ class SRTTranslator:
                 batch_size,
                 max_retries,
                 bilingual,
+                incremental=incremental,
             )
 
             results[input_file] = success
@@ -392,12 +970,118 @@ class SRTTranslator:
             else:
                 self.update_status(f"Dịch thất bại: {os.path.basename(input_file)}")
 
+        if index is not None:
+            # Ghi hash file nguồn đã dịch xong cho skip_up_to_date="hash"
+            for input_file, success in results.items():
+                if success:
+                    index.mark_translated(input_file)
+            index.save()
+
+        if self.cancelled:
+            self.update_status(
+                f"Đã dừng: {len(results)} file đã xử lý, các file còn lại chưa được dịch"
+            )
+
         # Tổng kết
         successful = sum(1 for success in results.values() if success)
         self.update_status(
-            f"\nĐã hoàn thành dịch {successful}/{len(srt_files)} file SRT"
+            f"\nĐã hoàn thành dịch {successful}/{len(results)} file SRT"
+        )
+
+        return results
+
+    def _output_path(self, input_file: str, file_suffix: str) -> str:
+        """Tạo tên file đầu ra từ file đầu vào và hậu tố."""
+        file_name, file_ext = os.path.splitext(input_file)
+        return f"{file_name}{file_suffix}{file_ext}"
+
+    def translate_packed_files(
+        self,
+        files: List[Tuple[str, str, List[Dict]]],
+        api_config: Dict,
+        num_threads: int,
+        max_retries: int = float("inf"),
+        bilingual: bool = False,
+        token_budget: int = 2000,
+    ) -> Dict[str, bool]:
+        """
+        Dịch nhiều file ngắn trong chung các yêu cầu API.
+
+        Phụ đề của mọi file được nối thành một luồng duy nhất với chỉ số toàn cục
+        (giữ file_id và chỉ số gốc trên từng mục), chia lô theo ngân sách token,
+        rồi tách kết quả về từng file đầu ra.
+
+        Tham số:
+            files: Danh sách (file đầu vào, file đầu ra, phụ đề đã phân tích)
+
+        Trả về:
+            {file đầu vào: True/False}
+        """
+        packed = []
+        for file_id, (input_file, _, subtitles) in enumerate(files):
+            self.create_backup(input_file)
+            for subtitle in subtitles:
+                cue = subtitle.copy()
+                cue["file_id"] = file_id
+                cue["file_index"] = subtitle["index"]
+                cue["index"] = len(packed) + 1
+                packed.append(cue)
+
+        num_requests = len(make_batches(packed, PACKED_MAX_BATCH_CUES, token_budget))
+        self.update_status(
+            f"\nĐóng gói {len(files)} file ngắn ({len(packed)} phụ đề) vào khoảng {num_requests} yêu cầu API"
         )
 
+        job_state = self.open_job_state([f[0] for f in files], api_config)
+        try:
+            translated = self.translate_with_state(
+                packed,
+                api_config,
+                num_threads,
+                job_state,
+                PACKED_MAX_BATCH_CUES,
+                max_retries,
+                token_budget,
+            )
+        except TranslationCancelled:
+            self.report_cancelled()
+            return {input_file: False for input_file, _, _ in files}
+        except Exception as e:
+            self.update_status(f"\nLỗi khi dịch gói file ngắn: {str(e)}")
+            return {input_file: False for input_file, _, _ in files}
+
+        # Tách kết quả về từng file
+        per_file = [[] for _ in files]
+        for cue in translated:
+            cue = cue.copy()
+            file_id = cue.pop("file_id")
+            cue["index"] = cue.pop("file_index")
+            per_file[file_id].append(cue)
+
+        results = {}
+        for (input_file, output_file, _), subtitles in zip(files, per_file):
+            try:
+                self.write_subtitles(
+                    subtitles,
+                    output_file,
+                    bilingual,
+                    input_file,
+                    api_config.get("durability"),
+                )
+                results[input_file] = True
+                self.update_status(f"Hoàn thành dịch: {os.path.basename(input_file)}")
+            except Exception as e:
+                results[input_file] = False
+                self.update_status(
+                    f"Lỗi khi ghi {os.path.basename(output_file)}: {str(e)}"
+                )
+
+        if all(results.values()):
+            try:
+                job_state.discard()
+            except Exception as e:
+                self.update_status(f"Lỗi khi xóa file tiến trình: {str(e)}")
+
         return results
 
     def translate_file(
@@ -409,50 +1093,142 @@ class SRTTranslator:
         batch_size: int = 10,
         max_retries: int = float("inf"),
         bilingual: bool = False,
+        profile: Optional[str] = None,
+        profile_output: Optional[str] = None,
+        incremental: bool = False,
+        retime: Optional[Dict] = None,
+        outputs: Optional[List[Dict]] = None,
     ) -> bool:
         """
         Phương thức chính để dịch một file SRT.
 
+        Tham số:
+            outputs: Các file đầu ra bổ sung, ghi cùng output_file trong một
+                lượt từ cùng bản dịch; mỗi mục {"path": ..., "layout": ...}
+                với layout "translated", "stacked" (song ngữ xếp chồng) hoặc
+                "small_original" (ASS: phụ đề gốc chữ nhỏ dưới bản dịch)
+            incremental: Dùng lại bản dịch từ manifest của lần chạy trước
+                ("{output_file}.manifest.json"); chỉ phụ đề mới hoặc đã đổi
+                nội dung được gửi tới API, phụ đề chỉ đổi thời gian được cập
+                nhật mà không gọi API
+            profile: Bật đo hiệu năng theo giai đoạn ("stages", "cprofile"
+                hoặc "sample"); None để tắt
+            profile_output: Tiền tố file kết quả profile
+                (mặc định: "{output_file}.profile")
+            retime: Chỉnh thời gian bản dịch trước khi ghi (dời, đổi fps,
+                kéo dài theo tốc độ đọc...), xem timestamps.retime_cues;
+                None để giữ nguyên
+
         Trả về:
             True nếu dịch hoàn thành thành công, False nếu không
         """
+        if profile:
+            return self._run_profiled(
+                profile,
+                profile_output or f"{output_file}.profile",
+                lambda translator: translator.translate_file(
+                    input_file,
+                    output_file,
+                    api_config,
+                    num_threads,
+                    batch_size,
+                    max_retries,
+                    bilingual,
+                    incremental=incremental,
+                    retime=retime,
+                    outputs=outputs,
+                ),
+            )
+
+        usage_before = self.usage.snapshot()
         try:
-            # Thiết lập file tiến trình
-            progress_file = f"{output_file}.progress"
+            # Kiểm tra các file đầu ra trước khi gọi API
+            outputs = [
+                {"path": output_file, "layout": "stacked" if bilingual else "translated"}
+            ] + list(outputs or [])
+            for output in outputs:
+                output_spec(output)
+
+            # Trạng thái công việc, khoá theo nội dung đầu vào + thiết lập dịch
+            job_state = self.open_job_state([input_file], api_config)
+            legacy = job_state.import_legacy_progress(f"{output_file}.progress")
+            if legacy:
+                self.update_status(
+                    f"Đã chuyển {legacy} phụ đề từ file tiến trình cũ"
+                )
 
             # Tạo bản sao lưu
-            self.create_backup(input_file)
+            with profiling.stage("backup"):
+                self.create_backup(input_file)
 
-            # Phân tích file SRT
-            self.update_status("Đang phân tích file SRT...")
-            subtitles = self.parse_srt(input_file)
+            # Phân tích file phụ đề
+            self.update_status("Đang phân tích file phụ đề...")
+            subtitles = self.parse_subtitles(input_file)
             self.update_status(f"Tìm thấy {len(subtitles)} mục phụ đề")
 
-            # Chia thành các phần
-            chunks = self.split_subtitles(subtitles, num_threads)
-            self.update_status(f"Đã chia thành {len(chunks)} phần")
+            # Dùng lại bản dịch của lần chạy trước nếu nội dung không đổi
+            reused = []
+            if incremental:
+                manifest_file = TranslationManifest.path_for(output_file)
+                reused, subtitles = self.reuse_from_manifest(
+                    subtitles, TranslationManifest.load(manifest_file)
+                )
 
-            # Dịch
-            self.update_status("\nBắt đầu dịch...")
             start_time = time.time()
+            translated_subtitles = []
+            if subtitles:
+                translated_subtitles = self.translate_with_state(
+                    subtitles,
+                    api_config,
+                    num_threads,
+                    job_state,
+                    batch_size,
+                    max_retries,
+                )
+
+            if reused:
+                translated_subtitles = sorted(
+                    reused + translated_subtitles, key=lambda x: x["index"]
+                )
+
+            self.report_glossary_violations(translated_subtitles)
+
+            if retime:
+                with profiling.stage("retime"):
+                    translated_subtitles = retime_cues(translated_subtitles, retime)
 
-            translated_subtitles = self.process_chunk_batch(
-                api_config, chunks, num_threads, progress_file, batch_size, max_retries
+            # Ghi file đã dịch (cùng phần đầu file với file nguồn) và các
+            # file đầu ra bổ sung trong một lượt
+            self.write_outputs(
+                translated_subtitles,
+                outputs,
+                input_file,
+                api_config.get("durability"),
             )
 
-            # Ghi file SRT đã dịch
-            self.write_srt(translated_subtitles, output_file, bilingual)
+            if incremental:
+                try:
+                    TranslationManifest().save(manifest_file, translated_subtitles)
+                except Exception as e:
+                    self.update_status(f"Lỗi khi lưu manifest: {str(e)}")
 
             end_time = time.time()
             self.update_status(
                 f"\nDịch hoàn thành trong {end_time - start_time:.2f} giây"
             )
+            usage = UsageStats.since(self.usage.snapshot(), usage_before)
+            if usage["requests"]:
+                self.update_status(f"Token: {UsageStats.format(usage)}")
             self.update_status(f"File đã dịch được lưu tại: {output_file}")
+            for output in outputs[1:]:
+                self.update_status(
+                    f"File đầu ra ({output.get('layout') or 'translated'}): {output['path']}"
+                )
 
-            # Dọn dẹp file tiến trình khi hoàn thành thành công
-            if os.path.exists(progress_file):
+            # Dọn dẹp trạng thái công việc khi hoàn thành thành công
+            if os.path.exists(job_state.path):
                 try:
-                    os.remove(progress_file)
+                    job_state.discard()
                     self.update_status(
                         "Đã xóa file tiến trình (dịch hoàn thành thành công)"
                     )
@@ -461,6 +1237,10 @@ class SRTTranslator:
 
             return True
 
+        except TranslationCancelled:
+            self.report_cancelled()
+            return False
+
         except Exception as e:
             self.update_status(f"\nLỗi trong quá trình dịch: {str(e)}")
             self.update_status("Dịch thất bại. Vui lòng kiểm tra thông báo lỗi ở trên.")
@@ -468,3 +1248,184 @@ class SRTTranslator:
                 "Tiến trình đã được lưu. Bạn có thể thử lại để tiếp tục dịch."
             )
             return False
+
+    def translate_file_multi(
+        self,
+        input_file: str,
+        outputs: Dict[str, str],
+        api_config: Dict,
+        num_threads: int,
+        batch_size: int = 10,
+        max_retries: int = float("inf"),
+        bilingual: bool = False,
+    ) -> Dict[str, bool]:
+        """
+        Dịch một file sang nhiều ngôn ngữ trong một lượt.
+
+        File chỉ được phân tích một lần; mỗi ngôn ngữ là một luồng lô riêng
+        (prompt theo api_config["target_language"]) nhưng mọi ngôn ngữ dùng
+        chung một nhật ký công việc: phụ đề của ngôn ngữ thứ k mang chỉ số
+        toàn cục k * len(phụ đề) + vị trí, giống cách translate_packed_files
+        đóng gói nhiều file. Dừng giữa chừng rồi chạy lại sẽ tiếp tục cả các
+        ngôn ngữ đã xong lẫn ngôn ngữ đang dịch dở.
+
+        Tham số:
+            outputs: {mã ngôn ngữ đích: file đầu ra}, theo thứ tự dịch
+
+        Trả về:
+            {mã ngôn ngữ: True/False}
+        """
+        languages = list(outputs)
+        results = {language: False for language in languages}
+        try:
+            job_state = self.open_job_state(
+                [input_file], dict(api_config, target_language=",".join(languages))
+            )
+            with profiling.stage("backup"):
+                self.create_backup(input_file)
+
+            self.update_status("Đang phân tích file phụ đề...")
+            subtitles = self.parse_subtitles(input_file)
+            self.update_status(
+                f"Tìm thấy {len(subtitles)} mục phụ đề, dịch sang {len(languages)} ngôn ngữ: {', '.join(languages)}"
+            )
+        except Exception as e:
+            self.update_status(f"\nLỗi trong quá trình dịch: {str(e)}")
+            return results
+
+        start_time = time.time()
+        for k, language in enumerate(languages):
+            self.update_status(f"\n===== Ngôn ngữ đích: {language} =====")
+            stream = []
+            for position, subtitle in enumerate(subtitles):
+                cue = subtitle.copy()
+                cue["file_index"] = subtitle["index"]
+                cue["index"] = k * len(subtitles) + position + 1
+                stream.append(cue)
+            try:
+                translated = self.translate_with_state(
+                    stream,
+                    dict(api_config, target_language=language),
+                    num_threads,
+                    job_state,
+                    batch_size,
+                    max_retries,
+                )
+                for cue in translated:
+                    cue["index"] = cue.pop("file_index")
+                self.report_glossary_violations(translated)
+                self.write_subtitles(
+                    translated,
+                    outputs[language],
+                    bilingual,
+                    input_file,
+                    api_config.get("durability"),
+                )
+                results[language] = True
+                self.update_status(f"File đã dịch được lưu tại: {outputs[language]}")
+            except TranslationCancelled:
+                self.report_cancelled()
+                break
+            except Exception as e:
+                self.update_status(f"\nLỗi khi dịch sang {language}: {str(e)}")
+                self.update_status(
+                    "Tiến trình đã được lưu. Bạn có thể thử lại để tiếp tục dịch."
+                )
+
+        self.update_status(
+            f"\nDịch {sum(results.values())}/{len(languages)} ngôn ngữ trong {time.time() - start_time:.2f} giây"
+        )
+        if all(results.values()) and os.path.exists(job_state.path):
+            try:
+                job_state.discard()
+            except Exception as e:
+                self.update_status(f"Lỗi khi xóa file tiến trình: {str(e)}")
+        return results
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_token is not None and self.cancel_token.cancelled
+
+    def report_cancelled(self) -> None:
+        self.update_status("\nĐã dừng dịch theo yêu cầu.")
+        self.update_status(
+            "Tiến trình đã được lưu. Bạn có thể dịch lại để tiếp tục từ chỗ đã dừng."
+        )
+
+    def report_glossary_violations(self, subtitles: List[Cue]) -> int:
+        """Báo số phụ đề chưa dùng đúng bảng thuật ngữ (xem glossary.py)."""
+        flagged = sum(1 for sub in subtitles if "glossary_violations" in sub)
+        if flagged:
+            self.update_status(
+                f"Cảnh báo: {flagged} phụ đề chưa dùng đúng bảng thuật ngữ"
+            )
+        return flagged
+
+    def reuse_from_manifest(
+        self, subtitles: List[Cue], manifest: TranslationManifest
+    ) -> Tuple[List[Cue], List[Cue]]:
+        """
+        Tách phụ đề thành (đã có bản dịch trong manifest, cần dịch).
+        Phụ đề dùng lại giữ thời gian và chỉ số của file nguồn hiện tại.
+        """
+        reused = []
+        pending = []
+        for subtitle in subtitles:
+            translation = manifest.lookup(subtitle["text"])
+            if translation is None:
+                pending.append(subtitle)
+                continue
+            translated = subtitle.copy()
+            translated["original_text"] = subtitle["text"]
+            translated["text"] = translation
+            reused.append(translated)
+
+        if reused:
+            self.update_status(
+                f"Dùng lại {len(reused)} bản dịch từ manifest, cần dịch {len(pending)} phụ đề"
+            )
+        return reused, pending
+
+    def _run_profiled(
+        self, mode: str, prefix: str, run: Callable[["SRTTranslator"], bool]
+    ) -> bool:
+        """
+        Bật profiler rồi gọi run với một bản sao (with_callbacks) có callback
+        trạng thái/tiến trình được đo thời gian; self không bị thay đổi nên
+        các công việc khác dùng chung translator không bị ảnh hưởng. Lỗi khi
+        bật profiler (chế độ sai, phiên profile khác đang chạy) được báo như
+        lỗi dịch.
+        """
+        try:
+            profiler = profiling.JobProfiler(mode).start()
+        except (RuntimeError, ValueError) as e:
+            self.update_status(f"\nLỗi khi bật profile: {str(e)}")
+            self.update_status("Dịch thất bại. Vui lòng kiểm tra thông báo lỗi ở trên.")
+            return False
+
+        status_callback = self.update_status
+        progress_callback = self.update_progress
+
+        def timed_status(msg):
+            with profiling.stage("status"):
+                status_callback(msg)
+
+        def timed_progress(thread_id, current, total):
+            with profiling.stage("progress_ui"):
+                progress_callback(thread_id, current, total)
+
+        try:
+            return run(self.with_callbacks(timed_status, timed_progress))
+        finally:
+            self._finish_profiler(profiler, prefix)
+
+    def _finish_profiler(self, profiler: profiling.JobProfiler, prefix: str) -> None:
+        """Dừng profiler và ghi bảng tóm tắt."""
+        profiler.stop()
+        self.update_status("\n===== PROFILE THEO GIAI ĐOẠN =====")
+        self.update_status(profiler.summary_table())
+        try:
+            for path in profiler.dump(prefix):
+                self.update_status(f"Đã ghi kết quả profile: {path}")
+        except Exception as e:
+            self.update_status(f"Lỗi khi ghi kết quả profile: {str(e)}")
@@ -0,0 +1,157 @@
+# stream_parser.py
+"""
+Phân tích phản hồi dạng streaming theo định dạng [n].
+
+Văn bản được đưa vào từng đoạn nhỏ; mỗi phụ đề được trả ra ngay khi khối [n]
+của nó đóng lại (gặp dấu [n+1] hoặc hết phản hồi). Trong lúc đọc, bộ phân
+tích phát hiện phản hồi "lệch hướng" để huỷ yêu cầu sớm:
+
+- Đánh số sai: lặp lại/lùi số, hoặc vượt quá số phụ đề trong lô (phát
+  hiện ngay khi gặp dấu [n]).
+- Sai ngôn ngữ: quá nửa số phụ đề của lô không có ký tự của ngôn ngữ đích
+  (tiếng Việt, tiếng Thái) hoặc giống hệt câu gốc. Chỉ xét khi đã nhận đủ
+  phản hồi (close()), vì lời bài hát, biển hiệu hay danh đề giữ nguyên tiếng
+  Anh có thể đứng liền nhau trong một bản dịch đúng.
+"""
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Dấu [n] ở đầu dòng (hoặc đầu phản hồi)
+_MARKER = re.compile(r"(?:^|\n)[ \t]*\[(\d+)\]")
+
+# Ký tự chỉ có trong tiếng Việt (chữ cái có dấu và đ)
+VIETNAMESE_CHARS = frozenset(
+    "ăâđêôơư"
+    "àáảãạằắẳẵặầấẩẫậèéẻẽẹềếểễệìíỉĩịòóỏõọồốổỗộờớởỡợùúủũụừứửữựỳýỷỹỵ"
+)
+
+
+
+def _is_thai(c: str) -> bool:
+    return "\u0e00" <= c <= "\u0e7f"
+
+
+# Cách nhận ra chữ cái của từng ngôn ngữ đích. Ngôn ngữ không có ở đây (ví dụ
+# tiếng Indonesia, chỉ dùng chữ Latin không dấu) chỉ được kiểm tra trùng câu gốc.
+TARGET_SCRIPTS: Dict[str, Callable[[str], bool]] = {
+    "vi": VIETNAMESE_CHARS.__contains__,
+    "th": _is_thai,
+}
+
+# Bản dịch có ít nhất chừng này chữ cái mới được xét ngôn ngữ
+MIN_LETTERS_FOR_LANGUAGE_CHECK = 12
+# Số bản dịch đáng ngờ tối thiểu trước khi coi là lệch hướng
+MIN_SUSPICIOUS_CUES = 3
+
+
+class StreamDerailed(Exception):
+    """Phản hồi streaming lệch hướng; thông điệp mô tả lý do."""
+
+
+def looks_untranslated(
+    text: str, source: Optional[str] = None, target_language: str = "vi"
+) -> bool:
+    """
+    True nếu bản dịch đủ dài mà không có ký tự của ngôn ngữ đích, hoặc giống
+    câu gốc.
+    """
+    if source is not None and " ".join(text.split()) == " ".join(source.split()):
+        return sum(c.isalpha() for c in text) >= MIN_LETTERS_FOR_LANGUAGE_CHECK
+    in_script = TARGET_SCRIPTS.get(target_language)
+    if in_script is None:
+        return False
+    letters = [c for c in text.lower() if c.isalpha()]
+    if len(letters) < MIN_LETTERS_FOR_LANGUAGE_CHECK:
+        return False
+    return not any(in_script(c) for c in letters)
+
+
+class StreamingCueParser:
+    """Bộ phân tích [n] tăng dần cho một lô phụ đề."""
+
+    def __init__(
+        self,
+        expected: int,
+        sources: Optional[List[str]] = None,
+        target_language: str = "vi",
+    ):
+        """
+        Tham số:
+            expected: Số phụ đề trong lô
+            sources: Văn bản gốc của từng phụ đề (để phát hiện trả về nguyên văn)
+            target_language: Mã ngôn ngữ đích (xem TARGET_SCRIPTS)
+        """
+        self.expected = expected
+        self.sources = sources
+        self.target_language = target_language
+        self._buffer = ""
+        self._scan_from = 0
+        # (số thứ tự, vị trí bắt đầu nội dung) của khối đang mở
+        self._open: Optional[Tuple[int, int]] = None
+        self._last_number = 0
+        self.emitted = 0
+        self.suspicious = 0
+
+    def feed(self, chunk: str) -> List[Tuple[int, str]]:
+        """
+        Thêm một đoạn phản hồi, trả về các phụ đề (n, bản dịch) vừa hoàn tất.
+        Ném StreamDerailed nếu phản hồi lệch hướng.
+        """
+        self._buffer += chunk
+        completed = []
+        # Lùi lại một chút để bắt dấu [n] bị cắt giữa hai đoạn
+        for match in _MARKER.finditer(self._buffer, max(0, self._scan_from - 8)):
+            if self._open is not None and match.start() < self._open[1]:
+                continue
+            number = int(match.group(1))
+            if self._open is not None:
+                completed.append(self._close(match.start()))
+            self._check_number(number)
+            self._open = (number, match.end())
+            self._last_number = number
+        self._scan_from = len(self._buffer)
+        return completed
+
+    def close(self) -> List[Tuple[int, str]]:
+        """
+        Kết thúc phản hồi: trả về phụ đề cuối cùng còn đang mở. Ném
+        StreamDerailed nếu quá nửa số phụ đề của lô sai ngôn ngữ đích.
+        """
+        completed = []
+        if self._open is not None:
+            completed.append(self._close(len(self._buffer)))
+        if (
+            self.suspicious >= MIN_SUSPICIOUS_CUES
+            and self.suspicious * 2 > self.expected
+        ):
+            raise StreamDerailed(
+                f"{self.suspicious}/{self.expected} bản dịch sai ngôn ngữ đích"
+            )
+        return completed
+
+    @property
+    def text(self) -> str:
+        """Toàn bộ văn bản đã nhận."""
+        return self._buffer
+
+    def _close(self, end: int) -> Tuple[int, str]:
+        number, start = self._open
+        self._open = None
+        text = self._buffer[start:end].strip()
+        self.emitted += 1
+        source = None
+        if self.sources and 1 <= number <= len(self.sources):
+            source = self.sources[number - 1]
+        if looks_untranslated(text, source, self.target_language):
+            self.suspicious += 1
+        return number, text
+
+    def _check_number(self, number: int) -> None:
+        if number <= self._last_number:
+            raise StreamDerailed(
+                f"đánh số sai: [{number}] sau [{self._last_number}]"
+            )
+        if number > self.expected:
+            raise StreamDerailed(
+                f"đánh số sai: [{number}] vượt quá {self.expected} phụ đề"
+            )
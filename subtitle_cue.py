@@ -0,0 +1,200 @@
+# subtitle_cue.py
+"""
+Kiểu dữ liệu gọn nhẹ cho một mục phụ đề.
+
+Cue dùng __slots__, lưu thời gian dưới dạng số nguyên mili giây và intern
+văn bản. Cue vẫn hỗ trợ truy cập kiểu dict (cue["text"], cue["start_time"],
+"original_text" in cue, cue.copy()...) để phần còn lại của pipeline và các
+file tiến trình cũ (danh sách dict) vẫn dùng được.
+"""
+import sys
+from typing import Any, Dict, Iterator, Optional
+
+
+def parse_timestamp(timestamp: str) -> int:
+    """Chuyển "HH:MM:SS,mmm" thành số mili giây."""
+    hours, minutes, rest = timestamp.split(":")
+    seconds, millis = rest.replace(".", ",").split(",")
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(millis)
+
+
+def format_timestamp(ms: int) -> str:
+    """Chuyển số mili giây thành "HH:MM:SS,mmm"."""
+    seconds, millis = divmod(int(ms), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{millis:03d}"
+
+
+class Cue:
+    """
+    Một mục phụ đề.
+
+    Thuộc tính:
+        index: Số thứ tự trong file
+        start_ms, end_ms: Thời gian bắt đầu/kết thúc (mili giây)
+        text: Nội dung (đã dịch nếu đã qua API)
+        original_text: Nội dung gốc trước khi dịch (None nếu chưa dịch)
+        extra: Các trường phụ (ví dụ file_id khi đóng gói), None nếu không có
+    """
+
+    __slots__ = ("index", "start_ms", "end_ms", "text", "original_text", "extra")
+
+    _FIELDS = ("index", "start_ms", "end_ms", "text", "original_text")
+
+    def __init__(
+        self,
+        index: int,
+        start_ms: int,
+        end_ms: int,
+        text: str,
+        original_text: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None,
+    ):
+        self.index = index
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.text = sys.intern(text)
+        self.original_text = (
+            sys.intern(original_text) if original_text is not None else None
+        )
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Cue":
+        """Tạo Cue từ dạng dict cũ ({"index", "start_time", "end_time", "text", ...})."""
+        extra = {
+            k: v
+            for k, v in data.items()
+            if k
+            not in ("index", "start_time", "end_time", "start_ms", "end_ms", "text", "original_text")
+        }
+        start = data["start_ms"] if "start_ms" in data else parse_timestamp(data["start_time"])
+        end = data["end_ms"] if "end_ms" in data else parse_timestamp(data["end_time"])
+        return cls(
+            int(data["index"]),
+            start,
+            end,
+            data["text"],
+            data.get("original_text"),
+            extra,
+        )
+
+    @classmethod
+    def coerce(cls, item: Any) -> "Cue":
+        """Trả về item nếu đã là Cue, ngược lại chuyển từ dict."""
+        return item if isinstance(item, cls) else cls.from_dict(item)
+
+    @property
+    def start_time(self) -> str:
+        return format_timestamp(self.start_ms)
+
+    @property
+    def end_time(self) -> str:
+        return format_timestamp(self.end_ms)
+
+    # ---- Giao diện kiểu dict ----
+
+    def __getitem__(self, key: str) -> Any:
+        if key in Cue._FIELDS:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return value
+        if key == "start_time":
+            return self.start_time
+        if key == "end_time":
+            return self.end_time
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key == "start_time":
+            self.start_ms = parse_timestamp(value)
+        elif key == "end_time":
+            self.end_ms = parse_timestamp(value)
+        elif key in ("text", "original_text"):
+            setattr(self, key, sys.intern(value) if value is not None else None)
+        elif key in Cue._FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        if key in ("start_time", "end_time", "index", "start_ms", "end_ms", "text"):
+            return True
+        if key == "original_text":
+            return self.original_text is not None
+        return self.extra is not None and key in self.extra
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key: str, *default: Any) -> Any:
+        """Xoá và trả về một trường phụ (chỉ áp dụng cho extra và original_text)."""
+        if key == "original_text" and self.original_text is not None:
+            value, self.original_text = self.original_text, None
+            return value
+        if self.extra is not None and key in self.extra:
+            value = self.extra.pop(key)
+            if not self.extra:
+                self.extra = None
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def keys(self) -> Iterator[str]:
+        yield from ("index", "start_time", "end_time", "text")
+        if self.original_text is not None:
+            yield "original_text"
+        if self.extra is not None:
+            yield from self.extra
+
+    def copy(self) -> "Cue":
+        return Cue(
+            self.index,
+            self.start_ms,
+            self.end_ms,
+            self.text,
+            self.original_text,
+            dict(self.extra) if self.extra else None,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Chuyển về dạng dict cũ."""
+        return {key: self[key] for key in self.keys()}
+
+    # ---- So sánh, hiển thị, pickle ----
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Cue):
+            return self.__reduce__()[1] == other.__reduce__()[1]
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return (
+            f"Cue({self.index}, {self.start_time} --> {self.end_time}, {self.text!r})"
+        )
+
+    def __reduce__(self):
+        # Pickle dạng tuple gọn: không lưu tên trường cho từng mục
+        return (
+            Cue,
+            (
+                self.index,
+                self.start_ms,
+                self.end_ms,
+                self.text,
+                self.original_text,
+                self.extra,
+            ),
+        )
@@ -0,0 +1,785 @@
+# subtitle_formats.py
+"""
+Đọc/ghi phụ đề nhiều định dạng qua một bảng codec: SRT, WebVTT, ASS/SSA, SBV.
+
+Mỗi codec đọc file theo từng dòng (không nạp cả file) và trả ra các Cue; phần
+còn lại của pipeline chỉ làm việc với Cue nên không phụ thuộc định dạng.
+
+- Thẻ định dạng ({\\i1} của ASS, <i>/<c.lop> của WebVTT) được tách khỏi văn
+  bản cần dịch và lưu trong cue.extra, rồi chèn lại khi ghi: thẻ ở đầu/cuối
+  giữ nguyên vị trí, thẻ giữa câu đặt theo vị trí tương đối trong bản dịch
+  (làm tròn tới ranh giới từ).
+- Phần đầu file (style ASS, khối STYLE/NOTE của WebVTT...) được đọc lại từ
+  file nguồn khi ghi (read_header chỉ đọc tới phụ đề đầu tiên). Các dòng
+  không phải phụ đề nằm giữa hoặc sau các phụ đề (Comment:, NOTE, mục
+  [Fonts]...) đi kèm phụ đề đứng trước chúng.
+- Trường riêng của từng dòng (Style, Layer, Margin của ASS; định danh và
+  thiết lập vị trí của WebVTT) nằm trong cue.extra và được ghi lại nguyên vẹn.
+
+Ghi file (write_cues): các chuỗi nhỏ của codec được gom thành khối lớn rồi
+ghi vào file tạm cùng thư mục, fsync theo chính sách durability, sau đó đổi
+tên thay file đích trong một bước. Dừng giữa chừng không để lại file đích bị
+cắt cụt trông như đã xong.
+
+Nhiều file đầu ra (write_variants): cùng một dãy Cue được ghi thành nhiều
+file với cách trình bày khác nhau (chỉ bản dịch, song ngữ xếp chồng, ASS với
+phụ đề gốc chữ nhỏ) trong một lượt; mỗi file có một luồng ghi riêng.
+
+Thêm định dạng mới: kế thừa SubtitleCodec rồi gọi register_codec().
+"""
+import contextlib
+import html
+import itertools
+import os
+import queue
+import re
+import shutil
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from subtitle_cue import Cue
+from timestamps import TIMESTAMP_WIDTH, format_timestamps, parse_timestamps, to_list
+
+# Số phụ đề xử lý thời gian cùng lúc khi đọc/ghi SRT
+_TIME_CHUNK = 4096
+
+# Kích thước khối (ký tự) gom lại trước mỗi lần ghi ra file
+WRITE_BLOCK_SIZE = 1 << 20
+
+# Chính sách fsync khi ghi file đầu ra:
+# - "none": không fsync (nhanh nhất, mất điện có thể mất nội dung vừa ghi)
+# - "file": fsync file tạm trước khi đổi tên
+# - "full": như "file", thêm fsync thư mục sau khi đổi tên
+DURABILITY_MODES = ("none", "file", "full")
+DEFAULT_DURABILITY = "file"
+
+# Cách trình bày phụ đề trong file đầu ra:
+# - "translated": chỉ bản dịch
+# - "stacked": phụ đề gốc ở trên, bản dịch ở dưới (bilingual=True)
+# - "small_original": bản dịch, phụ đề gốc chữ nhỏ ở dưới (chỉ ASS/SSA)
+OUTPUT_LAYOUTS = ("translated", "stacked", "small_original")
+
+# Số khối Cue tối đa chờ trong hàng đợi của mỗi luồng ghi (write_variants)
+_VARIANT_QUEUE_BLOCKS = 4
+
+
+def _layout(bilingual) -> str:
+    """Tên cách trình bày từ tham số bilingual (True/False hoặc một OUTPUT_LAYOUTS)."""
+    if bilingual is True:
+        return "stacked"
+    if not bilingual:
+        return "translated"
+    return bilingual
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Thời gian của WebVTT/ASS/SBV (xem parse_clock)
+_CLOCK = re.compile(r"(?:\d+:){0,2}\d+(?:[.,]\d+)?$")
+
+# Thời gian SRT "HH:MM:SS,mmm" (giờ có thể nhiều hơn 2 chữ số)
+_SRT_TIMESTAMP = re.compile(r"\d+:\d\d:\d\d[,.]\d{3}$")
+
+
+def _blocks(lines: Iterable[str]) -> Iterator[List[str]]:
+    """Gom các dòng (đã bỏ ký tự xuống dòng) thành khối ngăn cách bởi dòng trống."""
+    block = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line.strip():
+            block.append(line)
+        elif block:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def parse_clock(value: str) -> int:
+    """
+    Đọc thời gian dạng "H:MM:SS.mmm", "MM:SS.mmm" (WebVTT) hoặc
+    "H:MM:SS.cc" (ASS, phần trăm giây) thành mili giây. Ném ValueError nếu
+    chuỗi không đúng dạng.
+    """
+    value = value.strip()
+    if not _CLOCK.match(value):
+        raise ValueError(f"Thời gian không hợp lệ: {value!r}")
+    head, _, fraction = value.replace(",", ".").rpartition(".")
+    if not head:
+        head, fraction = fraction, "0"
+    parts = [int(p) for p in head.split(":")]
+    while len(parts) < 3:
+        parts.insert(0, 0)
+    hours, minutes, seconds = parts
+    millis = int((fraction + "00")[:3])
+    return ((hours * 60 + minutes) * 60 + seconds) * 1000 + millis
+
+
+def _clock(ms: int, hour_digits: int, fraction_digits: int) -> str:
+    ms = max(int(ms), 0)
+    if fraction_digits == 2:
+        ms = (ms + 5) // 10 * 10
+    seconds, millis = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    fraction = f"{millis:03d}"[:fraction_digits]
+    return f"{hours:0{hour_digits}d}:{minutes:02d}:{seconds:02d}.{fraction}"
+
+
+def _format_clocks(values: List[int], hour_digits: int, fraction_digits: int) -> List[str]:
+    """_clock cho cả danh sách, cắt từ kết quả của timestamps.format_timestamps."""
+    values = [max(int(ms), 0) for ms in values]
+    if fraction_digits == 2:
+        values = [(ms + 5) // 10 * 10 for ms in values]
+    end = 9 + fraction_digits
+    result = []
+    for ms, text in zip(values, format_timestamps(values)):
+        if len(text) != TIMESTAMP_WIDTH:
+            # Từ 100 giờ trở lên
+            result.append(_clock(ms, hour_digits, fraction_digits))
+            continue
+        start = 1 if hour_digits == 1 and text[0] == "0" else 0
+        result.append(text[start:8] + "." + text[9:end])
+    return result
+
+
+# ---- Thẻ định dạng ----
+
+# Thẻ đóng: </b> của VTT, hoặc khối ASS chỉ gồm lệnh tắt ({\b0}, {\i0\u0}, {\r})
+_CLOSING_TAG = re.compile(r"</|\{(?:\\(?:[bius]0|r(?=[\\}])))+\}$")
+
+
+def split_tags(text: str, pattern: "re.Pattern") -> Tuple[str, List[List]]:
+    """
+    Tách thẻ khỏi văn bản. Trả về (văn bản thuần, [[vị trí tương đối, thẻ]]),
+    vị trí 0.0 = đầu câu, 1.0 = cuối câu.
+    """
+    plain_parts = []
+    offsets = []
+    length = 0
+    last = 0
+    for match in pattern.finditer(text):
+        piece = text[last : match.start()]
+        plain_parts.append(piece)
+        length += len(piece)
+        offsets.append((length, match.group()))
+        last = match.end()
+    if not offsets:
+        return text, []
+    plain_parts.append(text[last:])
+    plain = "".join(plain_parts)
+    total = len(plain)
+    tags = [
+        [1.0 if total and offset >= total else (offset / total if total else 0.0), tag]
+        for offset, tag in offsets
+    ]
+    return plain, tags
+
+
+def restore_tags(text: str, tags: Optional[List[List]], exact: bool = True) -> str:
+    """
+    Chèn lại thẻ vào văn bản. exact=False (văn bản đã được dịch): vị trí giữa
+    câu không còn ứng với từ nào, nên chỉ thẻ ở đầu/cuối câu giữ chỗ cũ; thẻ
+    giữa câu được bọc quanh cả câu (thẻ đóng dời về cuối, thẻ khác về đầu).
+    """
+    if not tags:
+        return text
+    length = len(text)
+    placed = []
+    for ratio, tag in tags:
+        if exact:
+            position = round(ratio * length)
+        elif ratio >= 1.0 or (ratio > 0.0 and _CLOSING_TAG.match(tag)):
+            position = length
+        else:
+            position = 0
+        placed.append((position, tag))
+    parts = []
+    last = 0
+    # Sắp xếp ổn định: thẻ cùng vị trí giữ thứ tự ban đầu
+    for position, tag in sorted(placed, key=lambda item: item[0]):
+        parts.append(text[last:position])
+        parts.append(tag)
+        last = position
+    parts.append(text[last:])
+    return "".join(parts)
+
+
+# ---- Codec ----
+
+
+class SubtitleCodec:
+    """
+    Một định dạng phụ đề.
+
+    read() là generator: đọc lần lượt các dòng và trả ra Cue; phần đầu file
+    được ghi vào dict header truyền vào. write() ghi phần đầu file rồi từng Cue;
+    bilingual là True/False hoặc tên một cách trình bày trong layouts.
+    """
+
+    name = ""
+    extensions: Tuple[str, ...] = ()
+    layouts: Tuple[str, ...] = ("translated", "stacked")
+
+    def read(self, lines: Iterable[str], header: Dict) -> Iterator[Cue]:
+        raise NotImplementedError
+
+    def write(
+        self,
+        file: TextIO,
+        cues: Iterable[Cue],
+        header: Optional[Dict] = None,
+        bilingual: bool = False,
+    ) -> None:
+        raise NotImplementedError
+
+
+class SrtCodec(SubtitleCodec):
+    name = "srt"
+    extensions = (".srt",)
+
+    def read(self, lines: Iterable[str], header: Dict) -> Iterator[Cue]:
+        position = 0
+        for chunk in _chunks(self._raw_blocks(_blocks(lines)), _TIME_CHUNK):
+            starts = to_list(parse_timestamps([item[1] for item in chunk]))
+            ends = to_list(parse_timestamps([item[2] for item in chunk]))
+            for (index, _, _, text), start, end in zip(chunk, starts, ends):
+                position += 1
+                yield Cue(index if index is not None else position, start, end, text)
+
+    @staticmethod
+    def _raw_blocks(blocks: Iterator[List[str]]) -> Iterator[Tuple]:
+        """(chỉ số hoặc None, chuỗi bắt đầu, chuỗi kết thúc, văn bản) của từng khối."""
+        for block in blocks:
+            index = None
+            if "-->" not in block[0]:
+                if len(block) < 2 or not block[0].strip().isdigit():
+                    continue
+                index = int(block[0].strip())
+                block = block[1:]
+            timing = block[0].split()
+            if len(timing) < 3 or timing[1] != "-->":
+                continue
+            if not (_SRT_TIMESTAMP.match(timing[0]) and _SRT_TIMESTAMP.match(timing[2])):
+                # Thời gian hỏng: bỏ khối này, không dừng cả file
+                continue
+            yield index, timing[0], timing[2], "\n".join(block[1:]).strip()
+
+    def write(self, file, cues, header=None, bilingual=False) -> None:
+        stacked = _layout(bilingual) == "stacked"
+        for chunk in _chunks(cues, _TIME_CHUNK):
+            chunk = [Cue.coerce(cue) for cue in chunk]
+            starts = format_timestamps([cue.start_ms for cue in chunk])
+            ends = format_timestamps([cue.end_ms for cue in chunk])
+            for cue, start, end in zip(chunk, starts, ends):
+                if stacked and cue.original_text is not None:
+                    # Ghi cả phụ đề gốc và phụ đề đã dịch
+                    text = f"{cue.original_text}\n{cue.text}"
+                else:
+                    text = cue.text
+                file.write(f"{cue.index}\n{start} --> {end}\n{text}\n\n")
+
+
+class VttCodec(SubtitleCodec):
+    name = "vtt"
+    extensions = (".vtt",)
+
+    TAG = re.compile(r"<[^>]*>")
+
+    def read(self, lines: Iterable[str], header: Dict) -> Iterator[Cue]:
+        blocks = header.setdefault("blocks", [])
+        previous = None
+        position = 0
+        for block in _blocks(lines):
+            if "first_block" not in header and block[0].startswith("WEBVTT"):
+                header["first_block"] = block
+                continue
+            timing_at = next((i for i, line in enumerate(block[:2]) if "-->" in line), None)
+            if timing_at is None:
+                # NOTE, STYLE, REGION: giữ nguyên, đi kèm phụ đề đứng trước
+                if previous is None:
+                    blocks.append(block)
+                else:
+                    if previous.extra is None:
+                        previous.extra = {}
+                    previous.extra.setdefault("vtt_after", []).append(block)
+                continue
+            start, _, rest = block[timing_at].partition("-->")
+            rest = rest.split(None, 1)
+            try:
+                start_ms, end_ms = parse_clock(start), parse_clock(rest[0] if rest else "")
+            except ValueError:
+                # Thời gian hỏng: bỏ khối này, không dừng cả file
+                continue
+            if previous is not None:
+                yield previous
+            plain, tags = split_tags("\n".join(block[timing_at + 1 :]), self.TAG)
+            extra = {}
+            if timing_at:
+                extra["vtt_id"] = block[0]
+            if len(rest) > 1:
+                extra["vtt_settings"] = rest[1]
+            if tags:
+                extra["vtt_tags"] = tags
+            position += 1
+            previous = Cue(
+                position,
+                start_ms,
+                end_ms,
+                html.unescape(plain).strip(),
+                extra=extra,
+            )
+        if previous is not None:
+            yield previous
+
+    @staticmethod
+    def _escape(text: str) -> str:
+        return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+    def write(self, file, cues, header=None, bilingual=False) -> None:
+        stacked = _layout(bilingual) == "stacked"
+        header = header if header and header.get("format") == self.name else {}
+        file.write("\n".join(header.get("first_block") or ["WEBVTT"]) + "\n\n")
+        for block in header.get("blocks", []):
+            file.write("\n".join(block) + "\n\n")
+        for cue in map(Cue.coerce, cues):
+            extra = cue.extra or {}
+            if "vtt_id" in extra:
+                file.write(f"{extra['vtt_id']}\n")
+            timing = f"{_clock(cue.start_ms, 2, 3)} --> {_clock(cue.end_ms, 2, 3)}"
+            if "vtt_settings" in extra:
+                timing += f" {extra['vtt_settings']}"
+            tags = extra.get("vtt_tags")
+            if stacked and cue.original_text is not None:
+                text = (
+                    restore_tags(self._escape(cue.original_text), tags)
+                    + "\n"
+                    + self._escape(cue.text)
+                )
+            else:
+                text = restore_tags(
+                    self._escape(cue.text), tags, exact=cue.original_text is None
+                )
+            file.write(f"{timing}\n{text}\n\n")
+            for block in extra.get("vtt_after", []):
+                file.write("\n".join(block) + "\n\n")
+
+
+class SbvCodec(SubtitleCodec):
+    name = "sbv"
+    extensions = (".sbv",)
+
+    def read(self, lines: Iterable[str], header: Dict) -> Iterator[Cue]:
+        position = 0
+        for block in _blocks(lines):
+            start, comma, end = block[0].partition(",")
+            if not comma:
+                continue
+            try:
+                start_ms, end_ms = parse_clock(start), parse_clock(end)
+            except ValueError:
+                continue
+            position += 1
+            yield Cue(position, start_ms, end_ms, "\n".join(block[1:]).strip())
+
+    def write(self, file, cues, header=None, bilingual=False) -> None:
+        stacked = _layout(bilingual) == "stacked"
+        for cue in map(Cue.coerce, cues):
+            file.write(f"{_clock(cue.start_ms, 1, 3)},{_clock(cue.end_ms, 1, 3)}\n")
+            if stacked and cue.original_text is not None:
+                file.write(f"{cue.original_text}\n{cue.text}\n\n")
+            else:
+                file.write(f"{cue.text}\n\n")
+
+
+class AssCodec(SubtitleCodec):
+    name = "ass"
+    extensions = (".ass", ".ssa")
+    layouts = OUTPUT_LAYOUTS
+
+    # Thẻ thu nhỏ chữ cho phụ đề gốc ở cách trình bày "small_original"
+    # (tỉ lệ theo cỡ chữ của style nên dùng được với mọi style)
+    SMALL_ORIGINAL_TAG = r"{\fscx65\fscy65}"
+
+    TAG = re.compile(r"\{[^}]*\}")
+    DEFAULT_FORMAT = [
+        "Layer", "Start", "End", "Style", "Name",
+        "MarginL", "MarginR", "MarginV", "Effect", "Text",
+    ]
+    DEFAULT_HEADER = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, "
+        "BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, "
+        "BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+        "Style: Default,Arial,20,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,0,0,0,0,"
+        "100,100,0,0,1,2,2,2,10,10,10,1",
+        "",
+        "[Events]",
+    ]
+
+    def read(self, lines: Iterable[str], header: Dict) -> Iterator[Cue]:
+        header_lines = header.setdefault("lines", [])
+        fields = self.DEFAULT_FORMAT
+        in_events = False
+        previous = None
+        position = 0
+        for line in lines:
+            line = line.rstrip("\r\n")
+            stripped = line.strip()
+            if stripped.startswith("[") and stripped.endswith("]"):
+                in_events = stripped.lower() == "[events]"
+            elif in_events and stripped.lower().startswith("format:"):
+                fields = [f.strip() for f in stripped.split(":", 1)[1].split(",")]
+                header["fields"] = fields
+            elif in_events and stripped.startswith("Dialogue:"):
+                values = line.split(":", 1)[1].lstrip().split(",", len(fields) - 1)
+                row = dict(zip(fields, values)) if len(values) == len(fields) else None
+                try:
+                    start_ms, end_ms = parse_clock(row["Start"]), parse_clock(row["End"])
+                except (TypeError, KeyError, ValueError):
+                    # Thiếu trường hoặc thời gian hỏng: giữ nguyên như dòng
+                    # không phải phụ đề
+                    row = None
+                if row is not None:
+                    if previous is not None:
+                        yield previous
+                    plain, tags = split_tags(row.pop("Text"), self.TAG)
+                    plain = plain.replace("\\N", "\n").replace("\\n", "\n")
+                    position += 1
+                    extra = {
+                        "ass_fields": {
+                            k: v for k, v in row.items() if k not in ("Start", "End")
+                        }
+                    }
+                    if tags:
+                        extra["ass_tags"] = tags
+                    previous = Cue(
+                        position,
+                        start_ms,
+                        end_ms,
+                        plain,
+                        extra=extra,
+                    )
+                    continue
+            # Dòng không phải phụ đề: phần đầu file hoặc đi kèm phụ đề trước đó
+            if previous is None:
+                header_lines.append(line)
+            else:
+                previous.extra.setdefault("ass_after", []).append(line)
+        if previous is not None:
+            yield previous
+
+    @staticmethod
+    def _escape(text: str) -> str:
+        return text.replace("\n", "\\N")
+
+    def write(self, file, cues, header=None, bilingual=False) -> None:
+        layout = _layout(bilingual)
+        header = header if header and header.get("format") == self.name else {}
+        header_lines = header.get("lines") or self.DEFAULT_HEADER
+        fields = header.get("fields") or self.DEFAULT_FORMAT
+        for line in header_lines:
+            file.write(line + "\n")
+        if "fields" not in header:
+            file.write("Format: " + ", ".join(fields) + "\n")
+        # Giá trị mặc định của từng cột khi phụ đề không có
+        defaults = {
+            field: "0" if field.startswith(("Layer", "Margin")) else "" for field in fields
+        }
+        defaults["Style"] = "Default"
+        for chunk in _chunks(cues, _TIME_CHUNK):
+            chunk = [Cue.coerce(cue) for cue in chunk]
+            starts = _format_clocks([cue.start_ms for cue in chunk], 1, 2)
+            ends = _format_clocks([cue.end_ms for cue in chunk], 1, 2)
+            for cue, start, end in zip(chunk, starts, ends):
+                extra = cue.extra or {}
+                tags = extra.get("ass_tags")
+                if layout == "stacked" and cue.original_text is not None:
+                    text = (
+                        restore_tags(self._escape(cue.original_text), tags)
+                        + "\\N"
+                        + self._escape(cue.text)
+                    )
+                elif layout == "small_original" and cue.original_text is not None:
+                    text = (
+                        restore_tags(self._escape(cue.text), tags, exact=False)
+                        + "\\N"
+                        + self.SMALL_ORIGINAL_TAG
+                        + self._escape(cue.original_text)
+                    )
+                else:
+                    text = restore_tags(
+                        self._escape(cue.text), tags, exact=cue.original_text is None
+                    )
+                values = dict(defaults)
+                values.update(extra.get("ass_fields") or ())
+                values.update(Start=start, End=end, Text=text)
+                file.write("Dialogue: " + ",".join([values[field] for field in fields]) + "\n")
+                for line in extra.get("ass_after", []):
+                    file.write(line + "\n")
+
+
+# ---- Bảng codec ----
+
+CODECS: Dict[str, SubtitleCodec] = {}
+
+
+def register_codec(codec: SubtitleCodec) -> None:
+    """Đăng ký codec cho các phần mở rộng của nó."""
+    for extension in codec.extensions:
+        CODECS[extension.lower()] = codec
+
+
+for _codec in (SrtCodec(), VttCodec(), SbvCodec(), AssCodec()):
+    register_codec(_codec)
+
+
+def subtitle_extensions() -> Tuple[str, ...]:
+    """Các phần mở rộng đọc/ghi được (".srt", ".vtt", ...)."""
+    return tuple(CODECS)
+
+
+def is_subtitle_file(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in CODECS
+
+
+def codec_for_path(path: str) -> SubtitleCodec:
+    """Codec theo phần mở rộng của file (ValueError nếu không hỗ trợ)."""
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        return CODECS[extension]
+    except KeyError:
+        raise ValueError(f"Định dạng phụ đề không được hỗ trợ: {extension or path}")
+
+
+def read_cues(path: str, header: Optional[Dict] = None) -> Iterator[Cue]:
+    """Đọc lần lượt các Cue của file (generator); phần đầu file ghi vào header."""
+    codec = codec_for_path(path)
+    if header is None:
+        header = {}
+    header["format"] = codec.name
+    with open(path, "r", encoding="utf-8-sig") as f:
+        yield from codec.read(f, header)
+
+
+def read_header(path: str) -> Dict:
+    """Phần đầu file (đọc tới phụ đề đầu tiên)."""
+    header: Dict = {}
+    cues = read_cues(path, header)
+    next(cues, None)
+    cues.close()
+    return header
+
+
+class _BlockWriter:
+    """Gom các lần write() nhỏ của codec thành khối lớn trước khi ghi ra file."""
+
+    def __init__(self, file: TextIO, block_size: int = WRITE_BLOCK_SIZE):
+        self._file = file
+        self._block_size = block_size
+        self._parts: List[str] = []
+        self._size = 0
+
+    def write(self, text: str) -> int:
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self._block_size:
+            self.flush()
+        return len(text)
+
+    def flush(self) -> None:
+        if self._parts:
+            self._file.write("".join(self._parts))
+            self._parts = []
+            self._size = 0
+
+
+def _fsync_directory(directory: str) -> None:
+    """fsync thư mục để lần đổi tên được ghi xuống đĩa (bỏ qua nếu hệ điều hành không hỗ trợ)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def atomic_output(path: str, durability: Optional[str] = None) -> Iterator[TextIO]:
+    """
+    Mở file tạm cạnh path để ghi (qua bộ gom khối). Khi khối with kết thúc
+    bình thường, file tạm được fsync theo durability rồi đổi tên thay path;
+    nếu có lỗi, file tạm bị xoá và file đích cũ (nếu có) còn nguyên.
+    """
+    durability = durability or DEFAULT_DURABILITY
+    if durability not in DURABILITY_MODES:
+        raise ValueError(f"Chính sách ghi không hợp lệ: {durability}")
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            writer = _BlockWriter(f)
+            yield writer
+            writer.flush()
+            if durability != "none":
+                f.flush()
+                os.fsync(f.fileno())
+        # Giữ quyền truy cập của file cũ khi ghi đè
+        if os.path.exists(path):
+            try:
+                shutil.copymode(path, tmp_path)
+            except OSError:
+                pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    if durability == "full":
+        _fsync_directory(directory)
+
+
+def write_cues(
+    path: str,
+    cues: Iterable[Cue],
+    header: Optional[Dict] = None,
+    bilingual: bool = False,
+    durability: Optional[str] = None,
+) -> None:
+    """
+    Ghi Cue ra file theo định dạng của phần mở rộng (ghi nguyên tử, xem
+    atomic_output; durability: một trong DURABILITY_MODES, None = mặc định).
+    """
+    codec = codec_for_path(path)
+    with atomic_output(path, durability) as f:
+        codec.write(f, cues, header, bilingual)
+
+
+# ---- Nhiều file đầu ra trong một lượt ----
+
+# Đánh dấu trong hàng đợi của luồng ghi: hết Cue / luồng đọc gặp lỗi
+_FEED_END = object()
+_FEED_ABORT = object()
+
+
+class _CueFeed:
+    """Hàng đợi có giới hạn chuyển các khối Cue từ luồng đọc tới một luồng ghi."""
+
+    def __init__(self):
+        self._queue: "queue.Queue" = queue.Queue(maxsize=_VARIANT_QUEUE_BLOCKS)
+        self._finished = False
+
+    def put(self, block) -> None:
+        self._queue.put(block)
+
+    def __iter__(self) -> Iterator[Cue]:
+        while True:
+            block = self._queue.get()
+            if block is _FEED_END or block is _FEED_ABORT:
+                self._finished = True
+                if block is _FEED_ABORT:
+                    raise RuntimeError("Dừng ghi do lỗi khi đọc phụ đề")
+                return
+            yield from block
+
+    def discard(self) -> None:
+        """Bỏ phần còn lại (sau khi luồng ghi lỗi) để luồng đọc không bị chặn."""
+        while not self._finished:
+            block = self._queue.get()
+            self._finished = block is _FEED_END or block is _FEED_ABORT
+
+
+def output_spec(output: Dict) -> Tuple[str, SubtitleCodec, str]:
+    """
+    (đường dẫn, codec, cách trình bày) của một mục {"path": ..., "layout": ...}
+    (layout mặc định "translated"). Ném ValueError nếu định dạng không hỗ trợ
+    cách trình bày đó.
+    """
+    path = output["path"]
+    layout = output.get("layout") or "translated"
+    if layout not in OUTPUT_LAYOUTS:
+        raise ValueError(f"Cách trình bày không hợp lệ: {layout}")
+    codec = codec_for_path(path)
+    if layout not in codec.layouts:
+        raise ValueError(
+            f"Định dạng {codec.name} không hỗ trợ cách trình bày {layout}: {path}"
+        )
+    return path, codec, layout
+
+
+def write_variants(
+    outputs: List[Dict],
+    cues: Iterable[Cue],
+    header: Optional[Dict] = None,
+    durability: Optional[str] = None,
+) -> None:
+    """
+    Ghi nhiều file đầu ra từ cùng một dãy Cue trong một lượt. Mỗi mục của
+    outputs là {"path": ..., "layout": ...} (xem OUTPUT_LAYOUTS); định dạng
+    theo phần mở rộng của path.
+
+    Cue được đọc một lần và chuyển theo khối tới một luồng ghi riêng cho mỗi
+    file, nên việc định dạng và ghi/fsync các file chồng lên nhau. Mọi mục
+    được kiểm tra trước khi ghi. Mỗi file được ghi nguyên tử (atomic_output):
+    file gặp lỗi giữ nguyên nội dung cũ, lỗi đầu tiên được ném ra sau khi mọi
+    luồng ghi kết thúc.
+    """
+    specs = [output_spec(output) for output in outputs]
+    paths = [os.path.abspath(path) for path, _, _ in specs]
+    if len(set(paths)) != len(paths):
+        raise ValueError("Các file đầu ra bị trùng đường dẫn")
+    if len(specs) == 1:
+        path, _, layout = specs[0]
+        write_cues(path, cues, header, layout, durability)
+        return
+
+    errors: List[BaseException] = []
+
+    def write(spec: Tuple[str, SubtitleCodec, str], feed: _CueFeed) -> None:
+        path, codec, layout = spec
+        try:
+            with atomic_output(path, durability) as f:
+                codec.write(f, feed, header, layout)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            feed.discard()
+
+    feeds = [_CueFeed() for _ in specs]
+    writers = [
+        threading.Thread(target=write, args=(spec, feed), name=f"write-{i + 1}")
+        for i, (spec, feed) in enumerate(zip(specs, feeds))
+    ]
+    for writer in writers:
+        writer.start()
+    end = _FEED_END
+    try:
+        for block in _chunks(cues, _TIME_CHUNK):
+            for feed in feeds:
+                feed.put(block)
+    except BaseException:
+        end = _FEED_ABORT
+        raise
+    finally:
+        for feed in feeds:
+            feed.put(end)
+        for writer in writers:
+            writer.join()
+    if errors:
+        raise errors[0]
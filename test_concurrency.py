@@ -0,0 +1,113 @@
+# test_concurrency.py
+import threading
+import time
+
+import pytest
+
+from cancellation import CancelToken, TranslationCancelled
+from concurrency import (
+    BASELINE_MAX_GROWTH,
+    OUTCOME_CONGESTED,
+    OUTCOME_ERROR,
+    OUTCOME_OK,
+    AIMDController,
+    load_memory,
+)
+
+
+def _controller(initial=4, **kwargs):
+    kwargs.setdefault("memory_path", None)
+    return AIMDController("gemini|m|", initial, **kwargs)
+
+
+def _saturate(controller, latency=1.0, outcome=OUTCOME_OK):
+    """Gửi đủ limit yêu cầu cùng lúc rồi trả chỗ tất cả; trả về kết quả của release."""
+    tickets = [controller.acquire() for _ in range(controller.limit)]
+    return [controller.release(ticket, outcome, latency) for ticket in tickets]
+
+
+def test_additive_increase_when_saturated():
+    controller = _controller(4, max_limit=8)
+    _saturate(controller)
+    # Chỉ yêu cầu đầu tiên trả chỗ khi giới hạn đang được dùng hết
+    assert controller.limit == 4
+    for _ in range(6):
+        _saturate(controller)
+    assert 5 <= controller.limit <= 8
+
+
+def test_no_increase_when_not_saturated():
+    controller = _controller(4)
+    for _ in range(20):
+        controller.release(controller.acquire(), OUTCOME_OK, 1.0)
+    assert controller.limit == 4
+
+
+def test_multiplicative_decrease_once_per_window():
+    controller = _controller(8)
+    results = _saturate(controller, outcome=OUTCOME_CONGESTED)
+    # Cả đợt 429 của các yêu cầu gửi trước lần giảm chỉ bị tính một lần
+    assert results == [4] + [None] * 7
+    assert controller.limit == 4
+    controller.release(controller.acquire(), OUTCOME_CONGESTED)
+    assert controller.limit == 2
+
+
+def test_errors_and_latency_spikes_hold_limit():
+    controller = _controller(2, max_error_rate=0.2)
+    for _ in range(5):
+        _saturate(controller, outcome=OUTCOME_ERROR)
+    for _ in range(3):
+        _saturate(controller)
+    assert controller.limit == 2
+
+    controller = _controller(2)
+    _saturate(controller, latency=1.0)
+    for _ in range(3):
+        _saturate(controller, latency=5.0)
+    assert controller.limit == 2
+
+
+def test_baseline_bounded():
+    """Mức nền không tăng vô hạn khi độ trễ cao kéo dài."""
+    controller = _controller(1)
+    controller.release(controller.acquire(), OUTCOME_OK, 1.0)
+    for _ in range(10000):
+        controller.release(controller.acquire(), OUTCOME_OK, 100.0)
+    assert controller.baseline <= BASELINE_MAX_GROWTH * 1.0 + 1e-9
+    for _ in range(1000):
+        controller.release(controller.acquire(), OUTCOME_OK, 2.0)
+    assert controller.baseline == pytest.approx(2.0, rel=0.01)
+
+
+def test_limit_remembered(tmp_path):
+    path = str(tmp_path / "concurrency.json")
+    controller = _controller(8, memory_path=path)
+    assert not controller.remembered
+    controller.release(controller.acquire(), OUTCOME_CONGESTED)
+    assert load_memory(path)["gemini|m|"]["limit"] == 4
+    again = _controller(8, memory_path=path)
+    assert again.remembered and again.limit == 4
+
+
+def test_acquire_waits_and_cancels():
+    controller = _controller(1)
+    ticket = controller.acquire()
+    token = CancelToken()
+    errors = []
+
+    def wait():
+        try:
+            controller.acquire(token)
+        except TranslationCancelled as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    time.sleep(0.05)
+    assert thread.is_alive()
+    token.cancel("test")
+    thread.join(2)
+    assert errors and controller.in_flight == 1
+    controller.release(ticket, OUTCOME_OK)
+    assert controller.in_flight == 0
@@ -0,0 +1,65 @@
+# test_glossary.py
+import random
+
+from glossary import AhoCorasick, Glossary, load_glossary, read_glossary_file
+
+
+def _naive(patterns, text):
+    return sorted(
+        (start, pattern_id)
+        for pattern_id, pattern in enumerate(patterns)
+        for start in range(len(text) - len(pattern) + 1)
+        if text.startswith(pattern, start)
+    )
+
+
+def test_aho_corasick_overlapping_patterns():
+    patterns = ["he", "she", "his", "hers"]
+    matches = sorted(AhoCorasick(patterns).finditer("ushers"))
+    assert matches == [(1, 1), (2, 0), (2, 3)]
+
+
+def test_aho_corasick_matches_naive_search():
+    """So với tìm kiếm trực tiếp trên chuỗi ngẫu nhiên (nhiều mẫu là hậu tố của nhau)."""
+    rng = random.Random(1)
+    for _ in range(50):
+        patterns = list(
+            {"".join(rng.choice("ab") for _ in range(rng.randint(1, 4))) for _ in range(6)}
+        )
+        text = "".join(rng.choice("abc") for _ in range(40))
+        assert sorted(AhoCorasick(patterns).finditer(text)) == _naive(patterns, text)
+
+
+def test_find_whole_words_longest_first():
+    glossary = Glossary({"Stark": "Stark", "Ned Stark": "Ned Stark", "Winterfell": "Đông Thành"})
+    assert [glossary.entries[i][0] for i in glossary.find("NED  stark rode to Winterfell.")] == [
+        "Ned Stark",
+        "Winterfell",
+    ]
+    # Không khớp giữa từ
+    assert glossary.find("Starkly Winterfells") == []
+
+
+def test_terms_for_and_violations():
+    glossary = Glossary({"Winterfell": "Đông Thành", "Arya": ""})
+    assert glossary.terms_for(["Arya is here.", "Go to Winterfell", "Arya again"]) == [
+        ("Arya", "Arya"),
+        ("Winterfell", "Đông Thành"),
+    ]
+    assert glossary.violations("Arya in Winterfell", "Arya ở đông thành") == []
+    assert glossary.violations("Arya in Winterfell", "Arya ở Winterfell") == [
+        ("Winterfell", "Đông Thành")
+    ]
+
+
+def test_read_and_load_glossary(tmp_path):
+    text_file = tmp_path / "terms.txt"
+    text_file.write_text("# chú thích\nWinterfell = Đông Thành\nArya\tArya\n", encoding="utf-8")
+    glossary = Glossary(read_glossary_file(str(text_file)))
+    assert glossary.entries == [("Winterfell", "Đông Thành"), ("Arya", "Arya")]
+
+    csv_file = tmp_path / "terms.csv"
+    csv_file.write_text("Winterfell,Đông Thành\nHodor\n", encoding="utf-8")
+    glossary = load_glossary(str(csv_file))
+    assert glossary.entries == [("Winterfell", "Đông Thành"), ("Hodor", "Hodor")]
+    assert load_glossary(str(csv_file)) is glossary
@@ -0,0 +1,122 @@
+# test_job_server.py
+import http.client
+import json
+import os
+
+import pytest
+
+from job_server import JobServer, JobService
+
+SOURCE = "1\n00:00:01,000 --> 00:00:02,000\nHello\n"
+
+
+@pytest.fixture
+def service(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "a.srt").write_text(SOURCE, encoding="utf-8")
+    service = JobService(
+        str(tmp_path / "state"),
+        {"type": "gemini", "key": "x"},
+        allowed_root=str(root),
+        update_status=lambda msg: None,
+    )
+    yield service
+    service.executor.shutdown()
+
+
+def test_relative_paths_resolved_in_root(service):
+    job = service.submit({"path": "a.srt", "output": "out/a_vi.srt"})
+    assert job.input_file == os.path.join(service.allowed_root, "a.srt")
+    assert job.output_file == os.path.join(service.allowed_root, "out", "a_vi.srt")
+
+
+@pytest.mark.parametrize("output", ["../evil.srt", "/tmp/evil.srt", "sub/../../evil.srt"])
+def test_output_outside_root_rejected(service, output):
+    with pytest.raises(ValueError):
+        service.submit({"path": "a.srt", "output": output})
+
+
+def test_input_outside_root_rejected(service, tmp_path):
+    outside = tmp_path / "outside.srt"
+    outside.write_text(SOURCE, encoding="utf-8")
+    with pytest.raises(ValueError):
+        service.submit({"path": str(outside)})
+    os.symlink(str(outside), os.path.join(service.allowed_root, "link.srt"))
+    with pytest.raises(ValueError):
+        service.submit({"path": "link.srt"})
+
+
+def test_root_defaults_to_working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    service = JobService(str(tmp_path / "state"), {"type": "gemini", "key": "x"})
+    try:
+        assert service.allowed_root == os.path.realpath(str(tmp_path))
+        with pytest.raises(ValueError):
+            service.submit({"path": "/etc/hostname"})
+    finally:
+        service.executor.shutdown()
+
+
+def test_api_type_not_overridable(service):
+    job = service.submit({"path": "a.srt", "type": "novita", "model": "m"})
+    assert job.api_overrides == {"model": "m"}
+
+
+@pytest.mark.parametrize(
+    "request_body",
+    [
+        {"path": "a.srt", "weight": [1]},
+        {"path": "a.srt", "weight": {"a": 1}},
+        {"path": "a.srt", "weight": float("nan")},
+        {"path": "a.srt", "deadline_seconds": float("inf")},
+        {"path": "a.srt", "threads": float("inf")},
+        {"path": ["a.srt"]},
+        {"content": {"a": 1}},
+    ],
+)
+def test_invalid_values_rejected(service, request_body):
+    with pytest.raises(ValueError):
+        service.submit(request_body)
+    assert os.listdir(service.uploads_dir) == []
+
+
+def _post(server, path, body, headers):
+    host, port = server.url.rsplit("/", 1)[-1].split(":")
+    connection = http.client.HTTPConnection(host, int(port), timeout=5)
+    try:
+        connection.putrequest("POST", path)
+        for name, value in headers.items():
+            connection.putheader(name, value)
+        connection.endheaders(body)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize(
+    "body, headers",
+    [
+        (b"[1, 2]", {"Content-Type": "application/json", "Content-Length": "6"}),
+        (
+            b'{"path": "a.srt", "weight": NaN}',
+            {"Content-Type": "application/json", "Content-Length": "32"},
+        ),
+        (
+            b'{"path": "a.srt", "weight": [1]}',
+            {"Content-Type": "application/json", "Content-Length": "32"},
+        ),
+        (b"{}", {"Content-Type": "application/json", "Content-Length": "abc"}),
+    ],
+)
+def test_bad_requests_answered_with_400(service, body, headers):
+    """Yêu cầu sai kiểu nhận 400 thay vì làm rớt kết nối."""
+    server = JobServer(service, port=0).start()
+    try:
+        status, payload = _post(server, "/jobs", body, headers)
+        assert status == 400 and payload["error"]
+        status, payload = _post(server, "/config", body, headers)
+        assert status == 400 and payload["error"]
+    finally:
+        server.stop()
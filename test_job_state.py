@@ -0,0 +1,37 @@
+# test_job_state.py
+from job_state import JobState
+from subtitle_cue import Cue
+
+
+def _cue(index, text):
+    return Cue(index, index * 1000, index * 1000 + 500, text)
+
+
+def test_append_after_corrupt_tail_stays_readable(tmp_path):
+    """Bản ghi mới không bị kẹt sau phần đuôi hỏng của nhật ký."""
+    state = JobState(str(tmp_path), "job")
+    state.append([_cue(1, "Một")])
+    state.close()
+    with open(state.path, "ab") as f:
+        f.write(b"\x80\x05hong")
+
+    resumed = JobState(str(tmp_path), "job")
+    assert list(resumed.load()) == [1]
+    resumed.append([_cue(2, "Hai")])
+    resumed.close()
+
+    completed = JobState(str(tmp_path), "job").load()
+    assert {index: cue.text for index, cue in completed.items()} == {1: "Một", 2: "Hai"}
+
+
+def test_append_without_load_truncates_corrupt_tail(tmp_path):
+    state = JobState(str(tmp_path), "job")
+    state.append([_cue(1, "Một")])
+    state.close()
+    with open(state.path, "ab") as f:
+        f.write(b"\x80")
+
+    other = JobState(str(tmp_path), "job")
+    other.append([_cue(2, "Hai")])
+    other.close()
+    assert sorted(JobState(str(tmp_path), "job").load()) == [1, 2]
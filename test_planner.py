@@ -0,0 +1,78 @@
+# test_planner.py
+import os
+
+from benchmarks.synthetic_srt import write_synthetic_srt
+from concurrency import provider_key, save_limit
+from planner import plan_translation
+from srt_translator import SRTTranslator
+
+
+def _translator(tmp_path, messages=None):
+    return SRTTranslator(
+        (messages.append if messages is not None else lambda msg: None),
+        state_dir=str(tmp_path / "state"),
+    )
+
+
+def _adaptive_config(tmp_path, **extra):
+    config = {
+        "type": "gemini",
+        "key": "x",
+        "model": "gemini-2.0-flash",
+        "adaptive_concurrency": True,
+        "max_concurrency": 8,
+        "concurrency_memory": str(tmp_path / "concurrency.json"),
+    }
+    config.update(extra)
+    return config
+
+
+def test_dry_run_after_saved_limit(tmp_path):
+    """Dry-run với adaptive_concurrency sau khi đã lưu giới hạn AIMD không lỗi."""
+    input_dir = tmp_path / "in"
+    input_dir.mkdir()
+    write_synthetic_srt(str(input_dir / "a.srt"), 200, seed=1)
+    config = _adaptive_config(tmp_path)
+    save_limit(provider_key(config), 3, config["concurrency_memory"])
+
+    messages = []
+    results = _translator(tmp_path, messages).translate_directory(
+        str(input_dir), config, 2, 10, dry_run=True
+    )
+    assert results == {}
+    assert any("Số yêu cầu API: 24" in msg for msg in messages)
+    assert any("8 luồng (3 yêu cầu đồng thời)" in msg for msg in messages)
+
+
+def test_adaptive_plan_splits_by_max_limit(tmp_path):
+    """Chia phần theo max_concurrency như translate_with_state, không theo giới hạn đã nhớ."""
+    path = write_synthetic_srt(str(tmp_path / "a.srt"), 200, seed=1)
+    config = _adaptive_config(tmp_path)
+    save_limit(provider_key(config), 3, config["concurrency_memory"])
+    plan = plan_translation(
+        _translator(tmp_path), [(path, path + ".vi.srt")], config, 2, 10, request_seconds=1.0
+    )
+    assert plan.workers == 8
+    assert plan.concurrency == 3
+    # 8 phần x 3 lô = 24 yêu cầu, chỉ 3 yêu cầu cùng lúc: 24 * 1s / 3
+    assert plan.requests == 24
+    assert plan.seconds == 8.0
+
+
+def test_adaptive_plan_without_memory_uses_num_threads(tmp_path):
+    path = write_synthetic_srt(str(tmp_path / "a.srt"), 200, seed=1)
+    config = _adaptive_config(tmp_path)
+    plan = plan_translation(_translator(tmp_path), [(path, path + ".vi.srt")], config, 2, 10)
+    assert not os.path.exists(config["concurrency_memory"])
+    assert (plan.workers, plan.concurrency) == (8, 2)
+
+
+def test_fixed_threads_plan(tmp_path):
+    path = write_synthetic_srt(str(tmp_path / "a.srt"), 100, seed=1)
+    config = {"type": "gemini", "key": "x", "model": "gemini-2.0-flash"}
+    plan = plan_translation(
+        _translator(tmp_path), [(path, path + ".vi.srt")], config, 4, 10, request_seconds=2.0
+    )
+    assert (plan.workers, plan.concurrency) == (4, 4)
+    assert plan.requests == 12
+    assert plan.cost is not None
@@ -0,0 +1,83 @@
+# test_rate_limiter.py
+import threading
+import time
+
+import pytest
+
+from cancellation import CancelToken, TranslationCancelled
+from rate_limiter import RateLimiter
+from srt_translator import SRTTranslator
+
+
+def _acquire_in_thread(limiter, cancel=None):
+    """Chạy acquire() trong luồng riêng, trả về (luồng, kết quả)."""
+    outcome = {}
+
+    def run():
+        start = time.monotonic()
+        try:
+            limiter.acquire(cancel)
+        except TranslationCancelled as e:
+            outcome["error"] = e
+        outcome["seconds"] = time.monotonic() - start
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+
+def test_acquire_spaces_requests():
+    limiter = RateLimiter(600)  # 0,1 giây mỗi yêu cầu
+    start = time.monotonic()
+    for _ in range(4):
+        limiter.acquire()
+    assert 0.25 <= time.monotonic() - start < 1.0
+
+
+def test_set_rate_applies_to_queued_wait():
+    """Yêu cầu đang chờ theo tốc độ cũ (10 giây) đi ngay khi tăng tốc độ."""
+    limiter = RateLimiter(6)
+    limiter.acquire()
+    thread, outcome = _acquire_in_thread(limiter)
+    time.sleep(0.1)
+    limiter.set_rate(6000)
+    thread.join(2)
+    assert not thread.is_alive()
+    assert outcome["seconds"] < 1.0
+
+
+def test_close_and_cancel_release_waiters():
+    limiter = RateLimiter(6)
+    limiter.acquire()
+    token = CancelToken()
+    cancelled, cancelled_outcome = _acquire_in_thread(limiter, token)
+    time.sleep(0.1)
+    token.cancel("test")
+    cancelled.join(2)
+    assert isinstance(cancelled_outcome.get("error"), TranslationCancelled)
+
+    waiting, outcome = _acquire_in_thread(limiter)
+    time.sleep(0.1)
+    limiter.close()
+    waiting.join(2)
+    assert not waiting.is_alive() and "error" not in outcome
+
+
+def test_invalid_rate():
+    with pytest.raises(ValueError):
+        RateLimiter(0)
+
+
+def test_clones_share_rate_limit():
+    """set_rate_limit trên translator gốc áp dụng cho các bản sao của with_callbacks."""
+    translator = SRTTranslator(lambda msg: None)
+    clone = translator.with_callbacks(lambda msg: None)
+    translator.set_rate_limit(60)
+    assert clone.rate_limiter is translator.rate_limiter
+    api = clone.get_api({"type": "gemini", "key": "x"})
+    assert api.rate_limiter is translator.rate_limiter
+
+    clone.set_rate_limit(120)
+    assert translator.rate_limiter.requests_per_minute == 120
+    translator.set_rate_limit(None)
+    assert clone.rate_limiter is None and api.rate_limiter is None
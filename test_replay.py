@@ -0,0 +1,61 @@
+# test_replay.py
+import gzip
+import json
+import subprocess
+import sys
+import zlib
+
+from replay import CASSETTE_VERSION, CassetteAPI, load_cassette
+from translation_apis import TranslationAPI
+
+
+class _EchoAPI(TranslationAPI):
+    model = "echo"
+
+    def _complete(self, prompt):
+        return "[1] Xin chào"
+
+
+_RECORD_AND_EXIT = """
+import os, sys
+sys.path.insert(0, {root!r})
+from replay import CassetteAPI
+from test_replay import _EchoAPI
+api = CassetteAPI(_EchoAPI(), {path!r}, "record")
+api._complete("prompt " + sys.argv[1])
+os._exit(0)
+"""
+
+
+def _entry(text):
+    return (json.dumps({"v": CASSETTE_VERSION, "key": "k", "t": 0, "latency": 0, "text": text}) + "\n").encode()
+
+
+def test_record_then_replay(tmp_path):
+    path = str(tmp_path / "job.cassette.gz")
+    recorder = CassetteAPI(_EchoAPI(), path, "record")
+    assert recorder._complete("hello") == "[1] Xin chào"
+    recorder.close()
+
+    player = CassetteAPI(_EchoAPI(), path, "replay", latency_scale=0)
+    assert player._complete("hello") == "[1] Xin chào"
+
+
+def test_abrupt_exits_keep_cassette_readable(tmp_path):
+    """Hai phiên ghi dừng bằng os._exit (không đóng file) vẫn đọc được cả hai bản ghi."""
+    path = str(tmp_path / "job.cassette.gz")
+    script = _RECORD_AND_EXIT.format(root=str(__import__("os").getcwd()), path=path)
+    for session in ("1", "2"):
+        subprocess.run([sys.executable, "-c", script, session], check=True)
+    entries = load_cassette(path)
+    assert len(entries) == 2
+    assert all(entry["text"] == "[1] Xin chào" for entry in entries)
+
+
+def test_load_keeps_records_around_broken_member(tmp_path):
+    """Member gzip không có phần kết (định dạng cũ) rồi một member mới nối sau."""
+    compressor = zlib.compressobj(wbits=31)
+    unfinished = compressor.compress(_entry("a") + _entry("b")) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    path = tmp_path / "old.cassette.gz"
+    path.write_bytes(unfinished + gzip.compress(_entry("c")) + gzip.compress(_entry("d"))[:15])
+    assert [entry["text"] for entry in load_cassette(str(path))] == ["a", "b", "c"]
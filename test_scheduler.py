@@ -0,0 +1,142 @@
+# test_scheduler.py
+import threading
+import time
+
+import cancellation
+from job_server import JobService
+from scheduler import FairScheduler
+from translation_apis import TranslationAPI
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("Hết thời gian chờ")
+        time.sleep(0.005)
+
+
+def _serve_in_order(scheduler, requests):
+    """Xếp hàng các (job_key, cost) khi chỗ duy nhất đang bận, trả về thứ tự được cấp."""
+    order = []
+    scheduler.acquire("holder")
+    threads = []
+    for job_key, cost in requests:
+        thread = threading.Thread(
+            target=lambda key=job_key, c=cost: (
+                scheduler.acquire(key, c),
+                order.append(key),
+                scheduler.release(key, c),
+            )
+        )
+        thread.start()
+        threads.append(thread)
+        # Giữ thứ tự vào hàng để số thứ tự (seq) ổn định
+        _wait_for(lambda n=len(threads): scheduler.snapshot()["waiting"] == n)
+    scheduler.release("holder")
+    for thread in threads:
+        thread.join(2)
+    return order
+
+
+def test_priority_class_served_first():
+    scheduler = FairScheduler(1)
+    scheduler.register("bulk", "bulk")
+    scheduler.register("urgent", "urgent")
+    order = _serve_in_order(scheduler, [("bulk", 100), ("urgent", 100)])
+    assert order == ["urgent", "bulk"]
+
+
+def test_small_job_not_blocked_by_large_job():
+    """WFQ: lô của việc nhỏ không phải chờ mọi lô của việc lớn xếp trước nó."""
+    scheduler = FairScheduler(1)
+    requests = [("movie", 1000)] * 3 + [("ad", 50)]
+    order = _serve_in_order(scheduler, requests)
+    assert order == ["ad", "movie", "movie", "movie"]
+
+
+def test_expired_deadline_does_not_starve_urgent():
+    """Việc bulk đã trễ hạn (hoặc deadline 0) không còn chen trước việc urgent."""
+    scheduler = FairScheduler(1)
+    scheduler.register("urgent", "urgent")
+    scheduler.register("late", "bulk", deadline=time.time() - 1)
+    order = _serve_in_order(scheduler, [("late", 10), ("urgent", 10)])
+    assert order == ["urgent", "late"]
+
+
+def test_deadline_at_risk_boosted_within_class(monkeypatch):
+    """Việc sắp trễ hạn vượt việc cùng lớp nhưng không vượt lớp cao hơn."""
+    scheduler = FairScheduler(1)
+    monkeypatch.setattr(scheduler, "_service_rate", lambda: 1.0)
+    scheduler.register("urgent", "urgent")
+    scheduler.register("bulk", "bulk")
+    scheduler.register("late", "bulk", deadline=time.time() + 10, total_cost=1000)
+    order = _serve_in_order(scheduler, [("bulk", 10), ("urgent", 10), ("late", 10)])
+    assert order == ["urgent", "late", "bulk"]
+
+
+def test_cancelled_waiter_leaves_queue():
+    scheduler = FairScheduler(1)
+    scheduler.acquire("holder")
+    token = cancellation.CancelToken()
+    errors = []
+
+    def wait():
+        try:
+            scheduler.acquire("job", 1, token)
+        except cancellation.TranslationCancelled as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    _wait_for(lambda: scheduler.snapshot()["waiting"] == 1)
+    token.cancel("test")
+    thread.join(2)
+    assert errors and scheduler.snapshot()["waiting"] == 0
+
+
+class _FlakyAPI(TranslationAPI):
+    """Lần gửi đầu trả về phản hồi rỗng, các lần sau dịch đủ."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def _complete(self, prompt):
+        self.calls += 1
+        if self.calls == 1:
+            return ""
+        return "[1] Xin chào\n[2] Tạm biệt"
+
+
+def test_slot_released_during_backoff(monkeypatch):
+    """Chỗ của scheduler chỉ giữ trong lúc gửi, không giữ khi nghỉ trước khi thử lại."""
+    scheduler = FairScheduler(1)
+    in_flight_while_sleeping = []
+
+    def fake_sleep(seconds, cancel=None):
+        in_flight_while_sleeping.append(scheduler.snapshot()["in_flight"])
+
+    monkeypatch.setattr(cancellation, "sleep", fake_sleep)
+    api = _FlakyAPI()
+    batch = [{"index": 1, "text": "Hello"}, {"index": 2, "text": "Goodbye"}]
+    result = api.translate_batch(
+        batch, 1, lambda msg: None, 3, slot=lambda: scheduler.slot("job", 1)
+    )
+    assert [sub["text"] for sub in result] == ["Xin chào", "Tạm biệt"]
+    assert api.calls == 2
+    assert in_flight_while_sleeping == [0]
+    assert scheduler.snapshot()["in_flight"] == 0
+
+
+def test_job_threads_clamped(tmp_path):
+    """Số luồng của client không vượt num_threads của dịch vụ."""
+    service = JobService(str(tmp_path / "state"), {"type": "gemini", "key": "x"}, 3, 2)
+    try:
+        source = "1\n00:00:01,000 --> 00:00:02,000\nHello\n"
+        job = service.submit({"content": source, "name": "a.srt", "threads": 50})
+        assert job.options["num_threads"] == 3
+        service.reconfigure(job.id, {"threads": 40})
+        assert job.control.settings["num_threads"] == 3
+        assert service.executor._max_workers == 3 * 2
+    finally:
+        service.executor.shutdown()
@@ -0,0 +1,46 @@
+# test_sharding.py
+import threading
+import time
+
+from benchmarks.mock_llm_server import MockLLMConfig, MockLLMServer
+from benchmarks.synthetic_srt import write_synthetic_srt
+from cancellation import CancelToken
+from sharding import ShardCoordinator, translate_sharded
+from srt_translator import SRTTranslator
+
+
+def test_coordinator_stops_claims_after_cancel():
+    coordinator = ShardCoordinator([("a.srt", "a_vi.srt"), ("b.srt", "b_vi.srt")])
+    assert coordinator.claim(1) == ("a.srt", "a_vi.srt")
+    assert coordinator.cancel_reason() is None
+    coordinator.cancel("dừng")
+    assert coordinator.cancel_reason() == "dừng"
+    assert coordinator.claim(1) is None
+
+
+def test_cancel_stops_worker_processes(tmp_path):
+    """Huỷ giữa chừng: các tiến trình dừng sớm, file chưa xong có kết quả False."""
+    files = []
+    for i in range(4):
+        path = write_synthetic_srt(str(tmp_path / f"f{i}.srt"), 200, seed=i)
+        files.append((path, str(tmp_path / f"f{i}_vi.srt")))
+
+    messages = []
+    translator = SRTTranslator(messages.append)
+    translator.cancel_token = CancelToken()
+    with MockLLMServer(MockLLMConfig(latency="fixed:0.3", seed=1)) as server:
+        config = {"type": "gemini", "key": "x", "base_url": server.gemini_base_url}
+        timer = threading.Timer(4.0, translator.cancel_token.cancel, ("dừng",))
+        timer.start()
+        start = time.monotonic()
+        try:
+            results = translate_sharded(translator, files, config, 2, 1, 5, 1)
+        finally:
+            timer.cancel()
+        elapsed = time.monotonic() - start
+
+    # Không huỷ thì mỗi file cần khoảng 40 lô x 0.3 giây
+    assert elapsed < 20
+    assert not all(results.values())
+    assert any("Đã dừng dịch theo yêu cầu" in msg for msg in messages)
+    assert not any("dừng bất thường" in msg for msg in messages)
@@ -0,0 +1,70 @@
+# test_srt_translator.py
+import profiling
+import srt_translator
+from srt_translator import SRTTranslator
+from subtitle_cue import Cue
+
+ENGLISH = "This sentence is clearly English"
+
+
+class _RetryAPI:
+    """Dịch lại phụ đề 1 đúng, phụ đề 2 vẫn giữ tiếng Anh."""
+
+    def translate_batch(self, batch, thread_id, update_status, *args, **kwargs):
+        result = []
+        for cue in batch:
+            text = "Câu này đã được dịch" if cue.index == 1 else ENGLISH
+            result.append(Cue(cue.index, cue.start_ms, cue.end_ms, text, cue.text))
+        return result
+
+
+class _RecordingState:
+    def __init__(self):
+        self.records = []
+
+    def append(self, cues):
+        self.records.append([(cue.index, cue.text) for cue in cues])
+
+
+def test_quality_pass_journals_only_kept_retries(monkeypatch):
+    """Bản dịch lại của vòng QA chỉ được ghi nhật ký khi được giữ."""
+    monkeypatch.setattr(srt_translator, "BATCH_PAUSE_SECONDS", 0)
+    translator = SRTTranslator(lambda msg: None)
+    monkeypatch.setattr(translator, "get_api", lambda api_config: _RetryAPI())
+    subtitles = [Cue(i, i * 1000, i * 1000 + 900, ENGLISH) for i in (1, 2)]
+    translated = [Cue(i, i * 1000, i * 1000 + 900, ENGLISH, ENGLISH) for i in (1, 2)]
+    state = _RecordingState()
+    result = translator.quality_pass(subtitles, translated, {"qa": {"rounds": 1}}, 1, state)
+    assert state.records == [[(1, "Câu này đã được dịch")]]
+    assert [cue.text for cue in result] == ["Câu này đã được dịch", ENGLISH]
+    assert "qa_issues" in result[1]
+
+
+def _profiled_run(tmp_path, monkeypatch, profile):
+    monkeypatch.setattr(srt_translator, "BATCH_PAUSE_SECONDS", 0)
+    source = tmp_path / "a.srt"
+    source.write_text("1\n00:00:01,000 --> 00:00:02,000\nHello\n", encoding="utf-8")
+    messages = []
+    status = messages.append
+    translator = SRTTranslator(status, state_dir=str(tmp_path / "state"))
+    monkeypatch.setattr(translator, "get_api", lambda api_config: _RetryAPI())
+    ok = translator.translate_file(
+        str(source), str(tmp_path / "vi.srt"), {"qa": False}, 1, profile=profile
+    )
+    assert translator.update_status is status
+    return ok, messages
+
+
+def test_profiled_run_leaves_callbacks_untouched(tmp_path, monkeypatch):
+    ok, messages = _profiled_run(tmp_path, monkeypatch, "stages")
+    assert ok
+    assert "\n===== PROFILE THEO GIAI ĐOẠN =====" in messages
+
+
+def test_profiler_start_failure_reported(tmp_path, monkeypatch):
+    """Phiên profile khác đang chạy hoặc chế độ sai: báo lỗi, trả về False."""
+    ok, messages = _profiled_run(tmp_path, monkeypatch, "bogus")
+    assert not ok and any("Lỗi khi bật profile" in msg for msg in messages)
+    with profiling.JobProfiler("stages"):
+        ok, messages = _profiled_run(tmp_path, monkeypatch, "stages")
+    assert not ok and any("phiên profile khác" in msg for msg in messages)
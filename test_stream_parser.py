@@ -0,0 +1,105 @@
+# test_stream_parser.py
+import pytest
+
+import cancellation
+from stream_parser import StreamDerailed, StreamingCueParser, looks_untranslated
+from translation_apis import MAX_STREAM_DERAILS, TranslationAPI
+
+RESPONSE = "[1] Xin chào\n[2] Tạm biệt nhé\n[3] Cảm ơn bạn\n"
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, len(RESPONSE)])
+def test_cues_emitted_as_blocks_close(size):
+    """Kết quả không phụ thuộc cách cắt đoạn, kể cả khi dấu [n] bị cắt đôi."""
+    parser = StreamingCueParser(3)
+    emitted = []
+    for i in range(0, len(RESPONSE), size):
+        emitted.extend(parser.feed(RESPONSE[i : i + size]))
+    assert emitted == [(1, "Xin chào"), (2, "Tạm biệt nhé")]
+    assert parser.close() == [(3, "Cảm ơn bạn")]
+    assert parser.text == RESPONSE
+
+
+def test_cue_emitted_before_response_ends():
+    parser = StreamingCueParser(2)
+    assert parser.feed("[1] Xin chào\n[2] Tạm") == [(1, "Xin chào")]
+    assert parser.feed(" biệt") == []
+    assert parser.close() == [(2, "Tạm biệt")]
+
+
+def test_multiline_cue_and_inline_brackets():
+    parser = StreamingCueParser(2)
+    emitted = parser.feed("[1] Dòng một\nDòng hai [3] vẫn là [1]\n[2] Hết")
+    assert emitted == [(1, "Dòng một\nDòng hai [3] vẫn là [1]")]
+    assert parser.close() == [(2, "Hết")]
+
+
+@pytest.mark.parametrize("response", ["[1] A\n[1] B", "[2] A\n[1] B", "[1] A\n[4] B"])
+def test_bad_numbering_derails(response):
+    parser = StreamingCueParser(3)
+    with pytest.raises(StreamDerailed):
+        parser.feed(response)
+
+
+def test_wrong_language_derails():
+    sources = ["Hello there my friend"] * 4
+    parser = StreamingCueParser(4, sources)
+    response = "".join(f"[{i}] Hello there my friend\n" for i in range(1, 5))
+    assert len(parser.feed(response)) == 3
+    with pytest.raises(StreamDerailed):
+        parser.close()
+    assert parser.suspicious == 4
+
+
+def test_repeated_lyrics_not_derailed():
+    """Lời bài hát giữ nguyên bản gốc chỉ là thiểu số của lô thì không bị huỷ."""
+    sources = ["Never gonna give you up", "Never gonna let you down", "Never gonna run around"]
+    sources += ["Xin chào"] * 5
+    parser = StreamingCueParser(len(sources), sources)
+    response = "".join(f"[{i}] {text}\n" for i, text in enumerate(sources, 1))
+    assert len(parser.feed(response)) == len(sources) - 1
+    assert parser.close() == [(len(sources), "Xin chào")]
+    assert parser.suspicious == 3
+
+
+def test_looks_untranslated():
+    assert looks_untranslated("This sentence is clearly English")
+    assert not looks_untranslated("Câu này đã được dịch sang tiếng Việt")
+    assert not looks_untranslated("OK")
+    assert not looks_untranslated("Kalimat ini bahasa Indonesia", target_language="id")
+    assert looks_untranslated("Same text as the source", "Same  text as the source", "id")
+
+
+LYRICS = ["Never gonna give you up", "Never gonna let you down", "Never gonna run around"]
+
+
+class _LyricsAPI(TranslationAPI):
+    """Phản hồi giữ nguyên lời bài hát gốc, cả khi streaming lẫn không."""
+
+    stream = True
+
+    def __init__(self):
+        self.streamed = 0
+        self.completed = 0
+
+    def _response(self):
+        return "".join(f"[{i}] {text}\n" for i, text in enumerate(LYRICS, 1))
+
+    def _stream(self, prompt):
+        self.streamed += 1
+        yield self._response()
+
+    def _complete(self, prompt):
+        self.completed += 1
+        return self._response()
+
+
+def test_derailed_batch_falls_back_to_plain_parse(monkeypatch):
+    """Lệch hướng quá MAX_STREAM_DERAILS lần thì lô được gửi lại không streaming."""
+    monkeypatch.setattr(cancellation, "sleep", lambda seconds, cancel=None: None)
+    api = _LyricsAPI()
+    batch = [{"index": i, "text": text} for i, text in enumerate(LYRICS, 1)]
+    result = api.translate_batch(batch, 1, lambda msg: None, 5)
+    assert [sub["text"] for sub in result] == LYRICS
+    assert api.streamed == MAX_STREAM_DERAILS
+    assert api.completed == 1
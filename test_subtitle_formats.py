@@ -0,0 +1,119 @@
+# test_subtitle_formats.py
+import pytest
+
+from subtitle_formats import AssCodec, VttCodec, read_cues, restore_tags, split_tags, write_cues
+
+VTT = """WEBVTT
+
+00:00:01.000 --> 00:00:02.000
+Plain <b>bold</b> text
+
+00:00:03.000 --> 00:00:04.000
+<i>Hello <b>world</b></i>
+
+"""
+
+ASS = "\n".join(
+    AssCodec.DEFAULT_HEADER
+    + [
+        "Format: " + ", ".join(AssCodec.DEFAULT_FORMAT),
+        r"Dialogue: 0,0:00:01.00,0:00:02.00,Default,,0,0,0,,and{\b1} bold{\b0} word",
+        r"Dialogue: 0,0:00:03.00,0:00:04.00,Default,,0,0,0,,{\an8}Top {\i1}line{\i0}",
+    ]
+) + "\n"
+
+
+def _translate(cues, texts):
+    for cue, text in zip(cues, texts):
+        cue.original_text = cue.text
+        cue.text = text
+    return cues
+
+
+@pytest.mark.parametrize("name, content", [("a.vtt", VTT), ("a.ass", ASS)])
+def test_mid_line_tags_round_trip(tmp_path, name, content):
+    """Đọc rồi ghi lại (chưa dịch) giữ nguyên thẻ giữa câu."""
+    source = tmp_path / name
+    source.write_text(content, encoding="utf-8")
+    header = {}
+    cues = list(read_cues(str(source), header))
+    output = tmp_path / f"out_{name}"
+    write_cues(str(output), cues, header)
+    assert output.read_text(encoding="utf-8") == content
+
+
+def test_translated_vtt_wraps_inner_tags_around_line(tmp_path):
+    source = tmp_path / "a.vtt"
+    source.write_text(VTT, encoding="utf-8")
+    header = {}
+    cues = _translate(list(read_cues(str(source), header)), ["Văn bản đậm thường", "Xin chào thế giới"])
+    output = tmp_path / "vi.vtt"
+    write_cues(str(output), cues, header)
+    text = output.read_text(encoding="utf-8")
+    assert "<b>Văn bản đậm thường</b>\n" in text
+    assert "<i><b>Xin chào thế giới</b></i>\n" in text
+
+
+def test_translated_ass_wraps_inner_tags_around_line(tmp_path):
+    source = tmp_path / "a.ass"
+    source.write_text(ASS, encoding="utf-8")
+    header = {}
+    cues = _translate(list(read_cues(str(source), header)), ["và một từ đậm", "Dòng trên"])
+    output = tmp_path / "vi.ass"
+    write_cues(str(output), cues, header)
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert lines[-2].endswith(r",{\b1}và một từ đậm{\b0}")
+    assert lines[-1].endswith(r",{\an8}{\i1}Dòng trên{\i0}")
+
+
+def test_leading_and_trailing_tags_keep_place():
+    plain, tags = split_tags("<i>All italic</i>", VttCodec.TAG)
+    assert restore_tags("Nghiêng hết", tags, exact=False) == "<i>Nghiêng hết</i>"
+    plain, tags = split_tags(r"{\an8}Top line", AssCodec.TAG)
+    assert restore_tags("Dòng trên", tags, exact=False) == r"{\an8}Dòng trên"
+
+
+def test_style_switch_moves_to_start():
+    """Thẻ không phải thẻ đóng (đổi màu, đổi style) giữa câu được dời về đầu."""
+    plain, tags = split_tags(r"Say {\c&H00FF00&}green {\rAlt}alt", AssCodec.TAG)
+    assert restore_tags("Nói", tags, exact=False) == r"{\c&H00FF00&}{\rAlt}Nói"
+    plain, tags = split_tags(r"a {\b1}b{\b0\i0} c", AssCodec.TAG)
+    assert restore_tags("xyz", tags, exact=False) == r"{\b1}xyz{\b0\i0}"
+
+
+BAD_TIMINGS = {
+    "a.srt": (
+        "1\n00:00:01,000 --> 00:00:02,000\nMột\n\n"
+        "2\n00:00:0x,000 --> 00:00:04,000\nHỏng\n\n"
+        "3\n00:00:05,000 --> 00:00:06,000\nBa\n"
+    ),
+    "a.vtt": (
+        "WEBVTT\n\n00:00:01.000 --> 00:00:02.000\nMột\n\n"
+        "00:00:0x.000 --> 00:00:04.000\nHỏng\n\n"
+        "00:00:05.000 --> 00:00:06.000\nBa\n"
+    ),
+    "a.sbv": (
+        "0:00:01.000,0:00:02.000\nMột\n\n"
+        "0:00:0x.000,0:00:04.000\nHỏng\n\n"
+        "0:00:05.000,0:00:06.000\nBa\n"
+    ),
+    "a.ass": "\n".join(
+        AssCodec.DEFAULT_HEADER
+        + [
+            "Format: " + ", ".join(AssCodec.DEFAULT_FORMAT),
+            "Dialogue: 0,0:00:01.00,0:00:02.00,Default,,0,0,0,,Một",
+            "Dialogue: 0,0:00:0x.00,0:00:04.00,Default,,0,0,0,,Hỏng",
+            "Dialogue: 0,0:00:05.00,0:00:06.00,Default,,0,0,0,,Ba",
+        ]
+    ),
+}
+
+
+@pytest.mark.parametrize("name", sorted(BAD_TIMINGS))
+def test_malformed_timing_skips_block(tmp_path, name):
+    """Thời gian hỏng chỉ làm mất khối đó, không dừng đọc cả file."""
+    source = tmp_path / name
+    source.write_text(BAD_TIMINGS[name], encoding="utf-8")
+    cues = list(read_cues(str(source)))
+    assert [cue.text for cue in cues] == ["Một", "Ba"]
+    assert [(cue.start_ms, cue.end_ms) for cue in cues] == [(1000, 2000), (5000, 6000)]
@@ -0,0 +1,69 @@
+# test_timestamps.py
+import pytest
+
+from subtitle_cue import Cue
+from timestamps import Timeline, format_timestamps, parse_fps, parse_timestamps, retime_cues, to_list
+
+
+def _cues(*spans, text="Hi"):
+    return [Cue(i, start, end, text) for i, (start, end) in enumerate(spans, 1)]
+
+
+def _spans(cues):
+    return [(cue.start_ms, cue.end_ms) for cue in cues]
+
+
+def test_parse_and_format_round_trip():
+    values = [0, 1, 59_999, 3_600_000, 359_999_999, 360_000_000 + 1234]
+    texts = format_timestamps(values)
+    assert texts[:5] == ["00:00:00,000", "00:00:00,001", "00:00:59,999", "01:00:00,000", "99:59:59,999"]
+    assert texts[5] == "100:00:01,234"
+    assert to_list(parse_timestamps(texts)) == values
+    assert format_timestamps([-5]) == ["00:00:00,000"]
+    assert to_list(parse_timestamps(["00:00:01.500"])) == [1500]
+
+
+def test_parse_fps():
+    assert parse_fps("25:23.976") == (25.0, 23.976)
+    assert parse_fps((24, 25)) == (24.0, 25.0)
+
+
+def test_fps_then_shift():
+    cues = retime_cues(_cues((1000, 2000), (500, 800)), {"fps": "25:23.976", "shift_ms": -600})
+    assert _spans(cues) == [(round(1000 * 25 / 23.976) - 600, round(2000 * 25 / 23.976) - 600), (0, 234)]
+
+
+def test_extend_for_cps_never_overlaps_next_cue():
+    cues = _cues((0, 500), (1500, 1600), (5000, 5100), text="x" * 34)
+    retime_cues(cues, {"max_cps": 17, "min_gap_ms": 100})
+    # 34 ký tự ở 17 ký tự/giây cần 2 giây, bị chặn bởi phụ đề kế tiếp
+    assert _spans(cues) == [(0, 1400), (1500, 3500), (5000, 7000)]
+
+
+def test_extend_for_cps_min_duration_and_never_shortens():
+    cues = _cues((0, 3000), (4000, 4100), text="Hi")
+    retime_cues(cues, {"max_cps": 17, "min_duration_ms": 1000})
+    assert _spans(cues) == [(0, 3000), (4000, 5000)]
+
+
+def test_fix_overlaps_keeps_intentional_overlap():
+    cues = _cues((0, 2000), (1500, 3000), (1500, 2500), (2400, 2600))
+    retime_cues(cues, {"fix_overlaps": True, "min_gap_ms": 50})
+    # Phụ đề 2 và 3 bắt đầu cùng lúc (hiển thị chồng có chủ ý) được giữ nguyên
+    assert _spans(cues) == [(0, 1450), (1500, 3000), (1500, 2350), (2400, 2600)]
+
+
+def test_retime_coerces_dicts():
+    cues = retime_cues(
+        [{"index": 1, "start_time": "00:00:01,000", "end_time": "00:00:02,000", "text": "Hi"}],
+        {"shift_ms": 250},
+    )
+    assert isinstance(cues[0], Cue)
+    assert (cues[0].start_time, cues[0].end_time) == ("00:00:01,250", "00:00:02,250")
+
+
+def test_timeline_length_mismatch():
+    with pytest.raises(ValueError):
+        Timeline([0, 1], [2])
+    with pytest.raises(ValueError):
+        Timeline([0], [1]).extend_for_cps(["a", "b"], 17)
@@ -0,0 +1,71 @@
+# test_translation_apis.py
+import threading
+
+import translation_apis
+from translation_apis import GeminiAPI
+
+
+class _Response:
+    def __init__(self, status_code, name=None):
+        self.status_code = status_code
+        self._name = name
+
+    def json(self):
+        return {"name": self._name}
+
+
+def _api(responses):
+    """GeminiAPI có cachedContent, yêu cầu tạo cache trả về lần lượt responses."""
+    api = GeminiAPI("x", "m", "http://mock", use_cached_content=True)
+    calls = []
+
+    def post(url, json=None, timeout=None):
+        calls.append(url)
+        response = responses.pop(0)
+        return response() if callable(response) else response
+
+    api._session.post = post
+    return api, calls
+
+
+def test_transient_cache_error_retried_later(monkeypatch):
+    api, calls = _api([_Response(503), _Response(429), _Response(200, "cachedContents/1")])
+    assert api._cached_content("system") is None
+    # Trong thời gian chờ không gửi lại yêu cầu tạo cache
+    assert api._cached_content("system") is None
+    assert len(calls) == 1
+    monkeypatch.setattr(translation_apis, "GEMINI_CACHE_RETRY_SECONDS", 0)
+    api._cache_retry_at = 0.0
+    assert api._cached_content("system") is None
+    assert api._cached_content("system") == "cachedContents/1"
+    assert api.use_cached_content and len(calls) == 3
+
+
+def test_unsupported_cache_disabled():
+    api, calls = _api([_Response(400)])
+    assert api._cached_content("system") is None
+    assert not api.use_cached_content
+    assert api._cached_content("system") is None
+    assert len(calls) == 1
+
+
+def test_cache_creation_single_flight():
+    """Trong lúc một luồng đang tạo cache, luồng khác không chờ và không gửi thêm."""
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_response():
+        started.set()
+        release.wait(2)
+        return _Response(200, "cachedContents/1")
+
+    api, calls = _api([slow_response])
+    results = []
+    thread = threading.Thread(target=lambda: results.append(api._cached_content("system")))
+    thread.start()
+    assert started.wait(2)
+    assert api._cached_content("system") is None
+    release.set()
+    thread.join(2)
+    assert results == ["cachedContents/1"]
+    assert len(calls) == 1
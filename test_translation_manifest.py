@@ -0,0 +1,36 @@
+# test_translation_manifest.py
+from subtitle_cue import Cue
+from translation_apis import TranslationAPI
+from translation_manifest import TranslationManifest
+
+
+class _StubAPI(TranslationAPI):
+    def _complete(self, prompt):
+        return ""
+
+
+def _cues(*texts):
+    return [Cue(i, i * 1000, i * 1000 + 500, text) for i, text in enumerate(texts, 1)]
+
+
+def test_missing_translation_not_marked_translated():
+    batch = _cues("Hello", "Goodbye")
+    messages = []
+    result = _StubAPI().apply_translations(batch, {1: "Xin chào"}, 1, messages.append)
+    assert result[0]["original_text"] == "Hello" and result[0]["text"] == "Xin chào"
+    assert "original_text" not in result[1] and result[1]["text"] == "Goodbye"
+    assert messages
+
+
+def test_save_skips_untranslated_and_qa_flagged(tmp_path):
+    translated = _StubAPI().apply_translations(
+        _cues("Hello", "Goodbye", "Thanks"), {1: "Xin chào", 3: "Thanks"}, 1, lambda msg: None
+    )
+    translated[2]["qa_issues"] = ["untranslated"]
+    path = str(tmp_path / "a_vi.srt.manifest.json")
+    TranslationManifest().save(path, translated)
+
+    manifest = TranslationManifest.load(path)
+    assert manifest.lookup("Hello") == "Xin chào"
+    assert manifest.lookup("Goodbye") is None
+    assert manifest.lookup("Thanks") is None
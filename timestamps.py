@@ -0,0 +1,308 @@
+# timestamps.py
+"""
+Xử lý thời gian phụ đề hàng loạt.
+
+Thời gian của cả file được gom thành hai mảng số nguyên mili giây (bắt đầu,
+kết thúc) rồi biến đổi cùng lúc: dời, co giãn (đổi fps, ví dụ 25 <-> 23.976),
+sửa chồng lấn và kéo dài phụ đề cho đủ thời gian đọc (ký tự/giây). Dùng NumPy
+nếu có cài đặt, ngược lại dùng Python thuần với cùng kết quả.
+
+Chuyển đổi chuỗi "HH:MM:SS,mmm" <-> mili giây cũng có bản hàng loạt
+(parse_timestamps/format_timestamps), đủ nhanh cho file 100k phụ đề.
+
+Chỉnh thời gian một file:
+    python timestamps.py in.srt out.srt --shift 1500 --fps 25:23.976 --max-cps 17
+"""
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from subtitle_cue import Cue, parse_timestamp
+
+try:
+    import numpy as np
+except ImportError:  # NumPy là tuỳ chọn
+    np = None
+
+# Độ dài chuỗi "HH:MM:SS,mmm"
+TIMESTAMP_WIDTH = 12
+
+_TWO_DIGITS = [f"{i:02d}" for i in range(100)]
+_THREE_DIGITS = [f"{i:03d}" for i in range(1000)]
+
+
+def backend() -> str:
+    """Tên phần xử lý đang dùng: "numpy" hoặc "python"."""
+    return "numpy" if np is not None else "python"
+
+
+def _as_array(values: Iterable[int]):
+    if np is not None:
+        return np.array(values, dtype=np.int64)
+    return [int(v) for v in values]
+
+
+def to_list(values) -> List[int]:
+    """Mảng mili giây -> list số nguyên Python (để lưu vào Cue/JSON)."""
+    return values.tolist() if np is not None else list(values)
+
+
+def parse_timestamps(timestamps: Sequence[str]):
+    """Chuyển danh sách "HH:MM:SS,mmm" thành mảng mili giây."""
+    if not timestamps:
+        return _as_array([])
+    if np is not None and all(len(t) == TIMESTAMP_WIDTH for t in timestamps):
+        try:
+            raw = np.frombuffer("".join(timestamps).encode("ascii"), dtype=np.uint8)
+        except UnicodeEncodeError:
+            raw = None
+        if raw is not None:
+            digits = raw.reshape(-1, TIMESTAMP_WIDTH).astype(np.int64) - ord("0")
+            columns = [0, 1, 3, 4, 6, 7, 9, 10, 11]
+            if ((digits[:, columns] >= 0) & (digits[:, columns] <= 9)).all():
+                hours = digits[:, 0] * 10 + digits[:, 1]
+                minutes = digits[:, 3] * 10 + digits[:, 4]
+                seconds = digits[:, 6] * 10 + digits[:, 7]
+                millis = digits[:, 9] * 100 + digits[:, 10] * 10 + digits[:, 11]
+                return ((hours * 60 + minutes) * 60 + seconds) * 1000 + millis
+    values = []
+    append = values.append
+    for t in timestamps:
+        if len(t) == TIMESTAMP_WIDTH:
+            # Một lần int() cho cả HHMMSSmmm; SSmmm đã đúng là mili giây
+            v = int(t[0:2] + t[3:5] + t[6:8] + t[9:12])
+            append(v // 10000000 * 3600000 + v // 100000 % 100 * 60000 + v % 100000)
+        else:
+            append(parse_timestamp(t))
+    return _as_array(values)
+
+
+def format_timestamps(values: Iterable[int]) -> List[str]:
+    """Chuyển mảng mili giây thành danh sách "HH:MM:SS,mmm" (giá trị âm coi là 0)."""
+    if np is not None:
+        ms = np.maximum(np.asarray(values, dtype=np.int64), 0)
+        if ms.size and ms.max() < 100 * 3600 * 1000:
+            # Ghép thẳng mã ASCII của từng chữ số thành một bộ đệm
+            out = np.empty((ms.size, TIMESTAMP_WIDTH), dtype=np.uint8)
+            out[:, 2] = out[:, 5] = ord(":")
+            out[:, 8] = ord(",")
+            fields = (
+                (ms // 3600000, (0, 1)),
+                (ms // 60000 % 60, (3, 4)),
+                (ms // 1000 % 60, (6, 7)),
+                (ms % 1000, (9, 10, 11)),
+            )
+            for field, columns in fields:
+                for power, column in enumerate(reversed(columns)):
+                    out[:, column] = field // 10**power % 10 + ord("0")
+            text = out.tobytes().decode("ascii")
+            return [
+                text[i : i + TIMESTAMP_WIDTH]
+                for i in range(0, len(text), TIMESTAMP_WIDTH)
+            ]
+        values = ms.tolist()
+    result = []
+    for value in values:
+        seconds, millis = divmod(max(int(value), 0), 1000)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        result.append(
+            f"{_TWO_DIGITS[hours] if hours < 100 else hours}:{_TWO_DIGITS[minutes]}:"
+            f"{_TWO_DIGITS[seconds]},{_THREE_DIGITS[millis]}"
+        )
+    return result
+
+
+def reading_length(text: str) -> int:
+    """Số ký tự được tính khi đo tốc độ đọc (bỏ xuống dòng và khoảng trắng đầu/cuối)."""
+    return len(text.strip().replace("\n", ""))
+
+
+class Timeline:
+    """
+    Thời gian bắt đầu/kết thúc của một danh sách phụ đề (theo thứ tự file).
+
+    Các phép biến đổi sửa tại chỗ và trả về chính Timeline để viết nối tiếp:
+        Timeline.from_cues(cues).scale_fps(25, 23.976).shift(500).apply(cues)
+    """
+
+    def __init__(self, starts: Iterable[int], ends: Iterable[int]):
+        self.starts = _as_array(starts)
+        self.ends = _as_array(ends)
+        if len(self.starts) != len(self.ends):
+            raise ValueError("Số thời điểm bắt đầu và kết thúc không khớp")
+
+    @classmethod
+    def from_cues(cls, cues: Sequence[Cue]) -> "Timeline":
+        return cls([cue.start_ms for cue in cues], [cue.end_ms for cue in cues])
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def shift(self, offset_ms: int) -> "Timeline":
+        """Dời mọi thời điểm offset_ms mili giây (không xuống dưới 0)."""
+        if np is not None:
+            self.starts = np.maximum(self.starts + offset_ms, 0)
+            self.ends = np.maximum(self.ends + offset_ms, 0)
+        else:
+            self.starts = [max(t + offset_ms, 0) for t in self.starts]
+            self.ends = [max(t + offset_ms, 0) for t in self.ends]
+        return self
+
+    def scale(self, factor: float, origin_ms: int = 0) -> "Timeline":
+        """Co giãn thời gian quanh origin_ms theo hệ số factor (làm tròn tới ms)."""
+        if np is not None:
+            self.starts = np.rint(origin_ms + (self.starts - origin_ms) * factor).astype(np.int64)
+            self.ends = np.rint(origin_ms + (self.ends - origin_ms) * factor).astype(np.int64)
+        else:
+            self.starts = [round(origin_ms + (t - origin_ms) * factor) for t in self.starts]
+            self.ends = [round(origin_ms + (t - origin_ms) * factor) for t in self.ends]
+        return self
+
+    def scale_fps(self, source_fps: float, target_fps: float) -> "Timeline":
+        """Đổi thời gian khớp video source_fps sang bản target_fps (ví dụ 25 -> 23.976)."""
+        return self.scale(source_fps / target_fps)
+
+    def fix_overlaps(self, min_gap_ms: int = 0) -> "Timeline":
+        """
+        Cắt phần kết thúc của mỗi phụ đề để cách phụ đề sau ít nhất min_gap_ms.
+        Phụ đề bắt đầu cùng lúc hoặc sau phụ đề kế tiếp (hiển thị chồng có chủ
+        ý) được giữ nguyên.
+        """
+        if len(self) < 2:
+            return self
+        if np is not None:
+            limits = self.starts[1:] - min_gap_ms
+            head = self.ends[:-1]
+            self.ends[:-1] = np.where(
+                limits > self.starts[:-1], np.minimum(head, limits), head
+            )
+        else:
+            ends = self.ends
+            for i in range(len(ends) - 1):
+                limit = self.starts[i + 1] - min_gap_ms
+                if limit > self.starts[i] and ends[i] > limit:
+                    ends[i] = limit
+        return self
+
+    def extend_for_cps(
+        self,
+        texts: Sequence[str],
+        max_cps: float,
+        min_duration_ms: int = 0,
+        min_gap_ms: int = 0,
+    ) -> "Timeline":
+        """
+        Kéo dài phụ đề để tốc độ đọc không vượt max_cps ký tự/giây (và hiển
+        thị ít nhất min_duration_ms), không lấn vào phụ đề kế tiếp (cách ít
+        nhất min_gap_ms). Phụ đề không bao giờ bị rút ngắn.
+        """
+        if len(texts) != len(self):
+            raise ValueError("Số văn bản không khớp số phụ đề")
+        if not len(self):
+            return self
+        lengths = [reading_length(text) for text in texts]
+        if np is not None:
+            needed = np.ceil(np.array(lengths, dtype=np.float64) * 1000 / max_cps)
+            needed = np.maximum(needed.astype(np.int64), min_duration_ms)
+            target = np.maximum(self.ends, self.starts + needed)
+            limits = np.empty_like(target)
+            limits[:-1] = self.starts[1:] - min_gap_ms
+            limits[-1] = np.iinfo(np.int64).max
+            self.ends = np.maximum(self.ends, np.minimum(target, limits))
+        else:
+            count = len(self)
+            for i in range(count):
+                needed = max(math.ceil(lengths[i] * 1000 / max_cps), min_duration_ms)
+                target = max(self.ends[i], self.starts[i] + needed)
+                if i + 1 < count:
+                    target = min(target, self.starts[i + 1] - min_gap_ms)
+                self.ends[i] = max(self.ends[i], target)
+        return self
+
+    def apply(self, cues: Sequence[Cue]) -> None:
+        """Ghi thời gian đã biến đổi trở lại các phụ đề."""
+        for cue, start, end in zip(cues, to_list(self.starts), to_list(self.ends)):
+            cue.start_ms = start
+            cue.end_ms = end
+
+    def format(self) -> Tuple[List[str], List[str]]:
+        """Chuỗi "HH:MM:SS,mmm" của thời điểm bắt đầu và kết thúc."""
+        return format_timestamps(self.starts), format_timestamps(self.ends)
+
+
+def parse_fps(value) -> Tuple[float, float]:
+    """Đọc cặp fps "nguồn:đích" (ví dụ "25:23.976") hoặc tuple."""
+    if isinstance(value, str):
+        source, _, target = value.partition(":")
+        return float(source), float(target)
+    source, target = value
+    return float(source), float(target)
+
+
+def retime_cues(cues: Sequence[Cue], options: Dict) -> List[Cue]:
+    """
+    Chỉnh thời gian phụ đề tại chỗ theo options:
+        fps: Đổi fps, "nguồn:đích" hoặc (nguồn, đích)
+        shift_ms: Dời toàn bộ thời gian
+        max_cps: Kéo dài phụ đề theo tốc độ đọc (dùng văn bản hiện tại,
+            tức bản dịch nếu đã dịch)
+        min_duration_ms: Thời gian hiển thị tối thiểu khi dùng max_cps
+        min_gap_ms: Khoảng cách tối thiểu giữa hai phụ đề
+        fix_overlaps: Cắt phần chồng lấn với phụ đề kế tiếp
+    Trả về danh sách Cue (dict dạng cũ được chuyển thành Cue).
+    """
+    cues = [Cue.coerce(cue) for cue in cues]
+    timeline = Timeline.from_cues(cues)
+    if options.get("fps"):
+        timeline.scale_fps(*parse_fps(options["fps"]))
+    if options.get("shift_ms"):
+        timeline.shift(int(options["shift_ms"]))
+    min_gap_ms = int(options.get("min_gap_ms", 0))
+    if options.get("max_cps"):
+        timeline.extend_for_cps(
+            [cue.text for cue in cues],
+            float(options["max_cps"]),
+            int(options.get("min_duration_ms", 0)),
+            min_gap_ms,
+        )
+    if options.get("fix_overlaps"):
+        timeline.fix_overlaps(min_gap_ms)
+    timeline.apply(cues)
+    return cues
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    from srt_translator import SRTTranslator
+
+    parser = argparse.ArgumentParser(description="Chỉnh thời gian phụ đề hàng loạt")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--shift", type=int, default=0, help="Dời thời gian (ms, có thể âm)")
+    parser.add_argument("--fps", default=None, help='Đổi fps, ví dụ "25:23.976"')
+    parser.add_argument("--max-cps", type=float, default=None)
+    parser.add_argument("--min-duration", type=int, default=0, help="ms")
+    parser.add_argument("--min-gap", type=int, default=0, help="ms")
+    parser.add_argument("--fix-overlaps", action="store_true")
+    args = parser.parse_args(argv)
+
+    translator = SRTTranslator(update_status_callback=lambda msg: None)
+    cues = translator.parse_subtitles(args.input)
+    retime_cues(
+        cues,
+        {
+            "fps": args.fps,
+            "shift_ms": args.shift,
+            "max_cps": args.max_cps,
+            "min_duration_ms": args.min_duration,
+            "min_gap_ms": args.min_gap,
+            "fix_overlaps": args.fix_overlaps,
+        },
+    )
+    translator.write_subtitles(cues, args.output, source_file=args.input)
+    print(f"Đã chỉnh {len(cues)} phụ đề ({backend()}) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# token_usage.py
+"""
+Thống kê token và độ trễ của các yêu cầu API (an toàn đa luồng).
+
+Mỗi SRTTranslator (và mỗi công việc trong job_server) có một UsageStats; lớp
+API ghi lại số token đầu vào, số token được nhà cung cấp cache, số token đầu
+ra, độ trễ và thời gian tới token đầu tiên (TTFT) của từng yêu cầu.
+"""
+import threading
+from typing import Dict, Optional
+
+_FIELDS = (
+    "requests",
+    "prompt_tokens",
+    "cached_tokens",
+    "output_tokens",
+    "latency_total",
+    "ttft_total",
+)
+
+
+class UsageStats:
+    """Bộ cộng dồn token/độ trễ."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = dict.fromkeys(_FIELDS, 0)
+
+    def add(
+        self,
+        prompt_tokens: int = 0,
+        cached_tokens: int = 0,
+        output_tokens: int = 0,
+        latency: float = 0.0,
+        ttft: Optional[float] = None,
+    ) -> None:
+        """Ghi nhận một yêu cầu API thành công."""
+        with self._lock:
+            totals = self._totals
+            totals["requests"] += 1
+            totals["prompt_tokens"] += prompt_tokens or 0
+            totals["cached_tokens"] += cached_tokens or 0
+            totals["output_tokens"] += output_tokens or 0
+            totals["latency_total"] += latency
+            totals["ttft_total"] += latency if ttft is None else ttft
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return dict(self._totals)
+
+    @staticmethod
+    def since(after: Dict, before: Dict) -> Dict:
+        """Chênh lệch giữa hai snapshot (thống kê của một khoảng thời gian)."""
+        return {name: after[name] - before.get(name, 0) for name in _FIELDS}
+
+    @staticmethod
+    def format(snapshot: Dict) -> str:
+        """Một dòng tóm tắt dễ đọc cho snapshot."""
+        requests = snapshot["requests"]
+        if not requests:
+            return "Chưa có yêu cầu API nào"
+        uncached = snapshot["prompt_tokens"] - snapshot["cached_tokens"]
+        return (
+            f"{requests} yêu cầu, token đầu vào {snapshot['prompt_tokens']} "
+            f"(cache {snapshot['cached_tokens']}, tính phí đầy đủ {uncached}), "
+            f"token đầu ra {snapshot['output_tokens']}, "
+            f"độ trễ TB {snapshot['latency_total'] / requests:.2f}s, "
+            f"TTFT TB {snapshot['ttft_total'] / requests:.2f}s"
+        )
@@ -10,9 +10,108 @@ import re
 import time
 import json
 import requests
-from openai import OpenAI
+from openai import APITimeoutError, OpenAI
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Callable, Tuple
+from typing import List, Dict, Any, Optional, Callable, ContextManager, Iterator, Tuple
+import contextlib
+import socket
+import threading
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import cancellation
+import profiling
+from cancellation import TranslationCancelled
+from concurrency import OUTCOME_CONGESTED, OUTCOME_ERROR, OUTCOME_OK
+from prompt_templates import DEFAULT_TARGET_LANGUAGE, PromptTemplate, get_template
+from stream_parser import StreamDerailed, StreamingCueParser
+
+# Địa chỉ mặc định của các API (có thể ghi đè bằng api_config["base_url"],
+# ví dụ để trỏ tới server giả lập trong benchmarks/)
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+# Số kết nối HTTP giữ lại cho mỗi host (nên >= số luồng dịch)
+HTTP_POOL_SIZE = 32
+
+# Thời gian sống của cachedContent Gemini (giây)
+GEMINI_CACHE_TTL = 3600
+
+# Chờ bao lâu (giây) trước khi thử tạo lại cachedContent sau lỗi tạm thời
+# (429, 5xx, lỗi mạng); trong lúc đó yêu cầu gửi system instruction như thường
+GEMINI_CACHE_RETRY_SECONDS = 60
+
+# Số lần phản hồi streaming lệch hướng tối đa cho một lô; quá số này lô được
+# gửi lại không streaming (các lần này vẫn tính vào max_retries)
+MAX_STREAM_DERAILS = 2
+
+# Thống kê token của yêu cầu vừa gửi trong luồng hiện tại (xem _report_usage)
+_call_usage = threading.local()
+
+# CancelToken của lô đang dịch trong luồng hiện tại (xem current_cancel_token)
+_call_cancel = threading.local()
+
+# Các kết nối HTTP mà yêu cầu đang chạy trong luồng hiện tại đã lấy từ pool
+# (xem _AbortableAdapter)
+_call_connections = threading.local()
+
+
+class _TrackingPoolMixin:
+    """Ghi lại kết nối được lấy từ pool cho yêu cầu đang chạy trong luồng."""
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        connections = getattr(_call_connections, "value", None)
+        if connections is not None:
+            connections.append(conn)
+        return conn
+
+
+class _TrackingHTTPConnectionPool(_TrackingPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _TrackingHTTPSConnectionPool(_TrackingPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class _AbortableAdapter(requests.adapters.HTTPAdapter):
+    """
+    HTTPAdapter cho phép huỷ yêu cầu đang chờ phản hồi: đóng phản hồi từ
+    luồng khác không đánh thức được lần đọc socket đang chặn, nhưng
+    shutdown() socket thì có (xem abortable_request).
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TrackingHTTPConnectionPool,
+            "https": _TrackingHTTPSConnectionPool,
+        }
+
+
+@contextlib.contextmanager
+def abortable_request():
+    """
+    Trong khối with, yêu cầu gửi qua _AbortableAdapter bị ngắt ngay (socket bị
+    shutdown) khi CancelToken của lô đang dịch bị huỷ.
+    """
+    connections = []
+
+    def abort() -> None:
+        for conn in connections:
+            sock = getattr(conn, "sock", None)
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    _call_connections.value = connections
+    try:
+        with cancellation.on_cancel(current_cancel_token(), abort):
+            yield
+    finally:
+        _call_connections.value = None
 
 # Định nghĩa các model có sẵn cho mỗi API với đánh dấu model miễn phí
 # Mỗi tuple có format (model_id, description, is_free)
@@ -57,22 +156,421 @@ OPENROUTER_MODELS = [
 ]
 
 
-# Định nghĩa lớp trừu tượng cho tất cả các API dịch
+def current_cancel_token() -> Optional[cancellation.CancelToken]:
+    """CancelToken của lô đang được dịch trong luồng hiện tại (None nếu không có)."""
+    return getattr(_call_cancel, "value", None)
+
+
+def is_congestion_error(error: Exception) -> bool:
+    """True nếu lỗi cho thấy nhà cung cấp quá tải: 429 hoặc hết thời gian chờ."""
+    if getattr(error, "status_code", None) == 429:
+        return True
+    return isinstance(
+        error, (requests.exceptions.Timeout, APITimeoutError, TimeoutError)
+    )
+
+
+class TranslationAPIError(Exception):
+    """
+    Lỗi có thể thử lại khi gọi API (mã lỗi HTTP, phản hồi sai định dạng...).
+    Thông điệp đã được viết sẵn để hiển thị trong nhật ký.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ResponseDerailedError(TranslationAPIError):
+    """Phản hồi streaming lệch hướng (đánh số sai hoặc sai ngôn ngữ đích)."""
+
+
 # Định nghĩa lớp trừu tượng cho tất cả các API dịch
 class TranslationAPI(ABC):
-    @abstractmethod
+    # Tên hiển thị trong thông báo lỗi
+    display_name = "API"
+    # Bộ giới hạn tốc độ dùng chung (gán bởi SRTTranslator), None = không giới hạn
+    rate_limiter = None
+    # Mẫu prompt (gán bởi create_api theo api_config["prompt_version"])
+    prompt_template: PromptTemplate = get_template()
+    # Mã ngôn ngữ đích (gán bởi create_api theo api_config["target_language"])
+    target_language = DEFAULT_TARGET_LANGUAGE
+    # Nhận phản hồi dạng streaming nếu lớp con hỗ trợ (gán bởi create_api)
+    stream = False
+    # Cổng giới hạn số yêu cầu đồng thời tự điều chỉnh (concurrency.AIMDController,
+    # gán bởi SRTTranslator khi bật adaptive_concurrency), None = không giới hạn
+    concurrency = None
+    # Bảng thuật ngữ đã biên dịch (glossary.Glossary, gán bởi create_api theo
+    # api_config["glossary"]), None = không dùng
+    glossary = None
+
     def translate_batch(
         self,
         subtitles_batch: List[Dict],
         thread_id: int,
         update_status: Callable[[str], None],
         max_retries: int = float("inf"),
+        usage=None,
+        on_cue: Optional[Callable[[int, str], None]] = None,
+        cancel: Optional[cancellation.CancelToken] = None,
+        slot: Optional[Callable[[], ContextManager]] = None,
+    ) -> List[Dict]:
+        """
+        Dịch một lô phụ đề từ tiếng Anh sang tiếng Việt.
+
+        Vòng lặp thử lại dùng chung cho mọi API; mỗi lớp con chỉ cần cài đặt
+        _complete() để gửi prompt và trả về văn bản phản hồi.
+
+        Tham số:
+            usage: UsageStats để ghi token/độ trễ của các yêu cầu (tuỳ chọn)
+            on_cue: Khi streaming, được gọi với (vị trí trong lô, bản dịch)
+                ngay khi từng phụ đề hoàn tất (trước khi cả lô xong)
+            cancel: CancelToken của công việc; khi bị huỷ, các lần chờ (giới
+                hạn tốc độ, nghỉ trước khi thử lại) dừng ngay, yêu cầu
+                streaming đang chạy bị đóng và TranslationCancelled được ném
+            slot: Hàm trả về context manager giữ chỗ của bộ lập lịch (ví dụ
+                FairScheduler.slot); chỗ chỉ được giữ trong lúc gửi từng yêu
+                cầu, không giữ khi chờ giới hạn tốc độ hay nghỉ trước khi thử lại
+        """
+        with profiling.stage("prompt"):
+            prompt = self.build_prompt(subtitles_batch)
+
+        _call_cancel.value = cancel
+        try:
+            return self._translate_with_retries(
+                prompt,
+                subtitles_batch,
+                thread_id,
+                update_status,
+                max_retries,
+                usage,
+                on_cue,
+                cancel,
+                slot,
+            )
+        finally:
+            _call_cancel.value = None
+
+    def _translate_with_retries(
+        self,
+        prompt: str,
+        subtitles_batch: List[Dict],
+        thread_id: int,
+        update_status: Callable[[str], None],
+        max_retries: int,
+        usage,
+        on_cue: Optional[Callable[[int, str], None]],
+        cancel: Optional[cancellation.CancelToken],
+        slot: Optional[Callable[[], ContextManager]] = None,
     ) -> List[Dict]:
+        retries = 0
+        # Số lần phản hồi streaming lệch hướng; tới MAX_STREAM_DERAILS thì lô
+        # được gửi lại không streaming và phân tích như phản hồi thường
+        derails = 0
+        while retries < max_retries:
+            try:
+                cancellation.check(cancel)
+                if self.rate_limiter is not None:
+                    with profiling.stage("rate_wait"):
+                        self.rate_limiter.acquire(cancel)
+
+                _call_usage.value = None
+                with profiling.stage("network"):
+                    translated_text, start = self._send(
+                        prompt,
+                        subtitles_batch,
+                        thread_id,
+                        update_status,
+                        on_cue,
+                        cancel,
+                        slot,
+                        derails < MAX_STREAM_DERAILS,
+                    )
+                if usage is not None:
+                    usage.add(
+                        latency=time.perf_counter() - start,
+                        **(_call_usage.value or {}),
+                    )
+
+                with profiling.stage("response_parse"):
+                    translations = self.parse_translations(
+                        translated_text, thread_id, update_status
+                    )
+
+                if len(translations) < len(subtitles_batch) / 2:
+                    update_status(
+                        f"Thread {thread_id}: Cảnh báo - Chỉ nhận được {len(translations)}/{len(subtitles_batch)} bản dịch"
+                    )
+
+                    if retries < max_retries - 1:
+                        retries += 1
+                        sleep_time = min(2**retries, 60)
+                        update_status(
+                            f"Thread {thread_id}: Thử lại sau {sleep_time} giây..."
+                        )
+                        with profiling.stage("backoff"):
+                            cancellation.sleep(sleep_time, cancel)
+                        continue
+
+                translated_subtitles = self.apply_translations(
+                    subtitles_batch, translations, thread_id, update_status
+                )
+                if self.glossary is not None:
+                    with profiling.stage("glossary_check"):
+                        self.check_glossary(translated_subtitles, thread_id, update_status)
+                return translated_subtitles
+
+            except TranslationCancelled:
+                raise
+            except TranslationAPIError as e:
+                cancellation.check(cancel)
+                update_status(f"Thread {thread_id}: {e} (lần thử {retries+1})")
+                if isinstance(e, ResponseDerailedError):
+                    derails += 1
+                    if derails == MAX_STREAM_DERAILS and self.stream:
+                        update_status(
+                            f"Thread {thread_id}: Lệch hướng {derails} lần, gửi lại lô không streaming"
+                        )
+            except Exception as e:
+                # Kết nối bị đóng do huỷ cũng làm yêu cầu lỗi
+                cancellation.check(cancel)
+                update_status(
+                    f"Thread {thread_id}: Lỗi khi gọi {self.display_name} (lần thử {retries+1}): {str(e)}"
+                )
+
+            sleep_time = min(2**retries, 60)
+            update_status(f"Thread {thread_id}: Thử lại sau {sleep_time} giây...")
+            with profiling.stage("backoff"):
+                cancellation.sleep(sleep_time, cancel)
+            retries += 1
+
+        update_status(
+            f"Thread {thread_id}: Không thể dịch lô sau {max_retries} lần thử"
+        )
+        return subtitles_batch
+
+    def _send(
+        self,
+        prompt: str,
+        subtitles_batch: List[Dict],
+        thread_id: int,
+        update_status: Callable[[str], None],
+        on_cue: Optional[Callable[[int, str], None]],
+        cancel: Optional[cancellation.CancelToken] = None,
+        slot: Optional[Callable[[], ContextManager]] = None,
+        stream: bool = True,
+    ) -> Tuple[str, float]:
         """
-        Dịch một lô phụ đề.
+        Gửi một yêu cầu (qua chỗ của bộ lập lịch và cổng self.concurrency nếu
+        có), trả về văn bản phản hồi và thời điểm bắt đầu gửi. stream=False
+        buộc gửi không streaming kể cả khi self.stream bật.
+        """
+        with slot() if slot is not None else contextlib.nullcontext():
+            return self._send_gated(
+                prompt, subtitles_batch, thread_id, update_status, on_cue, cancel, stream
+            )
+
+    def _send_gated(
+        self,
+        prompt: str,
+        subtitles_batch: List[Dict],
+        thread_id: int,
+        update_status: Callable[[str], None],
+        on_cue: Optional[Callable[[int, str], None]],
+        cancel: Optional[cancellation.CancelToken],
+        stream: bool = True,
+    ) -> Tuple[str, float]:
+        controller = self.concurrency
+        ticket = None
+        if controller is not None:
+            with profiling.stage("concurrency_wait"):
+                ticket = controller.acquire(cancel)
+        outcome = OUTCOME_ERROR
+        start = time.perf_counter()
+        try:
+            if stream and self.stream and self.supports_streaming():
+                text = self._consume_stream(prompt, subtitles_batch, on_cue, cancel)
+            else:
+                text = self._complete(prompt)
+            outcome = OUTCOME_OK
+            return text, start
+        except Exception as e:
+            if is_congestion_error(e):
+                outcome = OUTCOME_CONGESTED
+            raise
+        finally:
+            if controller is not None:
+                reduced = controller.release(
+                    ticket, outcome, time.perf_counter() - start
+                )
+                if reduced is not None:
+                    update_status(
+                        f"Thread {thread_id}: {self.display_name} quá tải, giảm số yêu cầu đồng thời còn {reduced}"
+                    )
+
+    @abstractmethod
+    def _complete(self, prompt: str) -> str:
+        """
+        Gửi prompt (tin nhắn người dùng) tới dịch vụ và trả về văn bản phản hồi.
+        System instruction lấy từ self.prompt_template.system_instruction.
+        Ném TranslationAPIError (hoặc ngoại lệ bất kỳ) để vòng lặp thử lại.
         """
         pass
 
+    def _stream(self, prompt: str) -> Iterator[str]:
+        """
+        Gửi prompt và trả về lần lượt các đoạn văn bản phản hồi (generator).
+        Đóng generator phải huỷ yêu cầu HTTP. Lớp con hỗ trợ streaming ghi đè
+        phương thức này; để công việc bị huỷ ngắt được cả yêu cầu đang chờ dữ
+        liệu, gửi yêu cầu trong abortable_request() (qua _AbortableAdapter)
+        hoặc bọc phần đọc phản hồi trong self._abort_on_cancel(response.close).
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _abort_on_cancel(close: Callable[[], None]):
+        """Gọi close (đóng phản hồi HTTP) nếu lô đang dịch bị huỷ giữa chừng."""
+        return cancellation.on_cancel(current_cancel_token(), close)
+
+    def supports_streaming(self) -> bool:
+        return type(self)._stream is not TranslationAPI._stream
+
+    def _consume_stream(
+        self,
+        prompt: str,
+        subtitles_batch: List[Dict],
+        on_cue: Optional[Callable[[int, str], None]],
+        cancel: Optional[cancellation.CancelToken] = None,
+    ) -> str:
+        """
+        Đọc phản hồi streaming, báo từng phụ đề hoàn tất qua on_cue và huỷ
+        yêu cầu ngay khi đánh số sai hoặc công việc bị huỷ; phản hồi sai ngôn
+        ngữ đích chỉ bị loại khi đã nhận đủ (xem StreamingCueParser.close).
+        Trả về toàn bộ văn bản để phân tích như phản hồi thường.
+        """
+        parser = StreamingCueParser(
+            len(subtitles_batch),
+            [sub["text"] for sub in subtitles_batch],
+            self.target_language,
+        )
+        chunks = self._stream(prompt)
+        try:
+            for chunk in chunks:
+                cancellation.check(cancel)
+                for number, text in parser.feed(chunk):
+                    if on_cue is not None:
+                        on_cue(number - 1, text)
+            for number, text in parser.close():
+                if on_cue is not None:
+                    on_cue(number - 1, text)
+        except StreamDerailed as e:
+            raise ResponseDerailedError(f"Phản hồi lệch hướng, huỷ yêu cầu: {e}")
+        finally:
+            chunks.close()
+        return parser.text
+
+    def _report_usage(
+        self,
+        prompt_tokens: Optional[int] = None,
+        cached_tokens: Optional[int] = None,
+        output_tokens: Optional[int] = None,
+        ttft: Optional[float] = None,
+    ) -> None:
+        """Gọi trong _complete() để báo số token (và TTFT) của phản hồi."""
+        _call_usage.value = {
+            "prompt_tokens": prompt_tokens or 0,
+            "cached_tokens": cached_tokens or 0,
+            "output_tokens": output_tokens or 0,
+            "ttft": ttft,
+        }
+
+    def build_prompt(self, subtitles_batch: List[Dict]) -> str:
+        """
+        Tạo tin nhắn người dùng đánh số [n] cho một lô phụ đề, kèm các thuật
+        ngữ trong bảng thuật ngữ xuất hiện trong lô (nếu có).
+        """
+        terms = None
+        if self.glossary is not None:
+            terms = self.glossary.terms_for(sub["text"] for sub in subtitles_batch)
+        return self.prompt_template.render(subtitles_batch, terms)
+
+    def check_glossary(
+        self,
+        translated_subtitles: List[Dict],
+        thread_id: int,
+        update_status: Callable[[str], None],
+    ) -> int:
+        """
+        Đánh dấu các phụ đề không dùng đúng thuật ngữ: cue["glossary_violations"]
+        là danh sách (thuật ngữ gốc, bản dịch quy định). Trả về số phụ đề vi phạm.
+        """
+        flagged = 0
+        for subtitle in translated_subtitles:
+            if "original_text" not in subtitle:
+                continue
+            violations = self.glossary.violations(
+                subtitle["original_text"], subtitle["text"]
+            )
+            if violations:
+                subtitle["glossary_violations"] = violations
+                flagged += 1
+                terms = ", ".join(f"{source} => {target}" for source, target in violations)
+                update_status(
+                    f"Thread {thread_id}: Phụ đề {subtitle['index']} chưa dùng đúng thuật ngữ: {terms}"
+                )
+        return flagged
+
+    def parse_translations(
+        self, translated_text: str, thread_id: int, update_status: Callable[[str], None]
+    ) -> Dict[int, str]:
+        """Tách văn bản phản hồi thành {số thứ tự: bản dịch}."""
+        translated_parts = re.findall(
+            r"\[(\d+)\](.*?)(?=\n\[|\Z)", translated_text, re.DOTALL
+        )
+
+        if not translated_parts:
+            translated_parts = re.findall(
+                r"(?:\[)?(\d+)(?:\])?[:\.\s]+(.*?)(?=\n(?:\[)?\d+(?:\])?[:\.\s]+|\Z)",
+                translated_text,
+                re.DOTALL,
+            )
+
+        translations = {}
+        for idx_str, text in translated_parts:
+            try:
+                idx = int(idx_str)
+                translations[idx] = text.strip()
+            except ValueError:
+                update_status(
+                    f"Thread {thread_id}: Cảnh báo - Định dạng chỉ số không hợp lệ: {idx_str}"
+                )
+        return translations
+
+    def apply_translations(
+        self,
+        subtitles_batch: List[Dict],
+        translations: Dict[int, str],
+        thread_id: int,
+        update_status: Callable[[str], None],
+    ) -> List[Dict]:
+        """
+        Ghép bản dịch vào bản sao của từng phụ đề, giữ lại phụ đề gốc. Phụ đề
+        không nhận được bản dịch giữ nguyên (không có original_text), để không
+        bị ghi vào nhật ký hay manifest như đã dịch.
+        """
+        translated_subtitles = []
+        for i, subtitle in enumerate(subtitles_batch):
+            translated = subtitle.copy()
+            if i + 1 in translations:
+                # Lưu phụ đề gốc
+                translated["original_text"] = subtitle["text"]
+                translated["text"] = translations[i + 1]
+            else:
+                update_status(f"Thread {thread_id}: Thiếu bản dịch cho phụ đề {i+1}")
+            translated_subtitles.append(translated)
+
+        return translated_subtitles
+
     @staticmethod
     def create_api(api_type: str, api_config: Dict) -> "TranslationAPI":
         """
@@ -82,20 +580,51 @@ class TranslationAPI(ABC):
             model = api_config.get(
                 "model", GEMINI_MODELS[5][0]
             )  # Mặc định: gemini-2.0-flash-exp
-            return GeminiAPI(api_config["key"], model)
+            base_url = api_config.get("base_url") or GEMINI_BASE_URL
+            api = GeminiAPI(
+                api_config["key"],
+                model,
+                base_url,
+                api_config.get("cached_content", False),
+            )
         elif api_type == "novita":
             model = api_config.get(
                 "model", NOVITA_MODELS[0][0]
             )  # Mặc định: llama-3.1-8b-instruct
-            return NovitaAPI(api_config["key"], api_config["base_url"], model)
+            api = NovitaAPI(api_config["key"], api_config["base_url"], model)
         elif api_type == "openrouter":
             model = api_config.get("model", OPENROUTER_MODELS[0][0])  # Mặc định: gpt-4o
             site_url = api_config.get("site_url")
             site_name = api_config.get("site_name")
-            return OpenRouterAPI(api_config["key"], model, site_url, site_name)
+            base_url = api_config.get("base_url") or OPENROUTER_BASE_URL
+            api = OpenRouterAPI(
+                api_config["key"], model, site_url, site_name, base_url
+            )
         else:
             raise ValueError(f"Loại API không được hỗ trợ: {api_type}")
 
+        api.target_language = api_config.get("target_language") or DEFAULT_TARGET_LANGUAGE
+        api.prompt_template = get_template(
+            api_config.get("prompt_version"), api.target_language
+        )
+        api.stream = api_config.get("stream", False)
+        if api_config.get("glossary"):
+            from glossary import load_glossary
+
+            api.glossary = load_glossary(api_config["glossary"])
+
+        if api_config.get("cassette"):
+            # Ghi/phát lại lưu lượng (xem replay.py)
+            from replay import CassetteAPI
+
+            api = CassetteAPI(
+                api,
+                api_config["cassette"],
+                api_config.get("cassette_mode", "replay"),
+                api_config.get("cassette_latency_scale", 1.0),
+            )
+        return api
+
     @staticmethod
     def get_supported_apis():
         """
@@ -121,34 +650,98 @@ class TranslationAPI(ABC):
 
 # Cài đặt API Gemini
 class GeminiAPI(TranslationAPI):
-    def __init__(self, api_key: str, model: str = GEMINI_MODELS[5][0]):
-        self.api_key = api_key
-        self.model = model
+    display_name = "Gemini API"
 
-    def translate_batch(
+    def __init__(
         self,
-        subtitles_batch: List[Dict],
-        thread_id: int,
-        update_status: Callable[[str], None],
-        max_retries: int = float("inf"),
-    ) -> List[Dict]:
+        api_key: str,
+        model: str = GEMINI_MODELS[5][0],
+        base_url: str = GEMINI_BASE_URL,
+        use_cached_content: bool = False,
+    ):
         """
-        Dịch một lô phụ đề từ tiếng Anh sang tiếng Việt sử dụng API Gemini.
+        Tham số:
+            use_cached_content: Tạo cachedContent chứa system instruction và
+                tham chiếu tới nó trong mỗi yêu cầu (nếu tạo thất bại, ví dụ do
+                prompt quá ngắn để cache, sẽ gửi system instruction như thường)
         """
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model}:generateContent?key={self.api_key}"
-        headers = {"Content-Type": "application/json"}
-
-        subtitles_text = ""
-        for i, subtitle in enumerate(subtitles_batch):
-            subtitles_text += f"[{i+1}] {subtitle['text']}\n\n"
-
-        prompt = (
-            "Translate the following English subtitles to Vietnamese. Maintain the numbering format exactly as provided.\n"
-            "Each subtitle is marked with [number] followed by text. Translate ONLY the text, keeping the [number] format.\n"
-            "Return ONLY the translated subtitles with their numbers, no additional text or explanations.\n\n"
-            f"{subtitles_text}"
-        )
-
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.use_cached_content = use_cached_content
+        self._cache_lock = threading.Lock()
+        self._cache_name: Optional[str] = None
+        self._cache_expires = 0.0
+        # Chỉ một luồng tạo cachedContent tại một thời điểm (ngoài khoá)
+        self._cache_creating = False
+        self._cache_retry_at = 0.0
+        # Session giữ kết nối HTTP giữa các lô (dùng chung giữa các luồng)
+        self._session = requests.Session()
+        adapter = _AbortableAdapter(pool_maxsize=HTTP_POOL_SIZE)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    def _cached_content(self, system_instruction: str) -> Optional[str]:
+        """
+        Tên cachedContent chứa system instruction (tạo mới khi chưa có hoặc
+        sắp hết hạn). None nếu không dùng được cache: khi đó yêu cầu gửi
+        system instruction như thường.
+
+        Yêu cầu tạo cache gửi ngoài khoá và chỉ một luồng gửi tại một thời
+        điểm; các luồng khác không chờ mà dùng cache cũ (nếu chưa hết hạn).
+        Chỉ phản hồi 4xx (model không hỗ trợ, prompt quá ngắn để cache...)
+        tắt hẳn cache; lỗi tạm thời được thử lại sau GEMINI_CACHE_RETRY_SECONDS.
+        """
+        with self._cache_lock:
+            if not self.use_cached_content:
+                return None
+            now = time.time()
+            if self._cache_name and now < self._cache_expires - 60:
+                return self._cache_name
+            if self._cache_creating or now < self._cache_retry_at:
+                return self._cache_name if now < self._cache_expires else None
+            self._cache_creating = True
+
+        name = None
+        status_code = None
+        try:
+            response = self._session.post(
+                f"{self.base_url}/cachedContents?key={self.api_key}",
+                json={
+                    "model": f"models/{self.model}",
+                    "systemInstruction": {"parts": [{"text": system_instruction}]},
+                    "ttl": f"{GEMINI_CACHE_TTL}s",
+                },
+                timeout=60,
+            )
+            status_code = response.status_code
+            if status_code == 200:
+                name = response.json().get("name")
+        except (requests.RequestException, ValueError):
+            pass
+
+        with self._cache_lock:
+            self._cache_creating = False
+            now = time.time()
+            if name:
+                self._cache_name = name
+                self._cache_expires = now + GEMINI_CACHE_TTL
+                return name
+            if (
+                status_code is not None
+                and 400 <= status_code < 500
+                and status_code not in (408, 429)
+            ):
+                # Không hỗ trợ: dùng system instruction từ nay về sau
+                self.use_cached_content = False
+                self._cache_name = None
+                return None
+            # Lỗi tạm thời: thử tạo lại sau
+            self._cache_retry_at = now + GEMINI_CACHE_RETRY_SECONDS
+            return self._cache_name if now < self._cache_expires else None
+
+    def _request_body(self, prompt: str) -> Tuple[Dict, Optional[str]]:
+        """Tạo body yêu cầu; trả về (body, tên cachedContent đang dùng)."""
         data = {
             "contents": [{"role": "user", "parts": [{"text": prompt}]}],
             "generationConfig": {
@@ -159,405 +752,291 @@ class GeminiAPI(TranslationAPI):
                 "responseMimeType": "text/plain",
             },
         }
+        system_instruction = self.prompt_template.system_instruction
+        cache_name = None
+        if system_instruction:
+            cache_name = self._cached_content(system_instruction)
+            if cache_name:
+                data["cachedContent"] = cache_name
+            else:
+                data["systemInstruction"] = {"parts": [{"text": system_instruction}]}
+        return data, cache_name
+
+    def _raise_for_status(self, response, cache_name: Optional[str]) -> None:
+        if response.status_code == 200:
+            return
+        if cache_name and response.status_code in (400, 403, 404):
+            # Cache hết hạn hoặc bị xoá: tạo lại ở lần thử sau
+            with self._cache_lock:
+                self._cache_name = None
+        raise TranslationAPIError(
+            f"Lỗi API: {response.status_code}", response.status_code
+        )
 
-        retries = 0
-        while retries < max_retries:
-            try:
-                response = requests.post(url, headers=headers, json=data, timeout=60)
+    def _complete(self, prompt: str) -> str:
+        """
+        Gửi prompt tới API Gemini (generateContent).
+        """
+        url = f"{self.base_url}/models/{self.model}:generateContent?key={self.api_key}"
+        headers = {"Content-Type": "application/json"}
+        data, cache_name = self._request_body(prompt)
 
-                if response.status_code == 200:
-                    try:
-                        response_data = response.json()
-
-                        if (
-                            "candidates" in response_data
-                            and len(response_data["candidates"]) > 0
-                            and "content" in response_data["candidates"][0]
-                            and "parts" in response_data["candidates"][0]["content"]
-                            and len(response_data["candidates"][0]["content"]["parts"])
-                            > 0
-                            and "text"
-                            in response_data["candidates"][0]["content"]["parts"][0]
-                        ):
-
-                            translated_text = response_data["candidates"][0]["content"][
-                                "parts"
-                            ][0]["text"]
-
-                            translated_parts = re.findall(
-                                r"\[(\d+)\](.*?)(?=\n\[|\Z)", translated_text, re.DOTALL
-                            )
-
-                            if not translated_parts:
-                                translated_parts = re.findall(
-                                    r"(?:\[)?(\d+)(?:\])?[:\.\s]+(.*?)(?=\n(?:\[)?\d+(?:\])?[:\.\s]+|\Z)",
-                                    translated_text,
-                                    re.DOTALL,
-                                )
-
-                            translations = {}
-                            for idx_str, text in translated_parts:
-                                try:
-                                    idx = int(idx_str)
-                                    translations[idx] = text.strip()
-                                except ValueError:
-                                    update_status(
-                                        f"Thread {thread_id}: Cảnh báo - Định dạng chỉ số không hợp lệ: {idx_str}"
-                                    )
-
-                            if len(translations) < len(subtitles_batch) / 2:
-                                update_status(
-                                    f"Thread {thread_id}: Cảnh báo - Chỉ nhận được {len(translations)}/{len(subtitles_batch)} bản dịch"
-                                )
-
-                                if retries < max_retries - 1:
-                                    retries += 1
-                                    sleep_time = min(2**retries, 60)
-                                    update_status(
-                                        f"Thread {thread_id}: Thử lại sau {sleep_time} giây..."
-                                    )
-                                    time.sleep(sleep_time)
-                                    continue
-
-                            translated_subtitles = []
-                            for i, subtitle in enumerate(subtitles_batch):
-                                translated = subtitle.copy()
-                                # Lưu phụ đề gốc
-                                translated["original_text"] = subtitle["text"]
-                                if i + 1 in translations:
-                                    translated["text"] = translations[i + 1]
-                                else:
-                                    update_status(
-                                        f"Thread {thread_id}: Thiếu bản dịch cho phụ đề {i+1}"
-                                    )
-                                translated_subtitles.append(translated)
-
-                            return translated_subtitles
-
-                        else:
-                            update_status(
-                                f"Thread {thread_id}: Định dạng phản hồi không như mong đợi (lần thử {retries+1})"
-                            )
+        with abortable_request():
+            response = self._session.post(url, headers=headers, json=data, timeout=60)
+        self._raise_for_status(response, cache_name)
 
-                    except json.JSONDecodeError:
-                        update_status(
-                            f"Thread {thread_id}: Không thể phân tích phản hồi JSON (lần thử {retries+1})"
-                        )
+        try:
+            response_data = response.json()
+        except json.JSONDecodeError:
+            raise TranslationAPIError("Không thể phân tích phản hồi JSON")
+
+        usage = response_data.get("usageMetadata") or {}
+        self._report_usage(
+            usage.get("promptTokenCount"),
+            usage.get("cachedContentTokenCount"),
+            usage.get("candidatesTokenCount"),
+            # Phản hồi không streaming: token đầu tiên tới cùng lúc với header
+            response.elapsed.total_seconds(),
+        )
 
-                else:
-                    update_status(
-                        f"Thread {thread_id}: Lỗi API (lần thử {retries+1}): {response.status_code}"
-                    )
+        try:
+            return response_data["candidates"][0]["content"]["parts"][0]["text"]
+        except (KeyError, IndexError, TypeError):
+            raise TranslationAPIError("Định dạng phản hồi không như mong đợi")
 
-                sleep_time = min(2**retries, 60)
-                update_status(f"Thread {thread_id}: Thử lại sau {sleep_time} giây...")
-                time.sleep(sleep_time)
-                retries += 1
+    def _stream(self, prompt: str) -> Iterator[str]:
+        """
+        Gửi prompt tới API Gemini (streamGenerateContent, dạng SSE).
+        """
+        url = f"{self.base_url}/models/{self.model}:streamGenerateContent?alt=sse&key={self.api_key}"
+        data, cache_name = self._request_body(prompt)
 
-            except Exception as e:
-                update_status(
-                    f"Thread {thread_id}: Ngoại lệ trong quá trình gọi API (lần thử {retries+1}): {str(e)}"
+        start = time.perf_counter()
+        with abortable_request():
+            response = self._session.post(url, json=data, stream=True, timeout=60)
+            try:
+                self._raise_for_status(response, cache_name)
+                # SSE không khai báo charset, requests sẽ đoán sai thành latin-1
+                response.encoding = "utf-8"
+                ttft = None
+                usage = {}
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    try:
+                        event = json.loads(line[5:])
+                    except json.JSONDecodeError:
+                        raise TranslationAPIError("Không thể phân tích sự kiện SSE")
+                    usage = event.get("usageMetadata") or usage
+                    try:
+                        parts = event["candidates"][0]["content"]["parts"]
+                    except (KeyError, IndexError, TypeError):
+                        continue
+                    text = "".join(part.get("text", "") for part in parts)
+                    if text:
+                        if ttft is None:
+                            ttft = time.perf_counter() - start
+                        yield text
+
+                self._report_usage(
+                    usage.get("promptTokenCount"),
+                    usage.get("cachedContentTokenCount"),
+                    usage.get("candidatesTokenCount"),
+                    ttft,
                 )
-                sleep_time = min(2**retries, 60)
-                time.sleep(sleep_time)
-                retries += 1
-
-        update_status(
-            f"Thread {thread_id}: Không thể dịch lô sau {max_retries} lần thử"
-        )
-        return subtitles_batch
+            finally:
+                # Đóng kết nối cũng huỷ yêu cầu khi dừng đọc giữa chừng
+                response.close()
+
+
+def _report_openai_usage(api: TranslationAPI, completion, ttft: Optional[float] = None) -> None:
+    """Đọc token từ trường usage của phản hồi tương thích OpenAI."""
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    api._report_usage(
+        getattr(usage, "prompt_tokens", 0),
+        getattr(details, "cached_tokens", 0) if details is not None else 0,
+        getattr(usage, "completion_tokens", 0),
+        ttft,
+    )
+
+
+def _iter_openai_stream(api: TranslationAPI, stream, start: float) -> Iterator[str]:
+    """Đọc các đoạn văn bản từ stream tương thích OpenAI (stream=True)."""
+    ttft = None
+    last_usage = None
+    try:
+        with api._abort_on_cancel(stream.close):
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    last_usage = chunk
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    yield text
+        if last_usage is not None:
+            _report_openai_usage(api, last_usage, ttft)
+        else:
+            api._report_usage(ttft=ttft)
+    finally:
+        stream.close()
 
 
 # Cài đặt API Novita
 class NovitaAPI(TranslationAPI):
+    display_name = "Novita AI API"
+    # System message của Novita khi mẫu prompt không có system instruction (v1)
+    legacy_system_message = "You are a professional translator specialized in translating English to Vietnamese. Return only the translated text with the same formatting as the input."
+
     def __init__(self, api_key: str, base_url: str, model: str):
         self.api_key = api_key
         self.base_url = base_url
         self.model = model
+        self._client = None
 
-    def translate_batch(
-        self,
-        subtitles_batch: List[Dict],
-        thread_id: int,
-        update_status: Callable[[str], None],
-        max_retries: int = float("inf"),
-    ) -> List[Dict]:
-        """
-        Dịch một lô phụ đề từ tiếng Anh sang tiếng Việt sử dụng API Novita AI.
-        """
-        try:
-            client = OpenAI(
+    def _create(self, prompt: str, stream: bool):
+        if self._client is None:
+            self._client = OpenAI(
                 base_url=self.base_url,
                 api_key=self.api_key,
             )
 
-            subtitles_text = ""
-            for i, subtitle in enumerate(subtitles_batch):
-                subtitles_text += f"[{i+1}] {subtitle['text']}\n\n"
-
-            prompt = (
-                "Translate the following English subtitles to Vietnamese. Maintain the numbering format exactly as provided.\n"
-                "Each subtitle is marked with [number] followed by text. Translate ONLY the text, keeping the [number] format.\n"
-                "Return ONLY the translated subtitles with their numbers, no additional text or explanations.\n\n"
-                f"{subtitles_text}"
-            )
-
-            retries = 0
-            while retries < max_retries:
-                try:
-                    chat_completion_res = client.chat.completions.create(
-                        model=self.model,
-                        messages=[
-                            {
-                                "role": "system",
-                                "content": "You are a professional translator specialized in translating English to Vietnamese. Return only the translated text with the same formatting as the input.",
-                            },
-                            {
-                                "role": "user",
-                                "content": prompt,
-                            },
-                        ],
-                        stream=False,
-                        max_tokens=8192,
-                        temperature=0.1,
-                    )
-
-                    if (
-                        chat_completion_res
-                        and hasattr(chat_completion_res, "choices")
-                        and len(chat_completion_res.choices) > 0
-                    ):
-                        translated_text = chat_completion_res.choices[0].message.content
-
-                        translated_parts = re.findall(
-                            r"\[(\d+)\](.*?)(?=\n\[|\Z)", translated_text, re.DOTALL
-                        )
-
-                        if not translated_parts:
-                            translated_parts = re.findall(
-                                r"(?:\[)?(\d+)(?:\])?[:\.\s]+(.*?)(?=\n(?:\[)?\d+(?:\])?[:\.\s]+|\Z)",
-                                translated_text,
-                                re.DOTALL,
-                            )
-
-                        translations = {}
-                        for idx_str, text in translated_parts:
-                            try:
-                                idx = int(idx_str)
-                                translations[idx] = text.strip()
-                            except ValueError:
-                                update_status(
-                                    f"Thread {thread_id}: Cảnh báo - Định dạng chỉ số không hợp lệ: {idx_str}"
-                                )
-
-                        if len(translations) < len(subtitles_batch) / 2:
-                            update_status(
-                                f"Thread {thread_id}: Cảnh báo - Chỉ nhận được {len(translations)}/{len(subtitles_batch)} bản dịch"
-                            )
-
-                            if retries < max_retries - 1:
-                                retries += 1
-                                sleep_time = min(2**retries, 60)
-                                update_status(
-                                    f"Thread {thread_id}: Thử lại sau {sleep_time} giây..."
-                                )
-                                time.sleep(sleep_time)
-                                continue
-
-                        translated_subtitles = []
-                        for i, subtitle in enumerate(subtitles_batch):
-                            translated = subtitle.copy()
-                            # Lưu phụ đề gốc
-                            translated["original_text"] = subtitle["text"]
-                            if i + 1 in translations:
-                                translated["text"] = translations[i + 1]
-                            else:
-                                update_status(
-                                    f"Thread {thread_id}: Thiếu bản dịch cho phụ đề {i+1}"
-                                )
-                            translated_subtitles.append(translated)
-
-                        return translated_subtitles
-
-                    else:
-                        update_status(
-                            f"Thread {thread_id}: Phản hồi Novita AI không như mong đợi (lần thử {retries+1})"
-                        )
-
-                        sleep_time = min(2**retries, 60)
-                        update_status(
-                            f"Thread {thread_id}: Thử lại sau {sleep_time} giây..."
-                        )
-                        time.sleep(sleep_time)
-                        retries += 1
+        extra = {"stream_options": {"include_usage": True}} if stream else {}
+        return self._client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": self.prompt_template.system_instruction
+                    or self.legacy_system_message,
+                },
+                {
+                    "role": "user",
+                    "content": prompt,
+                },
+            ],
+            stream=stream,
+            max_tokens=8192,
+            temperature=0.1,
+            **extra,
+        )
 
-                except Exception as e:
-                    update_status(
-                        f"Thread {thread_id}: Lỗi khi gọi Novita AI API (lần thử {retries+1}): {str(e)}"
-                    )
-                    sleep_time = min(2**retries, 60)
-                    time.sleep(sleep_time)
-                    retries += 1
+    def _complete(self, prompt: str) -> str:
+        """
+        Gửi prompt tới API Novita AI (tương thích OpenAI).
+        """
+        chat_completion_res = self._create(prompt, stream=False)
 
-            update_status(
-                f"Thread {thread_id}: Không thể dịch lô sau {max_retries} lần thử"
-            )
+        if (
+            chat_completion_res
+            and hasattr(chat_completion_res, "choices")
+            and len(chat_completion_res.choices) > 0
+        ):
+            _report_openai_usage(self, chat_completion_res)
+            return chat_completion_res.choices[0].message.content or ""
 
-        except Exception as e:
-            update_status(
-                f"Thread {thread_id}: Lỗi nghiêm trọng khi sử dụng Novita AI: {str(e)}"
-            )
+        raise TranslationAPIError("Phản hồi Novita AI không như mong đợi")
 
-        return subtitles_batch
+    def _stream(self, prompt: str) -> Iterator[str]:
+        """
+        Gửi prompt tới API Novita AI với stream=True.
+        """
+        start = time.perf_counter()
+        yield from _iter_openai_stream(self, self._create(prompt, stream=True), start)
 
 
 # Cài đặt API OpenRouter
 class OpenRouterAPI(TranslationAPI):
+    display_name = "OpenRouter API"
+
     def __init__(
-        self, api_key: str, model: str, site_url: str = None, site_name: str = None
+        self,
+        api_key: str,
+        model: str,
+        site_url: str = None,
+        site_name: str = None,
+        base_url: str = OPENROUTER_BASE_URL,
     ):
         self.api_key = api_key
         self.model = model
         self.site_url = site_url
         self.site_name = site_name
+        self.base_url = base_url
+        self._client = None
 
-    def translate_batch(
-        self,
-        subtitles_batch: List[Dict],
-        thread_id: int,
-        update_status: Callable[[str], None],
-        max_retries: int = float("inf"),
-    ) -> List[Dict]:
-        """
-        Dịch một lô phụ đề từ tiếng Anh sang tiếng Việt sử dụng API OpenRouter.
-        """
-        try:
-            client = OpenAI(
-                base_url="https://openrouter.ai/api/v1",
+    def _create(self, prompt: str, stream: bool):
+        if self._client is None:
+            self._client = OpenAI(
+                base_url=self.base_url,
                 api_key=self.api_key,
             )
 
-            subtitles_text = ""
-            for i, subtitle in enumerate(subtitles_batch):
-                subtitles_text += f"[{i+1}] {subtitle['text']}\n\n"
-
-            prompt = (
-                "Translate the following English subtitles to Vietnamese. Maintain the numbering format exactly as provided.\n"
-                "Each subtitle is marked with [number] followed by text. Translate ONLY the text, keeping the [number] format.\n"
-                "Return ONLY the translated subtitles with their numbers, no additional text or explanations.\n\n"
-                f"{subtitles_text}"
-            )
-
-            retries = 0
-            while retries < max_retries:
-                try:
-                    extra_headers = {}
-                    if self.site_url:
-                        extra_headers["HTTP-Referer"] = self.site_url
-                    if self.site_name:
-                        extra_headers["X-Title"] = self.site_name
-
-                    completion = client.chat.completions.create(
-                        extra_headers=extra_headers,
-                        model=self.model,
-                        messages=[{"role": "user", "content": prompt}],
-                        temperature=0.1,
-                    )
-
-                    if (
-                        completion
-                        and hasattr(completion, "choices")
-                        and len(completion.choices) > 0
-                    ):
-                        translated_text = completion.choices[0].message.content
-
-                        # Xử lý phần còn lại giống như các API khác...
-                        translated_parts = re.findall(
-                            r"\[(\d+)\](.*?)(?=\n\[|\Z)", translated_text, re.DOTALL
-                        )
-                        if not translated_parts:
-                            translated_parts = re.findall(
-                                r"(?:\[)?(\d+)(?:\])?[:\.\s]+(.*?)(?=\n(?:\[)?\d+(?:\])?[:\.\s]+|\Z)",
-                                translated_text,
-                                re.DOTALL,
-                            )
-
-                        translations = {}
-                        for idx_str, text in translated_parts:
-                            try:
-                                idx = int(idx_str)
-                                translations[idx] = text.strip()
-                            except ValueError:
-                                update_status(
-                                    f"Thread {thread_id}: Cảnh báo - Định dạng chỉ số không hợp lệ: {idx_str}"
-                                )
-
-                        if len(translations) < len(subtitles_batch) / 2:
-                            update_status(
-                                f"Thread {thread_id}: Cảnh báo - Chỉ nhận được {len(translations)}/{len(subtitles_batch)} bản dịch"
-                            )
-                            if retries < max_retries - 1:
-                                retries += 1
-                                sleep_time = min(2**retries, 60)
-                                update_status(
-                                    f"Thread {thread_id}: Thử lại sau {sleep_time} giây..."
-                                )
-                                time.sleep(sleep_time)
-                                continue
-
-                        translated_subtitles = []
-                        for i, subtitle in enumerate(subtitles_batch):
-                            translated = subtitle.copy()
-                            translated["original_text"] = subtitle["text"]
-
-                            if i + 1 in translations:
-                                translated["text"] = translations[i + 1]
-                            else:
-                                update_status(
-                                    f"Thread {thread_id}: Thiếu bản dịch cho phụ đề {i+1}"
-                                )
-
-                            translated_subtitles.append(translated)
-
-                        return translated_subtitles
-                    else:
-                        update_status(
-                            f"Thread {thread_id}: Định dạng phản hồi không như mong đợi (lần thử {retries+1})"
-                        )
+        extra_headers = {}
+        if self.site_url:
+            extra_headers["HTTP-Referer"] = self.site_url
+        if self.site_name:
+            extra_headers["X-Title"] = self.site_name
+
+        messages = [{"role": "user", "content": prompt}]
+        system_instruction = self.prompt_template.system_instruction
+        if system_instruction:
+            messages.insert(0, {"role": "system", "content": system_instruction})
+
+        extra = {"stream_options": {"include_usage": True}} if stream else {}
+        return self._client.chat.completions.create(
+            extra_headers=extra_headers,
+            model=self.model,
+            messages=messages,
+            temperature=0.1,
+            stream=stream,
+            **extra,
+        )
 
-                except Exception as e:
-                    update_status(
-                        f"Thread {thread_id}: Lỗi khi gọi OpenRouter API (lần thử {retries+1}): {str(e)}"
-                    )
+    def _complete(self, prompt: str) -> str:
+        """
+        Gửi prompt tới API OpenRouter (tương thích OpenAI).
+        """
+        completion = self._create(prompt, stream=False)
 
-                sleep_time = min(2**retries, 60)
-                update_status(f"Thread {thread_id}: Thử lại sau {sleep_time} giây...")
-                time.sleep(sleep_time)
-                retries += 1
+        if completion and hasattr(completion, "choices") and len(completion.choices) > 0:
+            _report_openai_usage(self, completion)
+            return completion.choices[0].message.content or ""
 
-            update_status(
-                f"Thread {thread_id}: Không thể dịch lô sau {max_retries} lần thử"
-            )
+        raise TranslationAPIError("Định dạng phản hồi không như mong đợi")
 
-        except Exception as e:
-            update_status(
-                f"Thread {thread_id}: Lỗi nghiêm trọng khi sử dụng OpenRouter API: {str(e)}"
-            )
-
-        return subtitles_batch
+    def _stream(self, prompt: str) -> Iterator[str]:
+        """
+        Gửi prompt tới API OpenRouter với stream=True.
+        """
+        start = time.perf_counter()
+        yield from _iter_openai_stream(self, self._create(prompt, stream=True), start)
 
 
 # Để thêm một API mới, tạo một lớp mới như sau:
 """
 class NewAPI(TranslationAPI):
+    display_name = "New API"
+
     def __init__(self, api_key: str, other_params):
         self.api_key = api_key
         self.other_params = other_params
-    
-    def translate_batch(self, subtitles_batch: List[Dict], thread_id: int, update_status: Callable[[str], None], max_retries: int = float('inf')) -> List[Dict]:
-        # Triển khai code dịch ở đây
+
+    def _complete(self, prompt: str) -> str:
+        # Gửi self.prompt_template.system_instruction (nếu có) và prompt,
+        # gọi self._report_usage(...) với số token, rồi trả về văn bản phản
+        # hồi; vòng lặp thử lại, phân tích [n] và ghép bản dịch đã có sẵn
+        # trong TranslationAPI
         pass
 
+    # Tuỳ chọn: ghi đè _stream(prompt) (generator trả về từng đoạn văn bản)
+    # để hỗ trợ streaming; phụ đề được báo sớm và yêu cầu bị huỷ khi phản
+    # hồi lệch hướng
+
 # Và cập nhật phương thức create_api:
 @staticmethod
 def create_api(api_type: str, api_config: Dict) -> 'TranslationAPI':
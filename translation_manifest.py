@@ -0,0 +1,74 @@
+# translation_manifest.py
+"""
+Manifest đi kèm file đầu ra, lưu bản dịch của từng phụ đề theo hash nội dung
+gốc. Khi file nguồn được sửa (chỉnh thời gian, sửa vài dòng), lần dịch sau chỉ
+cần gửi các phụ đề mới hoặc đã đổi nội dung tới API.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+MANIFEST_VERSION = 1
+
+
+def text_hash(text: str) -> str:
+    """Hash của nội dung phụ đề (bỏ qua khác biệt khoảng trắng)."""
+    normalized = " ".join(text.split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+class TranslationManifest:
+    """Ánh xạ hash nội dung gốc -> bản dịch, lưu dưới dạng JSON."""
+
+    def __init__(self, translations: Optional[Dict[str, str]] = None):
+        self.translations: Dict[str, str] = translations or {}
+
+    @staticmethod
+    def path_for(output_file: str) -> str:
+        return f"{output_file}.manifest.json"
+
+    @classmethod
+    def load(cls, path: str) -> "TranslationManifest":
+        """Đọc manifest; trả về manifest rỗng nếu không có hoặc không đọc được."""
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if data.get("version") != MANIFEST_VERSION:
+            return cls()
+        return cls({entry["hash"]: entry["text"] for entry in data.get("cues", [])})
+
+    def lookup(self, source_text: str) -> Optional[str]:
+        return self.translations.get(text_hash(source_text))
+
+    def save(self, path: str, subtitles: List) -> None:
+        """
+        Ghi manifest cho danh sách phụ đề đã dịch (theo thứ tự trong file).
+        Chỉ những mục có original_text (đã được dịch) và không bị kiểm tra chất
+        lượng đánh dấu (qa_issues) mới được lưu, để lần sau chúng được dịch lại.
+        """
+        entries = []
+        for subtitle in subtitles:
+            if "original_text" not in subtitle or subtitle.get("qa_issues"):
+                continue
+            entries.append(
+                {
+                    "index": subtitle["index"],
+                    "hash": text_hash(subtitle["original_text"]),
+                    "text": subtitle["text"],
+                }
+            )
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": MANIFEST_VERSION, "cues": entries},
+                f,
+                ensure_ascii=False,
+                indent=0,
+            )
+        os.replace(tmp_path, path)
@@ -0,0 +1,370 @@
+# watch_folder.py
+"""
+Chế độ daemon: theo dõi một cây thư mục và tự động dịch file phụ đề (SRT,
+VTT, ASS/SSA, SBV) mới hoặc vừa thay đổi.
+
+Dùng inotify (Linux) nếu có, ngược lại quét định kỳ bằng os.scandir. Một
+SRTTranslator duy nhất với pool luồng và pool kết nối HTTP được giữ "ấm"
+suốt thời gian chạy, nên mỗi file mới không phải trả chi phí khởi động hay
+quét lại cả thư mục.
+
+Chạy từ dòng lệnh:
+    python watch_folder.py /srv/subs --api gemini --key ... --threads 5
+"""
+import concurrent.futures
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from cancellation import CancelToken
+from srt_translator import SRTTranslator
+from subtitle_formats import is_subtitle_file
+
+
+def _is_candidate(path: str, file_suffix: str) -> bool:
+    """File phụ đề đầu vào (không phải file đầu ra đã mang hậu tố)."""
+    if not is_subtitle_file(path):
+        return False
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return not (file_suffix and stem.endswith(file_suffix))
+
+
+def _scan_tree(root: str) -> Dict[str, float]:
+    """Quét đệ quy bằng os.scandir, trả về {đường dẫn file phụ đề: mtime}."""
+    found: Dict[str, float] = {}
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif is_subtitle_file(entry.name):
+                        try:
+                            found[entry.path] = entry.stat().st_mtime
+                        except OSError:
+                            pass
+        except OSError:
+            continue
+    return found
+
+
+class PollingWatcher:
+    """Phát hiện thay đổi bằng cách quét định kỳ."""
+
+    def __init__(self, root: str, interval: float = 5.0):
+        self.root = root
+        self.interval = interval
+        self._known = _scan_tree(root)
+        self._next_scan = time.monotonic() + interval
+
+    def poll(self, timeout: float) -> List[str]:
+        """Chờ tối đa timeout giây, trả về các file file phụ đề mới/đã đổi."""
+        delay = self._next_scan - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return []
+        if delay > 0:
+            time.sleep(delay)
+        self._next_scan = time.monotonic() + self.interval
+
+        current = _scan_tree(self.root)
+        changed = [
+            path
+            for path, mtime in current.items()
+            if self._known.get(path) != mtime
+        ]
+        self._known = current
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Phát hiện thay đổi qua inotify của Linux (gọi libc bằng ctypes)."""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+
+    _MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, root: str):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._libc.inotify_init1.argtypes = [ctypes.c_int]
+        self._libc.inotify_add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.root = root
+        self._dirs: Dict[int, str] = {}
+        self._add_tree(root)
+
+    def _add_tree(self, root: str) -> List[str]:
+        """Theo dõi root và mọi thư mục con; trả về các file phụ đề đã có sẵn."""
+        existing = []
+        for directory, subdirs, files in os.walk(root):
+            wd = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(directory), self._MASK
+            )
+            if wd >= 0:
+                self._dirs[wd] = directory
+            existing.extend(
+                os.path.join(directory, f) for f in files if is_subtitle_file(f)
+            )
+        return existing
+
+    def poll(self, timeout: float) -> Optional[List[str]]:
+        """
+        Chờ tối đa timeout giây, trả về các file file phụ đề mới/đã đổi.
+        Trả về None khi hàng đợi sự kiện của kernel bị tràn (cần quét lại).
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        changed = []
+        offset = 0
+        while offset + self._EVENT.size <= len(data):
+            wd, mask, _, length = self._EVENT.unpack_from(data, offset)
+            name = data[offset + self._EVENT.size : offset + self._EVENT.size + length]
+            offset += self._EVENT.size + length
+            name = os.fsdecode(name.rstrip(b"\0"))
+
+            if mask & self.IN_Q_OVERFLOW:
+                return None
+            if mask & self.IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    changed.extend(self._add_tree(path))
+            elif mask & (self.IN_CLOSE_WRITE | self.IN_MOVED_TO):
+                if is_subtitle_file(name):
+                    changed.append(path)
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(root: str, poll_interval: float = 5.0, use_inotify: bool = True):
+    """Tạo InotifyWatcher nếu hệ thống hỗ trợ, ngược lại PollingWatcher."""
+    if use_inotify:
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root, poll_interval)
+
+
+class WatchFolderDaemon:
+    """
+    Daemon theo dõi thư mục và dịch file SRT mới/đã đổi.
+
+    Một file được đưa vào hàng đợi sau khi không còn thay đổi trong
+    settle_seconds giây (tránh dịch file đang được ghi dở). File đã có đầu ra
+    mới hơn file nguồn được bỏ qua; file nguồn bị sửa được dịch lại ở chế độ
+    tăng dần (chỉ các phụ đề đổi nội dung mới gọi API).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        api_config: Dict,
+        num_threads: int = 5,
+        batch_size: int = 10,
+        max_retries: int = float("inf"),
+        bilingual: bool = False,
+        file_suffix: str = "_vi",
+        settle_seconds: float = 2.0,
+        poll_interval: float = 5.0,
+        use_inotify: bool = True,
+        update_status: Callable[[str], None] = None,
+    ):
+        self.directory = directory
+        self.api_config = api_config
+        self.num_threads = num_threads
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.bilingual = bilingual
+        self.file_suffix = file_suffix
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.update_status = update_status or (lambda msg: print(msg))
+
+        # Pool luồng và SRTTranslator (kèm pool kết nối API) giữ ấm suốt phiên
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=num_threads, thread_name_prefix="chunk"
+        )
+        self.translator = SRTTranslator(
+            self.update_status, executor=self.executor
+        )
+        # Khi dừng daemon, file đang dịch dở được huỷ (tiếp tục ở lần chạy sau)
+        self.translator.cancel_token = CancelToken()
+
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._queued = set()
+        self._pending: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def _output_file(self, input_file: str) -> str:
+        return self.translator._output_path(input_file, self.file_suffix)
+
+    def needs_translation(self, input_file: str) -> bool:
+        """True nếu chưa có đầu ra hoặc đầu ra cũ hơn file nguồn."""
+        output_file = self._output_file(input_file)
+        try:
+            return os.path.getmtime(output_file) < os.path.getmtime(input_file)
+        except OSError:
+            return os.path.exists(input_file)
+
+    def _note_change(self, path: str) -> None:
+        if _is_candidate(path, self.file_suffix):
+            self._pending[path] = time.monotonic()
+
+    def _enqueue_settled(self) -> None:
+        now = time.monotonic()
+        for path, seen in list(self._pending.items()):
+            if now - seen < self.settle_seconds:
+                continue
+            del self._pending[path]
+            if path in self._queued or not self.needs_translation(path):
+                continue
+            self._queued.add(path)
+            self._queue.put(path)
+            self.update_status(f"Đưa vào hàng đợi: {path}")
+
+    def _work_loop(self) -> None:
+        while True:
+            input_file = self._queue.get()
+            if input_file is None or self.translator.cancelled:
+                return
+            self._queued.discard(input_file)
+            if not self.needs_translation(input_file):
+                continue
+            self.translator.translate_file(
+                input_file,
+                self._output_file(input_file),
+                self.api_config,
+                self.num_threads,
+                self.batch_size,
+                self.max_retries,
+                self.bilingual,
+                incremental=True,
+            )
+
+    def run(self) -> None:
+        """Chạy daemon cho tới khi stop() được gọi (hoặc Ctrl+C)."""
+        watcher = create_watcher(self.directory, self.poll_interval, self.use_inotify)
+        self.update_status(
+            f"Đang theo dõi {self.directory} ({type(watcher).__name__})"
+        )
+
+        self._worker = threading.Thread(target=self._work_loop, name="watch-worker")
+        self._worker.start()
+
+        # File đã có sẵn khi khởi động được xử lý ngay
+        for path in _scan_tree(self.directory):
+            if _is_candidate(path, self.file_suffix):
+                self._pending[path] = 0.0
+
+        try:
+            while not self._stop.is_set():
+                self._enqueue_settled()
+                changed = watcher.poll(min(1.0, self.settle_seconds))
+                if changed is None:
+                    # Hàng đợi sự kiện bị tràn: quét lại toàn bộ
+                    changed = list(_scan_tree(self.directory))
+                for path in changed:
+                    self._note_change(path)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+            self.translator.cancel_token.cancel("Dừng theo dõi thư mục")
+            self._queue.put(None)
+            self._worker.join()
+            self.executor.shutdown(wait=True)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def main(argv: List[str] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Theo dõi thư mục và tự động dịch SRT")
+    parser.add_argument("directory")
+    parser.add_argument("--api", default="gemini", choices=["gemini", "novita", "openrouter"])
+    parser.add_argument("--key", default=os.environ.get("SRT_TRANSLATOR_API_KEY", ""))
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--base-url", default=None)
+    parser.add_argument("--threads", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--retries", type=int, default=0, help="0 = không giới hạn")
+    parser.add_argument("--bilingual", action="store_true")
+    parser.add_argument("--suffix", default="_vi")
+    parser.add_argument("--settle", type=float, default=2.0)
+    parser.add_argument("--poll", action="store_true", help="Luôn dùng chế độ quét định kỳ")
+    parser.add_argument("--poll-interval", type=float, default=5.0)
+    parser.add_argument("--glossary", default=None, help="File thuật ngữ")
+    args = parser.parse_args(argv)
+
+    api_config = {"type": args.api, "key": args.key}
+    if args.model:
+        api_config["model"] = args.model
+    if args.base_url:
+        api_config["base_url"] = args.base_url
+    if args.glossary:
+        api_config["glossary"] = args.glossary
+
+    WatchFolderDaemon(
+        args.directory,
+        api_config,
+        args.threads,
+        args.batch_size,
+        float("inf") if args.retries == 0 else args.retries,
+        args.bilingual,
+        args.suffix,
+        args.settle,
+        args.poll_interval,
+        not args.poll,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()